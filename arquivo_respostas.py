@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO DE RESPOSTAS - Páginas cruas em segmentos WARC + re-extração offline
+=============================================================================
+
+Quando um bug de extrator é corrigido (CORRECOES_*.md, FIX_*.md), recuperar os
+dados certos exigia crawlear tudo de novo.
+
+- Respostas gravadas em segmentos `*.warc.gz` (um membro gzip por registro,
+  registro WARC/1.1 `response` com status + headers + corpo), rotação por tamanho
+- Endereçado por conteúdo: corpo com o mesmo SHA-256 é gravado uma vez só;
+  capturas repetidas viram só uma linha no índice
+- Índice SQLite (url, host, data, status, sha256 → segmento + offset + tamanho):
+  leitura de um registro = seek + descompactar um membro
+- Ativação: variável de ambiente `ARQUIVAR_RESPOSTAS=<nome>` (ou
+  `ativar_arquivo(nome)`). Só arquivam os clientes httpx com `event_hooks()` /
+  `event_hooks_async()` ou que chamam `arquivar_resposta()`: hoje
+  extract_detailsv8, extract_sacada e extract_crawlee_completo (`archive_name`).
+  Descoberta (linksv8, frontier) e extract_fast não passam por aqui
+- No AsyncClient, gzip + escrita do segmento + SQLite rodam em `asyncio.to_thread`
+  (não bloqueiam o event loop)
+- `reextrair`: reprocessa a última captura de cada URL com os parsers atuais
+  (ProcessPool, um processo por core) e grava via sinks - sem rede. Parsers
+  disponíveis: detailsv8 e sacada (PARSERS)
+
+Uso:
+    ARQUIVAR_RESPOSTAS=sacada python extract_sacada.py
+    python arquivo_respostas.py listar
+    python arquivo_respostas.py reextrair --arquivo sacada --parser sacada --saida sacada_corrigido.ndjson
+    python arquivo_respostas.py reextrair --arquivo geral --parser detailsv8 --host www.loja.com --saida r.csv
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import importlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from sinks import criar_sink
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO_PADRAO = os.path.join('storage', 'arquivo')
+MAX_SEGMENTO = 256 * 1024 * 1024     # Rotação do segmento (bytes compactados)
+LOTE_REEXTRACAO = 200                # Registros por tarefa do ProcessPool
+
+# Parser (nome curto) → "modulo:funcao(html, url) -> Dict"
+PARSERS = {
+    'detailsv8': 'extract_detailsv8:extrair_dados_html',
+    'sacada': 'extract_sacada:parsear_produto_sacada',
+}
+
+# Headers que descrevem o transporte (o corpo arquivado já está decodificado)
+HEADERS_TRANSPORTE = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+# ================================================================================================
+# FORMATO DO REGISTRO
+# ================================================================================================
+def _montar_registro(url: str, status: int, reason: str, headers: List[Tuple[str, str]],
+                     corpo: bytes, sha256: str, capturado_em: float) -> bytes:
+    linhas_http = [f"HTTP/1.1 {status} {reason}".rstrip()]
+    linhas_http += [f"{k}: {v}" for k, v in headers if k.lower() not in HEADERS_TRANSPORTE]
+    bloco = ('\r\n'.join(linhas_http) + '\r\n\r\n').encode('utf-8', 'replace') + corpo
+    data = datetime.fromtimestamp(capturado_em, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    cabecalho = (
+        "WARC/1.1\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {data}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Payload-Digest: sha256:{sha256}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(bloco)}\r\n\r\n"
+    ).encode('utf-8')
+    return gzip.compress(cabecalho + bloco + b'\r\n\r\n', compresslevel=6)
+
+
+def _abrir_registro(dados: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """Membro gzip → (status, headers, corpo)."""
+    bruto = gzip.decompress(dados)
+    cabecalho, _, resto = bruto.partition(b'\r\n\r\n')   # Cabeçalho WARC
+    tamanho = next(int(l.split(b':', 1)[1]) for l in cabecalho.split(b'\r\n')
+                   if l.lower().startswith(b'content-length:'))
+    http, _, corpo = resto[:tamanho].partition(b'\r\n\r\n')   # Status + headers HTTP | corpo
+    linhas = http.decode('utf-8', 'replace').split('\r\n')
+    status = int(linhas[0].split()[1])
+    headers = dict(l.split(': ', 1) for l in linhas[1:] if ': ' in l)
+    return status, headers, corpo
+
+
+def _ler_membro(caminho: str, offset: int, tamanho: int) -> Tuple[int, Dict[str, str], bytes]:
+    with open(caminho, 'rb') as f:
+        f.seek(offset)
+        return _abrir_registro(f.read(tamanho))
+
+
+# ================================================================================================
+# ARQUIVO
+# ================================================================================================
+class ArquivoRespostas:
+    """
+    Arquivo de respostas cruas (thread-safe; vários processos podem gravar no
+    mesmo arquivo - cada um no seu segmento).
+    """
+
+    def __init__(self, nome: str = 'default', diretorio: str = DIRETORIO_PADRAO,
+                 max_segmento: int = MAX_SEGMENTO):
+        self.nome = nome
+        self.diretorio = os.path.join(diretorio, nome)
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.max_segmento = max_segmento
+        self._lock = threading.Lock()
+        self._segmento: Optional[str] = None
+        self._arquivo = None
+        self._parte = 0
+        self.stats = {'capturas': 0, 'gravados': 0, 'deduplicados': 0, 'bytes': 0}
+
+        self.conn = sqlite3.connect(os.path.join(self.diretorio, 'indice.sqlite'), timeout=30,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conteudos (
+                sha256 TEXT PRIMARY KEY,
+                segmento TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS capturas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                host TEXT NOT NULL,
+                capturado_em REAL NOT NULL,
+                status INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                content_type TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_capturas_url ON capturas(url, capturado_em);
+            CREATE INDEX IF NOT EXISTS idx_capturas_host ON capturas(host, status);
+        """)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def _abrir_segmento(self):
+        if self._arquivo:
+            self._arquivo.close()
+        self._parte += 1
+        carimbo = time.strftime('%Y%m%d%H%M%S')
+        self._segmento = f"seg-{carimbo}-{os.getpid()}-{self._parte:05d}.warc.gz"
+        self._arquivo = open(os.path.join(self.diretorio, self._segmento), 'ab')
+
+    def arquivar(self, url: str, status: int, headers: List[Tuple[str, str]], corpo: bytes,
+                 reason: str = '', capturado_em: Optional[float] = None) -> str:
+        """Grava uma resposta (corpo deduplicado por SHA-256). Retorna o hash."""
+        capturado_em = capturado_em or time.time()
+        sha256 = hashlib.sha256(corpo).hexdigest()
+        content_type = next((v for k, v in headers if k.lower() == 'content-type'), None)
+
+        with self._lock:
+            existe = self.conn.execute("SELECT 1 FROM conteudos WHERE sha256=?", (sha256,)).fetchone()
+            if existe:
+                self.stats['deduplicados'] += 1
+            else:
+                registro = _montar_registro(url, status, reason, headers, corpo, sha256, capturado_em)
+                if self._arquivo is None or self._arquivo.tell() + len(registro) > self.max_segmento:
+                    self._abrir_segmento()
+                offset = self._arquivo.tell()
+                self._arquivo.write(registro)
+                self._arquivo.flush()
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO conteudos (sha256, segmento, offset, tamanho) VALUES (?, ?, ?, ?)",
+                    (sha256, self._segmento, offset, len(registro))
+                )
+                self.stats['gravados'] += 1
+                self.stats['bytes'] += len(registro)
+            self.conn.execute(
+                "INSERT INTO capturas (url, host, capturado_em, status, sha256, content_type) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, urlparse(url).netloc.lower(), capturado_em, status, sha256, content_type)
+            )
+            self.stats['capturas'] += 1
+        return sha256
+
+    def arquivar_resposta(self, response: httpx.Response) -> str:
+        """Arquiva um httpx.Response já lido."""
+        return self.arquivar(str(response.url), response.status_code, list(response.headers.items()),
+                             response.content, response.reason_phrase)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def ler(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """Última captura de uma URL → (status, headers, corpo)."""
+        with self._lock:
+            linha = self.conn.execute(
+                "SELECT c.segmento, c.offset, c.tamanho FROM capturas p JOIN conteudos c ON c.sha256=p.sha256 "
+                "WHERE p.url=? ORDER BY p.capturado_em DESC LIMIT 1", (url,)
+            ).fetchone()
+        if not linha:
+            return None
+        return _ler_membro(os.path.join(self.diretorio, linha[0]), linha[1], linha[2])
+
+    def ultimas_capturas(self, host: Optional[str] = None, status: int = 200) -> List[Tuple[str, str, int, int]]:
+        """(url, segmento, offset, tamanho) da captura mais recente de cada URL."""
+        sql = (
+            "SELECT p.url, c.segmento, c.offset, c.tamanho FROM capturas p "
+            "JOIN (SELECT url, MAX(capturado_em) AS ultima FROM capturas WHERE status=? {filtro} GROUP BY url) u "
+            "ON u.url=p.url AND u.ultima=p.capturado_em "
+            "JOIN conteudos c ON c.sha256=p.sha256"
+        )
+        params: List = [status]
+        filtro = ''
+        if host:
+            filtro = 'AND host=?'
+            params.append(host.lower())
+        with self._lock:
+            return self.conn.execute(sql.format(filtro=filtro), params).fetchall()
+
+    def resumo(self) -> Dict[str, int]:
+        with self._lock:
+            capturas, urls = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM capturas").fetchone()
+            conteudos, tamanho = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM conteudos").fetchone()
+        return {'capturas': capturas, 'urls': urls, 'conteudos_unicos': conteudos, 'bytes_compactados': tamanho}
+
+    def close(self):
+        with self._lock:
+            if self._arquivo:
+                self._arquivo.close()
+                self._arquivo = None
+            self.conn.close()
+
+
+# ================================================================================================
+# ATIVAÇÃO GLOBAL + HOOKS HTTPX
+# ================================================================================================
+_arquivo_ativo: Optional[ArquivoRespostas] = None
+_arquivo_lock = threading.Lock()
+
+
+def ativar_arquivo(nome: str, diretorio: str = DIRETORIO_PADRAO) -> ArquivoRespostas:
+    """Liga o arquivamento para o processo inteiro."""
+    global _arquivo_ativo
+    with _arquivo_lock:
+        if _arquivo_ativo is None or _arquivo_ativo.nome != nome:
+            _arquivo_ativo = ArquivoRespostas(nome, diretorio)
+        return _arquivo_ativo
+
+
+def obter_arquivo() -> Optional[ArquivoRespostas]:
+    """Arquivo ativo (ou o da variável ARQUIVAR_RESPOSTAS); None = arquivamento desligado."""
+    if _arquivo_ativo is None and os.environ.get('ARQUIVAR_RESPOSTAS'):
+        return ativar_arquivo(os.environ['ARQUIVAR_RESPOSTAS'])
+    return _arquivo_ativo
+
+
+def arquivar_resposta(response: httpx.Response):
+    """Arquiva se o arquivamento estiver ligado (no-op caso contrário)."""
+    arquivo = obter_arquivo()
+    if arquivo is not None:
+        arquivo.arquivar_resposta(response)
+
+
+def event_hooks() -> Dict[str, List[Callable]]:
+    """event_hooks para httpx.Client: arquiva toda resposta quando ligado."""
+    def _hook(response: httpx.Response):
+        if obter_arquivo() is not None:
+            response.read()
+            arquivar_resposta(response)
+    return {'response': [_hook]}
+
+
+def event_hooks_async() -> Dict[str, List[Callable]]:
+    """event_hooks para httpx.AsyncClient (gravação fora do event loop)."""
+    async def _hook(response: httpx.Response):
+        if obter_arquivo() is not None:
+            await response.aread()
+            await asyncio.to_thread(arquivar_resposta, response)
+    return {'response': [_hook]}
+
+
+# ================================================================================================
+# RE-EXTRAÇÃO OFFLINE
+# ================================================================================================
+def _carregar_parser(spec: str) -> Callable[[str, str], Dict]:
+    modulo, _, funcao = PARSERS.get(spec, spec).partition(':')
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+def _reextrair_lote(args: Tuple[str, str, List[Tuple[str, str, int, int]]]) -> List[Dict]:
+    """Roda no processo filho: lê os membros do disco e aplica o parser."""
+    spec, diretorio, itens = args
+    parser = _carregar_parser(spec)
+    resultados = []
+    for url, segmento, offset, tamanho in itens:
+        try:
+            _, headers, corpo = _ler_membro(os.path.join(diretorio, segmento), offset, tamanho)
+            charset = 'utf-8'
+            tipo = headers.get('content-type') or headers.get('Content-Type') or ''
+            if 'charset=' in tipo:
+                charset = tipo.split('charset=')[-1].split(';')[0].strip() or 'utf-8'
+            html = corpo.decode(charset, 'replace')
+            dados = parser(html, url)
+        except Exception as e:
+            dados = {'url': url, 'erro': str(e)}
+        dados.setdefault('url', url)
+        resultados.append(dados)
+    return resultados
+
+
+def _lotes(itens: List, tamanho: int) -> Iterator[List]:
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+def reextrair(
+    nome: str,
+    parser: str,
+    saida: str,
+    host: Optional[str] = None,
+    processos: Optional[int] = None,
+    diretorio: str = DIRETORIO_PADRAO,
+    lote: int = LOTE_REEXTRACAO
+) -> Dict[str, float]:
+    """Reaplica `parser` na última captura 200 de cada URL do arquivo; grava em `saida`."""
+    arquivo = ArquivoRespostas(nome, diretorio)
+    itens = arquivo.ultimas_capturas(host)
+    arquivo.close()
+    print(f"🗄️ {len(itens)} páginas no arquivo '{nome}'" + (f" ({host})" if host else ""))
+
+    inicio = time.perf_counter()
+    ok = erros = 0
+    tarefas = [(parser, os.path.join(diretorio, nome), grupo) for grupo in _lotes(itens, lote)]
+    with criar_sink(saida) as sink, ProcessPoolExecutor(max_workers=processos) as executor:
+        for resultados in executor.map(_reextrair_lote, tarefas):
+            for dados in resultados:
+                sink.write(dados)
+                if dados.get('erro') or not dados.get('nome'):
+                    erros += 1
+                else:
+                    ok += 1
+    tempo = time.perf_counter() - inicio
+    print(f"✅ {ok} re-extraídos, {erros} sem dados em {tempo:.1f}s "
+          f"({len(itens) / tempo if tempo else 0:.0f} páginas/s) → {saida}")
+    return {'paginas': len(itens), 'ok': ok, 'erros': erros, 'tempo': tempo}
+
+
+# ================================================================================================
+# MAIN
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Arquivo de respostas cruas + re-extração offline")
+    parser.add_argument('--diretorio', default=DIRETORIO_PADRAO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    sub.add_parser('listar', help="Arquivos existentes e tamanhos")
+
+    reex = sub.add_parser('reextrair', help="Reprocessa as páginas arquivadas com os parsers atuais")
+    reex.add_argument('--arquivo', required=True, help="Nome do arquivo (ARQUIVAR_RESPOSTAS usado no run)")
+    reex.add_argument('--parser', required=True, help=f"{', '.join(PARSERS)} ou modulo:funcao(html, url)")
+    reex.add_argument('--saida', required=True, help="Destino (.ndjson/.csv/.parquet, com ou sem .gz)")
+    reex.add_argument('--host')
+    reex.add_argument('--processos', type=int, default=None, help="Padrão: um por core")
+
+    args = parser.parse_args()
+
+    if args.comando == 'listar':
+        if not os.path.isdir(args.diretorio):
+            print("🗄️ Nenhum arquivo")
+            return
+        for nome in sorted(os.listdir(args.diretorio)):
+            if os.path.exists(os.path.join(args.diretorio, nome, 'indice.sqlite')):
+                arquivo = ArquivoRespostas(nome, args.diretorio)
+                r = arquivo.resumo()
+                arquivo.close()
+                print(f"🗄️ {nome}: {r['urls']} URLs, {r['capturas']} capturas, "
+                      f"{r['conteudos_unicos']} corpos únicos, {r['bytes_compactados'] / 1e6:.1f} MB")
+    else:
+        reextrair(args.arquivo, args.parser, args.saida, args.host, args.processos, args.diretorio)
+
+
+if __name__ == "__main__":
+    main()
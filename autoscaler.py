@@ -0,0 +1,293 @@
+"""
+AUTOSCALER AIMD - Concorrência por host ajustada por latência e erros
+======================================================================
+
+A concorrência dos extratores era fixa (Config.max_concurrency, MAX_CONCURRENCY = 60,
+max_workers do quintapp) e o único ajuste era o RPM, em degraus, a cada 10 requests.
+Este controlador ajusta o número de requests EM VOO por host:
+
+- Additive increase: +1 por janela saudável em que o limite foi de fato usado
+- Multiplicative decrease:
+    × 0.5  em 429 (imediato, com cooldown para não despencar com a rajada em voo)
+    × 0.75 quando a janela tem erro/5xx acima do limite ou p95 acima do alvo
+- Alvo de latência: `latencia_alvo` fixo ou FATOR_LATENCIA × p95 base do host, uma média
+  móvel lenta (EWMA) do p95 das janelas - o sinal é a piora em relação ao próprio host,
+  não a razão p95/p50 (que num host lognormal saudável já passa de 2x); a base sobe e
+  desce com o host, então uma mudança permanente de patamar é absorvida em ~10 janelas
+- O número de workers/threads vira apenas o TETO (`max_concorrencia`)
+- Thread-safe; `acquire` (async) e `acquire_sync` (threads) com fila FIFO por host
+  e entrega direta do slot na liberação (sem polling, sem thundering herd)
+- `setpoints()` expõe limite, em voo, p50/p95, taxa de erro e 429s por host
+
+Uso:
+    autoscaler = AIMDAutoscaler(max_concorrencia=40)
+    await autoscaler.acquire(url)
+    inicio = time.perf_counter(); status = None
+    try:
+        status = (await client.get(url)).status_code
+    finally:
+        autoscaler.release(url, time.perf_counter() - inicio, status)
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from rate_limiter import host_de
+from timing_requests import registrar_tempo
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+JANELA = 20                 # Conclusões por janela de decisão
+FATOR_429 = 0.5             # Decremento multiplicativo em 429
+FATOR_DEGRADACAO = 0.75     # Decremento em erro/latência alta
+TAXA_ERRO_MAX = 0.10        # Acima disso a janela é "não saudável"
+FATOR_LATENCIA = 2.0        # p95 da janela > 2x o p95 base → congestionado
+ALFA_BASE = 0.1             # Peso da janela nova na EWMA das bases (p50/p95)
+AMOSTRAS_LATENCIA = 200     # Latências guardadas por host (p50/p95)
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, math.ceil(p * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _ewma(base: Optional[float], valor: float) -> float:
+    return valor if base is None else base + ALFA_BASE * (valor - base)
+
+
+# ================================================================================================
+# ESTADO POR HOST
+# ================================================================================================
+class _HostEstado:
+    __slots__ = ('limite', 'em_voo', 'espera', 'latencias', 'p50_base', 'p95_base', 'janela_total',
+                 'janela_erros', 'janela_429', 'janela_saturada', 'total_429', 'ultima_reducao')
+
+    def __init__(self, limite: float):
+        self.limite = limite
+        self.em_voo = 0
+        self.espera: Deque[Callable[[], None]] = deque()
+        self.latencias: Deque[float] = deque(maxlen=AMOSTRAS_LATENCIA)
+        self.p50_base: Optional[float] = None
+        self.p95_base: Optional[float] = None
+        self.janela_total = 0
+        self.janela_erros = 0
+        self.janela_429 = 0
+        self.janela_saturada = False
+        self.total_429 = 0
+        self.ultima_reducao = 0.0
+
+
+# ================================================================================================
+# AIMD AUTOSCALER
+# ================================================================================================
+class AIMDAutoscaler:
+    """
+    Controlador AIMD de concorrência por host.
+
+    Args:
+        max_concorrencia: teto (nº de workers/threads disponíveis)
+        min_concorrencia: piso
+        concorrencia_inicial: ponto de partida (padrão: 1/4 do teto)
+        latencia_alvo: p95 alvo em segundos (None = relativo ao p95 base do host)
+        janela: conclusões entre decisões
+    """
+
+    def __init__(
+        self,
+        max_concorrencia: int = 40,
+        min_concorrencia: int = 1,
+        concorrencia_inicial: Optional[int] = None,
+        latencia_alvo: Optional[float] = None,
+        janela: int = JANELA,
+        verbose: bool = False
+    ):
+        self.max_concorrencia = max(1, max_concorrencia)
+        self.min_concorrencia = max(1, min(min_concorrencia, self.max_concorrencia))
+        inicial = concorrencia_inicial or max(self.min_concorrencia, self.max_concorrencia // 4)
+        self.concorrencia_inicial = min(self.max_concorrencia, max(self.min_concorrencia, inicial))
+        self.latencia_alvo = latencia_alvo
+        self.janela = janela
+        self.verbose = verbose
+
+        self._hosts: Dict[str, _HostEstado] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+    def _estado(self, host: str) -> _HostEstado:
+        estado = self._hosts.get(host)
+        if estado is None:
+            estado = self._hosts[host] = _HostEstado(self.concorrencia_inicial)
+        return estado
+
+    def _tentar(self, estado: _HostEstado) -> bool:
+        """Ocupa um slot se houver (chamado com o lock)."""
+        if estado.em_voo < int(estado.limite) and not estado.espera:
+            estado.em_voo += 1
+            if estado.em_voo >= int(estado.limite):
+                estado.janela_saturada = True
+            return True
+        return False
+
+    def _entregar(self, estado: _HostEstado):
+        """Passa slots livres direto para quem está na fila (chamado com o lock)."""
+        while estado.espera and estado.em_voo < int(estado.limite):
+            estado.em_voo += 1
+            estado.janela_saturada = True
+            estado.espera.popleft()()
+
+    async def acquire(self, url_ou_host: Optional[str] = None):
+        """Aguarda um slot de concorrência do host (async)."""
+        host = host_de(url_ou_host)
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+
+        def acordar():
+            loop.call_soon_threadsafe(lambda: futuro.done() or futuro.set_result(None))
+
+        with self._lock:
+            estado = self._estado(host)
+            if self._tentar(estado):
+                registrar_tempo(host, 'fila_autoscaler', 0.0)
+                return
+            estado.espera.append(acordar)
+
+        inicio = time.perf_counter()
+        try:
+            await futuro
+            registrar_tempo(host, 'fila_autoscaler', time.perf_counter() - inicio)
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    estado.espera.remove(acordar)
+                except ValueError:
+                    # Slot já foi entregue - devolve
+                    estado.em_voo -= 1
+                    self._entregar(estado)
+            raise
+
+    def acquire_sync(self, url_ou_host: Optional[str] = None):
+        """Aguarda um slot de concorrência do host (threads)."""
+        host = host_de(url_ou_host)
+        evento = threading.Event()
+        with self._lock:
+            estado = self._estado(host)
+            if self._tentar(estado):
+                registrar_tempo(host, 'fila_autoscaler', 0.0)
+                return
+            estado.espera.append(evento.set)
+        inicio = time.perf_counter()
+        evento.wait()
+        registrar_tempo(host, 'fila_autoscaler', time.perf_counter() - inicio)
+
+    def release(
+        self,
+        url_ou_host: Optional[str] = None,
+        latencia: Optional[float] = None,
+        status: Optional[int] = None,
+        erro: bool = False
+    ):
+        """
+        Libera o slot e alimenta o controlador.
+
+        status=None com erro=False conta como sucesso sem código (ex: parse local);
+        exceções de rede devem passar erro=True.
+        """
+        host = host_de(url_ou_host)
+        with self._lock:
+            estado = self._estado(host)
+            estado.em_voo = max(0, estado.em_voo - 1)
+
+            if latencia is not None and status != 429 and not erro:
+                estado.latencias.append(latencia)
+
+            estado.janela_total += 1
+            if status == 429:
+                estado.janela_429 += 1
+                estado.total_429 += 1
+                self._reduzir(host, estado, FATOR_429, "429")
+            elif erro or (status is not None and status >= 500):
+                estado.janela_erros += 1
+
+            if estado.janela_total >= self.janela:
+                self._fechar_janela(host, estado)
+
+            self._entregar(estado)
+
+    # ------------------------------------------------------------------
+    # Controle AIMD
+    # ------------------------------------------------------------------
+    def _reduzir(self, host: str, estado: _HostEstado, fator: float, motivo: str):
+        agora = time.monotonic()
+        # Cooldown ~ uma latência típica: requests já em voo não derrubam o limite de novo
+        cooldown = max(1.0, estado.p50_base or 0.0)
+        if agora - estado.ultima_reducao < cooldown:
+            return
+        antigo = estado.limite
+        estado.limite = max(self.min_concorrencia, math.floor(estado.limite * fator))
+        estado.ultima_reducao = agora
+        estado.janela_saturada = False
+        if self.verbose and int(antigo) != int(estado.limite):
+            print(f"📉 [{host or '*'}] Concorrência {int(antigo)} → {int(estado.limite)} ({motivo})")
+
+    def _fechar_janela(self, host: str, estado: _HostEstado):
+        recentes = list(estado.latencias)[-self.janela:]
+        p50 = _percentil(recentes, 0.50)
+        p95 = _percentil(recentes, 0.95)
+
+        # Alvo calculado ANTES de a janela entrar na base: um pico é comparado com o passado
+        alvo = self.latencia_alvo
+        if alvo is None and estado.p95_base:
+            alvo = FATOR_LATENCIA * estado.p95_base
+        if recentes:
+            estado.p50_base = _ewma(estado.p50_base, p50)
+            estado.p95_base = _ewma(estado.p95_base, p95)
+
+        taxa_erro = estado.janela_erros / estado.janela_total
+        if estado.janela_429 == 0:
+            if taxa_erro > TAXA_ERRO_MAX:
+                self._reduzir(host, estado, FATOR_DEGRADACAO, f"erros {taxa_erro:.0%}")
+            elif alvo and p95 > alvo:
+                self._reduzir(host, estado, FATOR_DEGRADACAO, f"p95 {p95:.2f}s")
+            elif estado.janela_saturada and estado.limite < self.max_concorrencia:
+                estado.limite += 1
+                if self.verbose:
+                    print(f"📈 [{host or '*'}] Concorrência → {int(estado.limite)}")
+
+        estado.janela_total = estado.janela_erros = estado.janela_429 = 0
+        estado.janela_saturada = estado.em_voo >= int(estado.limite)
+
+    # ------------------------------------------------------------------
+    # Setpoints
+    # ------------------------------------------------------------------
+    def limite(self, url_ou_host: Optional[str] = None) -> int:
+        with self._lock:
+            estado = self._hosts.get(host_de(url_ou_host))
+            return int(estado.limite) if estado else self.concorrencia_inicial
+
+    def setpoints(self) -> Dict[str, Dict]:
+        """Estado atual por host."""
+        with self._lock:
+            return {
+                host or '*': {
+                    'limite': int(e.limite),
+                    'em_voo': e.em_voo,
+                    'na_fila': len(e.espera),
+                    'p50': round(_percentil(e.latencias, 0.50), 3),
+                    'p95': round(_percentil(e.latencias, 0.95), 3),
+                    'p95_base': round(e.p95_base or 0.0, 3),
+                    'taxa_erro_janela': round(e.janela_erros / e.janela_total, 3) if e.janela_total else 0.0,
+                    'total_429': e.total_429,
+                }
+                for host, e in self._hosts.items()
+            }
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK DE PARSERS - Microbenchmarks offline sobre as páginas salvas no repo
+===============================================================================
+
+Mede cada caminho de parse sobre as fixtures HTML capturadas (sem rede), para
+ter números antes de mexer em qualquer hot path.
+
+- Casos: BeautifulSoup (lxml / html.parser), extrair_json_ld, extrair_opengraph,
+  extrair_html, extrair_javascript_vars e a cascata completa (extract_detailsv8),
+  extrair_apollo_cache (extract_sacada), métodos microdata do PetriziExtractor,
+  extrair_via_hydration (extract_advanced) e fragmento_json_ld (recorte do cache_conteudo)
+- Entrada pronta fora da medição: casos que recebem `soup` usam um soup já
+  construído; o custo do soup aparece à parte nos casos `soup.*`
+- Tempo: mediana de N repetições (mínimo --min-tempo por caso) → µs/página e páginas/s
+- Memória: uma execução sob tracemalloc → pico (KB) e blocos ainda vivos no fim
+  (CPython não expõe contagem barata de alocações totais)
+- `--saida bench.json` guarda os resultados por caso × fixture (baseline)
+
+Uso:
+    python bench_parsers.py
+    python bench_parsers.py --casos v8. --fixtures "dermo_*.html" --saida bench.json
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+import extract_detailsv8 as v8
+from extract_advanced import extrair_via_hydration
+from extract_petrizi import PetriziExtractor
+from extract_sacada import extrair_apollo_cache
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+FIXTURES_PADRAO = [
+    'dermo_produto.html', 'dermo_minoxidil.html', 'katsukazan_produto.html',
+    'magnumauto_produto.html', 'magnumauto_rendered.html', 'mhstudios_produto.html',
+    'mhstudios_produto_real.html', 'petrizi_produto.html', 'sacada_produto_debug.html',
+    'cebmodas_produto.html', 'artistasdomundo_produto_kit.html', 'matcon_debug.html',
+    'debug_produto.html',
+]
+
+_petrizi = PetriziExtractor()
+
+# nome → (entrada, função). Entrada: 'html' (texto cru), 'lxml' ou 'html.parser' (soup pronto)
+CASOS: Dict[str, tuple] = {
+    'soup.lxml': ('html', lambda html: BeautifulSoup(html, 'lxml')),
+    'soup.html_parser': ('html', lambda html: BeautifulSoup(html, 'html.parser')),
+    'v8.extrair_json_ld': ('lxml', v8.extrair_json_ld),
+    'v8.extrair_opengraph': ('lxml', v8.extrair_opengraph),
+    'v8.extrair_html': ('lxml', v8.extrair_html),
+    'v8.extrair_javascript_vars': ('html', v8.extrair_javascript_vars),
+    'v8.extrair_dados_html': ('html', lambda html: v8.extrair_dados_html(html, '')),
+    'sacada.extrair_apollo_cache': ('html', extrair_apollo_cache),
+    'petrizi.extrair_preco': ('html.parser', _petrizi.extrair_preco),
+    'petrizi.extrair_nome': ('html.parser', _petrizi.extrair_nome),
+    'petrizi.extrair_imagem': ('html.parser', _petrizi.extrair_imagem),
+    'petrizi.extrair_marca': ('html.parser', _petrizi.extrair_marca),
+    'advanced.extrair_via_hydration': ('html', extrair_via_hydration),
+    'v8.fragmento_json_ld': ('html', v8.fragmento_json_ld),
+}
+
+
+# ================================================================================================
+# MEDIÇÃO
+# ================================================================================================
+def _acertou(resultado) -> bool:
+    """Achou algo? (dict com nome/preço, ou qualquer valor não vazio)"""
+    if isinstance(resultado, dict):
+        if 'nome' in resultado or 'preco' in resultado:
+            return bool(resultado.get('nome') or resultado.get('preco'))
+        return bool(resultado)
+    return resultado not in (None, '', 'N/A', 0) and resultado is not False
+
+
+def medir(funcao: Callable, entrada, min_tempo: float = 0.2, min_repeticoes: int = 5,
+          max_repeticoes: int = 200) -> Dict:
+    """Mediana de tempo por chamada + pico de memória de uma chamada isolada."""
+    resultado = funcao(entrada)  # aquecimento (imports preguiçosos, caches de regex)
+
+    tempos: List[int] = []
+    inicio = time.perf_counter()
+    while len(tempos) < max_repeticoes and (len(tempos) < min_repeticoes or time.perf_counter() - inicio < min_tempo):
+        t0 = time.perf_counter_ns()
+        funcao(entrada)
+        tempos.append(time.perf_counter_ns() - t0)
+
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        antes = tracemalloc.take_snapshot()
+        retido = funcao(entrada)
+        _, pico = tracemalloc.get_traced_memory()
+        depois = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocos = sum(d.count_diff for d in depois.compare_to(antes, 'filename') if d.count_diff > 0)
+    del retido
+
+    us = statistics.median(tempos) / 1000
+    return {
+        'us_por_pagina': round(us, 1),
+        'paginas_s': round(1e6 / us, 1) if us else None,
+        'p90_us': round(sorted(tempos)[int(len(tempos) * 0.9) - 1] / 1000, 1),
+        'repeticoes': len(tempos),
+        'pico_kb': round((pico - base) / 1024, 1),
+        'blocos_retidos': blocos,
+        'acerto': _acertou(resultado),
+    }
+
+
+def carregar_fixtures(padroes: Optional[List[str]] = None) -> Dict[str, str]:
+    if padroes:
+        caminhos = sorted({c for p in padroes for c in glob.glob(os.path.join(DIRETORIO, p))})
+    else:
+        caminhos = []
+        for nome in FIXTURES_PADRAO:
+            caminho = os.path.join(DIRETORIO, nome)
+            if os.path.exists(caminho):
+                caminhos.append(caminho)
+            else:
+                print(f"⚠️ Fixture ausente: {nome}")
+    fixtures = {}
+    for caminho in caminhos:
+        with open(caminho, encoding='utf-8', errors='replace') as f:
+            fixtures[os.path.basename(caminho)] = f.read()
+    return fixtures
+
+
+def rodar(fixtures: Dict[str, str], casos: Dict[str, tuple], min_tempo: float = 0.2) -> List[Dict]:
+    resultados = []
+    for fixture, html in fixtures.items():
+        entradas = {'html': html}
+        for tipo in ('lxml', 'html.parser'):
+            if any(c[0] == tipo for c in casos.values()):
+                entradas[tipo] = BeautifulSoup(html, tipo)
+        print(f"📄 {fixture} ({len(html) / 1024:.0f} KB)")
+        for nome, (tipo, funcao) in casos.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    medida = medir(funcao, entradas[tipo], min_tempo)
+                except Exception as e:
+                    medida = {'erro': f"{type(e).__name__}: {e}"}
+            resultados.append({'caso': nome, 'fixture': fixture, 'bytes': len(html.encode('utf-8')), **medida})
+    return resultados
+
+
+def agregar(resultados: List[Dict]) -> List[Dict]:
+    """Por caso: tempo total para ler todas as fixtures uma vez → µs/página e páginas/s médios."""
+    por_caso: Dict[str, List[Dict]] = {}
+    for r in resultados:
+        por_caso.setdefault(r['caso'], []).append(r)
+    linhas = []
+    for caso, rs in por_caso.items():
+        ok = [r for r in rs if 'erro' not in r]
+        if not ok:
+            linhas.append({'caso': caso, 'fixtures': len(rs), 'erros': len(rs)})
+            continue
+        total_us = sum(r['us_por_pagina'] for r in ok)
+        linhas.append({
+            'caso': caso,
+            'fixtures': len(rs),
+            'us_por_pagina': round(total_us / len(ok), 1),
+            'paginas_s': round(len(ok) * 1e6 / total_us, 1) if total_us else None,
+            'pico_kb_max': max(r['pico_kb'] for r in ok),
+            'blocos_retidos_medio': round(sum(r['blocos_retidos'] for r in ok) / len(ok)),
+            'acertos': sum(r['acerto'] for r in ok),
+            'erros': len(rs) - len(ok),
+        })
+    return linhas
+
+
+def imprimir(linhas: List[Dict]):
+    print(f"\n{'caso':<32} {'µs/pág':>10} {'pág/s':>9} {'pico KB':>9} {'blocos':>8} {'acertos':>8}")
+    print('-' * 80)
+    for l in linhas:
+        if 'us_por_pagina' not in l:
+            print(f"{l['caso']:<32} {'erro em todas as fixtures':>47}")
+            continue
+        print(f"{l['caso']:<32} {l['us_por_pagina']:>10,.1f} {l['paginas_s']:>9,.1f} "
+              f"{l['pico_kb_max']:>9,.1f} {l['blocos_retidos_medio']:>8} {l['acertos']:>4}/{l['fixtures']:<3}"
+              + (f" ⚠️ {l['erros']} erros" if l['erros'] else ''))
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks offline dos parsers')
+    parser.add_argument('--casos', help='Filtro por substring, separado por vírgula (ex: v8.,petrizi)')
+    parser.add_argument('--fixtures', nargs='*', help='Globs de fixtures (padrão: páginas de produto do repo)')
+    parser.add_argument('--min-tempo', type=float, default=0.2, help='Segundos mínimos por caso × fixture')
+    parser.add_argument('--saida', help='Salva resultados detalhados em JSON')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')  # XMLParsedAsHTMLWarning etc. poluem a saída
+
+    casos = CASOS
+    if args.casos:
+        filtros = [f.strip() for f in args.casos.split(',') if f.strip()]
+        casos = {n: c for n, c in CASOS.items() if any(f in n for f in filtros)}
+    fixtures = carregar_fixtures(args.fixtures)
+    if not casos or not fixtures:
+        print("❌ Nenhum caso/fixture selecionado")
+        return
+
+    print(f"🔬 {len(casos)} casos × {len(fixtures)} fixtures (mín. {args.min_tempo}s cada)\n")
+    inicio = time.time()
+    resultados = rodar(fixtures, casos, args.min_tempo)
+    linhas = agregar(resultados)
+    imprimir(linhas)
+    print(f"\n⏱️ {time.time() - inicio:.1f}s")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({
+                'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'maquina': platform.machine(),
+                'resumo': linhas,
+                'resultados': resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
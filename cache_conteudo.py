@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+CACHE POR CONTEÚDO - Pula o parse de páginas cujo trecho relevante não mudou
+============================================================================
+
+Mesmo sem ETag/Last-Modified, a maioria das páginas de produto chega idêntica
+entre execuções *na parte que interessa* (JSON-LD, Apollo Cache) - o resto do
+HTML muda a cada request (tokens, banners, timestamps).
+
+- Recorte barato (sem BeautifulSoup) do bloco de onde sai o registro inteiro:
+  `fragmento_json_ld` (extract_detailsv8, só se o JSON-LD traz nome e preço) e
+  `fragmento_apollo` (extract_sacada)
+- Hash blake2b de 128 bits do recorte, comparado com o da execução anterior
+- Store SQLite (storage/cache_conteudo.sqlite), chave = (origem, url);
+  guarda hash, versão do parser e o registro extraído
+- Hash igual → devolve o registro guardado e pula parse/normalização;
+  página sem recorte (só cai nos fallbacks de HTML) → sempre faz parse
+- `versao_codigo(parsear)` = hash do código do módulo do parser: mudou o
+  parser, todas as entradas antigas viram miss (sem versão manual esquecida)
+- Hit rate por site em `resumo()` / `descrever()`
+
+Uso:
+    python cache_conteudo.py --listar
+    python cache_conteudo.py --limpar --origem sacada
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DB_PADRAO = os.path.join('storage', 'cache_conteudo.sqlite')
+
+RE_JSON_LD = re.compile(
+    r'<script[^>]+type=["\']?application/ld\+json["\']?[^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+RE_SCRIPT = re.compile(r'<script[^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+
+
+# ================================================================================================
+# RECORTES
+# ================================================================================================
+def fragmento_apollo(html: str) -> Optional[str]:
+    """Primeiro <script> com "Product:" - mesmo critério de extract_sacada.extrair_apollo_cache."""
+    for corpo in RE_SCRIPT.findall(html):
+        if 'Product:' in corpo:
+            return corpo.strip()
+    return None
+
+
+def hash_fragmento(fragmento: str) -> str:
+    return hashlib.blake2b(fragmento.encode('utf-8', 'replace'), digest_size=16).hexdigest()
+
+
+def versao_codigo(parsear: Callable) -> str:
+    """Versão do parser = hash do código-fonte do módulo onde ele mora (helpers incluídos)."""
+    try:
+        codigo = inspect.getsource(inspect.getmodule(parsear) or parsear)
+    except (OSError, TypeError):
+        codigo = parsear.__code__.co_code.hex()
+    return hash_fragmento(codigo)[:12]
+
+
+# ================================================================================================
+# STORE
+# ================================================================================================
+class CacheConteudo:
+    """Registros extraídos indexados pelo hash do recorte (thread-safe; uma conexão por cache)."""
+
+    def __init__(self, origem: str, versao: str = '1', path: str = DB_PADRAO):
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.origem = origem
+        self.versao = versao
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {'hits': 0, 'misses': 0, 'sem_fragmento': 0})
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fragmentos (
+                origem TEXT NOT NULL,
+                url TEXT NOT NULL,
+                host TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                versao TEXT NOT NULL,
+                registro TEXT NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (origem, url)
+            )
+        """)
+
+    def _contar(self, url: str, chave: str):
+        with self._lock:
+            self._stats[urlparse(url).netloc.lower()][chave] += 1
+
+    def consultar(self, url: str, hash_: str) -> Optional[Dict]:
+        with self._lock:
+            linha = self.conn.execute(
+                "SELECT hash, versao, registro FROM fragmentos WHERE origem=? AND url=?",
+                (self.origem, url)
+            ).fetchone()
+        if linha and linha[0] == hash_ and linha[1] == self.versao:
+            return json.loads(linha[2])
+        return None
+
+    def guardar(self, url: str, hash_: str, registro: Dict):
+        registro = {k: v for k, v in registro.items() if k != 'indice'}
+        with self._lock:
+            self.conn.execute(
+                """INSERT INTO fragmentos (origem, url, host, hash, versao, registro, atualizado_em)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(origem, url) DO UPDATE SET
+                       hash=excluded.hash, versao=excluded.versao,
+                       registro=excluded.registro, atualizado_em=excluded.atualizado_em""",
+                (self.origem, url, urlparse(url).netloc.lower(), hash_, self.versao,
+                 json.dumps(registro, ensure_ascii=False, default=str), time.time())
+            )
+
+    def extrair(self, url: str, html: str, fragmentar: Callable[[str], Optional[str]],
+                parsear: Callable[[str, str], Dict]) -> Dict:
+        """
+        parsear(html, url) só roda se o recorte mudou (ou não existe).
+        Registros com erro/sem nome não são guardados.
+        """
+        fragmento = fragmentar(html)
+        if fragmento is None:
+            self._contar(url, 'sem_fragmento')
+            return parsear(html, url)
+
+        hash_ = hash_fragmento(fragmento)
+        anterior = self.consultar(url, hash_)
+        if anterior is not None:
+            self._contar(url, 'hits')
+            anterior['url'] = url
+            return anterior
+
+        self._contar(url, 'misses')
+        dados = parsear(html, url)
+        if dados.get('nome') and not dados.get('erro'):
+            self.guardar(url, hash_, dados)
+        return dados
+
+    def resumo(self) -> Dict[str, Dict]:
+        """Contadores desta execução por host, com hit rate sobre as páginas com recorte."""
+        with self._lock:
+            stats = {host: dict(c) for host, c in self._stats.items()}
+        for c in stats.values():
+            comparaveis = c['hits'] + c['misses']
+            c['hit_rate'] = c['hits'] / comparaveis if comparaveis else 0.0
+        return stats
+
+    def descrever(self) -> List[str]:
+        return [
+            f"♻️ {host}: {c['hits']}/{c['hits'] + c['misses']} sem mudança ({c['hit_rate']:.0%})"
+            + (f", {c['sem_fragmento']} sem dados estruturados" if c['sem_fragmento'] else '')
+            for host, c in sorted(self.resumo().items())
+        ]
+
+    def entradas(self) -> List[Dict]:
+        with self._lock:
+            linhas = self.conn.execute(
+                "SELECT origem, host, versao, COUNT(*), MAX(atualizado_em) FROM fragmentos "
+                "GROUP BY origem, host, versao ORDER BY origem, host"
+            ).fetchall()
+        return [{'origem': o, 'host': h, 'versao': v, 'entradas': n, 'atualizado_em': t}
+                for o, h, v, n, t in linhas]
+
+    def limpar(self, host: Optional[str] = None) -> int:
+        sql, params = "DELETE FROM fragmentos WHERE origem=?", [self.origem]
+        if host:
+            sql += " AND host=?"
+            params.append(host.lower())
+        with self._lock:
+            return self.conn.execute(sql, params).rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description='Cache de registros por hash do conteúdo')
+    parser.add_argument('--listar', action='store_true', help='Entradas por origem/host')
+    parser.add_argument('--limpar', action='store_true', help='Apaga entradas (força re-parse)')
+    parser.add_argument('--origem', default='detailsv8', help='Extrator (detailsv8, sacada)')
+    parser.add_argument('--host', help='Restringe --limpar a um host')
+    parser.add_argument('--db', default=DB_PADRAO)
+    args = parser.parse_args()
+
+    cache = CacheConteudo(args.origem, path=args.db)
+    try:
+        if args.limpar:
+            print(f"🧹 {cache.limpar(args.host)} entradas removidas ({args.origem})")
+        else:
+            for e in cache.entradas():
+                quando = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['atualizado_em']))
+                print(f"{e['origem']:<10} {e['host']:<40} v{e['versao']:<4} {e['entradas']:>7}  {quando}")
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
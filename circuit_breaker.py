@@ -0,0 +1,276 @@
+"""
+CIRCUIT BREAKER POR HOST - Pausa o host inteiro em 429/403/falhas seguidas
+===========================================================================
+
+Antes, cada worker tratava 429 sozinho (`time.sleep(2 ** tentativa)` no
+extract_detailsv8, `asyncio.sleep(10/30)` no CrawleeCrawler) enquanto os
+outros continuavam martelando o host - espiral de ban.
+
+Estados por host:
+- fechado     → tráfego normal
+- aberto      → ninguém passa até `aberto_ate` (Retry-After do servidor ou backoff exponencial)
+- meio_aberto → UMA requisição de sonda; sucesso → rampa, falha → reabre com backoff maior
+- rampa       → limite de requisições em voo dobra a cada sucesso (1, 2, 4, ...) até fechar
+
+Gatilhos de abertura: 429, 503 com Retry-After, 403 (possível ban), ou
+`falhas_para_abrir` timeouts/5xx consecutivos.
+
+Thread-safe; `aguardar` (async) e `aguardar_sync` (threads). Uma instância
+compartilhada (`obter_circuit_breaker`) faz todos os extratores do processo
+respeitarem a mesma pausa.
+
+Uso:
+    breaker = obter_circuit_breaker()
+    breaker.aguardar_sync(url)
+    resp = client.get(url)
+    breaker.registrar(url, resp.status_code, retry_after=parse_retry_after(resp.headers.get('Retry-After')))
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from rate_limiter import host_de, parse_retry_after, MAX_RETRY_AFTER
+from timing_requests import registrar_tempo
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+RAMPA = 'rampa'
+
+PAUSA_BASE = 5.0            # Primeira abertura sem Retry-After (s)
+PAUSA_BASE_403 = 30.0       # 403 = provável bloqueio, pausa maior
+FALHAS_PARA_ABRIR = 5       # Timeouts/5xx consecutivos
+PASSOS_RAMPA = 5            # 1 → 2 → 4 → 8 → 16 em voo, depois fecha
+ESPERA_SONDA = 0.5          # Intervalo de re-checagem enquanto a sonda está em voo
+
+
+# ================================================================================================
+# ESTADO POR HOST
+# ================================================================================================
+class _Circuito:
+    __slots__ = ('estado', 'aberto_ate', 'aberturas', 'falhas_seguidas', 'em_voo',
+                 'sucessos_rampa', 'total_aberturas', 'total_bloqueado')
+
+    def __init__(self):
+        self.estado = FECHADO
+        self.aberto_ate = 0.0
+        self.aberturas = 0          # Aberturas seguidas (para o backoff)
+        self.falhas_seguidas = 0
+        self.em_voo = 0
+        self.sucessos_rampa = 0
+        self.total_aberturas = 0
+        self.total_bloqueado = 0.0  # Segundos de pausa acumulados
+
+
+# ================================================================================================
+# HOST CIRCUIT BREAKER
+# ================================================================================================
+class HostCircuitBreaker:
+    """
+    Circuit breaker por host com sonda meio-aberta e rampa de retomada.
+
+    Args:
+        falhas_para_abrir: timeouts/5xx consecutivos que abrem o circuito
+        pausa_base: pausa da 1ª abertura sem Retry-After (dobra a cada reabertura)
+        pausa_max: teto de qualquer pausa
+        passos_rampa: sucessos na rampa até fechar (limite em voo = 2**sucessos)
+    """
+
+    def __init__(
+        self,
+        falhas_para_abrir: int = FALHAS_PARA_ABRIR,
+        pausa_base: float = PAUSA_BASE,
+        pausa_max: float = MAX_RETRY_AFTER,
+        passos_rampa: int = PASSOS_RAMPA,
+        verbose: bool = True
+    ):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.pausa_base = pausa_base
+        self.pausa_max = pausa_max
+        self.passos_rampa = passos_rampa
+        self.verbose = verbose
+
+        self._circuitos: Dict[str, _Circuito] = {}
+        self._lock = threading.Lock()
+
+    def _circuito(self, host: str) -> _Circuito:
+        circuito = self._circuitos.get(host)
+        if circuito is None:
+            circuito = self._circuitos[host] = _Circuito()
+        return circuito
+
+    # ------------------------------------------------------------------
+    # Admissão
+    # ------------------------------------------------------------------
+    def reservar(self, url_ou_host: Optional[str] = None) -> float:
+        """
+        Tenta admitir uma requisição.
+        Retorna 0 se admitida (conta como em voo) ou os segundos até tentar de novo.
+        """
+        host = host_de(url_ou_host)
+        with self._lock:
+            c = self._circuito(host)
+            agora = time.monotonic()
+
+            if c.estado == ABERTO:
+                if agora < c.aberto_ate:
+                    return c.aberto_ate - agora
+                c.estado = MEIO_ABERTO
+                if self.verbose:
+                    print(f"🔌 [{host or '*'}] Circuito meio-aberto - enviando sonda")
+
+            if c.estado == MEIO_ABERTO:
+                if c.em_voo > 0:
+                    return ESPERA_SONDA  # Só a sonda passa
+            elif c.estado == RAMPA:
+                if c.em_voo >= 2 ** c.sucessos_rampa:
+                    return ESPERA_SONDA
+
+            c.em_voo += 1
+            return 0.0
+
+    async def aguardar(self, url_ou_host: Optional[str] = None) -> float:
+        """Aguarda o circuito do host admitir a requisição (async). Retorna tempo esperado."""
+        total = 0.0
+        while True:
+            espera = self.reservar(url_ou_host)
+            if espera <= 0:
+                registrar_tempo(url_ou_host, 'fila_breaker', total)
+                return total
+            total += espera
+            await asyncio.sleep(espera)
+
+    def aguardar_sync(self, url_ou_host: Optional[str] = None) -> float:
+        """Aguarda o circuito do host admitir a requisição (threads). Retorna tempo esperado."""
+        total = 0.0
+        while True:
+            espera = self.reservar(url_ou_host)
+            if espera <= 0:
+                registrar_tempo(url_ou_host, 'fila_breaker', total)
+                return total
+            total += espera
+            time.sleep(espera)
+
+    # ------------------------------------------------------------------
+    # Resultado
+    # ------------------------------------------------------------------
+    def registrar(
+        self,
+        url_ou_host: Optional[str] = None,
+        status: Optional[int] = None,
+        erro: bool = False,
+        retry_after: Optional[float] = None
+    ):
+        """
+        Registra o resultado de uma requisição admitida.
+
+        status=None + erro=True → timeout/conexão; retry_after em segundos
+        (use parse_retry_after no header).
+        """
+        host = host_de(url_ou_host)
+        with self._lock:
+            c = self._circuito(host)
+            c.em_voo = max(0, c.em_voo - 1)
+
+            if status == 429 or status == 403 or (status == 503 and retry_after is not None):
+                base = PAUSA_BASE_403 if status == 403 else self.pausa_base
+                self._abrir(host, c, retry_after, base, f"HTTP {status}")
+                return
+
+            falhou = erro or (status is not None and status >= 500)
+            if falhou:
+                c.falhas_seguidas += 1
+                if c.estado in (MEIO_ABERTO, RAMPA) or c.falhas_seguidas >= self.falhas_para_abrir:
+                    self._abrir(host, c, retry_after, self.pausa_base,
+                                f"{c.falhas_seguidas} falhas seguidas")
+                return
+
+            # Sucesso (qualquer resposta que não indica sobrecarga)
+            c.falhas_seguidas = 0
+            if c.estado == MEIO_ABERTO:
+                c.estado = RAMPA
+                c.sucessos_rampa = 0
+            if c.estado == RAMPA:
+                c.sucessos_rampa += 1
+                if c.sucessos_rampa >= self.passos_rampa:
+                    c.estado = FECHADO
+                    c.aberturas = 0
+                    if self.verbose:
+                        print(f"✅ [{host or '*'}] Circuito fechado - tráfego normal")
+
+    def liberar(self, url_ou_host: Optional[str] = None):
+        """Devolve a vaga de uma requisição admitida que não chegou a ser enviada
+        (cancelada/erro na fila do limiter) - sem contar sucesso nem falha."""
+        with self._lock:
+            c = self._circuito(host_de(url_ou_host))
+            c.em_voo = max(0, c.em_voo - 1)
+
+    def _abrir(self, host: str, c: _Circuito, retry_after: Optional[float], base: float, motivo: str):
+        """Abre (ou estende) o circuito. Chamado com o lock."""
+        agora = time.monotonic()
+        if retry_after is not None:
+            pausa = retry_after
+        else:
+            # Backoff exponencial com full jitter entre aberturas seguidas
+            pausa = base * (2 ** c.aberturas)
+            pausa = random.uniform(pausa / 2, pausa)
+        pausa = min(self.pausa_max, max(0.0, pausa))
+
+        ate = agora + pausa
+        if c.estado == ABERTO and ate <= c.aberto_ate:
+            return  # Já pausado por mais tempo (rajada de 429 dos requests em voo)
+
+        c.total_bloqueado += ate - max(agora, c.aberto_ate)
+        c.estado = ABERTO
+        c.aberto_ate = ate
+        c.aberturas += 1
+        c.total_aberturas += 1
+        c.falhas_seguidas = 0
+        c.sucessos_rampa = 0
+        if self.verbose:
+            print(f"⛔ [{host or '*'}] Circuito aberto por {pausa:.1f}s ({motivo})")
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def estado(self, url_ou_host: Optional[str] = None) -> str:
+        with self._lock:
+            c = self._circuitos.get(host_de(url_ou_host))
+            return c.estado if c else FECHADO
+
+    def resumo(self) -> Dict[str, Dict]:
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                host or '*': {
+                    'estado': c.estado,
+                    'pausa_restante': round(max(0.0, c.aberto_ate - agora), 2),
+                    'aberturas': c.total_aberturas,
+                    'segundos_pausado': round(c.total_bloqueado, 1),
+                }
+                for host, c in self._circuitos.items()
+            }
+
+
+# ================================================================================================
+# INSTÂNCIA COMPARTILHADA
+# ================================================================================================
+_breaker_global: Optional[HostCircuitBreaker] = None
+_breaker_global_lock = threading.Lock()
+
+
+def obter_circuit_breaker(**kwargs) -> HostCircuitBreaker:
+    """Breaker único do processo (todos os extratores respeitam a mesma pausa por host)."""
+    global _breaker_global
+    with _breaker_global_lock:
+        if _breaker_global is None:
+            _breaker_global = HostCircuitBreaker(**kwargs)
+        return _breaker_global
+
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+COMPARAÇÃO DE ESTRATÉGIAS - Matriz estratégia × concorrência sobre a mesma lista de URLs
+========================================================================================
+
+COMPARACAO_ESTRATEGIAS.md e o README comparam os extract_* à mão, cada um
+rodado num dia, com outra lista de URLs. Este runner executa as estratégias
+escolhidas × níveis de concorrência sobre as MESMAS URLs e gera a matriz.
+
+- Cada execução roda num subprocesso isolado (cwd = diretório temporário próprio:
+  sem estado compartilhado de circuit breaker, dead-letter ou cache)
+- Três tipos de estratégia:
+    quintapp - extrair_detalhes_paralelo(produtos, callback, max_produtos, max_workers)
+    hibrido  - ExtractorHibrido do extract_fast (MAX_CONCURRENT)
+    script   - scripts Playwright com main() + `stats['produtos']` (MAX_CONCURRENCY);
+               recebem as URLs como urls_matcon_100.txt no diretório temporário
+- Métricas: tempo por produto, taxa de sucesso (dead_letter.classificar_falha),
+  completude de campos, nº de 429
+- 429: contado no servidor com --mock (mock_server.py); em sites reais, pelos
+  registros com status HTTP 429 ou pelas linhas de log de resposta 429
+  ("HTTP 429", "[429]", "429 Too Many Requests") - o que for maior
+- Saída: JSON (--saida) e Markdown (--markdown) com matriz e recomendação
+
+Uso:
+    python comparar_estrategias.py --urls urls_matcon_100.txt --estrategias detailsv8,fast,balanced_fast --concorrencias 5,10,20
+    python comparar_estrategias.py --mock --mock-p429 0.05 --mock-replicas 10 --estrategias detailsv8,sacada --markdown matriz.md
+"""
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dead_letter import STATUS_RE, classificar_falha
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# nome → (tipo, módulo, função/constante de concorrência)
+ESTRATEGIAS = {
+    'detailsv8': ('quintapp', 'extract_detailsv8', 'extrair_detalhes_paralelo'),
+    'sacada': ('quintapp', 'extract_sacada', 'extrair_detalhes_paralelo'),
+    'matcon_final': ('quintapp', 'extract_matcon_final', 'extrair_detalhes_paralelo'),
+    'listagem': ('quintapp', 'extract_listagem', 'extrair_detalhes_paralelo'),
+    'fast': ('hibrido', 'extract_fast', 'MAX_CONCURRENT'),
+    'ultra_fast': ('script', 'extract_ultra_fast', 'MAX_CONCURRENCY'),
+    'hyper_optimized': ('script', 'extract_hyper_optimized', 'MAX_CONCURRENCY'),
+    'max_concurrency': ('script', 'extract_max_concurrency', 'MAX_CONCURRENCY'),
+    'balanced_fast': ('script', 'extract_balanced_fast', 'MAX_CONCURRENCY'),
+    'with_abort': ('script', 'extract_with_abort', 'MAX_CONCURRENCY'),
+}
+# Fora da matriz: extract_detailsv7_turbo ignora max_workers (usa os workers de
+# detectar_tipo_site) - a linha sairia igual em todas as colunas de concorrência
+
+CAMPOS_COMPLETUDE = ('nome', 'preco', 'preco_original', 'marca', 'imagem', 'sku', 'categoria')
+VAZIOS = (None, '', 'N/A', [], {})
+# Só resposta HTTP 429 - não "429 produtos", "429s: 0" de resumo, URLs com 429...
+RE_429_LOG = re.compile(r'(?:\bHTTP[ /:]?|\bstatus[ =:]|\[)429\b|\b429 Too Many Requests\b', re.IGNORECASE)
+
+
+# ================================================================================================
+# WORKER (roda dentro do subprocesso)
+# ================================================================================================
+def _nome_da_url(url: str) -> str:
+    """Nome provisório a partir do slug - o que extrair_produtos entregaria ao QuintApp"""
+    partes = [p for p in url.split('?')[0].rstrip('/').split('/') if p and p != 'p']
+    return partes[-1].replace('-', ' ').title() if partes else url
+
+
+def _executar_estrategia(nome: str, urls: List[str], concorrencia: int) -> Dict:
+    """Roda uma estratégia no processo atual (cwd = diretório temporário)."""
+    tipo, modulo_nome, alvo = ESTRATEGIAS[nome]
+    modulo = importlib.import_module(modulo_nome)
+    inicio = time.perf_counter()
+    erros_429 = None
+
+    if tipo == 'quintapp':
+        funcao = getattr(modulo, alvo)
+        parametros = inspect.signature(funcao).parameters
+        # Comparação justa: mesma lista para todos, sem descarte por triagem nem reuso de cache
+        extras = {k: False for k in ('triar', 'reusar_cache') if k in parametros}
+        _, registros = funcao([{'url': u, 'nome': _nome_da_url(u)} for u in urls], print, len(urls), concorrencia, **extras)
+
+    elif tipo == 'hibrido':
+        setattr(modulo, alvo, concorrencia)
+
+        async def rodar():
+            extrator = modulo.ExtractorHibrido()
+            await extrator.setup(urls[0])
+            await extrator.processar_lote(urls)
+            return extrator
+
+        extrator = asyncio.run(rodar())
+        registros = [r for r in extrator.resultados if r]
+        erros_429 = extrator.stats.get('retry_429')
+
+    else:
+        with open('urls_matcon_100.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(urls) + '\n')
+        setattr(modulo, alvo, concorrencia)
+        asyncio.run(modulo.main())
+        registros = list(modulo.stats.get('produtos', [])) + list(modulo.stats.get('erros', []))
+
+    return {
+        'tempo': time.perf_counter() - inicio,
+        'registros': registros,
+        'erros_429_cliente': erros_429,
+    }
+
+
+def _worker(args):
+    with open(args.urls, encoding='utf-8') as f:
+        urls = [l.strip() for l in f if l.strip()]
+    resultado = _executar_estrategia(args.worker, urls, args.concorrencia)
+    with open(args.saida_worker, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, default=str)
+
+
+# ================================================================================================
+# MÉTRICAS
+# ================================================================================================
+def completude(registro: Dict) -> float:
+    return sum(registro.get(c) not in VAZIOS for c in CAMPOS_COMPLETUDE) / len(CAMPOS_COMPLETUDE)
+
+
+def eh_429(registro: Dict) -> bool:
+    """Registro de falha por HTTP 429 (campo status ou 'HTTP 429' / 'status 429' no erro)."""
+    if registro.get('status') == 429:
+        return True
+    erro = str(registro.get('erro') or '')
+    status = STATUS_RE.search(erro)
+    return (status is not None and status.group(1) == '429') or '429 Too Many Requests' in erro
+
+
+def contar_429_log(log: str) -> int:
+    return sum(1 for linha in log.splitlines() if RE_429_LOG.search(linha))
+
+
+def calcular_metricas(urls: List[str], saida: Dict, log: str) -> Dict:
+    registros = saida.get('registros') or []
+    bons = {}
+    for r in registros:
+        if isinstance(r, dict) and r.get('url') and classificar_falha(r) is None:
+            bons.setdefault(r['url'], r)
+    erros_429_registros = sum(1 for r in registros if isinstance(r, dict) and eh_429(r))
+    tempo = saida.get('tempo') or 0.0
+    return {
+        'urls': len(urls),
+        'sucesso': len(bons),
+        'taxa_sucesso': round(len(bons) / len(urls), 4) if urls else 0.0,
+        'tempo': round(tempo, 2),
+        'tempo_por_produto': round(tempo / len(urls), 3) if urls else None,
+        'completude': round(sum(completude(r) for r in bons.values()) / len(bons), 3) if bons else 0.0,
+        'erros_429': saida.get('erros_429_cliente') or max(erros_429_registros, contar_429_log(log)),
+        'fonte_429': 'cliente',
+    }
+
+
+# ================================================================================================
+# RUNNER
+# ================================================================================================
+def executar(estrategia: str, concorrencia: int, urls: List[str], timeout: float,
+             pasta_logs: str, mock=None) -> Dict:
+    """Roda uma célula da matriz num subprocesso."""
+    with tempfile.TemporaryDirectory(prefix='comparar_') as tmp:
+        arquivo_urls = os.path.join(tmp, 'urls.txt')
+        arquivo_saida = os.path.join(tmp, 'saida.json')
+        with open(arquivo_urls, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(urls) + '\n')
+
+        if mock:
+            mock.reset()
+        comando = [sys.executable, os.path.abspath(__file__), '--worker', estrategia,
+                   '--concorrencia', str(concorrencia), '--urls', arquivo_urls, '--saida-worker', arquivo_saida]
+        ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [DIRETORIO, os.environ.get('PYTHONPATH')])))
+        inicio = time.perf_counter()
+        status = 'ok'
+        try:
+            proc = subprocess.run(comando, capture_output=True, text=True, timeout=timeout, env=ambiente, cwd=tmp)
+            log = proc.stdout + proc.stderr
+            if proc.returncode != 0:
+                status = f'erro (código {proc.returncode})'
+        except subprocess.TimeoutExpired as e:
+            log = (e.stdout or b'').decode(errors='replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+            status = 'timeout'
+        wall = time.perf_counter() - inicio
+
+        os.makedirs(pasta_logs, exist_ok=True)
+        with open(os.path.join(pasta_logs, f'{estrategia}_c{concorrencia}.log'), 'w', encoding='utf-8') as f:
+            f.write(log)
+
+        saida = {}
+        if os.path.exists(arquivo_saida):
+            with open(arquivo_saida, encoding='utf-8') as f:
+                saida = json.load(f)
+
+    metricas = calcular_metricas(urls, saida, log)
+    if mock:
+        metricas['erros_429'] = mock.stats()['total']['429']
+        metricas['fonte_429'] = 'servidor'
+    return {'estrategia': estrategia, 'concorrencia': concorrencia, 'status': status,
+            'tempo_processo': round(wall, 2), **metricas}
+
+
+def recomendar(resultados: List[Dict], min_sucesso: float, min_completude: float) -> Optional[Dict]:
+    """Mais rápida (tempo/produto) entre as que atingem sucesso e completude mínimos; 429 desempata."""
+    aptos = [r for r in resultados if r['status'] == 'ok' and r['taxa_sucesso'] >= min_sucesso
+             and r['completude'] >= min_completude and r['tempo_por_produto']]
+    if not aptos:
+        return None
+    return min(aptos, key=lambda r: (r['tempo_por_produto'], r['erros_429']))
+
+
+def gerar_markdown(relatorio: Dict) -> str:
+    resultados = relatorio['resultados']
+    concorrencias = relatorio['concorrencias']
+    linhas = [
+        f"# Comparação de estratégias ({relatorio['gerado_em']})",
+        '',
+        f"{relatorio['urls']} URLs · fonte: {relatorio['fonte_urls']} · célula = s/produto · sucesso · completude · 429",
+        '',
+        '| estratégia | ' + ' | '.join(f'c={c}' for c in concorrencias) + ' |',
+        '|---|' + '---|' * len(concorrencias),
+    ]
+    for estrategia in relatorio['estrategias']:
+        celulas = []
+        for c in concorrencias:
+            r = next((x for x in resultados if x['estrategia'] == estrategia and x['concorrencia'] == c), None)
+            if not r:
+                celulas.append('-')
+            elif r['status'] != 'ok' and not r['sucesso']:
+                celulas.append(r['status'])
+            else:
+                celulas.append(f"{r['tempo_por_produto']:.3f}s · {r['taxa_sucesso']:.0%} · "
+                               f"{r['completude']:.2f} · {r['erros_429']}")
+        linhas.append(f'| {estrategia} | ' + ' | '.join(celulas) + ' |')
+
+    rec = relatorio.get('recomendacao')
+    linhas += ['', '## Recomendação', '']
+    if rec:
+        linhas.append(f"**{rec['estrategia']}** com concorrência **{rec['concorrencia']}**: "
+                      f"{rec['tempo_por_produto']:.3f}s/produto, {rec['taxa_sucesso']:.0%} sucesso, "
+                      f"completude {rec['completude']:.2f}, {rec['erros_429']} × 429")
+    else:
+        linhas.append(f"Nenhuma combinação atingiu sucesso ≥ {relatorio['criterios']['min_sucesso']:.0%} "
+                      f"e completude ≥ {relatorio['criterios']['min_completude']:.2f}")
+    return '\n'.join(linhas) + '\n'
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description='Matriz estratégia × concorrência')
+    parser.add_argument('--estrategias', default='detailsv8', help=f"Separadas por vírgula: {', '.join(ESTRATEGIAS)}")
+    parser.add_argument('--concorrencias', default='5,10,20')
+    parser.add_argument('--urls', help='Arquivo com uma URL por linha')
+    parser.add_argument('--limite', type=int, help='Usa só as N primeiras URLs')
+    parser.add_argument('--mock', action='store_true', help='Sobe o mock_server.py local e usa as URLs dele')
+    parser.add_argument('--mock-latencia', default='lognormal:-3,0.5')
+    parser.add_argument('--mock-p429', type=float, default=0.0)
+    parser.add_argument('--mock-p503', type=float, default=0.0)
+    parser.add_argument('--mock-rps', type=float)
+    parser.add_argument('--mock-replicas', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=900, help='Segundos por célula')
+    parser.add_argument('--min-sucesso', type=float, default=0.9)
+    parser.add_argument('--min-completude', type=float, default=0.3)
+    parser.add_argument('--saida', default=f"comparacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument('--markdown', help='Também grava a matriz em Markdown')
+    parser.add_argument('--logs', default=os.path.join('storage', 'comparacao_logs'))
+    # Uso interno (subprocesso)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--concorrencia', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--saida-worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return _worker(args)
+
+    estrategias = [e.strip() for e in args.estrategias.split(',') if e.strip()]
+    desconhecidas = [e for e in estrategias if e not in ESTRATEGIAS]
+    if desconhecidas:
+        parser.error(f"Estratégias desconhecidas: {', '.join(desconhecidas)}")
+    concorrencias = [int(c) for c in args.concorrencias.split(',') if c.strip()]
+
+    mock = None
+    if args.mock:
+        from mock_server import ConfigMock, MockServer
+        mock = MockServer(ConfigMock(latencia=args.mock_latencia, p429=args.mock_p429, p503=args.mock_p503,
+                                     rps=args.mock_rps, replicas=args.mock_replicas)).start()
+        urls = mock.urls_produtos()
+        fonte = f'mock {mock.url} (latência {args.mock_latencia}, 429 {args.mock_p429:.0%})'
+    elif args.urls:
+        with open(args.urls, encoding='utf-8') as f:
+            urls = [l.strip() for l in f if l.strip()]
+        fonte = args.urls
+    else:
+        parser.error('Informe --urls ou --mock')
+    urls = urls[:args.limite] if args.limite else urls
+
+    print(f"🧪 {len(estrategias)} estratégias × {len(concorrencias)} concorrências sobre {len(urls)} URLs ({fonte})\n")
+    resultados = []
+    try:
+        for estrategia in estrategias:
+            for c in concorrencias:
+                print(f"▶️ {estrategia} c={c} ...", flush=True)
+                r = executar(estrategia, c, urls, args.timeout, args.logs, mock)
+                resultados.append(r)
+                print(f"   {r['status']}: {r['tempo_por_produto']}s/produto, {r['taxa_sucesso']:.0%} sucesso, "
+                      f"completude {r['completude']:.2f}, {r['erros_429']} × 429")
+    finally:
+        if mock:
+            mock.stop()
+
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'fonte_urls': fonte,
+        'urls': len(urls),
+        'estrategias': estrategias,
+        'concorrencias': concorrencias,
+        'criterios': {'min_sucesso': args.min_sucesso, 'min_completude': args.min_completude},
+        'resultados': resultados,
+        'recomendacao': recomendar(resultados, args.min_sucesso, args.min_completude),
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 {args.saida}")
+
+    markdown = gerar_markdown(relatorio)
+    if args.markdown:
+        with open(args.markdown, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        print(f"📝 {args.markdown}")
+    print('\n' + markdown)
+
+
+if __name__ == '__main__':
+    main()
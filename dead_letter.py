@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+DEAD-LETTER QUEUE - Falhas persistidas + re-run só das URLs que falharam
+=========================================================================
+
+Antes, falhas na fase de detalhes (extract_detailsv8, extract_sacada,
+extract_matcon_final) voltavam como dicts "placeholder" com `erro` ou campos
+vazios, misturados aos resultados - e a única forma de recuperar era rodar o
+site inteiro de novo.
+
+- Taxonomia: timeout, http_4xx, http_5xx, bloqueado (401/403/429), conexao,
+  parse_miss (página veio mas nenhum parser achou o produto), outro
+- Store SQLite (storage/dead_letter.sqlite), chave = URL; guarda origem
+  (extrator), categoria, detalhe, nº de falhas, primeira/última falha
+- `separar_falhas(resultados, origem)` grava as falhas, marca como resolvidas
+  as URLs que agora deram certo e devolve só os registros bons
+- `--retry-failed` reprocessa só as pendentes (opcionalmente com outra
+  estratégia) e faz merge no arquivo de saída do run anterior
+
+Uso:
+    python dead_letter.py --listar
+    python dead_letter.py --retry-failed --saida resultados.json
+    python dead_letter.py --retry-failed --saida r.ndjson --host www.sacada.com --categoria timeout,http_5xx --estrategia detailsv8
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DB_PADRAO = os.path.join('storage', 'dead_letter.sqlite')
+
+CATEGORIAS = ('timeout', 'http_4xx', 'http_5xx', 'bloqueado', 'conexao', 'parse_miss', 'outro')
+
+# Estratégia (--estrategia) → módulo com extrair_detalhes_paralelo
+ESTRATEGIAS = {
+    'detailsv8': 'extract_detailsv8',
+    'sacada': 'extract_sacada',
+    'matcon': 'extract_matcon_final',
+    'listagem': 'extract_listagem',
+}
+
+STATUS_RE = re.compile(r'(?:status|http)\D{0,3}(\d{3})', re.IGNORECASE)
+TIMEOUT_RE = re.compile(r'timeout|timed out|tempo esgotado', re.IGNORECASE)
+CONEXAO_RE = re.compile(r'connect|conex|name resolution|getaddrinfo|reset by peer|refused|ssl', re.IGNORECASE)
+
+
+# ================================================================================================
+# CLASSIFICAÇÃO
+# ================================================================================================
+def classificar_falha(registro: Optional[Dict]) -> Optional[str]:
+    """
+    Classifica o resultado de um extrator.
+    Retorna None se o registro é bom (tem nome, sem erro).
+    """
+    if not registro or not registro.get('url'):
+        return 'outro'
+
+    erro = registro.get('erro')
+    if erro:
+        texto = str(erro)
+        status = STATUS_RE.search(texto)
+        if status:
+            codigo = int(status.group(1))
+            if codigo in (401, 403, 429):
+                return 'bloqueado'
+            if 400 <= codigo < 500:
+                return 'http_4xx'
+            if codigo >= 500:
+                return 'http_5xx'
+        if TIMEOUT_RE.search(texto):
+            return 'timeout'
+        if CONEXAO_RE.search(texto):
+            return 'conexao'
+        if re.search(r'n[ãa]o encontrad|not found|incomplet|sem dados', texto, re.IGNORECASE):
+            return 'parse_miss'
+        return 'outro'
+
+    # Sem nome = a página veio mas nenhum parser achou o produto
+    # (sem preço apenas é válido: produto indisponível)
+    if not registro.get('nome'):
+        return 'parse_miss'
+    return None
+
+
+# ================================================================================================
+# STORE
+# ================================================================================================
+class DeadLetterStore:
+    """Falhas persistidas em SQLite (thread-safe; uma conexão por store)."""
+
+    def __init__(self, path: str = DB_PADRAO):
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS falhas (
+                url TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                origem TEXT,
+                categoria TEXT NOT NULL,
+                detalhe TEXT,
+                falhas INTEGER NOT NULL DEFAULT 1,
+                primeira_falha REAL NOT NULL,
+                ultima_falha REAL NOT NULL,
+                resolvido INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_falhas_pendentes ON falhas(resolvido, host, categoria)")
+
+    def registrar(self, url: str, categoria: str, detalhe: str = '', origem: str = ''):
+        agora = time.time()
+        with self._lock:
+            self.conn.execute(
+                """INSERT INTO falhas (url, host, origem, categoria, detalhe, primeira_falha, ultima_falha)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       categoria=excluded.categoria, detalhe=excluded.detalhe, origem=excluded.origem,
+                       falhas=falhas + 1, ultima_falha=excluded.ultima_falha, resolvido=0""",
+                (url, urlparse(url).netloc.lower(), origem, categoria, (detalhe or '')[:500], agora, agora)
+            )
+
+    def resolver(self, urls: Iterable[str]):
+        """Marca URLs que agora deram certo."""
+        urls = list(urls)
+        if not urls:
+            return
+        with self._lock:
+            self.conn.executemany("UPDATE falhas SET resolvido=1 WHERE url=?", [(u,) for u in urls])
+
+    def pendentes(self, host: Optional[str] = None, categorias: Optional[Iterable[str]] = None) -> List[Dict]:
+        sql = "SELECT url, host, origem, categoria, detalhe, falhas FROM falhas WHERE resolvido=0"
+        params: List = []
+        if host:
+            sql += " AND host=?"
+            params.append(host.lower())
+        categorias = list(categorias or [])
+        if categorias:
+            sql += f" AND categoria IN ({','.join('?' * len(categorias))})"
+            params.extend(categorias)
+        sql += " ORDER BY host, ultima_falha"
+        with self._lock:
+            linhas = self.conn.execute(sql, params).fetchall()
+        colunas = ('url', 'host', 'origem', 'categoria', 'detalhe', 'falhas')
+        return [dict(zip(colunas, linha)) for linha in linhas]
+
+    def resumo(self) -> Dict[str, Dict[str, int]]:
+        """{host: {categoria: pendentes}}"""
+        with self._lock:
+            linhas = self.conn.execute(
+                "SELECT host, categoria, COUNT(*) FROM falhas WHERE resolvido=0 GROUP BY host, categoria"
+            ).fetchall()
+        resumo: Dict[str, Dict[str, int]] = {}
+        for host, categoria, total in linhas:
+            resumo.setdefault(host, {})[categoria] = total
+        return resumo
+
+    def close(self):
+        self.conn.close()
+
+
+_store_global: Optional[DeadLetterStore] = None
+_store_global_lock = threading.Lock()
+
+
+def obter_dead_letter(path: str = DB_PADRAO) -> DeadLetterStore:
+    """Store único do processo."""
+    global _store_global
+    with _store_global_lock:
+        if _store_global is None:
+            _store_global = DeadLetterStore(path)
+        return _store_global
+
+
+def separar_falhas(
+    resultados: List[Dict],
+    origem: str,
+    store: Optional[DeadLetterStore] = None
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Grava falhas na dead-letter, resolve URLs que deram certo e devolve
+    (registros_bons, {categoria: quantidade}).
+    """
+    store = store or obter_dead_letter()
+    bons: List[Dict] = []
+    contagem: Dict[str, int] = {}
+
+    for registro in resultados:
+        categoria = classificar_falha(registro)
+        if categoria is None:
+            bons.append(registro)
+            continue
+        contagem[categoria] = contagem.get(categoria, 0) + 1
+        url = (registro or {}).get('url')
+        if url:
+            store.registrar(url, categoria, str(registro.get('erro', '')), origem)
+
+    store.resolver(r['url'] for r in bons if r.get('url'))
+    return bons, contagem
+
+
+def descrever_falhas(contagem: Dict[str, int]) -> str:
+    total = sum(contagem.values())
+    detalhe = ', '.join(f"{k}: {v}" for k, v in sorted(contagem.items()))
+    return f"🪦 {total} falhas enviadas para a dead-letter ({detalhe})"
+
+
+# ================================================================================================
+# MERGE COM O RESULTADO ANTERIOR
+# ================================================================================================
+def _ler_saida(path: str) -> Tuple[List[Dict], str, Optional[Dict]]:
+    """Lê saída anterior: lista JSON, {'produtos': [...]} ou NDJSON. Retorna (registros, formato, envelope)."""
+    if not os.path.exists(path):
+        return [], 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'json', None
+    with open(path, 'r', encoding='utf-8') as f:
+        conteudo = f.read()
+    if path.endswith(('.ndjson', '.jsonl')):
+        return [json.loads(l) for l in conteudo.splitlines() if l.strip()], 'ndjson', None
+    dados = json.loads(conteudo or '[]')
+    if isinstance(dados, dict):
+        return list(dados.get('produtos', [])), 'json', dados
+    return dados, 'json', None
+
+
+def mesclar_resultados(path: str, novos: List[Dict]) -> Tuple[int, int]:
+    """Substitui/insere registros por URL no arquivo de saída. Retorna (substituidos, inseridos)."""
+    registros, formato, envelope = _ler_saida(path)
+    indice = {r.get('url'): i for i, r in enumerate(registros) if r.get('url')}
+    substituidos = inseridos = 0
+    for novo in novos:
+        posicao = indice.get(novo.get('url'))
+        if posicao is None:
+            indice[novo.get('url')] = len(registros)
+            registros.append(novo)
+            inseridos += 1
+        else:
+            registros[posicao] = novo
+            substituidos += 1
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if formato == 'ndjson':
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        elif envelope is not None:
+            envelope['produtos'] = registros
+            json.dump(envelope, f, ensure_ascii=False, indent=2)
+        else:
+            json.dump(registros, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return substituidos, inseridos
+
+
+# ================================================================================================
+# RE-RUN DAS FALHAS
+# ================================================================================================
+def reprocessar_falhas(
+    saida: Optional[str] = None,
+    host: Optional[str] = None,
+    categorias: Optional[List[str]] = None,
+    estrategia: Optional[str] = None,
+    max_workers: int = 10,
+    store: Optional[DeadLetterStore] = None
+) -> Dict[str, int]:
+    """
+    Reprocessa só as URLs pendentes na dead-letter.
+
+    estrategia=None usa o extrator que falhou originalmente (coluna origem).
+    """
+    store = store or obter_dead_letter()
+    pendentes = store.pendentes(host, categorias)
+    if not pendentes:
+        print("✅ Nenhuma falha pendente")
+        return {'pendentes': 0, 'recuperados': 0}
+
+    # Agrupa por estratégia
+    grupos: Dict[str, List[Dict]] = {}
+    for falha in pendentes:
+        nome = estrategia or falha['origem'] or 'detailsv8'
+        grupos.setdefault(nome, []).append({'url': falha['url'], 'nome': ''})
+
+    recuperados: List[Dict] = []
+    for nome, produtos in grupos.items():
+        modulo = importlib.import_module(ESTRATEGIAS.get(nome, nome))
+        funcao = modulo.extrair_detalhes_paralelo
+        kwargs = {}
+        if 'triar' in inspect.signature(funcao).parameters:
+            kwargs['triar'] = False  # Reprocesso é explícito - não descartar por triagem
+        print(f"🔁 Reprocessando {len(produtos)} URLs com '{nome}'...")
+        # Os extratores já chamam separar_falhas: sucesso resolve, falha atualiza a dead-letter
+        _, resultados = funcao(produtos, print, len(produtos), max_workers, **kwargs)
+        recuperados.extend(r for r in resultados if classificar_falha(r) is None)
+
+    if saida and recuperados:
+        substituidos, inseridos = mesclar_resultados(saida, recuperados)
+        print(f"💾 Merge em {saida}: {substituidos} substituídos, {inseridos} inseridos")
+
+    print(f"✅ Recuperados {len(recuperados)}/{len(pendentes)}")
+    return {'pendentes': len(pendentes), 'recuperados': len(recuperados)}
+
+
+# ================================================================================================
+# MAIN
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Dead-letter de falhas de extração")
+    parser.add_argument('--listar', action='store_true', help="Mostra falhas pendentes por host/categoria")
+    parser.add_argument('--retry-failed', action='store_true', help="Reprocessa só as URLs que falharam")
+    parser.add_argument('--saida', help="Arquivo de resultados do run anterior (JSON/NDJSON) para merge")
+    parser.add_argument('--host', help="Filtra por host (ex: www.sacada.com)")
+    parser.add_argument('--categoria', help=f"Filtra categorias, separadas por vírgula ({', '.join(CATEGORIAS)})")
+    parser.add_argument('--estrategia', choices=sorted(ESTRATEGIAS), help="Força outra estratégia de extração")
+    parser.add_argument('--max-workers', type=int, default=10)
+    parser.add_argument('--db', default=DB_PADRAO)
+    args = parser.parse_args()
+
+    store = obter_dead_letter(args.db)
+    categorias = [c.strip() for c in args.categoria.split(',')] if args.categoria else None
+
+    if args.retry_failed:
+        reprocessar_falhas(args.saida, args.host, categorias, args.estrategia, args.max_workers, store)
+    else:
+        resumo = store.resumo()
+        if not resumo:
+            print("✅ Nenhuma falha pendente")
+        for host, contagem in resumo.items():
+            total = sum(contagem.values())
+            print(f"🌐 {host}: {total} pendentes ({', '.join(f'{k}: {v}' for k, v in sorted(contagem.items()))})")
+
+
+if __name__ == "__main__":
+    main()
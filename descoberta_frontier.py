@@ -0,0 +1,312 @@
+"""
+DESCOBERTA POR FRONTIER - Crawler BFS com prioridade para modo discovery
+=========================================================================
+
+Substitui a navegação rasa/serial (100 primeiros <a>, 10 categorias, lista
+fixa /ferramentas/, /casa/...) por uma fronteira com prioridade:
+
+- Páginas são buscadas em paralelo, limitadas por um orçamento por host
+- Categorias são pontuadas pelo rendimento (produtos novos encontrados);
+  filhos e próxima página herdam a pontuação da página que os revelou
+- Paginação (?page=N, ?p=N, PS=, /page/N, rel=next) é seguida automaticamente
+  enquanto a página continuar rendendo produtos novos
+- Para assim que `max_produtos` produtos distintos forem encontrados
+
+Uso:
+    urls = await descobrir_produtos_frontier("https://www.site.com.br", max_produtos=200)
+"""
+
+import asyncio
+import heapq
+import re
+import time
+from typing import List, Dict, Set, Optional, Callable, Tuple
+from urllib.parse import urljoin, urlparse, urlencode, parse_qsl, urlunparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+from singleflight import get_compartilhado_async
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+CONCORRENCIA_HOST = 6   # Páginas simultâneas por host
+MAX_PAGINAS = 200       # Orçamento de páginas de listagem por execução
+MAX_PROFUNDIDADE = 3    # Home → categoria → subcategoria → sub-sub
+MAX_PAGINA_NUMERO = 50  # Limite de paginação por categoria
+
+TERMOS_INSTITUCIONAIS = [
+    'contato', 'sobre', 'login', 'cart', 'conta', 'ajuda', 'carrinho', 'checkout',
+    'politica', 'privacidade', 'termos', 'institucional', 'blog', 'account',
+    'atendimento', 'trocas', 'devolu', 'whatsapp', 'faq', 'minha-conta', 'wishlist',
+]
+EXTENSOES_IGNORADAS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.pdf', '.xml', '.js', '.css', '.zip')
+
+PRODUTO_RE = re.compile(r'/produtos?/[^/]+|/product/[^/]+|/p/[^/]+|/[^/]+/p$|-p-\d+|/[^/]+-\d{4,}(\.html)?$', re.IGNORECASE)
+PAGINA_PATH_RE = re.compile(r'/page/(\d+)/?$', re.IGNORECASE)
+PARAMS_PAGINA = ('page', 'p', 'pagina', 'pg')
+
+
+# ================================================================================================
+# CLASSIFICAÇÃO DE LINKS
+# ================================================================================================
+def parece_produto(url: str) -> bool:
+    """Heurística padrão de URL de produto (VTEX /p, /produto/, slug-123, etc)."""
+    path = urlparse(url).path.rstrip('/')
+    if PRODUTO_RE.search(path):
+        return True
+
+    # Slug longo com hífens em 3+ níveis (/cat/sub/nome-do-produto)
+    partes = [p for p in path.split('/') if p]
+    return len(partes) >= 3 and '-' in partes[-1] and len(partes[-1]) > 10
+
+
+def parece_categoria(url: str, base_netloc: str) -> bool:
+    """Links internos rasos que não são produto nem institucional."""
+    parsed = urlparse(url)
+    if parsed.netloc != base_netloc:
+        return False
+
+    path = parsed.path.lower()
+    if path.endswith(EXTENSOES_IGNORADAS):
+        return False
+    if any(t in path for t in TERMOS_INSTITUCIONAIS):
+        return False
+
+    niveis = len([p for p in path.split('/') if p])
+    return 1 <= niveis <= 3
+
+
+def normalizar_url(url: str, manter_query: bool = True) -> str:
+    """Remove fragmento (e query, se pedido) e barra final."""
+    parsed = urlparse(url)
+    query = parsed.query if manter_query else ''
+    path = parsed.path.rstrip('/') or '/'
+    return urlunparse((parsed.scheme, parsed.netloc, path, '', query, ''))
+
+
+def proxima_pagina(url: str, soup: Optional[BeautifulSoup] = None) -> Optional[str]:
+    """
+    Descobre a próxima página de uma listagem:
+    1. <link/a rel="next">
+    2. /page/N → /page/N+1
+    3. ?page=N (ou p/pagina/pg) → N+1 ; sem parâmetro → page=2
+    Mantém PS= (itens por página VTEX) quando presente.
+    """
+    if soup is not None:
+        prox = soup.find(['link', 'a'], rel='next', href=True)
+        if prox:
+            return urljoin(url, prox['href'])
+
+    parsed = urlparse(url)
+
+    m = PAGINA_PATH_RE.search(parsed.path)
+    if m:
+        numero = int(m.group(1))
+        if numero >= MAX_PAGINA_NUMERO:
+            return None
+        path = PAGINA_PATH_RE.sub(f'/page/{numero + 1}', parsed.path)
+        return urlunparse(parsed._replace(path=path))
+
+    params = parse_qsl(parsed.query, keep_blank_values=True)
+    for i, (chave, valor) in enumerate(params):
+        if chave.lower() in PARAMS_PAGINA and valor.isdigit():
+            numero = int(valor)
+            if numero >= MAX_PAGINA_NUMERO:
+                return None
+            params[i] = (chave, str(numero + 1))
+            return urlunparse(parsed._replace(query=urlencode(params)))
+
+    params.append(('page', '2'))
+    return urlunparse(parsed._replace(query=urlencode(params)))
+
+
+# ================================================================================================
+# FRONTIER CRAWLER
+# ================================================================================================
+class FrontierCrawler:
+    """
+    BFS com fila de prioridade (maior rendimento primeiro).
+    Mantém até `concorrencia_host` requisições em voo por host.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_produtos: int = 100,
+        max_paginas: int = MAX_PAGINAS,
+        concorrencia_host: int = CONCORRENCIA_HOST,
+        eh_produto: Optional[Callable[[str], bool]] = None,
+        normalizar_produto: Optional[Callable[[str], str]] = None,
+        show_message: Optional[Callable] = None,
+        timeout: float = 15.0
+    ):
+        self.base_url = base_url
+        self.base_netloc = urlparse(base_url).netloc
+        self.max_produtos = max_produtos
+        self.max_paginas = max_paginas
+        self.concorrencia_host = concorrencia_host
+        self.eh_produto = eh_produto or parece_produto
+        self.normalizar_produto = normalizar_produto or (lambda u: normalizar_url(u, manter_query=False))
+        self.show_message = show_message or (lambda msg: print(msg))
+        self.timeout = timeout
+
+        # Fronteira: (-score, seq, url, profundidade, eh_paginacao)
+        self.fronteira: List[Tuple[float, int, str, int, bool]] = []
+        self.seq = 0
+        self.enfileiradas: Set[str] = set()
+        self.produtos: Dict[str, None] = {}  # dict preserva ordem de descoberta
+
+        self.stats = {
+            'paginas': 0,
+            'paginas_paginacao': 0,
+            'erros': 0,
+            'rendimento': {},  # url → produtos novos
+        }
+
+    # --------------------------------------------------------------------------------------------
+    def _enfileirar(self, url: str, score: float, profundidade: int, eh_paginacao: bool = False):
+        chave = normalizar_url(url)
+        if chave in self.enfileiradas:
+            return
+        self.enfileiradas.add(chave)
+        self.seq += 1
+        heapq.heappush(self.fronteira, (-score, self.seq, chave, profundidade, eh_paginacao))
+
+    def _concluido(self) -> bool:
+        return len(self.produtos) >= self.max_produtos or self.stats['paginas'] >= self.max_paginas
+
+    async def _buscar(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        try:
+            response = await get_compartilhado_async(client, url)
+            if response.status_code != 200:
+                self.stats['erros'] += 1
+                return None
+            return response.text
+        except Exception:
+            self.stats['erros'] += 1
+            return None
+
+    def _produtos_extras(self, url: str, html: str, soup: BeautifulSoup) -> List[str]:
+        """Hook para subclasses: URLs de produto encontradas fora dos <a> da página."""
+        return []
+
+    def _processar_pagina(self, url: str, html: str, score_pai: float, profundidade: int, eh_paginacao: bool):
+        """Extrai produtos/categorias, atualiza rendimento e enfileira filhos + próxima página."""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        novos = 0
+        categorias: List[str] = []
+
+        for link in soup.find_all('a', href=True):
+            href = link['href'].strip()
+            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+                continue
+
+            url_link = urljoin(url, href)
+            if urlparse(url_link).netloc != self.base_netloc:
+                continue
+
+            if self.eh_produto(url_link):
+                produto = self.normalizar_produto(url_link)
+                if produto not in self.produtos:
+                    self.produtos[produto] = None
+                    novos += 1
+            elif profundidade < MAX_PROFUNDIDADE and parece_categoria(url_link, self.base_netloc):
+                categorias.append(url_link)
+
+        # Produtos vindos de outras fontes da página (ex: cards JSON-LD em subclasses)
+        for produto in self._produtos_extras(url, html, soup):
+            if produto not in self.produtos:
+                self.produtos[produto] = None
+                novos += 1
+
+        self.stats['rendimento'][url] = novos
+
+        # Filhos herdam o rendimento do pai (categoria que rende → subcategorias primeiro)
+        score_filhos = novos + score_pai * 0.5
+        for cat in categorias:
+            self._enfileirar(normalizar_url(cat, manter_query=False), score_filhos, profundidade + 1)
+
+        # Paginação: segue enquanto a página render produtos novos
+        if novos > 0 and profundidade > 0:
+            prox = proxima_pagina(url, soup)
+            if prox and urlparse(prox).netloc == self.base_netloc:
+                # Próxima página tem prioridade alta (rendimento comprovado)
+                self._enfileirar(prox, novos * 1.5, profundidade, eh_paginacao=True)
+
+        return novos
+
+    # --------------------------------------------------------------------------------------------
+    async def run(self) -> List[str]:
+        inicio = time.time()
+        self._enfileirar(self.base_url, float('inf'), 0)
+
+        em_voo: Dict[asyncio.Task, Tuple[str, float, int, bool]] = {}
+
+        async with httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concorrencia_host)
+        ) as client:
+            while (self.fronteira or em_voo) and not self._concluido():
+                # Preenche orçamento do host com as páginas de maior score
+                while (self.fronteira and len(em_voo) < self.concorrencia_host
+                       and self.stats['paginas'] + len(em_voo) < self.max_paginas):
+                    neg_score, _, url, profundidade, eh_paginacao = heapq.heappop(self.fronteira)
+                    task = asyncio.create_task(self._buscar(client, url))
+                    em_voo[task] = (url, -neg_score, profundidade, eh_paginacao)
+
+                if not em_voo:
+                    break
+
+                prontos, _ = await asyncio.wait(em_voo, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in prontos:
+                    url, score, profundidade, eh_paginacao = em_voo.pop(task)
+                    self.stats['paginas'] += 1
+                    if eh_paginacao:
+                        self.stats['paginas_paginacao'] += 1
+
+                    html = task.result()
+                    if not html:
+                        continue
+
+                    score_pai = 0.0 if score == float('inf') else score
+                    novos = self._processar_pagina(url, html, score_pai, profundidade, eh_paginacao)
+                    if novos:
+                        caminho = urlparse(url).path + (f"?{urlparse(url).query}" if urlparse(url).query else '')
+                        self.show_message(f"   → {caminho or '/'}: +{novos} produtos (total: {len(self.produtos)})")
+
+            # Atingiu meta: cancela o que ainda está em voo
+            for task in em_voo:
+                task.cancel()
+            if em_voo:
+                await asyncio.gather(*em_voo, return_exceptions=True)
+
+        tempo = time.time() - inicio
+        self.show_message(
+            f"🧭 Frontier: {len(self.produtos)} produtos em {self.stats['paginas']} páginas "
+            f"({self.stats['paginas_paginacao']} de paginação) em {tempo:.1f}s"
+        )
+        return list(self.produtos)[:self.max_produtos]
+
+
+async def descobrir_produtos_frontier(
+    base_url: str,
+    max_produtos: int = 100,
+    show_message: Optional[Callable] = None,
+    **kwargs
+) -> List[str]:
+    """Atalho: roda o FrontierCrawler e retorna URLs de produtos distintas."""
+    crawler = FrontierCrawler(base_url, max_produtos=max_produtos, show_message=show_message, **kwargs)
+    return await crawler.run()
@@ -20,6 +20,8 @@ from bs4 import BeautifulSoup
 import re
 from typing import Optional, Dict, Any
 
+from circuit_breaker import obter_circuit_breaker, parse_retry_after
+
 # User-Agents
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -33,6 +35,10 @@ SKU_RE = re.compile(r'-(\d+)$')
 MARCA_RE = re.compile(r'marca[:\s]*([A-Z][A-Za-z]+)', re.IGNORECASE)
 
 
+# Circuit breaker compartilhado (429/403/falhas seguidas pausam o host inteiro)
+breaker = obter_circuit_breaker()
+
+
 class LeakyBucket:
     """
     Rate limiter profissional com:
@@ -69,18 +75,6 @@ class LeakyBucket:
             self.next_slot = max(self.next_slot, time.monotonic()) + self.base_interval * jitter
 
 
-def parse_retry_after(header_value: Optional[str]) -> Optional[float]:
-    """Parse Retry-After header (segundos ou HTTP-date)"""
-    if not header_value:
-        return None
-    try:
-        return float(header_value)
-    except ValueError:
-        # Pode ser HTTP-date, mas por simplicidade retornar None
-        # Em produção, implementar parsing de RFC 7231 date
-        return None
-
-
 def extrair_via_jsonld(html: str) -> Optional[Dict[str, Any]]:
     """
     Extrai dados estruturados do JSON-LD (Schema.org Product).
@@ -293,14 +287,12 @@ async def extrair_produto_avancado(
     3. HTML fallback
     """
     
-    retry_after = None
-    
     for tentativa in range(max_retries):
         inicio = time.time()
         
         try:
-            # Rate limiting com Retry-After support
-            await rate_limiter.acquire(retry_after)
+            # Rate limiting (a pausa do 429/Retry-After fica com o circuit breaker)
+            await rate_limiter.acquire()
             
             # Headers completos
             headers = {
@@ -317,19 +309,21 @@ async def extrair_produto_avancado(
                 "Cache-Control": "max-age=0",
             }
             
-            response = await client.get(url, headers=headers, timeout=15, follow_redirects=True)
+            # Circuit breaker por host (pausa compartilhada com os outros extratores)
+            await breaker.aguardar(url)
+            try:
+                response = await client.get(url, headers=headers, timeout=15, follow_redirects=True)
+            except Exception:
+                breaker.registrar(url, erro=True)
+                raise
+            breaker.registrar(url, response.status_code,
+                              retry_after=parse_retry_after(response.headers.get("Retry-After")))
             
-            # Tratamento 429 com Retry-After (RFC 6585)
+            # 429: o breaker.registrar acima já pausou o host (Retry-After ou backoff com jitter);
+            # o breaker.aguardar da próxima tentativa espera - sem segunda espera local
             if response.status_code == 429:
-                retry_after = parse_retry_after(response.headers.get("Retry-After"))
-                
-                if retry_after is None:
-                    # Fallback: Full Jitter exponential backoff (AWS recommendation)
-                    retry_after = min(60, (2 ** tentativa) * random.uniform(1.0, 3.0))
-                
                 if tentativa < max_retries - 1:
-                    print(f"    [429] Waiting {retry_after:.1f}s (Retry-After)...")
-                    # Não fazer sleep aqui - o acquire() no próximo loop vai lidar
+                    print(f"    [429] Host pausado pelo circuit breaker, nova tentativa...")
                     continue
                 else:
                     return {"erro": "HTTP 429", "status": 429, "url": url}
@@ -5,8 +5,8 @@ CRAWLEE-STYLE SCRAPER - Arquitetura Profissional
 
 Implementa padrões do Crawlee:
 1. Router com labels (LIST → PRODUCT)
-2. RequestQueue com prioridade
-3. AutoscaledPool com rate limiting inteligente
+2. RequestQueue com prioridade (memória ou SQLite persistente/retomável)
+3. AutoscaledPool com rate limiting por host (rate_limiter.HostRateLimiter)
 4. SessionPool para gerenciar cookies/headers
 5. Extração em cascata: JSON-LD → HTML Fallback
 6. Detecção VTEX → API em lote (50 produtos/request)
@@ -19,7 +19,11 @@ import asyncio
 import httpx
 import time
 import json
-import random
+import os
+import socket
+import sqlite3
+import sys
+import threading
 from datetime import datetime
 from typing import Optional, Dict, Any, List, Callable
 from bs4 import BeautifulSoup
@@ -28,6 +32,17 @@ import re
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
+from journal_resultados import JournalResultados
+from sinks import PreviewSink, criar_sink
+from arquivo_respostas import ativar_arquivo, event_hooks_async
+from timing_requests import combinar_hooks, descrever_tempos, event_hooks_tempos_async, medir_fase, salvar_tempos
+from tracer_crawl import faixa, span
+from metricas import (coletor_fila, coletor_setpoints, contar_produtos, event_hooks_metricas_async,
+                      iniciar_se_configurado, iniciar_servidor_metricas, registrar_coletor)
+from rate_limiter import HostRateLimiter, parse_retry_after
+from autoscaler import AIMDAutoscaler
+from circuit_breaker import obter_circuit_breaker
+
 
 # ================================================================================================
 # TIPOS E CONFIGURAÇÃO
@@ -65,7 +80,7 @@ class Context:
 class Config:
     """Configuração do crawler."""
     max_requests_per_minute: int = 120  # Rate limiting global
-    max_concurrency: int = 5            # Requisições simultâneas
+    max_concurrency: int = 5            # Requisições simultâneas (teto quando autoscale_concurrency)
     timeout: float = 20.0
     max_retries: int = 3
     
@@ -73,14 +88,27 @@ class Config:
     autoscale_enabled: bool = True
     autoscale_interval: int = 20  # Ajusta a cada N requests
     error_threshold: float = 0.15  # >15% erros = reduz velocidade
+    autoscale_concurrency: bool = True  # AIMD por host (latência/429/5xx) sobre os workers
+    min_concurrency: int = 1
     
     # Session Pool
     session_pool_size: int = 5
     persist_cookies: bool = True
     
     # Output
-    checkpoint_interval: int = 50
+    checkpoint_interval: int = 50   # fsync do journal a cada N produtos
     output_file: str = "produtos_bellacotton.ndjson"
+    journal_file: Optional[str] = None  # Padrão: <output_file>.journal
+    export_file: Optional[str] = None   # Export em streaming (.csv/.ndjson[.gz]/.parquet) do run atual, além do NDJSON final
+    export_rotate_records: Optional[int] = None  # Rotação do export a cada N registros
+    archive_name: Optional[str] = None  # Arquiva respostas cruas em storage/arquivo/<nome> (re-extração offline)
+    metrics_port: Optional[int] = None  # Serve /metrics (Prometheus) nesta porta; None = só se METRICAS_PORTA
+    
+    # Fila persistente (SQLite em storage/request_queues) - permite retomar e
+    # compartilhar a fila entre processos
+    persistent_queue: bool = False
+    queue_name: str = "default"
+    queue_lease_seconds: float = 120.0  # Requests "em progresso" de processo morto voltam após o lease
 
 
 # ================================================================================================
@@ -150,6 +178,9 @@ class RequestQueue:
     """
     Fila de requisições com prioridade e deduplicação.
     Similar ao Crawlee RequestQueue.
+    
+    Orientada a eventos: add/mark_* sinalizam `changed`, e fetch_next_request
+    só devolve None quando o crawl acabou (nada pendente E nada em progresso).
     """
     
     def __init__(self):
@@ -160,6 +191,7 @@ class RequestQueue:
         self.failed_count: int = 0
         self.lock = asyncio.Lock()
         self.counter: int = 0  # Contador para desempate na PriorityQueue
+        self.changed = asyncio.Event()  # Acorda workers ociosos (novo request ou fim de request)
     
     async def add_request(self, request: Request, force: bool = False):
         """Adiciona request à fila (com deduplicação)."""
@@ -171,7 +203,8 @@ class RequestQueue:
             # Prioridade negativa (maior prioridade = menor número na fila)
             # Usa counter para desempate (evita comparar Request objects)
             self.counter += 1
-            await self.queue.put((-request.priority, self.counter, request))
+            self.queue.put_nowait((-request.priority, self.counter, request))
+            self.changed.set()
     
     async def add_requests(self, requests: List[Request]):
         """Adiciona múltiplos requests."""
@@ -179,26 +212,41 @@ class RequestQueue:
             await self.add_request(req)
     
     async def fetch_next_request(self) -> Optional[Request]:
-        """Pega próximo request da fila."""
-        try:
-            _, _, request = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-            async with self.lock:
+        """
+        Pega próximo request da fila, esperando (sem polling) enquanto houver
+        requests em progresso que ainda podem enfileirar links.
+        Retorna None apenas quando o crawl terminou.
+        """
+        while True:
+            if not self.queue.empty():
+                _, _, request = self.queue.get_nowait()
                 self.in_progress[request.url] = request
-            return request
-        except asyncio.TimeoutError:
-            return None
+                return request
+            
+            if not self.in_progress:
+                self.changed.set()  # Propaga o fim para os outros workers
+                return None
+            
+            # Sem await entre a checagem e o clear → nenhum sinal é perdido
+            self.changed.clear()
+            await self.changed.wait()
+    
+    async def renew_lease(self, url: str):
+        """Sem lease em memória (interface do SQLiteRequestQueue)."""
     
-    def mark_completed(self, url: str):
+    async def mark_completed(self, url: str):
         """Marca request como concluído."""
         if url in self.in_progress:
             del self.in_progress[url]
         self.completed_count += 1
+        self.changed.set()
     
-    def mark_failed(self, url: str):
+    async def mark_failed(self, url: str):
         """Marca request como falhado."""
         if url in self.in_progress:
             del self.in_progress[url]
         self.failed_count += 1
+        self.changed.set()
     
     def is_empty(self) -> bool:
         """Verifica se fila está vazia."""
@@ -214,6 +262,245 @@ class RequestQueue:
         }
 
 
+# ================================================================================================
+# REQUEST QUEUE PERSISTENTE (SQLite - retomável e compartilhável entre processos)
+# ================================================================================================
+class SQLiteRequestQueue:
+    """
+    Mesma interface do RequestQueue, mas persistida em SQLite
+    (storage/request_queues/<nome>.sqlite).
+    
+    - Deduplicação pela URL (PRIMARY KEY)
+    - Prioridade + ordem de chegada
+    - retry_count persistido
+    - Lease: request em progresso fica reservado por `lease_seconds`; se o
+      processo morrer, volta a ficar disponível (outro processo ou o próximo run pega).
+      `renew_lease` renova depois das filas (breaker/autoscaler/rate limiter), antes do fetch
+    - Conclusão/falha são UPDATEs atômicos
+    - Chamadas ao SQLite rodam em `asyncio.to_thread` (não bloqueiam o event loop)
+    
+    Vários processos podem usar o mesmo arquivo (WAL + BEGIN IMMEDIATE na reserva).
+    """
+    
+    PENDING = 'pending'
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    
+    def __init__(self, name: str = "default", directory: str = "storage/request_queues",
+                 lease_seconds: float = 120.0):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.sqlite")
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        
+        # Uma conexão usada por várias threads (to_thread, coletor de métricas): o lock
+        # serializa statements e impede que transações de threads diferentes se misturem
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                url TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                user_data TEXT NOT NULL DEFAULT '{}',
+                priority INTEGER NOT NULL DEFAULT 0,
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                lease_until REAL,
+                worker TEXT,
+                seq INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_next ON requests(state, priority DESC, seq)")
+        
+        # Ordem de chegada: contador semeado uma vez (MAX(seq) por insert era O(N) a cada add)
+        self.seq: int = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM requests").fetchone()[0]
+        
+        # Contadores desta sessão (get_stats usa os totais do banco)
+        self.completed_count: int = 0
+        self.failed_count: int = 0
+        
+        # Sinal local (mesmo processo); outros processos são vistos via poll_interval
+        self.changed = asyncio.Event()
+        self.poll_interval: float = 1.0
+    
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_to_request(row) -> Request:
+        url, label, user_data, priority, retry_count = row
+        return Request(
+            url=url,
+            label=RouteLabel(label),
+            user_data=json.loads(user_data),
+            retry_count=retry_count,
+            priority=priority
+        )
+    
+    def _insert(self, request: Request, force: bool, now: float):
+        """INSERT de um request (chamado com o lock, dentro da transação)."""
+        self.seq += 1
+        if force:
+            self.conn.execute(
+                """INSERT INTO requests (url, label, user_data, priority, retry_count, state, seq, updated_at)
+                   VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       state='pending', retry_count=excluded.retry_count, priority=excluded.priority,
+                       lease_until=NULL, worker=NULL, updated_at=excluded.updated_at""",
+                (request.url, request.label.value, json.dumps(request.user_data), request.priority,
+                 request.retry_count, self.seq, now)
+            )
+        else:
+            self.conn.execute(
+                """INSERT OR IGNORE INTO requests (url, label, user_data, priority, retry_count, state, seq, updated_at)
+                   VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)""",
+                (request.url, request.label.value, json.dumps(request.user_data), request.priority,
+                 request.retry_count, self.seq, now)
+            )
+    
+    def _add(self, requests: List[Request], force: bool = False):
+        """Adiciona requests numa transação (roda em thread)."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for req in requests:
+                    self._insert(req, force, now)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    async def add_request(self, request: Request, force: bool = False):
+        """Adiciona request (deduplicado). force=True recoloca na fila (retry)."""
+        await asyncio.to_thread(self._add, [request], force)
+        self.changed.set()
+    
+    async def add_requests(self, requests: List[Request]):
+        """Adiciona múltiplos requests (uma transação)."""
+        await asyncio.to_thread(self._add, requests)
+        self.changed.set()
+    
+    def _claim(self) -> Optional[Request]:
+        """Reserva atomicamente o próximo request (pendente ou com lease expirado)."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    """SELECT url, label, user_data, priority, retry_count FROM requests
+                       WHERE state = 'pending' OR (state = 'in_progress' AND lease_until < ?)
+                       ORDER BY priority DESC, seq LIMIT 1""",
+                    (now,)
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        "UPDATE requests SET state='in_progress', lease_until=?, worker=?, updated_at=? WHERE url=?",
+                        (now + self.lease_seconds, self.worker_id, now, row[0])
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self._row_to_request(row) if row else None
+    
+    async def fetch_next_request(self) -> Optional[Request]:
+        """
+        Pega próximo request. Espera por sinal local (ou poll_interval, para
+        enxergar outros processos/leases expirando) enquanto houver requests em
+        progresso. Retorna None apenas quando o crawl terminou.
+        """
+        while True:
+            self.changed.clear()
+            request = await asyncio.to_thread(self._claim)
+            if request:
+                return request
+            
+            if await asyncio.to_thread(self.is_empty):
+                self.changed.set()  # Propaga o fim para os outros workers
+                return None
+            
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _renew(self, url: str):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE requests SET lease_until=?, worker=?, updated_at=? WHERE url=? AND state='in_progress'",
+                (now + self.lease_seconds, self.worker_id, now, url)
+            )
+    
+    async def renew_lease(self, url: str):
+        """Renova o lease (chamar depois das esperas, logo antes do fetch)."""
+        await asyncio.to_thread(self._renew, url)
+    
+    def _finish(self, url: str, state: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE requests SET state=?, lease_until=NULL, updated_at=? WHERE url=?",
+                (state, time.time(), url)
+            )
+    
+    async def mark_completed(self, url: str):
+        """Marca request como concluído (atômico)."""
+        await asyncio.to_thread(self._finish, url, self.COMPLETED)
+        self.completed_count += 1
+        self.changed.set()
+    
+    async def mark_failed(self, url: str):
+        """Marca request como falhado (atômico)."""
+        await asyncio.to_thread(self._finish, url, self.FAILED)
+        self.failed_count += 1
+        self.changed.set()
+    
+    def release_in_progress(self, only_mine: bool = True):
+        """Devolve para a fila requests em progresso (ex: após Ctrl-C neste processo)."""
+        with self.lock:
+            if only_mine:
+                self.conn.execute(
+                    "UPDATE requests SET state='pending', lease_until=NULL, worker=NULL WHERE state='in_progress' AND worker=?",
+                    (self.worker_id,)
+                )
+            else:
+                self.conn.execute("UPDATE requests SET state='pending', lease_until=NULL, worker=NULL WHERE state='in_progress'")
+    
+    def clear(self):
+        """Apaga a fila inteira (novo crawl do zero)."""
+        with self.lock:
+            self.conn.execute("DELETE FROM requests")
+    
+    def _counts(self) -> Dict[str, int]:
+        counts = {self.PENDING: 0, self.IN_PROGRESS: 0, self.COMPLETED: 0, self.FAILED: 0}
+        with self.lock:
+            for state, total in self.conn.execute("SELECT state, COUNT(*) FROM requests GROUP BY state"):
+                counts[state] = total
+        return counts
+    
+    def is_empty(self) -> bool:
+        """Vazia = nada pendente e nada em progresso (em qualquer processo)."""
+        counts = self._counts()
+        return counts[self.PENDING] == 0 and counts[self.IN_PROGRESS] == 0
+    
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas (totais persistidos, incluindo runs anteriores)."""
+        counts = self._counts()
+        return {
+            "pending": counts[self.PENDING],
+            "in_progress": counts[self.IN_PROGRESS],
+            "completed": counts[self.COMPLETED],
+            "failed": counts[self.FAILED]
+        }
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
 # ================================================================================================
 # ROUTER (roteamento por label)
 # ================================================================================================
@@ -245,94 +532,6 @@ class Router:
             print(f"⚠️  Nenhum handler para label: {context.request.label}")
 
 
-# ================================================================================================
-# ADAPTIVE RATE LIMITER (AutoscaledPool)
-# ================================================================================================
-class AdaptiveRateLimiter:
-    """
-    Rate limiter adaptativo similar ao AutoscaledPool.
-    Ajusta velocidade automaticamente com base em erros.
-    """
-    
-    def __init__(self, requests_per_minute: int, autoscale: bool = True):
-        self.max_rpm = requests_per_minute
-        self.current_rpm = requests_per_minute
-        self.autoscale = autoscale
-        
-        # Controle de taxa
-        self.tokens = []
-        self.lock = asyncio.Lock()
-        
-        # Métricas para autoscaling
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
-    
-    async def acquire(self):
-        """Aguarda até poder fazer próxima requisição."""
-        async with self.lock:
-            now = time.time()
-            
-            # Remove tokens antigos (>60s)
-            self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            # Se atingiu limite, aguarda
-            while len(self.tokens) >= self.current_rpm:
-                await asyncio.sleep(0.1)
-                now = time.time()
-                self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            # Adiciona novo token
-            self.tokens.append(now)
-            
-            # Jitter leve para evitar bursts
-            await asyncio.sleep(random.uniform(0, 0.1))
-    
-    def report_success(self):
-        self.recent_requests += 1
-        self._maybe_adjust()
-    
-    def report_error(self):
-        self.recent_requests += 1
-        self.recent_errors += 1
-        self._maybe_adjust()
-    
-    def report_429(self):
-        self.recent_requests += 1
-        self.recent_429s += 1
-        self._maybe_adjust()
-    
-    def _maybe_adjust(self):
-        """Ajusta RPM automaticamente."""
-        if not self.autoscale or self.recent_requests < 10:  # Ajusta mais rápido (10 vs 20)
-            return
-        
-        error_rate = (self.recent_errors + self.recent_429s) / self.recent_requests
-        
-        old_rpm = self.current_rpm
-        
-        if self.recent_429s > 2:  # Mais sensível (2 vs 3)
-            # Muitos 429s = reduz drasticamente
-            self.current_rpm = max(15, int(self.current_rpm * 0.3))  # Reduz 70%!
-            print(f"⚠️  Muitos 429s ({self.recent_429s})! RPM: {old_rpm} → {self.current_rpm}")
-        
-        elif error_rate > 0.2:  # Mais sensível (20% vs 15%)
-            # Muitos erros = reduz
-            self.current_rpm = max(20, int(self.current_rpm * 0.6))  # Reduz 40%
-            print(f"⚠️  Taxa de erro alta ({error_rate:.0%}). RPM: {old_rpm} → {self.current_rpm}")
-        
-        elif error_rate < 0.05 and self.recent_429s == 0:
-            # Poucos erros = aumenta devagar
-            self.current_rpm = min(self.max_rpm, int(self.current_rpm * 1.05))  # Aumenta só 5%
-            if self.current_rpm != old_rpm:
-                print(f"✅ Baixa taxa de erro! RPM: {old_rpm} → {self.current_rpm}")
-        
-        # Reset métricas
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
-
-
 # ================================================================================================
 # EXTRAÇÃO DE DADOS
 # ================================================================================================
@@ -497,15 +696,45 @@ class CrawleeCrawler:
         self.router = router
         
         # Componentes
-        self.request_queue = RequestQueue()
+        if config.persistent_queue:
+            self.request_queue = SQLiteRequestQueue(config.queue_name, lease_seconds=config.queue_lease_seconds)
+        else:
+            self.request_queue = RequestQueue()
         self.session_pool = SessionPool(config.session_pool_size)
-        self.rate_limiter = AdaptiveRateLimiter(
+        self.rate_limiter = HostRateLimiter(
             config.max_requests_per_minute,
             autoscale=config.autoscale_enabled
         )
+        self.autoscaler = AIMDAutoscaler(
+            max_concorrencia=config.max_concurrency,
+            min_concorrencia=config.min_concurrency,
+            verbose=True
+        ) if config.autoscale_concurrency else None
+        self.breaker = obter_circuit_breaker()  # Pausa por host compartilhada entre workers
+        
+        # Armazenamento (journal append-only; com fila persistente o run retomado continua o mesmo journal)
+        journal_path = config.journal_file or f"{config.output_file}.journal"
+        if not config.persistent_queue and os.path.exists(journal_path):
+            os.remove(journal_path)
+        self.journal = JournalResultados(journal_path, fsync_registros=config.checkpoint_interval)
+        if config.archive_name:
+            ativar_arquivo(config.archive_name)
         
-        # Armazenamento
-        self.produtos: List[Dict] = []
+        # Métricas: fila, RPM por host e concorrência AIMD lidos a cada scrape do /metrics
+        if config.metrics_port is not None:
+            iniciar_servidor_metricas(config.metrics_port)
+        else:
+            iniciar_se_configurado()
+        registrar_coletor('fila_crawlee', coletor_fila(config.queue_name, self.request_queue.get_stats))
+        registrar_coletor('rate_limiter_crawlee', coletor_setpoints('rate_limiter', self.rate_limiter.setpoints))
+        if self.autoscaler:
+            registrar_coletor('autoscaler_crawlee', coletor_setpoints('autoscaler', self.autoscaler.setpoints))
+        
+        # Só uma prévia fica em memória; os registros vão direto para journal/export
+        self.preview = PreviewSink()
+        self.export = criar_sink(
+            config.export_file, rotacionar_registros=config.export_rotate_records
+        ) if config.export_file else None
         self.stats = {
             'requests': 0,
             'successes': 0,
@@ -518,17 +747,34 @@ class CrawleeCrawler:
     
     async def push_data(self, data: Dict):
         """Salva dados extraídos."""
-        self.produtos.append(data)
+        self.preview.write(data)
+        contar_produtos(data.get('url'))
+        self.journal.append(data)  # Custo constante por registro (fsync em lote)
+        if self.export:
+            self.export.write(data)
         
         # Checkpoint periódico
-        if len(self.produtos) % self.config.checkpoint_interval == 0:
+        if self.preview.total % self.config.checkpoint_interval == 0:
             self._save_checkpoint()
     
     async def fetch_and_parse(self, request: Request, session: Session) -> Optional[Context]:
         """Faz requisição e parseia resposta."""
-        await self.rate_limiter.acquire()
-        
+        await self.breaker.aguardar(request.url)  # Daqui em diante a vaga no breaker é nossa
+        com_autoscaler = False
+        inicio = None
+        latencia = None
+        status = None
+        retry_after = None
         try:
+            # Filas dentro do try: cancelamento/erro aqui ainda devolve a vaga do breaker
+            if self.autoscaler:
+                await self.autoscaler.acquire(request.url)
+                com_autoscaler = True
+            await self.rate_limiter.acquire(request.url)
+            # As filas acima podem passar do lease: renova antes de buscar (fila persistente)
+            await self.request_queue.renew_lease(request.url)
+            inicio = time.perf_counter()
+            
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -539,37 +785,43 @@ class CrawleeCrawler:
             async with httpx.AsyncClient(
                 timeout=self.config.timeout,
                 follow_redirects=True,
-                cookies=session.cookies
+                cookies=session.cookies,
+                # Arquiva respostas cruas (se ligado) + tempos e métricas por request
+                event_hooks=combinar_hooks(event_hooks_async(), event_hooks_tempos_async(), event_hooks_metricas_async())
             ) as client:
                 response = await client.get(request.url, headers=headers)
+                latencia = time.perf_counter() - inicio
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
                 
                 # Atualiza cookies da sessão
                 session.cookies.update(response.cookies)
                 
                 if response.status_code == 429:
-                    self.rate_limiter.report_429()
+                    # Circuit breaker pausa o host inteiro (Retry-After ou backoff) - todos os workers respeitam
+                    self.rate_limiter.report_429(request.url, retry_after)
                     session.mark_bad()
-                    print(f"   ⚠️  429 Too Many Requests - aguardando...")
-                    await asyncio.sleep(10)  # Pausa de 10s quando pega 429
+                    print(f"   ⚠️  429 Too Many Requests - host pausado")
                     return None
                 
                 if response.status_code == 403:
+                    # Pausa longa do host no breaker (não só deste worker)
                     print(f"   🚫 403 Forbidden - IP pode estar banido!")
-                    self.rate_limiter.report_error()
+                    self.rate_limiter.report_error(request.url)
                     session.mark_bad()
-                    await asyncio.sleep(30)  # Pausa longa em caso de ban
                     return None
                 
                 if response.status_code != 200:
-                    self.rate_limiter.report_error()
+                    self.rate_limiter.report_error(request.url)
                     session.mark_bad()
                     print(f"   ❌ HTTP {response.status_code}")
                     return None
                 
                 html = response.text
-                soup = BeautifulSoup(html, 'lxml')
+                with medir_fase(request.url, 'parse'):
+                    soup = BeautifulSoup(html, 'lxml')
                 
-                self.rate_limiter.report_success()
+                self.rate_limiter.report_success(request.url)
                 session.mark_good()
                 
                 return Context(
@@ -581,9 +833,18 @@ class CrawleeCrawler:
                 )
         
         except Exception as e:
-            self.rate_limiter.report_error()
-            session.mark_bad()
+            if inicio is not None:
+                self.rate_limiter.report_error(request.url)
+                session.mark_bad()
             return None
+        
+        finally:
+            if inicio is None:
+                self.breaker.liberar(request.url)  # Não chegou a enviar: sem veredito para o circuito
+            else:
+                self.breaker.registrar(request.url, status, erro=status is None, retry_after=retry_after)
+            if com_autoscaler:
+                self.autoscaler.release(request.url, latencia, status, erro=status is None)
     
     async def process_request(self, request: Request):
         """Processa um request."""
@@ -596,11 +857,10 @@ class CrawleeCrawler:
             self.stats['requests'] += 1
             
             # Log de sucesso
-            stats = self.request_queue.get_stats()
-            print(f"[{stats['completed']+1:3d}] ✅ OK - RPM atual: {self.rate_limiter.current_rpm}")
+            print(f"[{self.request_queue.completed_count+1:3d}] ✅ OK - RPM atual: {self.rate_limiter.current_rpm}")
             
             await self.router.route(context)
-            self.request_queue.mark_completed(request.url)
+            await self.request_queue.mark_completed(request.url)
         else:
             self.stats['errors'] += 1
             self.stats['requests'] += 1
@@ -612,7 +872,7 @@ class CrawleeCrawler:
                 await self.request_queue.add_request(request, force=True)
             else:
                 print(f"   ❌ Falha definitiva após {self.config.max_retries} tentativas")
-                self.request_queue.mark_failed(request.url)
+                await self.request_queue.mark_failed(request.url)
     
     async def run(self, seeds: List[Request]):
         """
@@ -625,9 +885,13 @@ class CrawleeCrawler:
         print(f"Max RPM: {self.config.max_requests_per_minute}")
         print(f"Max Concurrency: {self.config.max_concurrency}")
         print(f"AutoScale: {self.config.autoscale_enabled}")
+        if self.config.persistent_queue:
+            stats = self.request_queue.get_stats()
+            print(f"Fila persistente: {self.request_queue.path} "
+                  f"({stats['completed']} concluídos, {stats['pending']} pendentes)")
         print(f"{'='*100}\n")
         
-        # Adiciona seeds
+        # Adiciona seeds (deduplicados - em fila persistente, seeds já vistos não voltam)
         await self.request_queue.add_requests(seeds)
         
         inicio = time.time()
@@ -638,41 +902,61 @@ class CrawleeCrawler:
             workers.append(asyncio.create_task(self._worker(i)))
         
         # Aguarda conclusão
-        await asyncio.gather(*workers)
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            if self.config.persistent_queue:
+                # Ctrl-C/crash: devolve o que estava em progresso para a fila
+                self.request_queue.release_in_progress()
         
         tempo_total = time.time() - inicio
         
         # Resultados finais
         self._print_stats(tempo_total)
         self._save_final()
+        for linha in descrever_tempos():
+            print(linha)
+        print(f"⏱️ Tempos por request: {salvar_tempos(nome='crawlee')}")
     
     async def _worker(self, worker_id: int):
-        """Worker que processa requests da fila."""
-        while True:
-            if self.request_queue.is_empty():
-                await asyncio.sleep(0.5)
-                if self.request_queue.is_empty():
+        """
+        Worker que processa requests da fila.
+        Dorme no fetch_next_request até chegar request (ou o crawl terminar) - sem polling.
+        """
+        with faixa(f'worker {worker_id}'):  # Faixa do trace (tracer_crawl.py), no-op se desligado
+            while True:
+                with span('fila_requests', 'fila'):
+                    request = await self.request_queue.fetch_next_request()
+                if request is None:
                     break
-            
-            request = await self.request_queue.fetch_next_request()
-            if request:
+                
                 self.stats['requests'] += 1
-                await self.process_request(request)
+                try:
+                    with span('request', url=request.url, label=request.label.value):
+                        await self.process_request(request)
+                except Exception as e:
+                    # Handler quebrado não pode deixar o request "em progresso" para sempre
+                    print(f"   ❌ Erro no handler ({request.url}): {str(e)[:80]}")
+                    await self.request_queue.mark_failed(request.url)
     
     def _save_checkpoint(self):
-        """Salva checkpoint."""
-        with open(f"checkpoint_{len(self.produtos)}.json", "w", encoding="utf-8") as f:
-            json.dump(self.produtos, f, indent=2, ensure_ascii=False)
-        print(f"   💾 Checkpoint: {len(self.produtos)} produtos")
+        """Checkpoint = fsync do journal (+ compactação se houver muitas duplicatas)."""
+        self.journal.flush()
+        if self.export:
+            self.export.flush()
+        if self.journal.precisa_compactar():
+            self.journal.compactar()
+        print(f"   💾 Checkpoint: {len(self.journal)} produtos no journal")
     
     def _save_final(self):
-        """Salva resultados finais."""
-        # NDJSON (uma linha por produto)
-        with open(self.config.output_file, "w", encoding="utf-8") as f:
-            for produto in self.produtos:
-                f.write(json.dumps(produto, ensure_ascii=False) + "\n")
+        """Salva resultados finais (compacta o journal no NDJSON de saída)."""
+        total = self.journal.compactar(self.config.output_file)
+        self.journal.close()
+        if self.export:
+            self.export.close()
+            print(f"📤 Export: {', '.join(getattr(self.export, 'arquivos', [self.config.export_file]))}")
         
-        print(f"\n✅ Salvos {len(self.produtos)} produtos em: {self.config.output_file}\n")
+        print(f"\n✅ Salvos {total} produtos em: {self.config.output_file}\n")
     
     def _print_stats(self, tempo_total: float):
         """Imprime estatísticas finais."""
@@ -683,11 +967,15 @@ class CrawleeCrawler:
         print(f"{'='*100}")
         print(f"✅ Sucesso: {stats['completed']}")
         print(f"❌ Falhas: {stats['failed']}")
-        print(f"📦 Produtos extraídos: {len(self.produtos)}")
+        print(f"📦 Produtos extraídos: {self.preview.total}")
         print(f"⏱️  Tempo total: {tempo_total:.1f}s ({tempo_total/60:.1f} min)")
         if stats['completed'] > 0:
             print(f"📊 Tempo médio: {tempo_total/stats['completed']:.2f}s por request")
         print(f"🚀 RPM final: {self.rate_limiter.current_rpm}")
+        if self.autoscaler:
+            for host, sp in self.autoscaler.setpoints().items():
+                print(f"⚙️  {host}: concorrência {sp['limite']}/{self.config.max_concurrency} "
+                      f"(p50 {sp['p50']:.2f}s, p95 {sp['p95']:.2f}s, 429s: {sp['total_429']})")
         print(f"{'='*100}\n")
 
 
@@ -700,7 +988,9 @@ async def main():
         max_requests_per_minute=60,  # Começa com 60 RPM (1 req por segundo)
         max_concurrency=3,           # 3 workers simultâneos
         autoscale_enabled=True,
-        checkpoint_interval=10       # Checkpoint a cada 10 produtos
+        checkpoint_interval=10,      # Checkpoint a cada 10 produtos
+        persistent_queue=True,       # Retoma de onde parou (storage/request_queues/bellacotton.sqlite)
+        queue_name="bellacotton"
     )
     
     # Router
@@ -711,6 +1001,12 @@ async def main():
     # Crawler
     crawler = CrawleeCrawler(config, router)
     
+    # --reset: descarta a fila persistente e começa do zero
+    if '--reset' in sys.argv and config.persistent_queue:
+        crawler.request_queue.clear()
+        crawler.journal.limpar()
+        print("🗑️  Fila persistente apagada")
+    
     # Seeds - pode ser categorias OU lista de produtos direto
     # Opção 1: Seeds com categorias (crawl completo)
     # seeds = [
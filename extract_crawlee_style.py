@@ -24,6 +24,8 @@ import re
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+from journal_resultados import JournalResultados
+
 
 # ================================================================================================
 # CONFIGURAÇÃO
@@ -50,7 +52,7 @@ class Config:
     
     # Checkpoints
     checkpoint_interval: int = 50  # Salva a cada 50 produtos
-    checkpoint_file: str = "checkpoint_crawlee.json"
+    checkpoint_file: str = "checkpoint_crawlee.ndjson"  # Journal append-only (1 linha por produto)
     output_file: str = "produtos_crawlee.json"
     
     # HTTP
@@ -324,6 +326,8 @@ async def crawl(urls: List[str], config: Config):
     request_queue = RequestQueue(urls, max_retries=config.max_retries)
     
     produtos_extraidos = []
+    journal = JournalResultados(config.checkpoint_file, fsync_registros=config.checkpoint_interval)
+    journal.limpar()
     inicio_total = time.time()
     
     # HTTP Client
@@ -353,12 +357,13 @@ async def crawl(urls: List[str], config: Config):
             if resultado["sucesso"]:
                 request_queue.mark_success(req.url)
                 produtos_extraidos.append(resultado["dados"])
+                journal.append(resultado["dados"])
                 
                 print(f"[{contador:3d}/{len(urls)}] ✅ OK  ({resultado['tempo']:.2f}s){tentativa_str}")
                 
                 # Checkpoint
                 if len(produtos_extraidos) % config.checkpoint_interval == 0:
-                    salvar_checkpoint(produtos_extraidos, config.checkpoint_file)
+                    journal.flush()
                     print(f"   💾 Checkpoint salvo: {len(produtos_extraidos)} produtos")
             
             else:
@@ -372,6 +377,7 @@ async def crawl(urls: List[str], config: Config):
                     print(f"[{contador:3d}/{len(urls)}] ❌ ERR ({resultado['erro'][:30]}){tentativa_str}")
     
     tempo_total = time.time() - inicio_total
+    journal.close()
     
     # Estatísticas finais
     stats = request_queue.get_stats()
@@ -400,15 +406,6 @@ async def crawl(urls: List[str], config: Config):
         print(f"⚠️  URLs falhadas salvas em: urls_falhadas.txt\n")
 
 
-def salvar_checkpoint(produtos: List[Dict], filename: str):
-    """Salva checkpoint para recuperação."""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump({
-            "timestamp": datetime.now().isoformat(),
-            "produtos": produtos
-        }, f, indent=2, ensure_ascii=False)
-
-
 # ================================================================================================
 # MAIN
 # ================================================================================================
@@ -4,7 +4,7 @@ EXTRACT DETAILS V7 - Crawlee-Style Architecture
 ================================================
 
 Implementa extração de detalhes usando padrões do Crawlee:
-- AdaptiveRateLimiter (AutoscaledPool)
+- HostRateLimiter (token bucket por host, rate_limiter.py)
 - SessionPool para gerenciar cookies
 - Extração em cascata: JSON-LD → OpenGraph → HTML Fallback
 - Processamento paralelo com workers
@@ -27,70 +27,7 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 import time
 
-
-# ================================================================================================
-# ADAPTIVE RATE LIMITER
-# ================================================================================================
-class AdaptiveRateLimiter:
-    """Rate limiter adaptativo."""
-    
-    def __init__(self, requests_per_minute: int = 60):
-        self.max_rpm = requests_per_minute
-        self.current_rpm = requests_per_minute
-        self.tokens = []
-        self.lock = asyncio.Lock()
-        
-        # Métricas
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
-    
-    async def acquire(self):
-        """Aguarda até poder fazer próxima requisição."""
-        async with self.lock:
-            now = time.time()
-            self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            while len(self.tokens) >= self.current_rpm:
-                await asyncio.sleep(0.1)
-                now = time.time()
-                self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            self.tokens.append(now)
-            
-            import random
-            await asyncio.sleep(random.uniform(0, 0.05))
-    
-    def report_success(self):
-        self.recent_requests += 1
-        self._adjust()
-    
-    def report_error(self):
-        self.recent_requests += 1
-        self.recent_errors += 1
-        self._adjust()
-    
-    def report_429(self):
-        self.recent_requests += 1
-        self.recent_429s += 1
-        self._adjust()
-    
-    def _adjust(self):
-        if self.recent_requests < 10:
-            return
-        
-        error_rate = (self.recent_errors + self.recent_429s) / self.recent_requests
-        
-        if self.recent_429s > 2:
-            self.current_rpm = max(20, int(self.current_rpm * 0.5))
-        elif error_rate > 0.2:
-            self.current_rpm = max(30, int(self.current_rpm * 0.7))
-        elif error_rate < 0.05 and self.recent_429s == 0:
-            self.current_rpm = min(self.max_rpm, int(self.current_rpm * 1.1))
-        
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
+from rate_limiter import HostRateLimiter, parse_retry_after
 
 
 # ================================================================================================
@@ -254,7 +191,7 @@ async def extrair_produto_detalhes(
     indice: int,
     client: httpx.AsyncClient,
     session: Session,
-    rate_limiter: AdaptiveRateLimiter
+    rate_limiter: HostRateLimiter
 ) -> Dict:
     """
     Extrai detalhes de um produto.
@@ -262,7 +199,7 @@ async def extrair_produto_detalhes(
     """
     url = produto['url']
     
-    await rate_limiter.acquire()
+    await rate_limiter.acquire(url)
     
     inicio = time.perf_counter()
     
@@ -282,7 +219,7 @@ async def extrair_produto_detalhes(
         tempo_resposta = time.perf_counter() - inicio
         
         if response.status_code == 429:
-            rate_limiter.report_429()
+            rate_limiter.report_429(url, parse_retry_after(response.headers.get('Retry-After')))
             session.mark_bad()
             return {
                 'indice': indice,
@@ -294,7 +231,7 @@ async def extrair_produto_detalhes(
             }
         
         if response.status_code != 200:
-            rate_limiter.report_error()
+            rate_limiter.report_error(url)
             session.mark_bad()
             return {
                 'indice': indice,
@@ -305,7 +242,7 @@ async def extrair_produto_detalhes(
                 'tempo_resposta': tempo_resposta
             }
         
-        rate_limiter.report_success()
+        rate_limiter.report_success(url)
         session.mark_good()
         
         html = response.text
@@ -338,7 +275,7 @@ async def extrair_produto_detalhes(
         return dados
     
     except httpx.TimeoutException:
-        rate_limiter.report_error()
+        rate_limiter.report_error(url)
         session.mark_bad()
         return {
             'indice': indice,
@@ -349,7 +286,7 @@ async def extrair_produto_detalhes(
         }
     
     except Exception as e:
-        rate_limiter.report_error()
+        rate_limiter.report_error(url)
         session.mark_bad()
         return {
             'indice': indice,
@@ -388,7 +325,7 @@ async def extrair_detalhes_async(
     
     # Componentes Crawlee - RPM mais alto para workers paralelos
     # Com 5 workers, 120 RPM = ~24 RPM por worker = 1 req a cada 2.5s
-    rate_limiter = AdaptiveRateLimiter(requests_per_minute=120)
+    rate_limiter = HostRateLimiter(requests_per_minute=120)
     session_pool = SessionPool(size=max_workers)
     
     # Fila de trabalho
@@ -6,23 +6,41 @@ import httpx
 from bs4 import BeautifulSoup
 import json
 import re
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from triagem_urls import filtrar_produtos_vivos
+from autoscaler import AIMDAutoscaler
+from circuit_breaker import obter_circuit_breaker, parse_retry_after
+from hedging import HedgedFetcher
+from dead_letter import separar_falhas, descrever_falhas
+from arquivo_respostas import event_hooks
+from cache_conteudo import RE_JSON_LD, CacheConteudo, versao_codigo
+from timing_requests import combinar_hooks, event_hooks_tempos, execucao_tempos, medir_fase
+from metricas import coletor_setpoints, coletores_execucao, contar_produtos, event_hooks_metricas, id_execucao
+
+# Pausa por host compartilhada por todas as threads (e outros extratores do processo)
+breaker = obter_circuit_breaker()
 
 # Cliente HTTP compartilhado
 client = httpx.Client(
     headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'},
     timeout=15,
     follow_redirects=True,
-    limits=httpx.Limits(max_connections=40)
+    limits=httpx.Limits(max_connections=40),
+    # Arquiva respostas cruas (se ARQUIVAR_RESPOSTAS) + tempos por request (conexão/TLS/TTFB/download)
+    # + contadores de requests/bytes/status para o /metrics (metricas.py)
+    event_hooks=combinar_hooks(event_hooks(), event_hooks_tempos(), event_hooks_metricas())
 )
 
-def extrair_json_ld(soup):
-    """Extrai dados de JSON-LD"""
+def extrair_json_ld_blocos(blocos):
+    """Extrai dados do primeiro bloco JSON-LD com Product.
+    Retorna (dados, bloco usado) - o bloco é o recorte do cache_conteudo"""
     dados = {}
     
-    for script in soup.find_all('script', type='application/ld+json'):
+    for bloco in blocos:
         try:
-            data = json.loads(script.string)
+            data = json.loads(bloco)
             if isinstance(data, list):
                 data = next((d for d in data if d.get('@type') == 'Product'), {})
             
@@ -55,11 +73,23 @@ def extrair_json_ld(soup):
                 
                 dados['marca'] = data.get('brand', {}).get('name') if isinstance(data.get('brand'), dict) else data.get('brand')
                 dados['imagem'] = data.get('image', [None])[0] if isinstance(data.get('image'), list) else data.get('image')
-                break
+                return dados, bloco
         except:
             pass
     
-    return dados
+    return dados, None
+
+def extrair_json_ld(soup):
+    """Extrai dados de JSON-LD"""
+    blocos = (script.string for script in soup.find_all('script', type='application/ld+json'))
+    return extrair_json_ld_blocos(blocos)[0]
+
+def fragmento_json_ld(html):
+    """Recorte para o cache_conteudo: o bloco JSON-LD de onde sai o registro inteiro.
+    Só quando ele traz nome e preço - senão a cascata completa com JS/OpenGraph/HTML,
+    que não entram no hash (ex: @graph do Yoast cai no OpenGraph) → sempre faz parse"""
+    dados, bloco = extrair_json_ld_blocos(b.strip() for b in RE_JSON_LD.findall(html))
+    return bloco if dados.get('nome') and dados.get('preco') else None
 
 def extrair_opengraph(soup):
     """Extrai dados de OpenGraph"""
@@ -114,35 +144,74 @@ def extrair_html(soup):
     
     return dados
 
-def processar_produto(produto, indice, total):
-    """Processa um produto (com retry)"""
+def _get(url, autoscaler=None, medida=None):
+    """GET no cliente compartilhado: circuit breaker do host + slot de concorrência (AIMD).
+    medida (hedging.MedidaRede): marca só o GET, sem as filas, para o p95 do hedger"""
+    breaker.aguardar_sync(url)
+    if autoscaler:
+        autoscaler.acquire_sync(url)
+    inicio = time.perf_counter()
+    if medida:
+        medida.iniciar()
+    status = None
+    retry_after = None
+    try:
+        response = client.get(url)
+        status = response.status_code
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        return response
+    finally:
+        if medida:
+            medida.terminar()
+        breaker.registrar(url, status, erro=status is None, retry_after=retry_after)
+        if autoscaler:
+            autoscaler.release(url, time.perf_counter() - inicio, status, erro=status is None)
+
+def extrair_dados_html(html, url):
+    """Cascata de extração sobre o HTML (também usada na re-extração offline do arquivo)"""
+    with medir_fase(url, 'parse'):
+        soup = BeautifulSoup(html, 'lxml')
+    
+    with medir_fase(url, 'extracao'):
+        dados = extrair_json_ld(soup)
+        if not dados.get('nome') or not dados.get('preco'):
+            dados.update(extrair_javascript_vars(html))
+        if not dados.get('nome'):
+            dados.update(extrair_opengraph(soup))
+        if not dados.get('nome'):
+            dados.update(extrair_html(soup))
+    
+    dados['url'] = url
+    return dados
+
+def processar_produto(produto, indice, total, autoscaler=None, hedger=None, cache=None):
+    """Processa um produto (com retry; hedger duplica requests que passam do p95 do host;
+    com cache, pula o parse se o JSON-LD não mudou desde a última execução)"""
     url = produto['url']
+    ultimo_erro = 'Max retries'
     
     for tentativa in range(3):
         try:
-            response = client.get(url)
+            if hedger:
+                response = hedger.get_sync(url, lambda medida: _get(url, autoscaler, medida), mede_latencia=True)
+            else:
+                response = _get(url, autoscaler)
             
             if response.status_code == 429:
-                import time
-                time.sleep(2 ** tentativa)
+                # Sem sleep local: o breaker já pausou o host para todas as threads
+                ultimo_erro = 'HTTP 429'
                 continue
             
             if response.status_code != 200:
+                ultimo_erro = f'HTTP {response.status_code}'
                 continue
             
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Cascata de extração
-            dados = extrair_json_ld(soup)
-            if not dados.get('nome') or not dados.get('preco'):
-                dados.update(extrair_javascript_vars(response.text))
-            if not dados.get('nome'):
-                dados.update(extrair_opengraph(soup))
-            if not dados.get('nome'):
-                dados.update(extrair_html(soup))
-            
-            dados['url'] = url
+            if cache:
+                dados = cache.extrair(url, response.text, fragmento_json_ld, extrair_dados_html)
+            else:
+                dados = extrair_dados_html(response.text, url)
             dados['indice'] = indice
+            contar_produtos(url)
             
             print(f"✅ [{indice}/{total}] {dados.get('nome', 'Produto')[:40]}")
             return dados
@@ -154,20 +223,45 @@ def processar_produto(produto, indice, total):
             import time
             time.sleep(0.5)
     
-    return {'url': url, 'indice': indice, 'erro': 'Max retries'}
+    return {'url': url, 'indice': indice, 'erro': ultimo_erro}
 
-def extrair_detalhes_paralelo(produtos, show_message, max_produtos=10, max_workers=20):
-    """Extração paralela com ThreadPool"""
+def extrair_detalhes_paralelo(produtos, show_message, max_produtos=10, max_workers=20, triar=True, autoscale=True, hedge=False, reusar_cache=True):
+    """Extração paralela com ThreadPool
+    
+    triar: faz triagem HEAD/Range antes (descarta 404/410/soft-404 sem baixar a página)
+    autoscale: max_workers vira teto; concorrência real por host ajustada por AIMD
+    hedge: dispara cópia de requests que passam do p95 do host (primeira resposta vence)
+    reusar_cache: JSON-LD igual ao da execução anterior → reusa o registro (cache_conteudo.py)
+    
+    Falhas (timeout, 4xx/5xx, bloqueio, página sem produto) vão para a
+    dead-letter (dead_letter.py) e não entram nos resultados.
+    """
     
     show_message(f"Processando {len(produtos)} produtos com {max_workers} threads...")
     
-    # Limita quantidade
-    produtos_processar = produtos[:max_produtos]
+    # Triagem de URLs mortas + limita quantidade
+    if triar:
+        produtos_processar = filtrar_produtos_vivos(produtos, show_message, max_produtos)
+    else:
+        produtos_processar = produtos[:max_produtos]
+    
+    autoscaler = AIMDAutoscaler(max_concorrencia=max_workers) if autoscale else None
+    hedger = HedgedFetcher(max_threads=max_workers * 2) if hedge else None
+    # Versão = hash do código deste módulo: qualquer mudança na cascata invalida o cache
+    cache = CacheConteudo('detailsv8', versao_codigo(extrair_dados_html)) if reusar_cache else None
+    hosts = {urlparse(p['url']).netloc for p in produtos_processar}
+    # Coletores por chamada (quintapp roda várias plataformas ao mesmo tempo); somem no fim
+    execucao = id_execucao('detailsv8', hosts)
+    coletores = {}
+    if autoscaler:
+        coletores[f'autoscaler_{execucao}'] = coletor_setpoints(f'autoscaler_{execucao}', autoscaler.setpoints)
+    if cache:
+        coletores[f'cache_{execucao}'] = coletor_setpoints(f'cache_{execucao}', cache.resumo, metrica='cache')
     
     resultados = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with coletores_execucao(coletores), execucao_tempos() as tempos, ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = {
-            executor.submit(processar_produto, prod, i+1, len(produtos_processar)): i
+            executor.submit(processar_produto, prod, i+1, len(produtos_processar), autoscaler, hedger, cache): i
             for i, prod in enumerate(produtos_processar)
         }
         
@@ -177,6 +271,13 @@ def extrair_detalhes_paralelo(produtos, show_message, max_produtos=10, max_worke
                 resultados.append(resultado)
             except Exception as e:
                 print(f"Erro: {e}")
+                i = futures[future]
+                resultados.append({'url': produtos_processar[i]['url'], 'indice': i + 1, 'erro': str(e)})
+    
+    # Falhas → dead-letter (re-run com: python dead_letter.py --retry-failed)
+    resultados, falhas = separar_falhas(resultados, 'detailsv8')
+    if falhas:
+        show_message(descrever_falhas(falhas))
     
     # Ordena por índice
     resultados.sort(key=lambda x: x.get('indice', 0))
@@ -190,5 +291,20 @@ def extrair_detalhes_paralelo(produtos, show_message, max_produtos=10, max_worke
         texto += f"URL: {r.get('url', 'N/A')}\n\n"
     
     show_message(f"✅ {len(resultados)} produtos processados!")
+    if autoscaler:
+        for host, sp in autoscaler.setpoints().items():
+            show_message(f"⚙️ {host}: concorrência final {sp['limite']}/{max_workers} (p95 {sp['p95']:.2f}s)")
+    if cache:
+        for linha in cache.descrever():
+            show_message(linha)
+        cache.close()
+    for linha in tempos.descrever(hosts):
+        show_message(linha)
+    show_message(f"⏱️ Tempos por request: {tempos.salvar(hosts=hosts, nome='detailsv8')}")
+    if hedger:
+        for host, h in hedger.resumo().items():
+            show_message(f"🪁 {host}: {h['hedges']} hedges ({h['taxa_hedge']:.1%}), "
+                         f"{h['vitorias_hedge']} vitórias, ~{h['economia_s']:.1f}s economizados")
+        hedger.close()
     
     return texto, resultados
@@ -22,6 +22,11 @@ from bs4 import BeautifulSoup
 import extruct
 from w3lib.html import get_base_url
 
+from rate_limiter import HostRateLimiter
+from timing_requests import combinar_hooks, descrever_tempos, event_hooks_tempos_async, salvar_tempos
+from metricas import (coletor_estrategias, coletor_retries_429, coletor_setpoints, contar_produtos,
+                      event_hooks_metricas_async, iniciar_se_configurado, registrar_coletor)
+
 
 # ============================================================================
 # CONFIGURAÇÕES
@@ -31,6 +36,9 @@ MAX_CONCURRENT = 8   # Requisições HTTP simultâneas (conservador)
 TIMEOUT_HTTP = 12  # Timeout para requisições HTTP
 TIMEOUT_BROWSER = 15  # Timeout para browser (fallback)
 
+# Métodos de extração em ExtractorHibrido.stats (taxa por estratégia no /metrics)
+ESTRATEGIAS = ("api_product_basic", "jsonld", "api_json", "dom", "erro")
+
 # CEP fixo para consistência de preços
 CEP_FIXO = "01310-100"  # São Paulo - SP
 
@@ -57,34 +65,6 @@ def ler_urls(arquivo: str = "urls_matcon_100.txt") -> List[str]:
         return []
 
 
-# ============================================================================
-# TOKEN BUCKET RATE LIMITER
-# ============================================================================
-class TokenBucket:
-    """Rate limiter com token bucket"""
-    
-    def __init__(self, rate: float):
-        self.rate = rate  # tokens por segundo
-        self.tokens = rate
-        self.last_update = time.time()
-        self.lock = asyncio.Lock()
-    
-    async def acquire(self):
-        """Aguarda até ter token disponível"""
-        async with self.lock:
-            now = time.time()
-            elapsed = now - self.last_update
-            self.tokens = min(self.rate, self.tokens + elapsed * self.rate)
-            self.last_update = now
-            
-            if self.tokens < 1:
-                wait_time = (1 - self.tokens) / self.rate
-                await asyncio.sleep(wait_time)
-                self.tokens = 0
-            else:
-                self.tokens -= 1
-
-
 # ============================================================================
 # ETAPA 1: SNIFFAR ENDPOINTS JSON
 # ============================================================================
@@ -407,7 +387,8 @@ class ExtractorHibrido:
     """Extrator híbrido com fallbacks inteligentes"""
     
     def __init__(self):
-        self.rate_limiter = TokenBucket(RATE_LIMIT_RPS)
+        # Token bucket por host (burst = 1s de tokens, como o TokenBucket antigo)
+        self.rate_limiter = HostRateLimiter(RATE_LIMIT_RPS * 60, burst=RATE_LIMIT_RPS, autoscale=False)
         self.stats = {
             "api_product_basic": 0,  # Nova API descoberta!
             "jsonld": 0,
@@ -419,6 +400,12 @@ class ExtractorHibrido:
         self.resultados: List[Dict] = []
         self.browser_page: Optional[Page] = None
         self.page_lock = asyncio.Lock()
+        # /metrics: acertos por método (taxa de cada fallback), retries por 429 e RPM por host.
+        # retry_429 fica fora do dict das estratégias: não é uma extração e inflaria o denominador
+        registrar_coletor('estrategias_hibrido', coletor_estrategias(
+            'hibrido', lambda: {metodo: self.stats[metodo] for metodo in ESTRATEGIAS}))
+        registrar_coletor('retries_hibrido', coletor_retries_429('hibrido', lambda: self.stats['retry_429']))
+        registrar_coletor('rate_limiter_hibrido', coletor_setpoints('rate_limiter', self.rate_limiter.setpoints))
     
     async def setup(self, url_exemplo: str):
         """Descobrir endpoints antes de começar"""
@@ -437,7 +424,7 @@ class ExtractorHibrido:
         2. API JSON (rápido)
         3. DOM (mais lento)
         """
-        await self.rate_limiter.acquire()
+        await self.rate_limiter.acquire(url)
         
         resultado = {
             "url": url,
@@ -584,7 +571,9 @@ class ExtractorHibrido:
         async with httpx.AsyncClient(
             timeout=TIMEOUT_HTTP,
             limits=httpx.Limits(max_connections=MAX_CONCURRENT),
-            follow_redirects=True
+            follow_redirects=True,
+            # Conexão/TLS/TTFB/download + requests/bytes/status por request
+            event_hooks=combinar_hooks(event_hooks_tempos_async(), event_hooks_metricas_async())
         ) as client:
             
             # Browser para fallback DOM (apenas 1 instância)
@@ -608,7 +597,10 @@ class ExtractorHibrido:
                 async def processar_com_semaforo(url: str, idx: int):
                     async with semaforo:
                         # MUDANÇA PRINCIPAL: usar extrair_produto_com_retry
-                        return await self.extrair_produto_com_retry(client, url, idx + 1, len(urls))
+                        resultado = await self.extrair_produto_com_retry(client, url, idx + 1, len(urls))
+                        if not resultado.get("erro"):
+                            contar_produtos(url)
+                        return resultado
                 
                 # Executar em paralelo
                 tasks = [processar_com_semaforo(url, i) for i, url in enumerate(urls)]
@@ -626,6 +618,8 @@ async def main():
     print("=" * 80)
     print()
     
+    iniciar_se_configurado()  # /metrics se METRICAS_PORTA
+    
     # ETAPA 1: Setup
     urls = ler_urls()
     if not urls:
@@ -680,6 +674,9 @@ async def main():
         }, f, ensure_ascii=False, indent=2)
     
     print(f"💾 Salvo: {arquivo}")
+    for linha in descrever_tempos():
+        print(linha)
+    print(f"⏱️ Tempos por request: {salvar_tempos(nome='hybrid')}")
     print("=" * 80)
 
 
@@ -17,6 +17,7 @@ from bs4 import BeautifulSoup
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
+from triagem_urls import classificar_resposta
 
 # Headers básicos de navegador
 HEADERS = {
@@ -465,6 +466,10 @@ def _validar_produto_http(url, show_message=None):
             if r_head.status_code != 200:
                 continue  # Tenta próxima variação
             
+            # 200 após redirect para home/404/busca = soft-404 (evita o GET completo)
+            if classificar_resposta(url_teste, r_head.status_code, str(r_head.url)) != 'viva':
+                continue
+            
             # Se HEAD retornou 200, faz GET completo
             r = httpx.get(url_teste, headers=HEADERS, timeout=4, follow_redirects=True)
             
@@ -5,7 +5,7 @@ EXTRACT LINKS V7 - Crawlee-Style Architecture
 
 Implementa extração de links de produtos usando padrões do Crawlee:
 - RequestQueue com prioridade
-- AdaptiveRateLimiter (AutoscaledPool)
+- HostRateLimiter (token bucket por host, rate_limiter.py)
 - SessionPool para gerenciar cookies
 - Extração inteligente de sitemaps e listagens
 - Validação paralela com rate limiting
@@ -20,92 +20,18 @@ Fluxo:
 import asyncio
 import httpx
 import re
-import time
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
 
-
-# ================================================================================================
-# ADAPTIVE RATE LIMITER (AutoscaledPool)
-# ================================================================================================
-class AdaptiveRateLimiter:
-    """Rate limiter adaptativo similar ao AutoscaledPool do Crawlee."""
-    
-    def __init__(self, requests_per_minute: int = 60, autoscale: bool = True):
-        self.max_rpm = requests_per_minute
-        self.current_rpm = requests_per_minute
-        self.autoscale = autoscale
-        
-        # Controle de taxa
-        self.tokens = []
-        self.lock = asyncio.Lock()
-        
-        # Métricas
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
-    
-    async def acquire(self):
-        """Aguarda até poder fazer próxima requisição."""
-        async with self.lock:
-            now = time.time()
-            
-            # Remove tokens antigos (>60s)
-            self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            # Se atingiu limite, aguarda
-            while len(self.tokens) >= self.current_rpm:
-                await asyncio.sleep(0.1)
-                now = time.time()
-                self.tokens = [t for t in self.tokens if now - t < 60]
-            
-            # Adiciona novo token
-            self.tokens.append(now)
-            
-            # Jitter leve
-            import random
-            await asyncio.sleep(random.uniform(0, 0.05))
-    
-    def report_success(self):
-        self.recent_requests += 1
-        self._maybe_adjust()
-    
-    def report_error(self):
-        self.recent_requests += 1
-        self.recent_errors += 1
-        self._maybe_adjust()
-    
-    def report_429(self):
-        self.recent_requests += 1
-        self.recent_429s += 1
-        self._maybe_adjust()
-    
-    def _maybe_adjust(self):
-        """Ajusta RPM automaticamente."""
-        if not self.autoscale or self.recent_requests < 10:
-            return
-        
-        error_rate = (self.recent_errors + self.recent_429s) / self.recent_requests
-        
-        if self.recent_429s > 2:
-            self.current_rpm = max(20, int(self.current_rpm * 0.5))
-        elif error_rate > 0.2:
-            self.current_rpm = max(30, int(self.current_rpm * 0.7))
-        elif error_rate < 0.05 and self.recent_429s == 0:
-            self.current_rpm = min(self.max_rpm, int(self.current_rpm * 1.1))
-        
-        # Reset
-        self.recent_requests = 0
-        self.recent_errors = 0
-        self.recent_429s = 0
+from rate_limiter import HostRateLimiter, parse_retry_after
 
 
 # ================================================================================================
 # EXTRAÇÃO DE SITEMAPS
 # ================================================================================================
-async def buscar_sitemaps(base_url: str, rate_limiter: AdaptiveRateLimiter, progress_callback: Optional[Callable] = None) -> List[str]:
+async def buscar_sitemaps(base_url: str, rate_limiter: HostRateLimiter, progress_callback: Optional[Callable] = None) -> List[str]:
     """
     Busca URLs de produtos nos sitemaps.
     Processa sitemap index recursivamente.
@@ -126,7 +52,7 @@ async def buscar_sitemaps(base_url: str, rate_limiter: AdaptiveRateLimiter, prog
     async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
         # Fase 1: Buscar sitemaps iniciais
         for sitemap_url in sitemap_iniciais:
-            await rate_limiter.acquire()
+            await rate_limiter.acquire(sitemap_url)
             
             try:
                 if progress_callback:
@@ -135,7 +61,7 @@ async def buscar_sitemaps(base_url: str, rate_limiter: AdaptiveRateLimiter, prog
                 response = await client.get(sitemap_url)
                 
                 if response.status_code == 200:
-                    rate_limiter.report_success()
+                    rate_limiter.report_success(sitemap_url)
                     content = response.text
                     
                     # Se é robots.txt, procura por sitemaps
@@ -148,14 +74,14 @@ async def buscar_sitemaps(base_url: str, rate_limiter: AdaptiveRateLimiter, prog
                         urls_produto.update(urls)
                         sitemaps_para_processar.extend(sitemaps)
                 else:
-                    rate_limiter.report_error()
+                    rate_limiter.report_error(sitemap_url)
             
             except Exception:
-                rate_limiter.report_error()
+                rate_limiter.report_error(sitemap_url)
         
         # Fase 2: Processar sitemaps encontrados (sitemap index)
         for sitemap_url in sitemaps_para_processar:
-            await rate_limiter.acquire()
+            await rate_limiter.acquire(sitemap_url)
             
             try:
                 if progress_callback:
@@ -164,14 +90,14 @@ async def buscar_sitemaps(base_url: str, rate_limiter: AdaptiveRateLimiter, prog
                 response = await client.get(sitemap_url)
                 
                 if response.status_code == 200:
-                    rate_limiter.report_success()
+                    rate_limiter.report_success(sitemap_url)
                     urls, _ = extrair_urls_do_sitemap(response.text, domain)
                     urls_produto.update(urls)
                 else:
-                    rate_limiter.report_error()
+                    rate_limiter.report_error(sitemap_url)
             
             except Exception:
-                rate_limiter.report_error()
+                rate_limiter.report_error(sitemap_url)
     
     return list(urls_produto)
 
@@ -279,26 +205,27 @@ def aprender_padrao_urls(urls_amostra: List[str], max_amostra: int = 100) -> Opt
 # ================================================================================================
 # VALIDAÇÃO DE PRODUTOS
 # ================================================================================================
-async def validar_produto(url: str, client: httpx.AsyncClient, rate_limiter: AdaptiveRateLimiter) -> bool:
+async def validar_produto(url: str, client: httpx.AsyncClient, rate_limiter: HostRateLimiter) -> bool:
     """
     Valida se URL é realmente um produto fazendo requisição HTTP.
     Retorna True se for produto válido.
     """
-    await rate_limiter.acquire()
+    await rate_limiter.acquire(url)
     
     try:
         response = await client.get(url, timeout=10.0)
         
         if response.status_code == 429:
-            rate_limiter.report_429()
-            await asyncio.sleep(2)  # Reduzido de 5s para 2s
+            # Pausa o host para todas as validações concorrentes (não só esta)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            rate_limiter.report_429(url, retry_after if retry_after is not None else 2.0)
             return False
         
         if response.status_code != 200:
-            rate_limiter.report_error()
+            rate_limiter.report_error(url)
             return False
         
-        rate_limiter.report_success()
+        rate_limiter.report_success(url)
         
         # Verifica se tem indicadores de produto na página
         html = response.text.lower()
@@ -318,26 +245,82 @@ async def validar_produto(url: str, client: httpx.AsyncClient, rate_limiter: Ada
         return score >= 2  # Pelo menos 2 indicadores
     
     except:
-        rate_limiter.report_error()
+        rate_limiter.report_error(url)
         return False
 
 
+# ================================================================================================
+# VALIDAÇÃO CONCORRENTE (ondas com early-stop)
+# ================================================================================================
+async def validar_onda(
+    urls: List[str],
+    client: httpx.AsyncClient,
+    rate_limiter: HostRateLimiter,
+    concorrencia: int = 10,
+    progress_callback: Optional[Callable] = None,
+    progresso_base: int = 0,
+    progresso_total: int = 0,
+    deve_parar: Optional[Callable[[List[str], int], bool]] = None
+) -> Tuple[List[str], Set[str]]:
+    """
+    Valida uma onda de URLs em paralelo (limitado por `concorrencia` + rate limiter).
+    
+    Os resultados são avaliados conforme chegam: `deve_parar(validas, processadas)`
+    é chamado a cada resposta e, se retornar True, as validações pendentes são
+    canceladas. Assim o custo depende da concorrência, não do tamanho da amostra.
+    
+    Retorna: (urls_validas na ordem original, urls_processadas)
+    """
+    semaforo = asyncio.Semaphore(concorrencia)
+    
+    async def _validar(indice: int, url: str) -> Tuple[int, str, bool]:
+        async with semaforo:
+            return indice, url, await validar_produto(url, client, rate_limiter)
+    
+    tasks = [asyncio.create_task(_validar(i, url)) for i, url in enumerate(urls)]
+    validas: Dict[int, str] = {}
+    processadas: Set[str] = set()
+    
+    try:
+        for future in asyncio.as_completed(tasks):
+            indice, url, valido = await future
+            processadas.add(url)
+            if valido:
+                validas[indice] = url
+            
+            if progress_callback:
+                progress_callback(progresso_base + len(processadas), progresso_total or len(urls), "", "validando")
+            
+            if deve_parar and deve_parar([validas[i] for i in sorted(validas)], len(processadas)):
+                break
+    finally:
+        # Cancela o que ainda está na fila/em voo (early-stop ou erro)
+        pendentes = [t for t in tasks if not t.done()]
+        for task in pendentes:
+            task.cancel()
+        if pendentes:
+            await asyncio.gather(*pendentes, return_exceptions=True)
+    
+    return [validas[i] for i in sorted(validas)], processadas
+
+
 # ================================================================================================
 # VALIDAÇÃO ADAPTATIVA INTELIGENTE
 # ================================================================================================
 async def validacao_adaptativa(
     urls: List[str],
-    rate_limiter: AdaptiveRateLimiter,
+    rate_limiter: HostRateLimiter,
     show_message: Callable,
     progress_callback: Optional[Callable],
-    max_produtos: Optional[int] = None
+    max_produtos: Optional[int] = None,
+    concorrencia: int = 10
 ) -> List[str]:
     """
     Validação adaptativa com DETECÇÃO DE PADRÃO EARLY-STOP:
-    - Valida 10-20 URLs
-    - Tenta detectar padrão
-    - Se encontrar padrão: PARA e usa padrão no resto!
-    - Se não encontrar: continua validação adaptativa
+    - Valida 10-20 URLs (em paralelo)
+    - Tenta detectar padrão a cada URL válida que chega
+    - Se encontrar padrão: cancela o resto da onda e usa padrão no resto!
+    - Se não encontrar: continua validação adaptativa (ondas concorrentes)
     """
     total_urls = len(urls)
     
@@ -362,58 +345,79 @@ async def validacao_adaptativa(
     
     # FASE 1: Valida APENAS 20 URLs e tenta detectar padrão
     amostra_minima = 20
-    show_message(f"🔍 Validando {amostra_minima} URLs e procurando padrão...")
+    show_message(f"🔍 Validando {amostra_minima} URLs ({concorrencia} em paralelo) e procurando padrão...")
+    
+    urls_validas: List[str] = []
+    urls_processadas: Set[str] = set()
+    padrao_detectado: Dict[str, re.Pattern] = {}
+    
+    def checkpoint_padrao(validas_onda: List[str], processadas: int) -> bool:
+        """Checkpoint avaliado a cada resultado: para a onda assim que houver padrão."""
+        validas = urls_validas + validas_onda
+        if max_produtos and len(validas) >= max_produtos:
+            return True
+        if len(validas) < 10:  # Precisa de pelo menos 10 válidas
+            return False
+        padrao = aprender_padrao_urls(validas, max_amostra=len(validas))
+        if padrao:
+            padrao_detectado['padrao'] = padrao
+            return True
+        return False
     
-    urls_validas = []
+    async def rodar_onda(lote: List[str], base: int, total: int, parar=checkpoint_padrao):
+        validas, processadas = await validar_onda(
+            lote, client, rate_limiter, concorrencia,
+            progress_callback, base, total, parar
+        )
+        urls_validas.extend(validas)
+        urls_processadas.update(processadas)
+    
+    def aplicar_padrao() -> List[str]:
+        """Aplica padrão detectado em TODAS as URLs ainda não validadas (sem HTTP)."""
+        padrao = padrao_detectado['padrao']
+        show_message(f"✅ PADRÃO DETECTADO: {padrao.pattern}")
+        show_message(f"🚀 Aplicando padrão no resto (SEM validação HTTP)!")
+        
+        urls_com_padrao = [url for url in urls if url not in urls_processadas and padrao.search(url)]
+        resultado = urls_validas + urls_com_padrao
+        
+        if max_produtos and len(resultado) > max_produtos:
+            resultado = resultado[:max_produtos]
+        
+        show_message(f"✅ Total: {len(resultado)} produtos (padrão aplicado em {len(urls_com_padrao)})")
+        return resultado
     
     async with httpx.AsyncClient(
         headers={'User-Agent': 'Mozilla/5.0'},
         timeout=10.0,
-        follow_redirects=True
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=concorrencia)
     ) as client:
         
-        # Valida primeira amostra mínima
-        for i, url in enumerate(urls[:amostra_minima]):
-            if progress_callback:
-                progress_callback(i + 1, amostra_minima, "", "validando")
-            
-            if await validar_produto(url, client, rate_limiter):
-                urls_validas.append(url)
+        # Valida primeira amostra mínima (checkpoint de padrão a cada resultado)
+        await rodar_onda(urls[:amostra_minima], 0, amostra_minima)
         
-        # TENTA DETECTAR PADRÃO logo após 20 validações
-        if len(urls_validas) >= 10:  # Precisa de pelo menos 10 válidas
-            show_message(f"🧠 Tentando detectar padrão com {len(urls_validas)} URLs válidas...")
-            padrao = aprender_padrao_urls(urls_validas, max_amostra=len(urls_validas))
-            
-            if padrao:
-                # 🎉 ACHOU PADRÃO! Para de validar e usa padrão no resto!
-                show_message(f"✅ PADRÃO DETECTADO: {padrao.pattern}")
-                show_message(f"🚀 Aplicando padrão no resto (SEM validação HTTP)!")
-                
-                # Aplica padrão em TODAS as URLs restantes (sem HTTP)
-                urls_com_padrao = [url for url in urls[amostra_minima:] if padrao.search(url)]
-                urls_validas.extend(urls_com_padrao)
-                
-                if max_produtos and len(urls_validas) > max_produtos:
-                    urls_validas = urls_validas[:max_produtos]
-                
-                show_message(f"✅ Total: {len(urls_validas)} produtos (padrão aplicado em {len(urls_com_padrao)})")
-                return urls_validas
+        if padrao_detectado:
+            # 🎉 ACHOU PADRÃO! Para de validar e usa padrão no resto!
+            return aplicar_padrao()
+        
+        if max_produtos and len(urls_validas) >= max_produtos:
+            show_message(f"✅ Validação concluída: {len(urls_validas)} produtos de {total_urls} URLs")
+            return urls_validas[:max_produtos]
         
         # Se não achou padrão, continua validação adaptativa
         show_message(f"⚠️ Padrão não detectado. Continuando validação adaptativa...")
         
-        # FASE 2: Valida mais 30 URLs (total 50)
+        # FASE 2: Valida mais 30 URLs (total 50) - padrão ainda é checado a cada resultado
         amostra_extra = 30
-        for i, url in enumerate(urls[amostra_minima:amostra_minima + amostra_extra]):
-            if progress_callback:
-                progress_callback(amostra_minima + i + 1, amostra_minima + amostra_extra, "", "validando")
-            
-            if await validar_produto(url, client, rate_limiter):
-                urls_validas.append(url)
+        await rodar_onda(urls[amostra_minima:amostra_minima + amostra_extra], amostra_minima, amostra_minima + amostra_extra)
+        
+        if padrao_detectado:
+            return aplicar_padrao()
         
-        taxa_sucesso = len(urls_validas) / (amostra_minima + amostra_extra)
-        show_message(f"📊 Taxa de sucesso: {taxa_sucesso*100:.1f}% ({len(urls_validas)}/{amostra_minima + amostra_extra})")
+        validadas = max(1, len(urls_processadas))
+        taxa_sucesso = len(urls_validas) / validadas
+        show_message(f"📊 Taxa de sucesso: {taxa_sucesso*100:.1f}% ({len(urls_validas)}/{validadas})")
         
         # Decisão inteligente
         if taxa_sucesso >= 0.80:
@@ -425,33 +429,32 @@ async def validacao_adaptativa(
             # Taxa média = valida mais 100 URLs
             show_message(f"⚠️ Taxa média. Validando mais 100 URLs...")
             amostra_adicional = 100
+            inicio = amostra_minima + amostra_extra
+            await rodar_onda(urls[inicio:inicio + amostra_adicional], inicio, inicio + amostra_adicional)
             
-            for i, url in enumerate(urls[amostra_minima + amostra_extra:amostra_minima + amostra_extra + amostra_adicional]):
-                if progress_callback:
-                    progress_callback(amostra_minima + amostra_extra + i + 1, amostra_minima + amostra_extra + amostra_adicional, "", "validando")
-                
-                if await validar_produto(url, client, rate_limiter):
-                    urls_validas.append(url)
+            if padrao_detectado:
+                return aplicar_padrao()
             
             # Recalcula taxa
-            taxa_final = len(urls_validas) / (amostra_minima + amostra_extra + amostra_adicional)
+            taxa_final = len(urls_validas) / max(1, len(urls_processadas))
             show_message(f"📊 Taxa final: {taxa_final*100:.1f}%")
             
             if taxa_final >= 0.70:
                 show_message(f"✅ Taxa aceitável. Assumindo resto como válido")
-                urls_validas.extend(urls[amostra_minima + amostra_extra + amostra_adicional:max_produtos] if max_produtos else urls[amostra_minima + amostra_extra + amostra_adicional:])
+                urls_validas.extend(urls[inicio + amostra_adicional:max_produtos] if max_produtos else urls[inicio + amostra_adicional:])
         
         else:
-            # Taxa baixa < 50% = valida até 500
+            # Taxa baixa < 50% = valida até 500 (para assim que atingir max_produtos ou achar padrão)
             show_message(f"❌ Taxa baixa! Validando até 500 URLs...")
             limite = min(500, len(urls)) if not max_produtos else min(max_produtos, len(urls))
+            inicio = amostra_minima + amostra_extra
+            await rodar_onda(urls[inicio:limite], inicio, limite)
             
-            for i, url in enumerate(urls[amostra_minima + amostra_extra:limite]):
-                if progress_callback:
-                    progress_callback(amostra_minima + amostra_extra + i + 1, limite, "", "validando")
-                
-                if await validar_produto(url, client, rate_limiter):
-                    urls_validas.append(url)
+            if padrao_detectado:
+                return aplicar_padrao()
+    
+    if max_produtos:
+        urls_validas = urls_validas[:max_produtos]
     
     show_message(f"✅ Validação concluída: {len(urls_validas)} produtos de {total_urls} URLs")
     return urls_validas
@@ -481,7 +484,7 @@ async def extrair_produtos_async(
     show_message("🚀 Iniciando extração Crawlee-style...")
     
     # Rate limiter adaptativo - AUMENTADO para 300 RPM (validação rápida)
-    rate_limiter = AdaptiveRateLimiter(requests_per_minute=300, autoscale=True)
+    rate_limiter = HostRateLimiter(requests_per_minute=300, autoscale=True, verbose=False)
     
     # 1. Busca sitemaps
     show_message("📋 Buscando sitemaps...")
@@ -5,9 +5,10 @@ Estratégia: Discovery por navegação + Pattern Learning
 import asyncio
 import httpx
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Set, Optional
+from urllib.parse import urlparse
+from typing import List, Optional
+from descoberta_frontier import descobrir_produtos_frontier
+from singleflight import get_compartilhado_async
 
 async def buscar_sitemap(base_url: str) -> List[str]:
     """Busca URLs do sitemap (com expansão recursiva)"""
@@ -16,7 +17,7 @@ async def buscar_sitemap(base_url: str) -> List[str]:
     
     try:
         async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.get(sitemap_url, follow_redirects=True)
+            r = await get_compartilhado_async(client, sitemap_url, follow_redirects=True)
             if r.status_code == 200:
                 urls = re.findall(r'<loc>(.*?)</loc>', r.text)
                 
@@ -29,7 +30,7 @@ async def buscar_sitemap(base_url: str) -> List[str]:
                     for sitemap_filho in urls:
                         if '.xml' in sitemap_filho:
                             try:
-                                r2 = await client.get(sitemap_filho, timeout=10)
+                                r2 = await get_compartilhado_async(client, sitemap_filho, timeout=10)
                                 if r2.status_code == 200:
                                     urls_filho = re.findall(r'<loc>(.*?)</loc>', r2.text)
                                     # Filtra apenas URLs de produtos (não .xml)
@@ -79,85 +80,6 @@ def detectar_padrao(urls: List[str]) -> Optional[re.Pattern]:
     
     return None
 
-async def descobrir_categorias(base_url: str) -> List[Dict]:
-    """Descobre categorias na home"""
-    categorias = []
-    
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.get(base_url, follow_redirects=True)
-            soup = BeautifulSoup(r.text, 'html.parser')
-            
-            # Busca TODOS os links (não só nav)
-            todos_links = soup.find_all('a', href=True)[:100]
-            
-            for link in todos_links:
-                texto = link.get_text(strip=True)
-                href = link.get('href')
-                
-                # Ignora links institucionais e vazios
-                if not texto or len(texto) < 3:
-                    continue
-                    
-                if any(x in texto.lower() for x in ['contato', 'sobre', 'login', 'cart', 'conta', 'ajuda']):
-                    continue
-                
-                url_completa = urljoin(base_url, href)
-                
-                # Só aceita URLs da mesma origem
-                if urlparse(url_completa).netloc != urlparse(base_url).netloc:
-                    continue
-                
-                # Conta níveis (categorias tem 1-2 níveis)
-                niveis = len([p for p in urlparse(url_completa).path.split('/') if p])
-                
-                if 1 <= niveis <= 2:
-                    categorias.append({
-                        'nome': texto,
-                        'url': url_completa
-                    })
-    except:
-        pass
-    
-    # Remove duplicatas por URL
-    categorias_unicas = []
-    urls_vistas = set()
-    for cat in categorias:
-        if cat['url'] not in urls_vistas:
-            urls_vistas.add(cat['url'])
-            categorias_unicas.append(cat)
-    
-    return categorias_unicas[:10]  # Max 10 categorias
-
-async def extrair_produtos_categoria(url_cat: str, max_prods: int = 50) -> Set[str]:
-    """Extrai produtos de uma categoria"""
-    produtos = set()
-    
-    try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(url_cat, follow_redirects=True)
-            soup = BeautifulSoup(r.text, 'html.parser')
-            
-            # Busca links de produtos (mais flexível)
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                url = urljoin(url_cat, href)
-                
-                # Só aceita URLs da mesma origem
-                if urlparse(url).netloc != urlparse(url_cat).netloc:
-                    continue
-                
-                # Heurística: URL de produto tem 3+ níveis
-                niveis = len([p for p in urlparse(url).path.split('/') if p])
-                if niveis >= 3:
-                    produtos.add(url)
-                    if len(produtos) >= max_prods:
-                        break
-    except:
-        pass
-    
-    return produtos
-
 async def extrair_produtos_rapido(
     base_url: str,
     show_message,
@@ -193,11 +115,16 @@ async def extrair_produtos_rapido(
         show_message(f"✅ {len(produtos)} produtos encontrados")
         return produtos
     
-    # Sitemap RUIM/inexistente: Navegação
+    # Sitemap RUIM/inexistente: Navegação (frontier BFS concorrente com paginação)
     show_message("⚠️ Sitemap ruim/inexistente. Navegando por categorias...")
     
-    categorias = await descobrir_categorias(base_url)
-    if not categorias:
+    urls_finais = await descobrir_produtos_frontier(
+        base_url,
+        max_produtos=max_produtos or 500,
+        show_message=show_message
+    )
+    
+    if not urls_finais:
         show_message("❌ Nenhuma categoria encontrada. Usando sitemap como fallback...")
         
         # Fallback: usa sitemap mesmo sendo ruim
@@ -211,22 +138,6 @@ async def extrair_produtos_rapido(
         
         return []
     
-    show_message(f"✅ {len(categorias)} categorias encontradas")
-    
-    # Navega por categorias
-    todos_produtos = set()
-    for i, cat in enumerate(categorias, 1):
-        show_message(f"[{i}/{len(categorias)}] Navegando: {cat['nome']}")
-        prods = await extrair_produtos_categoria(cat['url'], max_prods=100)
-        
-        if prods:
-            show_message(f"   → {len(prods)} produtos")
-            todos_produtos.update(prods)
-        
-        if max_produtos and len(todos_produtos) >= max_produtos:
-            break
-    
-    urls_finais = list(todos_produtos)[:max_produtos] if max_produtos else list(todos_produtos)
     produtos = [{'nome': u.split('/')[-1].replace('-', ' ').title(), 'url': u} 
                for u in urls_finais]
     
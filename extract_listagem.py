@@ -0,0 +1,408 @@
+"""
+EXTRATOR POR LISTAGEM - Preço/nome direto das páginas de categoria
+===================================================================
+
+Generaliza o que extract_dermo_quintapp e extract_katsukazan já fazem: em vez
+de buscar cada página de produto, lê os "cards" das listagens (uma página com
+48 produtos substitui 48 requisições).
+
+Fontes de cards (em ordem):
+1. JSON-LD: ItemList (itemListElement), Product, @graph
+2. Microdata: itemtype="schema.org/Product" (itemprop name/price/url/image)
+3. Estado embutido: __NEXT_DATA__, window.__INITIAL_STATE__/__STATE__/__PRELOADED_STATE__
+
+As listagens são descobertas com o FrontierCrawler (descoberta_frontier).
+Só produtos com campos faltando (nome/preço) vão para a página de produto,
+e os campos da listagem são mantidos - a página só completa o que falta.
+
+Compatível com QuintApp:
+- extrair_produtos(url_base, callback=None, max_produtos=None) -> List[Dict]
+- extrair_detalhes_paralelo(produtos, callback=None, max_produtos=None, max_workers=20) -> (str, List[Dict])
+"""
+
+import asyncio
+import json
+import re
+from typing import List, Dict, Optional, Callable, Any, Iterator, Tuple
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from descoberta_frontier import FrontierCrawler, normalizar_url
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+CAMPOS_OBRIGATORIOS = ('nome', 'preco')
+
+STATE_RES = [
+    re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE),
+    re.compile(r'window\.__(?:INITIAL_STATE|STATE|PRELOADED_STATE)__\s*=\s*({.*?})\s*;?\s*</script>', re.DOTALL),
+]
+
+CHAVES_NOME = ('name', 'productName', 'title', 'nome')
+CHAVES_PRECO = ('price', 'sellingPrice', 'lowPrice', 'finalPrice', 'preco', 'salePrice', 'Price')
+CHAVES_URL = ('url', 'link', 'href', 'linkText', 'slug', 'path')
+CHAVES_IMAGEM = ('image', 'imageUrl', 'thumbnail', 'small_image', 'imagem')
+MAX_NOS_STATE = 50000
+
+
+# ================================================================================================
+# HELPERS
+# ================================================================================================
+def _valor_preco(valor: Any) -> Optional[str]:
+    """Normaliza preço de JSON (número, string ou objeto {value/amount})."""
+    if isinstance(valor, dict):
+        for chave in ('value', 'amount', 'lowPrice', 'price'):
+            if chave in valor:
+                return _valor_preco(valor[chave])
+        return None
+    if isinstance(valor, bool) or valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return str(valor) if valor > 0 else None
+    valor = str(valor).strip()
+    return valor if re.search(r'\d', valor) else None
+
+
+def _primeira_imagem(imagem: Any) -> Optional[str]:
+    if isinstance(imagem, list):
+        imagem = imagem[0] if imagem else None
+    if isinstance(imagem, dict):
+        imagem = imagem.get('url') or imagem.get('contentUrl')
+    return imagem if isinstance(imagem, str) else None
+
+
+def _produto_jsonld(item: Dict, url_pagina: str) -> Optional[Dict]:
+    """Converte um Product JSON-LD em registro."""
+    offers = item.get('offers') or item.get('Offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+
+    preco = None
+    if isinstance(offers, dict):
+        preco = _valor_preco(offers.get('price') or offers.get('lowPrice'))
+
+    url = item.get('url')
+    if not url and isinstance(item.get('mainEntityOfPage'), dict):
+        url = item['mainEntityOfPage'].get('@id')
+    if not url:
+        return None
+
+    brand = item.get('brand')
+    marca = brand.get('name') if isinstance(brand, dict) else brand
+
+    return {
+        'url': urljoin(url_pagina, url),
+        'nome': item.get('name'),
+        'preco': preco,
+        'moeda': offers.get('priceCurrency') if isinstance(offers, dict) else None,
+        'marca': marca,
+        'imagem': _primeira_imagem(item.get('image')),
+        'sku': item.get('sku'),
+        'disponivel': offers.get('availability') if isinstance(offers, dict) else None,
+        'fonte': 'listagem-jsonld',
+    }
+
+
+def _itens_jsonld(data: Any) -> Iterator[Dict]:
+    """Percorre JSON-LD (lista, @graph, ItemList) e devolve objetos Product/ListItem."""
+    if isinstance(data, list):
+        for d in data:
+            yield from _itens_jsonld(d)
+        return
+    if not isinstance(data, dict):
+        return
+
+    if '@graph' in data:
+        yield from _itens_jsonld(data['@graph'])
+
+    tipo = data.get('@type')
+    tipos = tipo if isinstance(tipo, list) else [tipo]
+
+    if 'ItemList' in tipos or 'OfferCatalog' in tipos:
+        for elem in data.get('itemListElement', []):
+            if isinstance(elem, dict):
+                item = elem.get('item', elem)
+                if isinstance(item, dict):
+                    yield item
+                elif isinstance(item, str):
+                    yield {'@type': 'ListItem', 'url': item}
+    elif any(t in ('Product', 'IndividualProduct', 'ProductGroup') for t in tipos):
+        yield data
+
+
+# ================================================================================================
+# PARSERS DE CARDS
+# ================================================================================================
+def extrair_cards_jsonld(soup: BeautifulSoup, url_pagina: str) -> List[Dict]:
+    """Cards a partir de JSON-LD ItemList/Product."""
+    cards = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '{}')
+        except Exception:
+            continue
+
+        for item in _itens_jsonld(data):
+            if item.get('@type') == 'ListItem':
+                # ItemList só com URLs: produto sem dados (vai para página de produto)
+                if item.get('url'):
+                    cards.append({'url': urljoin(url_pagina, item['url']), 'fonte': 'listagem-jsonld'})
+                continue
+            registro = _produto_jsonld(item, url_pagina)
+            if registro:
+                cards.append(registro)
+    return cards
+
+
+ATRIBUTOS_IMAGEM_LAZY = ('content', 'data-src', 'data-original', 'data-lazy', 'data-lazy-src', 'src')
+
+
+def _escopo_microdata(tag):
+    """itemscope mais próximo acima da tag (a própria tag não conta: itemprop+itemscope é um item filho)."""
+    return tag.find_parent(attrs={'itemscope': True})
+
+
+def _props_microdata(escopo, nome: str) -> List:
+    """itemprops `nome` que pertencem a este escopo (ignora Review, AggregateRating, Offer aninhados)."""
+    return [tag for tag in escopo.find_all(attrs={'itemprop': nome}) if _escopo_microdata(tag) is escopo]
+
+
+def _valor_microdata(tag) -> Optional[str]:
+    if tag.has_attr('itemscope'):
+        # Item aninhado (ex: brand → Brand): usa o name dele
+        nomes = _props_microdata(tag, 'name')
+        return _valor_microdata(nomes[0]) if nomes else None
+    if tag.name in ('img', 'source'):
+        # Lazy-load: src costuma ser o placeholder (loading.gif)
+        return next((tag[a] for a in ATRIBUTOS_IMAGEM_LAZY if tag.get(a)), None)
+    if tag.name in ('a', 'link'):
+        return tag.get('content') or tag.get('href')
+    return tag.get('content') or tag.get_text(strip=True) or None
+
+
+def extrair_cards_microdata(soup: BeautifulSoup, url_pagina: str) -> List[Dict]:
+    """Cards a partir de microdata schema.org/Product (só props do próprio card e da sua Offer)."""
+    cards = []
+    for elem in soup.find_all(attrs={'itemtype': re.compile(r'schema\.org/Product', re.I)}):
+        def prop(nome, escopo=elem):
+            for tag in _props_microdata(escopo, nome):
+                valor = _valor_microdata(tag)
+                if valor:
+                    return valor
+            return None
+
+        ofertas = [o for o in _props_microdata(elem, 'offers') if o.has_attr('itemscope')]
+
+        def prop_oferta(nome):
+            return next((v for v in (prop(nome, o) for o in ofertas) if v), None) or prop(nome)
+
+        url = prop('url') or prop_oferta('url')
+        if not url:
+            link = elem.find('a', href=True)
+            url = link['href'] if link else None
+        if not url:
+            continue
+
+        cards.append({
+            'url': urljoin(url_pagina, url),
+            'nome': prop('name'),
+            'preco': _valor_preco(prop_oferta('price') or prop_oferta('lowPrice')),
+            'moeda': prop_oferta('priceCurrency'),
+            'marca': prop('brand'),
+            'imagem': prop('image'),
+            'sku': prop('sku'),
+            'disponivel': prop_oferta('availability'),
+            'fonte': 'listagem-microdata',
+        })
+    return cards
+
+
+def _percorrer_state(obj: Any, contador: List[int]) -> Iterator[Dict]:
+    """DFS limitado em JSON de estado (Next.js, Redux, VTEX)."""
+    pilha = [obj]
+    while pilha and contador[0] < MAX_NOS_STATE:
+        atual = pilha.pop()
+        contador[0] += 1
+        if isinstance(atual, dict):
+            yield atual
+            pilha.extend(v for v in atual.values() if isinstance(v, (dict, list)))
+        elif isinstance(atual, list):
+            pilha.extend(v for v in atual if isinstance(v, (dict, list)))
+
+
+def extrair_cards_state(html: str, url_pagina: str) -> List[Dict]:
+    """Cards a partir de estado embutido (objetos com nome + preço + link)."""
+    cards = []
+    for padrao in STATE_RES:
+        m = padrao.search(html)
+        if not m:
+            continue
+        try:
+            data = json.loads(m.group(1))
+        except Exception:
+            continue
+
+        for node in _percorrer_state(data, [0]):
+            nome = next((node[c] for c in CHAVES_NOME if isinstance(node.get(c), str)), None)
+            if not nome:
+                continue
+            preco = next((_valor_preco(node[c]) for c in CHAVES_PRECO if c in node), None)
+            if not preco:
+                # VTEX: priceRange.sellingPrice.lowPrice
+                price_range = node.get('priceRange') or node.get('price_range')
+                if isinstance(price_range, dict):
+                    preco = _valor_preco(price_range.get('sellingPrice') or price_range.get('minimum_price', {}).get('final_price'))
+            url_chave = next((c for c in CHAVES_URL if isinstance(node.get(c), str)), None)
+            if not preco or not url_chave:
+                continue
+
+            url = node[url_chave]
+            if url_chave == 'linkText':
+                url = f"/{url}/p"  # VTEX
+            cards.append({
+                'url': urljoin(url_pagina, url),
+                'nome': nome,
+                'preco': preco,
+                'marca': node.get('brand') if isinstance(node.get('brand'), str) else None,
+                'imagem': next((_primeira_imagem(node[c]) for c in CHAVES_IMAGEM if c in node), None),
+                'sku': node.get('sku') or node.get('productId'),
+                'fonte': 'listagem-state',
+            })
+    return cards
+
+
+def extrair_cards_listagem(html: str, url_pagina: str, soup: Optional[BeautifulSoup] = None) -> List[Dict]:
+    """Todos os cards de uma listagem (JSON-LD → microdata → estado), mesclados por URL."""
+    soup = soup or BeautifulSoup(html, 'html.parser')
+    netloc = urlparse(url_pagina).netloc
+
+    cards: Dict[str, Dict] = {}
+    for lista in (extrair_cards_jsonld(soup, url_pagina),
+                  extrair_cards_microdata(soup, url_pagina),
+                  extrair_cards_state(html, url_pagina)):
+        for card in lista:
+            if urlparse(card['url']).netloc != netloc:
+                continue
+            chave = normalizar_url(card['url'], manter_query=False)
+            card['url'] = chave
+            existente = cards.setdefault(chave, {})
+            for campo, valor in card.items():
+                if valor and not existente.get(campo):
+                    existente[campo] = valor
+    return list(cards.values())
+
+
+def registro_completo(produto: Dict) -> bool:
+    return all(produto.get(c) for c in CAMPOS_OBRIGATORIOS)
+
+
+# ================================================================================================
+# CRAWLER DE LISTAGENS
+# ================================================================================================
+class ListagemCrawler(FrontierCrawler):
+    """FrontierCrawler que também colhe os cards de cada listagem visitada."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.registros: Dict[str, Dict] = {}
+
+    def _produtos_extras(self, url, html, soup):
+        cards = extrair_cards_listagem(html, url, soup)
+        for card in cards:
+            existente = self.registros.setdefault(card['url'], {})
+            for campo, valor in card.items():
+                if valor and not existente.get(campo):
+                    existente[campo] = valor
+
+        # Cards contam como produto mesmo se o link não bater na heurística de URL
+        return [card['url'] for card in cards]
+
+
+async def _colher_listagens(url_base: str, callback: Optional[Callable], max_produtos: int) -> List[Dict]:
+    def log(msg):
+        if callback:
+            callback(msg)
+        print(f"[LISTAGEM] {msg}")
+
+    crawler = ListagemCrawler(url_base, max_produtos=max_produtos, show_message=log)
+    urls = await crawler.run()
+
+    produtos = []
+    for url in urls:
+        registro = crawler.registros.get(url, {})
+        produto = {'url': url, **{k: v for k, v in registro.items() if k != 'url'}}
+        produto.setdefault('fonte', 'listagem-link')
+        produtos.append(produto)
+
+    completos = sum(1 for p in produtos if registro_completo(p))
+    log(f"{completos}/{len(produtos)} produtos completos direto da listagem "
+        f"({crawler.stats['paginas']} páginas em vez de {len(produtos)} requisições)")
+    return produtos
+
+
+# ================================================================================================
+# INTERFACE QUINTAPP
+# ================================================================================================
+def extrair_produtos(url_base: str, callback: Callable = None, max_produtos: int = None) -> List[Dict]:
+    """
+    Interface compatível com QuintApp
+    Retorna registros colhidos das listagens (completos quando o card tem nome + preço)
+    """
+    return asyncio.run(_colher_listagens(url_base, callback, max_produtos or 500))
+
+
+def extrair_detalhes_paralelo(produtos: List[Dict], callback: Callable = None,
+                              max_produtos: int = None, max_workers: int = 20) -> Tuple[str, List[Dict]]:
+    """
+    Interface compatível com QuintApp
+    Só busca página de produto para registros incompletos; campos da listagem são preservados
+    """
+    from extract_detailsv8 import extrair_detalhes_paralelo as detalhes_v8
+
+    if max_produtos:
+        produtos = produtos[:max_produtos]
+
+    incompletos = [p for p in produtos if not registro_completo(p)]
+    msg = f"Listagem: {len(produtos) - len(incompletos)} completos, {len(incompletos)} vão para página de produto"
+    print(f"[LISTAGEM] {msg}")
+    if callback:
+        callback(msg)
+
+    if incompletos:
+        _, detalhes = detalhes_v8(incompletos, callback or print, len(incompletos), max_workers)
+        por_url = {d.get('url'): d for d in detalhes}
+
+        for produto in incompletos:
+            detalhe = por_url.get(produto['url'], {})
+            for campo, valor in detalhe.items():
+                if campo in ('indice', 'url'):
+                    continue
+                if valor and not produto.get(campo):
+                    produto[campo] = valor
+            if detalhe and 'erro' not in detalhe:
+                produto['fonte'] = f"{produto.get('fonte', 'listagem')}+produto"
+
+    for i, produto in enumerate(produtos, 1):
+        produto['indice'] = i
+
+    texto = f"=== {len(produtos)} PRODUTOS (LISTAGEM) ===\n\n"
+    for p in produtos[:10]:
+        texto += f"[{p['indice']}] {p.get('nome', 'N/A')} - {p.get('preco', 'N/A')}\n{p['url']}\n\n"
+
+    return texto, produtos
+
+
+# Teste standalone
+if __name__ == "__main__":
+    import sys
+
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://katsukazan.com.br"
+    produtos = extrair_produtos(url, max_produtos=50)
+    _, produtos = extrair_detalhes_paralelo(produtos)
+
+    print(f"\n✅ {len(produtos)} produtos")
+    for p in produtos[:5]:
+        print(f"  - {p.get('nome', 'N/A')[:50]} | {p.get('preco', 'N/A')} | {p.get('fonte')}")
@@ -9,6 +9,8 @@ from bs4 import BeautifulSoup
 from typing import List, Dict, Tuple, Optional, Callable
 import re
 
+from singleflight import get_compartilhado
+
 def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_produtos: Optional[int] = None) -> List[Dict]:
     """
     Descobre URLs de produtos via sitemap ou homepage
@@ -20,7 +22,7 @@ def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_pro
         with httpx.Client(timeout=30, follow_redirects=True) as client:
             # 1. Tentar sitemap
             try:
-                r = client.get(f"{url_base}/sitemap.xml")
+                r = get_compartilhado(client, f"{url_base}/sitemap.xml")
                 if r.status_code == 200:
                     soup = BeautifulSoup(r.text, 'xml')
                     sitemap_links = soup.find_all('loc')
@@ -30,7 +32,7 @@ def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_pro
                         url = loc.text
                         if 'product' in url.lower():
                             try:
-                                r_sub = client.get(url)
+                                r_sub = get_compartilhado(client, url)
                                 soup_sub = BeautifulSoup(r_sub.text, 'xml')
                                 product_urls = soup_sub.find_all('loc')
                                 
@@ -52,7 +54,7 @@ def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_pro
             
             # 2. Se sitemap falhou ou não tem URLs suficientes, usar homepage
             if len(produtos) < (max_produtos or 50):
-                r = client.get(url_base)
+                r = get_compartilhado(client, url_base)
                 soup = BeautifulSoup(r.text, 'html.parser')
                 
                 for link in soup.find_all('a', href=True):
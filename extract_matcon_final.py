@@ -11,6 +11,11 @@ import httpx
 from bs4 import BeautifulSoup
 import concurrent.futures
 
+from singleflight import get_compartilhado
+from dead_letter import separar_falhas, descrever_falhas
+from timing_requests import event_hooks_tempos
+from tracer_crawl import faixa, span
+
 def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_produtos: Optional[int] = None) -> List[Dict]:
     """
     Descobre URLs de produtos via sitemap/homepage (httpx - rápido)
@@ -19,9 +24,10 @@ def extrair_produtos(url_base: str, callback: Optional[Callable] = None, max_pro
     urls_visitadas = set()
     
     try:
-        with httpx.Client(timeout=30, follow_redirects=True) as client:
+        with httpx.Client(timeout=30, follow_redirects=True, event_hooks=event_hooks_tempos()) as client, \
+                span('descoberta', url=url_base):
             # Tentar homepage
-            r = client.get(url_base)
+            r = get_compartilhado(client, url_base)
             soup = BeautifulSoup(r.text, 'html.parser')
             
             for link in soup.find_all('a', href=True):
@@ -89,19 +95,22 @@ async def _extrair_detalhes_async(produtos: List[Dict], callback: Optional[Calla
                 tasks = []
                 
                 for idx, produto in enumerate(batch):
-                    task = _extrair_produto_api(browser, produto, callback, i + idx + 1, total)
+                    # Cada slot do lote numa faixa fixa do trace (tracer_crawl.py): mostra stragglers do lote
+                    task = _no_slot(f'slot {idx + 1}', _extrair_produto_api(browser, produto, callback, i + idx + 1, total))
                     tasks.append(task)
                 
-                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+                with span(f'lote {i // batch_size + 1}', 'lote', produtos=len(batch)):
+                    batch_results = await asyncio.gather(*tasks, return_exceptions=True)
                 
-                for result in batch_results:
+                for produto, result in zip(batch, batch_results):
                     if isinstance(result, dict):
                         resultados.append(result)
                     elif isinstance(result, Exception):
                         print(f"⚠️ Erro em produto: {result}")
-                        # Adicionar produto vazio
+                        # Produto vazio com a URL e o erro (vai para a dead-letter)
                         resultados.append({
-                            'url': '',
+                            'url': produto.get('url', ''),
+                            'erro': str(result),
                             'nome': '',
                             'preco': '',
                             'marca': '',
@@ -115,8 +124,20 @@ async def _extrair_detalhes_async(produtos: List[Dict], callback: Optional[Calla
         import traceback
         traceback.print_exc()
     
+    # Falhas → dead-letter (re-run com: python dead_letter.py --retry-failed)
+    resultados, falhas = separar_falhas(resultados, 'matcon')
+    if falhas:
+        print(descrever_falhas(falhas))
+        if callback:
+            callback(descrever_falhas(falhas))
+    
     return "matcon", resultados
 
+async def _no_slot(nome: str, coro):
+    """Roda a corrotina com os spans na faixa `nome` do trace"""
+    with faixa(nome):
+        return await coro
+
 async def _extrair_produto_api(browser, produto: Dict, callback: Optional[Callable], 
                                index: int, total: int) -> Dict:
     """Extrai um produto interceptando a API"""
@@ -125,8 +146,9 @@ async def _extrair_produto_api(browser, produto: Dict, callback: Optional[Callab
     page = None
     
     try:
-        context = await browser.new_context()
-        page = await context.new_page()
+        with span('abrir_contexto', 'browser'):
+            context = await browser.new_context()
+            page = await context.new_page()
         
         # Timeout mais curto para não travar
         page.set_default_timeout(20000)  # 20 segundos
@@ -147,8 +169,10 @@ async def _extrair_produto_api(browser, produto: Dict, callback: Optional[Callab
         url = produto['url']
         print(f"   [{index}/{total}] Processando: {url[:60]}...")
         
-        await page.goto(url, wait_until='networkidle', timeout=25000)
-        await page.wait_for_timeout(2000)  # Aguardar API
+        with span('navegacao', 'browser', url=url):
+            resposta = await page.goto(url, wait_until='networkidle', timeout=25000)
+        with span('espera_api', 'browser'):
+            await page.wait_for_timeout(2000)  # Aguardar API
         
         dados = {
             'url': url,
@@ -158,6 +182,8 @@ async def _extrair_produto_api(browser, produto: Dict, callback: Optional[Callab
             'categoria': '',
             'imagem': ''
         }
+        if resposta and resposta.status >= 400:
+            dados['erro'] = f"HTTP {resposta.status}"
         
         # Se interceptou a API, usar os dados dela
         if 'products' in api_data and api_data['products']:
@@ -210,7 +236,8 @@ async def _extrair_produto_api(browser, produto: Dict, callback: Optional[Callab
             'preco': '',
             'marca': '',
             'categoria': '',
-            'imagem': ''
+            'imagem': '',
+            'erro': str(e)
         }
     finally:
         if context:
@@ -2,21 +2,51 @@
 EXTRAÇÃO COM CONCORRÊNCIA MÁXIMA
 Baseado no extract_production.py que FUNCIONA (1.35s/produto, 100% sucesso)
 Única mudança: MAX_CONCURRENCY de 30 para 60
+MAX_CONCURRENCY agora é o TETO: navegações por host são limitadas pelo AIMD (autoscaler.py)
 """
 
 import asyncio
 import json
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from crawlee.crawlers import PlaywrightCrawler
 from crawlee import ConcurrencySettings
 
+from autoscaler import AIMDAutoscaler
+
 # CONFIGURAÇÕES - só aumentar concorrência
 MAX_CONCURRENCY = 60  # ERA 30, agora 60
 SELECTOR_TIMEOUT = 8000
 EXTRA_WAIT = 500
 REQUEST_TIMEOUT = timedelta(seconds=15)
 MAX_RETRIES = 2
+MIN_CONCURRENCY = 10
+
+# Concorrência real por host (AIMD por latência/429/erros) - slot reservado antes da navegação
+autoscaler = AIMDAutoscaler(max_concorrencia=MAX_CONCURRENCY, min_concorrencia=MIN_CONCURRENCY, verbose=True)
+_inicio_slots = {}
+
+
+async def reservar_slot(context) -> None:
+    """pre_navigation_hook: espera slot do host antes de abrir a página."""
+    await autoscaler.acquire(context.request.url)
+    _inicio_slots[context.request.id] = time.perf_counter()
+
+
+def liberar_slot(context, erro: bool = False) -> None:
+    """Libera o slot (handler concluído ou navegação/handler com erro)."""
+    inicio = _inicio_slots.pop(context.request.id, None)
+    if inicio is None:
+        return
+    response = getattr(context, 'response', None)
+    status = getattr(response, 'status', None) if response is not None else None
+    autoscaler.release(context.request.url, time.perf_counter() - inicio, status, erro=erro)
+
+
+async def liberar_slot_erro(context, error) -> None:
+    liberar_slot(context, erro=True)
+
 
 stats = {
     'total': 0,
@@ -29,6 +59,16 @@ stats = {
 
 async def extrair_produto(context) -> None:
     """Extração otimizada (EXATAMENTE como production.py que funciona)"""
+    ok = False
+    try:
+        ok = await _extrair_produto(context)
+    finally:
+        # Timeout do h1/evaluate conta como erro do host para o AIMD
+        liberar_slot(context, erro=not ok)
+
+
+async def _extrair_produto(context) -> bool:
+    """False se a página falhou (exceção); dados incompletos ainda são uma resposta do host"""
     page = context.page
     url = context.request.url
     
@@ -114,6 +154,7 @@ async def extrair_produto(context) -> None:
                 'erro': 'Dados incompletos'
             })
             print(f"❌ [{stats['erro']:3d}] {url[:70]} - Dados incompletos")
+        return True
     
     except Exception as e:
         stats['erro'] += 1
@@ -122,6 +163,7 @@ async def extrair_produto(context) -> None:
             'erro': str(e)
         })
         print(f"❌ ERRO: {str(e)[:50]}")
+        return False
 
 async def main():
     arquivo_urls = 'urls_matcon_100.txt'
@@ -171,9 +213,12 @@ async def main():
         concurrency_settings=ConcurrencySettings(
             max_concurrency=MAX_CONCURRENCY,
             desired_concurrency=MAX_CONCURRENCY,
-            min_concurrency=10,
+            min_concurrency=MIN_CONCURRENCY,
         ),
     )
+    crawler.pre_navigation_hook(reservar_slot)
+    crawler.error_handler(liberar_slot_erro)
+    crawler.failed_request_handler(liberar_slot_erro)
     
     # Executar
     await crawler.run(urls)
@@ -199,6 +244,11 @@ async def main():
     print(f"⚠️  Erros: {stats['erro']}/{total_processado} ({100-taxa_sucesso:.1f}%)")
     print()
     
+    setpoints = autoscaler.setpoints()
+    for host, sp in setpoints.items():
+        print(f"⚙️  {host}: concorrência {sp['limite']}/{MAX_CONCURRENCY} | p50 {sp['p50']:.2f}s | p95 {sp['p95']:.2f}s | 429s: {sp['total_429']}")
+    print()
+    
     # Qualidade
     produtos_ok = [p for p in stats['produtos'] if 'erro' not in p]
     if produtos_ok:
@@ -243,6 +293,7 @@ async def main():
             'fim': stats['fim'].isoformat(),
             'metodo': 'max_concurrency_60',
             'concorrencia': MAX_CONCURRENCY,
+            'autoscaler': setpoints,
         },
         'produtos': stats['produtos']
     }
@@ -7,16 +7,22 @@ FEATURES:
 - Playwright crawler otimizado (wait for h1, não networkidle)
 - Homepage SSR discovery como fallback (MatConcasa style)
 - Uso flexível: aceita arquivo de URLs OU URL do site
+- Resultados gravados em streaming (sinks.py): saída .json (mesmo formato de
+  antes, montado do NDJSON parcial) ou .ndjson/.csv/.parquet (+ .gz) direto
+- METRICAS_PORTA=9108 expõe /metrics (metricas.py): produtos/s, sucesso/erro, fila
 """
 
 import asyncio
 import json
+import os
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 from crawlee.crawlers import PlaywrightCrawler
 from crawlee import ConcurrencySettings
 from playwright.async_api import async_playwright
+from sinks import MultiSink, NDJSONSink, PreviewSink, criar_sink, exportar_json, ler_ndjson
+from metricas import coletor_estrategias, coletor_fila, contar_produtos, iniciar_se_configurado, registrar_coletor
 
 # Configurações otimizadas
 MAX_CONCURRENCY = 30
@@ -29,7 +35,9 @@ stats = {
     'total': 0,
     'sucesso': 0,
     'erro': 0,
-    'produtos': [],
+    'sink': None,       # Destino em streaming dos produtos (definido no main)
+    'preview': None,    # Primeiros produtos para o resumo final
+    'qualidade': {'ok': 0, 'nome': 0, 'preco': 0, 'preco_original': 0, 'imagens': 0},
     'inicio': None,
     'fim': None,
     'modo': None,  # 'arquivo' ou 'discovery'
@@ -216,13 +224,21 @@ async def extrair_produto(context) -> None:
         
         if resultado['nome'] and resultado['preco']:
             stats['sucesso'] += 1
+            contar_produtos(url)
             nome_curto = resultado['nome'][:50] if len(resultado['nome']) > 50 else resultado['nome']
             print(f"✅ [{contador:3d}/{stats['total']}] {nome_curto:50s} R$ {resultado['preco']:>9s}")
         else:
             stats['erro'] += 1
             print(f"⚠️  [{contador:3d}/{stats['total']}] Dados incompletos")
         
-        stats['produtos'].append({
+        qualidade = stats['qualidade']
+        qualidade['ok'] += 1
+        qualidade['nome'] += bool(resultado['nome'])
+        qualidade['preco'] += bool(resultado['preco'])
+        qualidade['preco_original'] += bool(resultado['preco_original'])
+        qualidade['imagens'] += bool(resultado['imagens'])
+        
+        stats['sink'].write({
             'url': url,
             'nome': resultado['nome'],
             'preco': resultado['preco'],
@@ -238,7 +254,7 @@ async def extrair_produto(context) -> None:
     except Exception as e:
         stats['erro'] += 1
         print(f"❌ [{contador:3d}/{stats['total']}] Erro: {str(e)[:60]}")
-        stats['produtos'].append({
+        stats['sink'].write({
             'url': url,
             'erro': str(e)[:200],
             'extraido_em': datetime.now().isoformat()
@@ -263,6 +279,8 @@ async def main():
         print("  python extract_production.py urls_matcon_100.txt resultados.json")
         print("  python extract_production.py https://www.matconcasa.com.br/ resultados.json --discovery")
         print()
+        print("Formatos de saída: .json, .ndjson, .csv, .parquet (NDJSON/CSV aceitam .gz)")
+        print()
         return
     
     modo_discovery = '--discovery' in sys.argv or len(sys.argv) == 3 and sys.argv[1].startswith('http')
@@ -326,6 +344,24 @@ async def main():
     print(f"⏱️  Tempo estimado: {tempo_estimado:.0f}s ({tempo_estimado/60:.1f}min)")
     print()
     
+    # Produtos vão para o disco conforme são extraídos (só uma prévia fica em memória)
+    saida_json = arquivo_saida.endswith('.json')
+    arquivo_parcial = f"{arquivo_saida}.parcial.ndjson"
+    stats['preview'] = PreviewSink(max_registros=5)
+    stats['sink'] = MultiSink(
+        NDJSONSink(arquivo_parcial) if saida_json else criar_sink(arquivo_saida),
+        stats['preview']
+    )
+    
+    if iniciar_se_configurado():
+        registrar_coletor('resultado_production_v2', coletor_estrategias(
+            'production_v2', lambda: {'sucesso': stats['sucesso'], 'erro': stats['erro']}))
+        registrar_coletor('fila_production_v2', coletor_fila('production_v2', lambda: {
+            'pending': stats['total'] - stats['sucesso'] - stats['erro'],
+            'completed': stats['sucesso'],
+            'failed': stats['erro'],
+        }))
+    
     stats['inicio'] = datetime.now()
     print(f"🕐 Início: {stats['inicio'].strftime('%H:%M:%S')}")
     print("="*80)
@@ -353,6 +389,7 @@ async def main():
     except Exception as e:
         print(f"\n⚠️  Crawler interrompido: {str(e)}")
     
+    stats['sink'].close()
     stats['fim'] = datetime.now()
     tempo_total = (stats['fim'] - stats['inicio']).total_seconds()
     
@@ -376,22 +413,18 @@ async def main():
     print()
     
     # Qualidade dos dados
-    produtos_ok = [p for p in stats['produtos'] if 'erro' not in p]
-    if produtos_ok:
-        nome_ok = sum(1 for p in produtos_ok if p.get('nome'))
-        preco_ok = sum(1 for p in produtos_ok if p.get('preco'))
-        preco_orig_ok = sum(1 for p in produtos_ok if p.get('preco_original'))
-        imgs_ok = sum(1 for p in produtos_ok if p.get('imagens') and len(p['imagens']) > 0)
-        
+    qualidade = stats['qualidade']
+    total_ok = qualidade['ok']
+    if total_ok:
         print("📈 Qualidade dos Dados:")
-        print(f"   • Nome: {nome_ok}/{len(produtos_ok)} ({nome_ok/len(produtos_ok)*100:.1f}%)")
-        print(f"   • Preço: {preco_ok}/{len(produtos_ok)} ({preco_ok/len(produtos_ok)*100:.1f}%)")
-        print(f"   • Preço original: {preco_orig_ok}/{len(produtos_ok)} ({preco_orig_ok/len(produtos_ok)*100:.1f}%)")
-        print(f"   • Imagens: {imgs_ok}/{len(produtos_ok)} ({imgs_ok/len(produtos_ok)*100:.1f}%)")
+        print(f"   • Nome: {qualidade['nome']}/{total_ok} ({qualidade['nome']/total_ok*100:.1f}%)")
+        print(f"   • Preço: {qualidade['preco']}/{total_ok} ({qualidade['preco']/total_ok*100:.1f}%)")
+        print(f"   • Preço original: {qualidade['preco_original']}/{total_ok} ({qualidade['preco_original']/total_ok*100:.1f}%)")
+        print(f"   • Imagens: {qualidade['imagens']}/{total_ok} ({qualidade['imagens']/total_ok*100:.1f}%)")
         print()
     
     # Salvar resultados
-    resultado_final = {
+    metadata = {
         'metadata': {
             'site': site_name,
             'modo_extracao': stats['modo'],
@@ -407,20 +440,26 @@ async def main():
             'fim': stats['fim'].isoformat(),
             'metodo': 'playwright_optimized_v2',
             'concorrencia': MAX_CONCURRENCY,
-        },
-        'produtos': stats['produtos']
+        }
     }
     
-    with open(arquivo_saida, 'w', encoding='utf-8') as f:
-        json.dump(resultado_final, f, ensure_ascii=False, indent=2)
-    
-    print(f"💾 Resultados salvos: {arquivo_saida}")
+    if saida_json:
+        # Mesmo formato de antes ({metadata, produtos}), montado em streaming do NDJSON parcial
+        exportar_json(arquivo_saida, ler_ndjson(arquivo_parcial), metadata)
+        os.remove(arquivo_parcial)
+        print(f"💾 Resultados salvos: {arquivo_saida}")
+    else:
+        arquivo_meta = f"{arquivo_saida}.meta.json"
+        with open(arquivo_meta, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        arquivos = getattr(stats['sink'].sinks[0], 'arquivos', [arquivo_saida])
+        print(f"💾 Resultados salvos: {', '.join(arquivos)} (metadata: {arquivo_meta})")
     print()
     
     # Resumo de produtos
     print("📦 Primeiros 5 produtos extraídos:")
     print("-"*80)
-    for i, p in enumerate(stats['produtos'][:5], 1):
+    for i, p in enumerate(stats['preview'].registros, 1):
         if 'erro' in p:
             print(f"\n{i}. ❌ ERRO")
             print(f"   URL: {p['url'][:70]}...")
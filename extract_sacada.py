@@ -9,6 +9,7 @@ Compatível com QuintApp:
 Observações:
 - Ignora sitemap product-0 (produtos antigos/inativos)
 - Prioriza product-1, product-2, product-3
+- Triagem HEAD antes dos detalhes (descarta produtos mortos dos demais sitemaps)
 """
 
 import httpx
@@ -18,6 +19,13 @@ from typing import Dict, Optional, List, Tuple
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
+from triagem_urls import filtrar_produtos_vivos
+from dead_letter import separar_falhas, descrever_falhas
+from arquivo_respostas import arquivar_resposta
+from cache_conteudo import CacheConteudo, fragmento_apollo, versao_codigo
+from timing_requests import combinar_hooks, event_hooks_tempos, execucao_tempos, medir_fase
+from metricas import coletor_setpoints, coletores_execucao, contar_produtos, event_hooks_metricas, id_execucao
+
 
 def extrair_apollo_cache(html: str) -> Optional[Dict]:
     """Extrai dados do Apollo Cache no HTML"""
@@ -43,15 +51,103 @@ def resolver_referencia(cache: Dict, ref: any) -> any:
         return cache.get(key, ref)
     return ref
 
-def extrair_produto_sacada(url: str, timeout: int = 15) -> Dict:
+def parsear_produto_sacada(html: str, url: str) -> Dict:
+    """
+    Extrai os dados do produto do HTML (Apollo Cache) - sem rede.
+    Usado na extração normal e na re-extração offline (arquivo_respostas.py).
+    """
+    # Extrair Apollo Cache
+    cache = extrair_apollo_cache(html)
+    
+    if not cache:
+        return {
+            'url': url,
+            'erro': 'Apollo Cache não encontrado'
+        }
+    
+    # Encontrar chave do produto (começa com "Product:")
+    product_keys = [k for k in cache.keys() if k.startswith('Product:') and '.' not in k]
+    
+    if not product_keys:
+        return {
+            'url': url,
+            'erro': 'Produto não encontrado no cache'
+        }
+    
+    product_key = product_keys[0]
+    product = cache[product_key]
+    
+    # Extrair dados básicos
+    nome = product.get('productName', 'N/A')
+    marca = product.get('brand', 'N/A')
+    product_id = product.get('productId', 'N/A')
+    descricao = product.get('description', 'N/A')
+    
+    # Extrair categorias
+    categories_obj = product.get('categories')
+    if isinstance(categories_obj, dict) and 'json' in categories_obj:
+        categorias = categories_obj['json']
+        # Pegar categoria mais específica (última antes de /)
+        categoria = categorias[0].strip('/').split('/')[-1] if categorias else 'N/A'
+    else:
+        categoria = 'N/A'
+    
+    # Extrair preços (resolver referências)
+    preco = 'N/A'
+    preco_original = 'N/A'
+    
+    price_range_ref = product.get('priceRange')
+    if isinstance(price_range_ref, dict) and 'id' in price_range_ref:
+        price_range = resolver_referencia(cache, price_range_ref)
+        
+        # Preço de venda
+        if 'sellingPrice' in price_range:
+            selling_ref = price_range['sellingPrice']
+            selling_data = resolver_referencia(cache, selling_ref)
+            if 'lowPrice' in selling_data:
+                preco = selling_data['lowPrice']
+        
+        # Preço de lista
+        if 'listPrice' in price_range:
+            list_ref = price_range['listPrice']
+            list_data = resolver_referencia(cache, list_ref)
+            if 'lowPrice' in list_data:
+                preco_original = list_data['lowPrice']
+    
+    # Extrair primeiro SKU
+    items = product.get('items', [])
+    sku = 'N/A'
+    if items:
+        first_item_ref = items[0]
+        if isinstance(first_item_ref, dict) and 'id' in first_item_ref:
+            first_item = resolver_referencia(cache, first_item_ref)
+            sku = first_item.get('itemId', 'N/A')
+    
+    return {
+        'url': url,
+        'nome': nome,
+        'preco': f'R$ {preco}' if preco != 'N/A' else 'N/A',
+        'preco_original': f'R$ {preco_original}' if preco_original != 'N/A' else 'N/A',
+        'marca': marca,
+        'categoria': categoria,
+        'sku': sku,
+        'product_id': product_id,
+        'descricao': descricao[:200] + '...' if len(descricao) > 200 else descricao,
+    }
+
+def extrair_produto_sacada(url: str, timeout: int = 15, cache: Optional[CacheConteudo] = None) -> Dict:
     """
     Extrai dados de produto do Sacada
     
+    Com cache, o parse é pulado se o Apollo Cache não mudou desde a última execução.
     Retorna dict com: nome, preco, preco_original, marca, categoria, sku, url
     """
     try:
-        # Fazer requisição
-        resp = httpx.get(url, timeout=timeout, follow_redirects=True)
+        # Fazer requisição - mesmo que httpx.get (cliente por chamada), com hooks de tempo e métricas por request
+        hooks = combinar_hooks(event_hooks_tempos(), event_hooks_metricas())
+        with httpx.Client(timeout=timeout, follow_redirects=True, event_hooks=hooks) as client:
+            resp = client.get(url)
+        arquivar_resposta(resp)  # No-op sem ARQUIVAR_RESPOSTAS
         
         if resp.status_code != 200:
             return {
@@ -59,84 +155,10 @@ def extrair_produto_sacada(url: str, timeout: int = 15) -> Dict:
                 'erro': f'Status {resp.status_code}'
             }
         
-        # Extrair Apollo Cache
-        cache = extrair_apollo_cache(resp.text)
-        
-        if not cache:
-            return {
-                'url': url,
-                'erro': 'Apollo Cache não encontrado'
-            }
-        
-        # Encontrar chave do produto (começa com "Product:")
-        product_keys = [k for k in cache.keys() if k.startswith('Product:') and '.' not in k]
-        
-        if not product_keys:
-            return {
-                'url': url,
-                'erro': 'Produto não encontrado no cache'
-            }
-        
-        product_key = product_keys[0]
-        product = cache[product_key]
-        
-        # Extrair dados básicos
-        nome = product.get('productName', 'N/A')
-        marca = product.get('brand', 'N/A')
-        product_id = product.get('productId', 'N/A')
-        descricao = product.get('description', 'N/A')
-        
-        # Extrair categorias
-        categories_obj = product.get('categories')
-        if isinstance(categories_obj, dict) and 'json' in categories_obj:
-            categorias = categories_obj['json']
-            # Pegar categoria mais específica (última antes de /)
-            categoria = categorias[0].strip('/').split('/')[-1] if categorias else 'N/A'
-        else:
-            categoria = 'N/A'
-        
-        # Extrair preços (resolver referências)
-        preco = 'N/A'
-        preco_original = 'N/A'
-        
-        price_range_ref = product.get('priceRange')
-        if isinstance(price_range_ref, dict) and 'id' in price_range_ref:
-            price_range = resolver_referencia(cache, price_range_ref)
-            
-            # Preço de venda
-            if 'sellingPrice' in price_range:
-                selling_ref = price_range['sellingPrice']
-                selling_data = resolver_referencia(cache, selling_ref)
-                if 'lowPrice' in selling_data:
-                    preco = selling_data['lowPrice']
-            
-            # Preço de lista
-            if 'listPrice' in price_range:
-                list_ref = price_range['listPrice']
-                list_data = resolver_referencia(cache, list_ref)
-                if 'lowPrice' in list_data:
-                    preco_original = list_data['lowPrice']
-        
-        # Extrair primeiro SKU
-        items = product.get('items', [])
-        sku = 'N/A'
-        if items:
-            first_item_ref = items[0]
-            if isinstance(first_item_ref, dict) and 'id' in first_item_ref:
-                first_item = resolver_referencia(cache, first_item_ref)
-                sku = first_item.get('itemId', 'N/A')
-        
-        return {
-            'url': url,
-            'nome': nome,
-            'preco': f'R$ {preco}' if preco != 'N/A' else 'N/A',
-            'preco_original': f'R$ {preco_original}' if preco_original != 'N/A' else 'N/A',
-            'marca': marca,
-            'categoria': categoria,
-            'sku': sku,
-            'product_id': product_id,
-            'descricao': descricao[:200] + '...' if len(descricao) > 200 else descricao,
-        }
+        with medir_fase(url, 'parse'):
+            if cache:
+                return cache.extrair(url, resp.text, fragmento_apollo, parsear_produto_sacada)
+            return parsear_produto_sacada(resp.text, url)
         
     except Exception as e:
         return {
@@ -299,9 +321,11 @@ def extrair_produtos(url_base: str, callback=None, max_produtos: Optional[int] =
     return produtos
 
 
-def _processar_detalhe(url: str, indice: int, total: int) -> Dict:
-    dados = extrair_produto_sacada(url)
+def _processar_detalhe(url: str, indice: int, total: int, cache: Optional[CacheConteudo] = None) -> Dict:
+    dados = extrair_produto_sacada(url, cache=cache)
     dados['indice'] = indice
+    if not dados.get('erro'):
+        contar_produtos(url)
     # Normaliza campos principais
     if 'preco' in dados and isinstance(dados['preco'], (int, float)):
         dados['preco'] = f"R$ {dados['preco']:.2f}"
@@ -309,20 +333,33 @@ def _processar_detalhe(url: str, indice: int, total: int) -> Dict:
 
 
 def extrair_detalhes_paralelo(produtos: List[Dict], callback=None, 
-                              max_produtos: Optional[int] = None, max_workers: int = 20) -> Tuple[str, List[Dict]]:
+                              max_produtos: Optional[int] = None, max_workers: int = 20,
+                              triar: bool = True, reusar_cache: bool = True) -> Tuple[str, List[Dict]]:
     """
     Extrai detalhes em paralelo via Apollo Cache.
+    Com triar=True, URLs mortas (404/410/soft-404) são descartadas antes via HEAD.
+    Com reusar_cache=True, páginas com Apollo Cache inalterado reusam o registro anterior.
+    Falhas vão para a dead-letter (dead_letter.py) e não entram nos detalhes.
     Retorna (texto_resumo, detalhes)
     """
-    if max_produtos:
+    if triar:
+        produtos = filtrar_produtos_vivos(produtos, callback, max_produtos)
+    elif max_produtos:
         produtos = produtos[:max_produtos]
 
     total = len(produtos)
     resultados: List[Dict] = []
+    cache = CacheConteudo('sacada', versao_codigo(parsear_produto_sacada)) if reusar_cache else None
+    hosts = {urlparse(p['url']).netloc for p in produtos}
+    # Coletor por chamada (some do /metrics no fim)
+    coletores = {}
+    if cache:
+        componente = f"cache_{id_execucao('sacada', hosts)}"
+        coletores[componente] = coletor_setpoints(componente, cache.resumo, metrica='cache')
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with coletores_execucao(coletores), execucao_tempos() as tempos, ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = {
-            executor.submit(_processar_detalhe, prod['url'], i + 1, total): i
+            executor.submit(_processar_detalhe, prod['url'], i + 1, total, cache): i
             for i, prod in enumerate(produtos)
         }
         for fut in as_completed(futures):
@@ -332,9 +369,27 @@ def extrair_detalhes_paralelo(produtos: List[Dict], callback=None,
                 if callback:
                     callback(f"✓ [{res.get('indice','?')}/{total}] {res.get('nome','Produto')} ")
             except Exception as e:
+                i = futures[fut]
+                resultados.append({'url': produtos[i]['url'], 'indice': i + 1, 'erro': str(e)})
                 if callback:
                     callback(f"✗ Erro: {e}")
 
+    # Falhas → dead-letter (re-run com: python dead_letter.py --retry-failed)
+    resultados, falhas = separar_falhas(resultados, 'sacada')
+    if falhas and callback:
+        callback(descrever_falhas(falhas))
+    if cache:
+        if callback:
+            for linha in cache.descrever():
+                callback(linha)
+        cache.close()
+
+    caminho_tempos = tempos.salvar(hosts=hosts, nome='sacada')
+    if callback:
+        for linha in tempos.descrever(hosts):
+            callback(linha)
+        callback(f"⏱️ Tempos por request: {caminho_tempos}")
+
     resultados.sort(key=lambda x: x.get('indice', 0))
 
     # Monta texto de resumo compatível
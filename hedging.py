@@ -0,0 +1,294 @@
+"""
+HEDGED REQUESTS - Corta a cauda de latência da fase de detalhes
+================================================================
+
+O tempo da fase 2 é ditado pelos poucos % de páginas mais lentas: requests
+que ficam pendurados até o timeout de 15s seguram o `as_completed` e o
+término do `max_produtos`.
+
+- Latência por host (janela móvel) → p95 corrente do host
+- Se um request passa do p95, dispara UMA cópia (hedge); o primeiro a responder vence
+- Orçamento: hedges limitados a `fracao_max` dos requests do host (+ o próprio
+  hedge passa pelo mesmo caminho do request normal: breaker, AIMD, rate limiter)
+- Perdedor é cancelado (async) ou abandonado e descartado (threads - httpx
+  síncrono não interrompe um request em andamento)
+- Relatório: taxa de hedge, vitórias do hedge e latência economizada
+  (medida quando o perdedor termina; estimada pela cauda do host quando é cancelado)
+
+- Latência = só a parte de rede quando o request informa (`mede_latencia=True`:
+  o callable recebe uma `MedidaRede` e marca `iniciar()`/`terminar()` em volta
+  do GET); filas de breaker/AIMD ficam de fora do p95 e o atraso do hedge só
+  começa a contar quando o primário sai delas
+
+Uso (threads):
+    hedger = HedgedFetcher()
+    response = hedger.get_sync(url, lambda: client.get(url))
+    response = hedger.get_sync(url, lambda medida: get_com_filas(url, medida), mede_latencia=True)
+
+Uso (async):
+    response = await hedger.get(url, lambda: client.get(url))
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from rate_limiter import host_de
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+PERCENTIL_HEDGE = 0.95      # Dispara hedge quando o request passa deste percentil
+MIN_AMOSTRAS = 20           # Sem histórico suficiente não há hedge
+FRACAO_MAX_HEDGE = 0.10     # No máximo 10% de requests extras por host
+ATRASO_MINIMO = 0.2         # Nunca hedgear antes disso (s)
+AMOSTRAS_LATENCIA = 200
+
+
+class _HostLatencia:
+    __slots__ = ('latencias', 'p95', 'desde_calculo', 'requests', 'hedges',
+                 'vitorias_hedge', 'economia', 'economia_estimada')
+
+    def __init__(self):
+        self.latencias: Deque[float] = deque(maxlen=AMOSTRAS_LATENCIA)
+        self.p95: Optional[float] = None
+        self.desde_calculo = 0
+        self.requests = 0
+        self.hedges = 0
+        self.vitorias_hedge = 0
+        self.economia = 0.0             # Medida (perdedor terminou depois)
+        self.economia_estimada = 0.0    # Perdedor cancelado: cauda esperada do host
+
+
+class MedidaRede:
+    """Início/fim da parte de rede de um request (depois das filas de breaker/AIMD/limiter)"""
+
+    def __init__(self):
+        self.iniciado: Future = Future()
+        self.inicio: Optional[float] = None
+        self.latencia: Optional[float] = None
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        if not self.iniciado.done():
+            self.iniciado.set_result(self.inicio)
+
+    def terminar(self):
+        if self.inicio is not None:
+            self.latencia = time.perf_counter() - self.inicio
+
+
+# ================================================================================================
+# HEDGED FETCHER
+# ================================================================================================
+class HedgedFetcher:
+    """
+    Executa requests com hedge no p95 do host.
+
+    Args:
+        percentil: percentil de latência que dispara o hedge
+        fracao_max: orçamento de hedges por host (fração dos requests)
+        max_threads: threads auxiliares do modo síncrono
+    """
+
+    def __init__(
+        self,
+        percentil: float = PERCENTIL_HEDGE,
+        fracao_max: float = FRACAO_MAX_HEDGE,
+        min_amostras: int = MIN_AMOSTRAS,
+        max_threads: int = 32
+    ):
+        self.percentil = percentil
+        self.fracao_max = fracao_max
+        self.min_amostras = min_amostras
+        self._hosts: Dict[str, _HostLatencia] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._max_threads = max_threads
+
+    # ------------------------------------------------------------------
+    # Estado por host
+    # ------------------------------------------------------------------
+    def _host(self, host: str) -> _HostLatencia:
+        estado = self._hosts.get(host)
+        if estado is None:
+            estado = self._hosts[host] = _HostLatencia()
+        return estado
+
+    def _atraso_hedge(self, host: str) -> Optional[float]:
+        """p95 corrente do host (recalculado a cada 10 amostras)."""
+        with self._lock:
+            estado = self._host(host)
+            estado.requests += 1
+            if len(estado.latencias) < self.min_amostras:
+                return None
+            if estado.p95 is None or estado.desde_calculo >= 10:
+                ordenadas = sorted(estado.latencias)
+                indice = min(len(ordenadas) - 1, math.ceil(self.percentil * len(ordenadas)) - 1)
+                estado.p95 = ordenadas[indice]
+                estado.desde_calculo = 0
+            return max(ATRASO_MINIMO, estado.p95)
+
+    def _reservar_hedge(self, host: str) -> bool:
+        with self._lock:
+            estado = self._host(host)
+            if estado.hedges + 1 > self.fracao_max * estado.requests + 1:
+                return False
+            estado.hedges += 1
+            return True
+
+    def _registrar(self, host: str, latencia: float):
+        with self._lock:
+            estado = self._host(host)
+            estado.latencias.append(latencia)
+            estado.desde_calculo += 1
+
+    def _cauda_esperada(self, host: str, decorrido: float) -> float:
+        """Latência média do host acima de `decorrido` (estimativa para perdedor cancelado)."""
+        with self._lock:
+            cauda = [l for l in self._host(host).latencias if l > decorrido]
+        return sum(cauda) / len(cauda) if cauda else decorrido
+
+    def _vitoria_hedge(self, host: str, economia: float = 0.0, estimada: float = 0.0):
+        with self._lock:
+            estado = self._host(host)
+            estado.vitorias_hedge += 1
+            estado.economia += economia
+            estado.economia_estimada += estimada
+
+    # ------------------------------------------------------------------
+    # Modo síncrono (ThreadPool dos extratores)
+    # ------------------------------------------------------------------
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._max_threads, thread_name_prefix='hedge')
+            return self._pool
+
+    def get_sync(self, url: str, fazer_request: Callable[..., Any], mede_latencia: bool = False) -> Any:
+        """
+        Executa `fazer_request` com hedge no p95 do host (bloqueante).
+        mede_latencia=True: `fazer_request(medida)` marca a parte de rede (MedidaRede).
+        """
+        host = host_de(url)
+        atraso = self._atraso_hedge(host)
+        inicio = time.perf_counter()
+
+        def chamada():
+            medida = MedidaRede() if mede_latencia else None
+            return medida, (lambda: fazer_request(medida)) if mede_latencia else fazer_request
+
+        def latencia(medida: Optional[MedidaRede], fim: float) -> float:
+            return medida.latencia if medida is not None and medida.latencia is not None else fim - inicio
+
+        medida_primario, funcao = chamada()
+        if atraso is None:
+            resultado = funcao()
+            self._registrar(host, latencia(medida_primario, time.perf_counter()))
+            return resultado
+
+        pool = self._executor()
+        primario = pool.submit(funcao)
+        if medida_primario is not None:
+            # O atraso conta a partir da rede: espera nas filas não dispara hedge
+            wait([primario, medida_primario.iniciado], return_when=FIRST_COMPLETED)
+            atraso -= time.perf_counter() - (medida_primario.inicio or time.perf_counter())
+        feitos, _ = wait([primario], timeout=max(0.0, atraso))
+        if feitos or not self._reservar_hedge(host):
+            resultado = primario.result()
+            self._registrar(host, latencia(medida_primario, time.perf_counter()))
+            return resultado
+
+        medida_hedge, funcao_hedge = chamada()
+        hedge = pool.submit(funcao_hedge)
+        pendentes = {primario, hedge}
+        while True:
+            feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            vencedor = next((f for f in feitos if f.exception() is None), None)
+            if vencedor is not None or not pendentes:
+                break
+        if vencedor is None:
+            vencedor = next(iter(feitos))  # Os dois falharam - propaga a exceção
+        fim_vencedor = time.perf_counter()
+        self._registrar(host, latencia(medida_hedge if vencedor is hedge else medida_primario, fim_vencedor))
+
+        if vencedor is hedge:
+            if primario.done():
+                self._vitoria_hedge(host, 0.0)
+            else:
+                # Primário não pode ser interrompido: mede a economia quando ele terminar
+                primario.add_done_callback(
+                    lambda _f: self._vitoria_hedge(host, time.perf_counter() - fim_vencedor)
+                )
+        return vencedor.result()
+
+    # ------------------------------------------------------------------
+    # Modo async
+    # ------------------------------------------------------------------
+    async def get(self, url: str, fazer_request: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa `fazer_request` com hedge no p95 do host; perdedor é cancelado."""
+        host = host_de(url)
+        atraso = self._atraso_hedge(host)
+        inicio = time.perf_counter()
+
+        primario = asyncio.ensure_future(fazer_request())
+        if atraso is None:
+            resultado = await primario
+            self._registrar(host, time.perf_counter() - inicio)
+            return resultado
+
+        try:
+            feitos, _ = await asyncio.wait({primario}, timeout=atraso)
+            if feitos or not self._reservar_hedge(host):
+                resultado = await primario
+                self._registrar(host, time.perf_counter() - inicio)
+                return resultado
+
+            hedge = asyncio.ensure_future(fazer_request())
+            pendentes = {primario, hedge}
+            while True:
+                feitos, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                vencedor = next((t for t in feitos if t.exception() is None), None)
+                if vencedor is not None or not pendentes:
+                    break
+            if vencedor is None:
+                vencedor = next(iter(feitos))
+
+            decorrido = time.perf_counter() - inicio
+            self._registrar(host, decorrido)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if vencedor is hedge and primario in pendentes:
+                self._vitoria_hedge(host, estimada=max(0.0, self._cauda_esperada(host, decorrido) - decorrido))
+            return vencedor.result()
+        finally:
+            if not primario.done():
+                primario.cancel()
+
+    # ------------------------------------------------------------------
+    # Relatório
+    # ------------------------------------------------------------------
+    def resumo(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                host or '*': {
+                    'requests': e.requests,
+                    'hedges': e.hedges,
+                    'taxa_hedge': round(e.hedges / e.requests, 3) if e.requests else 0.0,
+                    'vitorias_hedge': e.vitorias_hedge,
+                    'p95': round(e.p95, 3) if e.p95 else None,
+                    'economia_s': round(e.economia, 2),
+                    'economia_estimada_s': round(e.economia_estimada, 2),
+                }
+                for host, e in self._hosts.items()
+            }
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+HISTÓRICO DE PREÇOS - Store SQLite por domínio+SKU com detecção de mudanças
+============================================================================
+
+Cada run gravava um arquivo novo com timestamp (resultados_hybrid_*.json,
+resultados_fast_*.json, ...) sem índice entre eles - comparar hoje com ontem
+era varrer JSONs.
+
+- `produtos`: estado atual por (dominio, chave); chave = SKU quando o extrator
+  traz um, senão a URL sem query/fragmento
+- `alteracoes`: uma linha por campo que mudou (preço, preço original,
+  disponibilidade, moeda, nome), indexada por execução e por produto
+- `execucoes`: um id por run; produtos sem mudança só têm `ultima_execucao` atualizada
+- Preço/disponibilidade tipados por normalizacao.normalizar_registro
+  (mesma regra do export Parquet)
+- Delta = consulta indexada nas alterações após uma execução
+
+Uso:
+    historico = HistoricoPrecos()
+    execucao = historico.iniciar_execucao('quintapp')
+    historico.registrar(execucao, produtos)
+    historico.finalizar_execucao(execucao)
+    mudancas = historico.delta(desde_execucao=execucao - 1)
+
+CLI:
+    python historico_precos.py importar resultados_hybrid_*.json
+    python historico_precos.py execucoes
+    python historico_precos.py delta --desde 12 --saida delta.csv
+    python historico_precos.py produto https://www.sacada.com/vestido-x/p
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+
+from normalizacao import ler_registros, normalizar_registro
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DB_PADRAO = os.path.join('storage', 'historico_precos.sqlite')
+
+# Campos monitorados (coluna em `produtos`)
+CAMPOS_MONITORADOS = ('preco', 'preco_original', 'disponivel', 'moeda', 'nome')
+
+LOTE_CONSULTA = 400   # Chaves por SELECT (2 parâmetros cada; limite antigo do SQLite = 999)
+
+
+def chave_produto(registro: Dict) -> Tuple[str, str]:
+    """(dominio, chave): SKU do extrator ou URL canônica (sem query/fragmento)."""
+    url = registro.get('url') or ''
+    partes = urlparse(url)
+    dominio = partes.netloc.lower()
+    sku = registro.get('sku')
+    if sku not in (None, '', 'N/A'):
+        return dominio, f"sku:{sku}"
+    return dominio, urlunparse((partes.scheme, dominio, partes.path.rstrip('/'), '', '', ''))
+
+
+def _valor_comparavel(valor):
+    if isinstance(valor, float):
+        return round(valor, 2)
+    if isinstance(valor, bool):
+        return int(valor)
+    return valor
+
+
+# ================================================================================================
+# STORE
+# ================================================================================================
+class HistoricoPrecos:
+    """Store SQLite (WAL) do histórico de preços."""
+
+    def __init__(self, path: str = DB_PADRAO):
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS execucoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origem TEXT,
+                iniciada REAL NOT NULL,
+                finalizada REAL,
+                produtos INTEGER NOT NULL DEFAULT 0,
+                alterados INTEGER NOT NULL DEFAULT 0,
+                novos INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS produtos (
+                dominio TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                url TEXT,
+                nome TEXT,
+                preco REAL,
+                preco_original REAL,
+                moeda TEXT,
+                disponivel INTEGER,
+                primeira_execucao INTEGER NOT NULL,
+                ultima_execucao INTEGER NOT NULL,
+                alterado_em REAL NOT NULL,
+                PRIMARY KEY (dominio, chave)
+            );
+            CREATE TABLE IF NOT EXISTS alteracoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                execucao INTEGER NOT NULL,
+                dominio TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                campo TEXT NOT NULL,
+                antes TEXT,
+                depois TEXT,
+                em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alteracoes_execucao ON alteracoes(execucao, campo);
+            CREATE INDEX IF NOT EXISTS idx_alteracoes_produto ON alteracoes(dominio, chave, em);
+            CREATE INDEX IF NOT EXISTS idx_produtos_execucao ON produtos(ultima_execucao);
+        """)
+
+    # ------------------------------------------------------------------
+    # Execuções
+    # ------------------------------------------------------------------
+    def iniciar_execucao(self, origem: str = '', iniciada: Optional[float] = None) -> int:
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO execucoes (origem, iniciada) VALUES (?, ?)", (origem, iniciada or time.time())
+            )
+            return cursor.lastrowid
+
+    def finalizar_execucao(self, execucao: int):
+        with self._lock:
+            self.conn.execute("UPDATE execucoes SET finalizada=? WHERE id=?", (time.time(), execucao))
+
+    def execucoes(self, limite: int = 20) -> List[Dict]:
+        with self._lock:
+            linhas = self.conn.execute(
+                "SELECT id, origem, iniciada, finalizada, produtos, alterados, novos "
+                "FROM execucoes ORDER BY id DESC LIMIT ?", (limite,)
+            ).fetchall()
+        colunas = ('id', 'origem', 'iniciada', 'finalizada', 'produtos', 'alterados', 'novos')
+        return [dict(zip(colunas, linha)) for linha in linhas]
+
+    # ------------------------------------------------------------------
+    # Registro (upsert só do que mudou)
+    # ------------------------------------------------------------------
+    def _atuais(self, chaves: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple]:
+        """Estado atual das chaves (consultas em lote pela PK)."""
+        atuais: Dict[Tuple[str, str], Tuple] = {}
+        colunas = ', '.join(CAMPOS_MONITORADOS)
+        for i in range(0, len(chaves), LOTE_CONSULTA):
+            lote = chaves[i:i + LOTE_CONSULTA]
+            filtro = ' OR '.join(['(dominio=? AND chave=?)'] * len(lote))
+            params = [v for chave in lote for v in chave]
+            for linha in self.conn.execute(
+                f"SELECT dominio, chave, {colunas} FROM produtos WHERE {filtro}", params
+            ):
+                atuais[(linha[0], linha[1])] = linha[2:]
+        return atuais
+
+    def registrar(self, execucao: int, registros: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Grava um lote de produtos da execução.
+        Retorna {'produtos', 'novos', 'alterados', 'alteracoes'}.
+        """
+        normalizados: Dict[Tuple[str, str], Dict] = {}
+        for registro in registros:
+            if not registro.get('url') or registro.get('erro'):
+                continue
+            normalizado = normalizar_registro(registro)
+            normalizado['disponivel'] = (None if normalizado['disponivel'] is None
+                                         else int(normalizado['disponivel']))
+            normalizados[chave_produto(registro)] = normalizado  # Última ocorrência vence
+
+        novos, alterados, alteracoes, sem_mudanca = [], [], [], []
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Momento da coleta = início da execução (lotes gravados depois não "andam" no tempo)
+                linha = self.conn.execute("SELECT iniciada FROM execucoes WHERE id=?", (execucao,)).fetchone()
+                agora = linha[0] if linha else time.time()
+                atuais = self._atuais(list(normalizados))
+                for (dominio, chave), n in normalizados.items():
+                    atual = atuais.get((dominio, chave))
+                    valores = tuple(n[c] for c in CAMPOS_MONITORADOS)
+                    if atual is None:
+                        novos.append((dominio, chave, n['url'], *valores, execucao, execucao, agora))
+                        continue
+                    mudou = False
+                    for campo, antes, depois in zip(CAMPOS_MONITORADOS, atual, valores):
+                        # Campo ausente nesta coleta não apaga o valor conhecido
+                        if depois is None or _valor_comparavel(antes) == _valor_comparavel(depois):
+                            continue
+                        mudou = True
+                        alteracoes.append((execucao, dominio, chave, campo,
+                                           json.dumps(antes, ensure_ascii=False),
+                                           json.dumps(depois, ensure_ascii=False), agora))
+                    if mudou:
+                        alterados.append((n['url'], *[
+                            depois if depois is not None else antes
+                            for antes, depois in zip(atual, valores)
+                        ], execucao, agora, dominio, chave))
+                    else:
+                        sem_mudanca.append((execucao, dominio, chave))
+
+                colunas = ', '.join(CAMPOS_MONITORADOS)
+                marcadores = ', '.join('?' * len(CAMPOS_MONITORADOS))
+                self.conn.executemany(
+                    f"INSERT INTO produtos (dominio, chave, url, {colunas}, primeira_execucao, ultima_execucao, alterado_em) "
+                    f"VALUES (?, ?, ?, {marcadores}, ?, ?, ?)", novos
+                )
+                atribuicoes = ', '.join(f"{c}=?" for c in CAMPOS_MONITORADOS)
+                self.conn.executemany(
+                    f"UPDATE produtos SET url=?, {atribuicoes}, ultima_execucao=?, alterado_em=? "
+                    f"WHERE dominio=? AND chave=?", alterados
+                )
+                self.conn.executemany(
+                    "UPDATE produtos SET ultima_execucao=? WHERE dominio=? AND chave=?", sem_mudanca
+                )
+                self.conn.executemany(
+                    "INSERT INTO alteracoes (execucao, dominio, chave, campo, antes, depois, em) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", alteracoes
+                )
+                self.conn.execute(
+                    "UPDATE execucoes SET produtos=produtos+?, alterados=alterados+?, novos=novos+? WHERE id=?",
+                    (len(normalizados), len(alterados), len(novos), execucao)
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return {
+            'produtos': len(normalizados),
+            'novos': len(novos),
+            'alterados': len(alterados),
+            'alteracoes': len(alteracoes),
+        }
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def delta(
+        self,
+        desde_execucao: int,
+        ate_execucao: Optional[int] = None,
+        campos: Iterable[str] = ('preco', 'disponivel'),
+        dominio: Optional[str] = None
+    ) -> List[Dict]:
+        """Mudanças (campo a campo) nas execuções > desde_execucao."""
+        campos = list(campos)
+        sql = (
+            "SELECT a.execucao, a.dominio, a.chave, p.url, p.nome, a.campo, a.antes, a.depois, a.em "
+            "FROM alteracoes a JOIN produtos p ON p.dominio=a.dominio AND p.chave=a.chave "
+            "WHERE a.execucao > ?"
+        )
+        params: List = [desde_execucao]
+        if ate_execucao is not None:
+            sql += " AND a.execucao <= ?"
+            params.append(ate_execucao)
+        if campos:
+            sql += f" AND a.campo IN ({','.join('?' * len(campos))})"
+            params.extend(campos)
+        if dominio:
+            sql += " AND a.dominio=?"
+            params.append(dominio.lower())
+        sql += " ORDER BY a.execucao, a.dominio, a.chave, a.campo"
+
+        with self._lock:
+            linhas = self.conn.execute(sql, params).fetchall()
+        colunas = ('execucao', 'dominio', 'chave', 'url', 'nome', 'campo', 'antes', 'depois', 'em')
+        mudancas = []
+        for linha in linhas:
+            mudanca = dict(zip(colunas, linha))
+            mudanca['antes'] = json.loads(mudanca['antes'])
+            mudanca['depois'] = json.loads(mudanca['depois'])
+            mudancas.append(mudanca)
+        return mudancas
+
+    def novos(self, desde_execucao: int, dominio: Optional[str] = None) -> List[Dict]:
+        """Produtos vistos pela primeira vez após `desde_execucao`."""
+        sql = "SELECT dominio, chave, url, nome, preco, disponivel, primeira_execucao FROM produtos WHERE primeira_execucao > ?"
+        params: List = [desde_execucao]
+        if dominio:
+            sql += " AND dominio=?"
+            params.append(dominio.lower())
+        with self._lock:
+            linhas = self.conn.execute(sql, params).fetchall()
+        colunas = ('dominio', 'chave', 'url', 'nome', 'preco', 'disponivel', 'primeira_execucao')
+        return [dict(zip(colunas, linha)) for linha in linhas]
+
+    def historico_produto(self, url_ou_sku: str) -> List[Dict]:
+        """Linha do tempo de um produto (por URL ou 'sku:<id>')."""
+        with self._lock:
+            if url_ou_sku.startswith('sku:'):
+                chaves = self.conn.execute("SELECT dominio, chave FROM produtos WHERE chave=?", (url_ou_sku,)).fetchall()
+            else:
+                chaves = [chave_produto({'url': url_ou_sku})]
+                chaves += self.conn.execute("SELECT dominio, chave FROM produtos WHERE url=?", (url_ou_sku,)).fetchall()
+            linhas = []
+            for dominio, chave in dict.fromkeys(chaves):
+                linhas += self.conn.execute(
+                    "SELECT execucao, campo, antes, depois, em FROM alteracoes "
+                    "WHERE dominio=? AND chave=? ORDER BY em", (dominio, chave)
+                ).fetchall()
+        return [
+            {'execucao': execucao, 'campo': campo, 'antes': json.loads(antes), 'depois': json.loads(depois), 'em': em}
+            for execucao, campo, antes, depois, em in linhas
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+# ================================================================================================
+# MAIN
+# ================================================================================================
+def _exportar_delta(mudancas: List[Dict], saida: str):
+    if saida.endswith('.csv'):
+        with open(saida, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['execucao', 'dominio', 'chave', 'url', 'nome',
+                                                   'campo', 'antes', 'depois', 'em'])
+            writer.writeheader()
+            writer.writerows(mudancas)
+    else:
+        with open(saida, 'w', encoding='utf-8') as f:
+            for mudanca in mudancas:
+                f.write(json.dumps(mudanca, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de preços (SQLite)")
+    parser.add_argument('--db', default=DB_PADRAO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    importar = sub.add_parser('importar', help="Importa resultados antigos (uma execução por arquivo, por data)")
+    importar.add_argument('arquivos', nargs='+')
+
+    sub.add_parser('execucoes', help="Lista as últimas execuções")
+
+    delta = sub.add_parser('delta', help="Mudanças de preço/disponibilidade desde uma execução")
+    delta.add_argument('--desde', type=int, help="Id da execução base (padrão: penúltima)")
+    delta.add_argument('--ate', type=int)
+    delta.add_argument('--campos', default='preco,disponivel')
+    delta.add_argument('--dominio')
+    delta.add_argument('--saida', help="Arquivo .csv ou .ndjson (padrão: imprime)")
+
+    produto = sub.add_parser('produto', help="Linha do tempo de um produto")
+    produto.add_argument('url_ou_sku')
+
+    args = parser.parse_args()
+    historico = HistoricoPrecos(args.db)
+
+    if args.comando == 'importar':
+        for arquivo in sorted(args.arquivos, key=os.path.getmtime):
+            execucao = historico.iniciar_execucao(f"importar:{os.path.basename(arquivo)}", os.path.getmtime(arquivo))
+            resumo = historico.registrar(execucao, ler_registros(arquivo))
+            historico.finalizar_execucao(execucao)
+            print(f"📥 #{execucao} {arquivo}: {resumo['produtos']} produtos, "
+                  f"{resumo['novos']} novos, {resumo['alterados']} alterados")
+
+    elif args.comando == 'execucoes':
+        for e in historico.execucoes():
+            quando = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['iniciada']))
+            print(f"#{e['id']:<5} {quando}  {e['origem']:<40} {e['produtos']:>7} produtos "
+                  f"{e['novos']:>6} novos {e['alterados']:>6} alterados")
+
+    elif args.comando == 'delta':
+        desde = args.desde
+        if desde is None:
+            ultimas = historico.execucoes(2)
+            desde = ultimas[-1]['id'] if len(ultimas) == 2 else 0
+        campos = [c.strip() for c in args.campos.split(',') if c.strip()]
+        mudancas = historico.delta(desde, args.ate, campos, args.dominio)
+        if args.saida:
+            _exportar_delta(mudancas, args.saida)
+            print(f"💾 {len(mudancas)} mudanças desde #{desde} → {args.saida}")
+        else:
+            for m in mudancas:
+                print(f"#{m['execucao']} {m['campo']:<10} {m['antes']} → {m['depois']}  {m['url']}")
+            print(f"📊 {len(mudancas)} mudanças desde #{desde}")
+
+    elif args.comando == 'produto':
+        for a in historico.historico_produto(args.url_ou_sku):
+            quando = time.strftime('%Y-%m-%d %H:%M', time.localtime(a['em']))
+            print(f"{quando} #{a['execucao']} {a['campo']}: {a['antes']} → {a['depois']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+JOURNAL DE RESULTADOS - Append-only NDJSON com fsync em lote
+=============================================================
+
+Substitui os checkpoints que reescreviam a lista inteira de produtos a cada N
+itens (checkpoint_10.json, checkpoint_20.json, ... → O(N²) bytes por run).
+
+- Cada produto é gravado UMA vez, no momento em que é extraído (1 linha NDJSON)
+- flush + fsync em lote: a cada `fsync_registros` registros ou `fsync_segundos`
+- Custo por registro constante, independente do tamanho do crawl
+- Cauda truncada (crash no meio de uma linha) é reparada ao reabrir
+- Compactação: mantém só o último registro de cada chave (ex: URL re-extraída
+  em retry/resume), reescrevendo em arquivo temporário + os.replace (atômico)
+
+Uso:
+    journal = JournalResultados("produtos.ndjson.journal")
+    journal.append(produto)        # barato, não bloqueia em disco
+    journal.flush()                # checkpoint durável (fsync)
+    journal.compactar("produtos.ndjson")
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+FSYNC_REGISTROS = 50        # fsync a cada N registros...
+FSYNC_SEGUNDOS = 5.0        # ...ou a cada N segundos (o que vier primeiro)
+COMPACTAR_PROPORCAO = 2.0   # Compacta quando linhas >= 2x registros únicos
+
+
+# ================================================================================================
+# LEITURA
+# ================================================================================================
+def ler_journal(path: str) -> Iterator[Dict]:
+    """Lê registros do journal, ignorando linha final truncada/corrompida."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+
+
+def _reparar_cauda(path: str) -> None:
+    """Remove a última linha se ela não terminar em '\\n' (escrita interrompida)."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        tamanho = f.tell()
+        if tamanho == 0:
+            return
+        f.seek(tamanho - 1)
+        if f.read(1) == b'\n':
+            return
+
+        # Procura o último '\n' de trás para frente, em blocos
+        posicao = tamanho
+        bloco = 4096
+        while posicao > 0:
+            inicio = max(0, posicao - bloco)
+            f.seek(inicio)
+            dados = f.read(posicao - inicio)
+            idx = dados.rfind(b'\n')
+            if idx != -1:
+                f.truncate(inicio + idx + 1)
+                return
+            posicao = inicio
+        f.truncate(0)
+
+
+# ================================================================================================
+# JOURNAL
+# ================================================================================================
+class JournalResultados:
+    """
+    Journal append-only de resultados (NDJSON).
+
+    Args:
+        path: arquivo do journal (aberto em modo append - runs retomados continuam nele)
+        chave: campo usado para deduplicar na compactação (None = sem dedup)
+        fsync_registros / fsync_segundos: política de fsync em lote
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chave: Optional[str] = 'url',
+        fsync_registros: int = FSYNC_REGISTROS,
+        fsync_segundos: float = FSYNC_SEGUNDOS
+    ):
+        self.path = path
+        self.chave = chave
+        self.fsync_registros = fsync_registros
+        self.fsync_segundos = fsync_segundos
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        _reparar_cauda(path)
+
+        # Chaves já presentes (de runs anteriores) - usado para decidir compactação
+        self.linhas = 0
+        self.chaves = set()
+        for registro in ler_journal(path):
+            self.linhas += 1
+            if self.chave:
+                self.chaves.add(registro.get(self.chave))
+
+        self._arquivo = open(path, 'a', encoding='utf-8')
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+        self.stats = {'registros': 0, 'fsyncs': 0, 'compactacoes': 0}
+
+    def __len__(self) -> int:
+        """Registros únicos (ou linhas, sem chave)."""
+        return len(self.chaves) if self.chave else self.linhas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def append(self, registro: Dict) -> None:
+        """Grava um registro (1 linha). fsync só quando a política de lote mandar."""
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self.linhas += 1
+        self._pendentes += 1
+        self.stats['registros'] += 1
+        if self.chave:
+            self.chaves.add(registro.get(self.chave))
+
+        if (self._pendentes >= self.fsync_registros or
+                time.monotonic() - self._ultimo_fsync >= self.fsync_segundos):
+            self.flush()
+
+    def append_many(self, registros: List[Dict]) -> None:
+        for registro in registros:
+            self.append(registro)
+
+    def flush(self, sync: bool = True) -> None:
+        """Esvazia buffer e (opcional) faz fsync - ponto de checkpoint durável."""
+        if self._arquivo.closed:
+            return
+        self._arquivo.flush()
+        if sync and self._pendentes:
+            os.fsync(self._arquivo.fileno())
+            self.stats['fsyncs'] += 1
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def precisa_compactar(self, minimo_linhas: int = 1000) -> bool:
+        """Há duplicatas suficientes para valer a reescrita?"""
+        if not self.chave or self.linhas < minimo_linhas:
+            return False
+        return self.linhas >= COMPACTAR_PROPORCAO * max(1, len(self.chaves))
+
+    def compactar(self, destino: Optional[str] = None) -> int:
+        """
+        Reescreve mantendo apenas o último registro de cada chave.
+
+        destino=None compacta o próprio journal (e continua aceitando appends);
+        com destino, gera o arquivo final e deixa o journal intacto.
+
+        Returns:
+            número de registros escritos
+        """
+        self.flush()
+
+        ultimos: Dict = {}
+        sem_chave: List[Dict] = []
+        for registro in ler_journal(self.path):
+            if self.chave and registro.get(self.chave) is not None:
+                ultimos.pop(registro[self.chave], None)  # Reinsere no fim (ordem do último)
+                ultimos[registro[self.chave]] = registro
+            else:
+                sem_chave.append(registro)
+        registros = sem_chave + list(ultimos.values())
+
+        alvo = destino or self.path
+        tmp = f"{alvo}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        if destino is None:
+            self._arquivo.close()
+            os.replace(tmp, self.path)
+            self._arquivo = open(self.path, 'a', encoding='utf-8')
+            self.linhas = len(registros)
+        else:
+            os.replace(tmp, destino)
+
+        self.stats['compactacoes'] += 1
+        return len(registros)
+
+    def limpar(self) -> None:
+        """Descarta todo o conteúdo (novo crawl do zero)."""
+        self._arquivo.close()
+        self._arquivo = open(self.path, 'w', encoding='utf-8')
+        self.linhas = 0
+        self.chaves.clear()
+        self._pendentes = 0
+
+    def close(self) -> None:
+        if not self._arquivo.closed:
+            self.flush()
+            self._arquivo.close()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+MÉTRICAS - Endpoint HTTP no formato texto do Prometheus para crawls longos
+==========================================================================
+
+Crawls de horas só tinham as linhas de print com emoji como visibilidade.
+Este módulo (só stdlib) expõe contadores/medidores/histogramas em
+http://127.0.0.1:<porta>/metrics a partir de qualquer processo de crawl.
+
+- Requests, bytes e status por host: `event_hooks_metricas()` /
+  `event_hooks_metricas_async()` nos clientes httpx (bytes contados no stream
+  da resposta, ou seja, como vieram no fio)
+- Produtos por plataforma: `contar_produtos(plataforma)` → contador
+  crawler_produtos_total + medidor crawler_produtos_por_segundo
+- Taxas por estratégia (ex: ExtractorHibrido.stats), retries por 429, setpoints de limiters
+  (rate_limiter / autoscaler / circuit breaker) e profundidade de fila:
+  `registrar_coletor(nome, funcao)` - a função roda a cada scrape;
+  `coletores_execucao(...)` registra por chamada (id com host + nº da execução)
+  e remove ao terminar
+- Histogramas de fase por host (conexão, TLS, TTFB, download, parse, filas)
+  vêm do timing_requests.py, sem custo extra
+- Servidor: `iniciar_servidor_metricas(porta)` (idempotente) ou
+  `iniciar_se_configurado()` com a variável de ambiente METRICAS_PORTA
+
+Uso:
+    METRICAS_PORTA=9108 streamlit run quintapp.py
+    METRICAS_PORTA=9108 python extract_production_v2.py urls.txt saida.ndjson
+    curl -s localhost:9108/metrics | grep crawler_produtos
+"""
+
+import contextlib
+import itertools
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+PORTA_PADRAO = 9108
+ENV_PORTA = 'METRICAS_PORTA'
+PREFIXO = 'crawler_'
+
+RE_NOME_INVALIDO = re.compile(r'[^a-zA-Z0-9_]')
+
+# (nome, tipo, ajuda, labels, valor)
+Amostra = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _host(url: Optional[str]) -> str:
+    if not url:
+        return 'default'
+    return (urlparse(url).netloc if '://' in url else url).lower() or 'default'
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_valor(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# ================================================================================================
+# REGISTRO
+# ================================================================================================
+class RegistroMetricas:
+    """Contadores/medidores com labels + coletores chamados a cada scrape (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._meta: Dict[str, Tuple[str, str]] = {}  # nome → (tipo, ajuda)
+        self._coletores: Dict[str, Callable[[], Iterable[Amostra]]] = {}
+        self.inicio = time.time()
+
+    def _declarar(self, nome: str, tipo: str, ajuda: str):
+        if nome not in self._meta:
+            self._meta[nome] = (tipo, ajuda)
+            self._valores[nome] = {}
+
+    def inc(self, nome: str, valor: float = 1.0, ajuda: str = '', **labels):
+        chave = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._declarar(nome, 'counter', ajuda)
+            serie = self._valores[nome]
+            serie[chave] = serie.get(chave, 0.0) + valor
+
+    def set(self, nome: str, valor: float, ajuda: str = '', **labels):
+        chave = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._declarar(nome, 'gauge', ajuda)
+            self._valores[nome][chave] = float(valor)
+
+    def valor(self, nome: str, **labels) -> float:
+        chave = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            return self._valores.get(nome, {}).get(chave, 0.0)
+
+    def registrar_coletor(self, nome: str, funcao: Callable[[], Iterable[Amostra]]):
+        """Mesmo nome substitui o coletor anterior (ex: autoscaler de uma nova execução)"""
+        with self._lock:
+            self._coletores[nome] = funcao
+
+    def remover_coletor(self, nome: str):
+        with self._lock:
+            self._coletores.pop(nome, None)
+
+    def amostras(self) -> List[Amostra]:
+        with self._lock:
+            amostras = [
+                (nome, self._meta[nome][0], self._meta[nome][1], dict(chave), valor)
+                for nome, serie in self._valores.items()
+                for chave, valor in serie.items()
+            ]
+            coletores = list(self._coletores.items())
+        for nome_coletor, funcao in coletores:
+            try:
+                amostras.extend(funcao())
+            except Exception as e:
+                amostras.append((f'{PREFIXO}coletor_erros', 'gauge', 'Coletor que falhou no último scrape',
+                                 {'coletor': nome_coletor, 'erro': type(e).__name__}, 1))
+        return amostras
+
+    def expor(self) -> str:
+        """Formato texto 0.0.4 do Prometheus (HELP/TYPE uma vez por família)"""
+        familias: Dict[str, List[Amostra]] = {}
+        for amostra in self.amostras():
+            nome = RE_NOME_INVALIDO.sub('_', amostra[0])
+            # Séries _bucket/_sum/_count pertencem à família do histograma
+            base = re.sub(r'_(bucket|sum|count)$', '', nome) if amostra[1] == 'histogram' else nome
+            familias.setdefault(base, []).append((nome,) + amostra[1:])
+        linhas = []
+        for base, amostras in familias.items():
+            _, tipo, ajuda, _, _ = amostras[0]
+            if ajuda:
+                linhas.append(f'# HELP {base} {ajuda}')
+            linhas.append(f'# TYPE {base} {tipo}')
+            for nome, _, _, labels, valor in amostras:
+                rotulos = ','.join(f'{RE_NOME_INVALIDO.sub("_", k)}="{_escapar(v)}"' for k, v in labels.items())
+                linhas.append(f'{nome}{{{rotulos}}} {_formatar_valor(valor)}' if rotulos else f'{nome} {_formatar_valor(valor)}')
+        return '\n'.join(linhas) + '\n'
+
+
+_registro: Optional[RegistroMetricas] = None
+_registro_lock = threading.Lock()
+
+
+def obter_metricas() -> RegistroMetricas:
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroMetricas()
+            _registrar_coletores_padrao(_registro)
+        return _registro
+
+
+def registrar_coletor(nome: str, funcao: Callable[[], Iterable[Amostra]]):
+    obter_metricas().registrar_coletor(nome, funcao)
+
+
+def remover_coletor(nome: str):
+    obter_metricas().remover_coletor(nome)
+
+
+_execucoes = itertools.count(1)
+
+
+def id_execucao(origem: str, hosts: Iterable[str]) -> str:
+    """'detailsv8@loja.com#3': chamadas simultâneas (plataformas do quintapp) não se sobrescrevem"""
+    return f"{origem}@{'+'.join(sorted(filter(None, hosts))) or '*'}#{next(_execucoes)}"
+
+
+@contextlib.contextmanager
+def coletores_execucao(coletores: Dict[str, Callable[[], Iterable[Amostra]]]):
+    """Registra os coletores de uma chamada e remove no fim (série some do /metrics)"""
+    for nome, funcao in coletores.items():
+        registrar_coletor(nome, funcao)
+    try:
+        yield
+    finally:
+        for nome in coletores:
+            remover_coletor(nome)
+
+
+# ================================================================================================
+# PRODUTOS E ESTRATÉGIAS
+# ================================================================================================
+_primeiro_produto: Dict[str, float] = {}
+
+
+def contar_produtos(plataforma: Optional[str], n: int = 1):
+    plataforma = _host(plataforma)
+    _primeiro_produto.setdefault(plataforma, time.time())
+    obter_metricas().inc(f'{PREFIXO}produtos_total', n, 'Produtos extraídos', plataforma=plataforma)
+
+
+def _coletar_produtos_por_segundo() -> Iterable[Amostra]:
+    registro = obter_metricas()
+    agora = time.time()
+    for plataforma, inicio in list(_primeiro_produto.items()):
+        total = registro.valor(f'{PREFIXO}produtos_total', plataforma=plataforma)
+        decorrido = max(agora - inicio, 1.0)  # Piso de 1s: evita taxa absurda logo no primeiro produto
+        yield (f'{PREFIXO}produtos_por_segundo', 'gauge', 'Média de produtos/s desde o primeiro produto da plataforma',
+               {'plataforma': plataforma}, round(total / decorrido, 4))
+
+
+def coletor_estrategias(origem: str, stats: Callable[[], Dict[str, float]]) -> Callable[[], Iterable[Amostra]]:
+    """Dict de contadores por método (ex: ExtractorHibrido.stats) → crawler_estrategia_total + taxa"""
+    def coletar():
+        valores = {k: v for k, v in stats().items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        total = sum(valores.values())
+        for metodo, valor in valores.items():
+            yield (f'{PREFIXO}estrategia_total', 'counter', 'Extrações por método/estratégia',
+                   {'origem': origem, 'metodo': metodo}, valor)
+            yield (f'{PREFIXO}estrategia_taxa', 'gauge', 'Fração das extrações por método',
+                   {'origem': origem, 'metodo': metodo}, round(valor / total, 4) if total else 0.0)
+    return coletar
+
+
+def coletor_retries_429(origem: str, total: Callable[[], int]) -> Callable[[], Iterable[Amostra]]:
+    """Retries por 429 fora das estratégias (não são extrações) → crawler_retries_429_total"""
+    def coletar():
+        yield (f'{PREFIXO}retries_429_total', 'counter', 'Retries por HTTP 429', {'origem': origem}, total())
+    return coletar
+
+
+def coletor_setpoints(componente: str, setpoints: Callable[[], Dict[str, Dict]],
+                      metrica: str = 'limiter') -> Callable[[], Iterable[Amostra]]:
+    """Dict por host (setpoints() de rate_limiter/autoscaler, resumo() do breaker/cache)
+    → crawler_<metrica>{componente,host,campo}; campos textuais viram crawler_<metrica>_estado"""
+    def coletar():
+        for host, campos in setpoints().items():
+            for campo, valor in campos.items():
+                if isinstance(valor, bool):
+                    valor = int(valor)
+                if isinstance(valor, (int, float)):
+                    yield (f'{PREFIXO}{metrica}', 'gauge', f'Estado por host ({metrica})',
+                           {'componente': componente, 'host': host, 'campo': campo}, valor)
+                else:
+                    yield (f'{PREFIXO}{metrica}_estado', 'gauge', f'Estado textual por host ({metrica}), 1 = atual',
+                           {'componente': componente, 'host': host, 'campo': campo, 'valor': valor}, 1)
+    return coletar
+
+
+def coletor_fila(nome: str, stats: Callable[[], Dict[str, int]]) -> Callable[[], Iterable[Amostra]]:
+    """get_stats() de fila (pending/in_progress/completed/failed) → crawler_fila{fila,estado}"""
+    def coletar():
+        for estado, valor in stats().items():
+            yield (f'{PREFIXO}fila', 'gauge', 'Requests na fila por estado', {'fila': nome, 'estado': estado}, valor)
+    return coletar
+
+
+def _coletar_tempos() -> Iterable[Amostra]:
+    """Histogramas do timing_requests.py (ms) → histograma Prometheus em segundos"""
+    from timing_requests import LIMITES_MS, obter_registro_tempos
+    nome = f'{PREFIXO}fase_duracao_segundos'
+    ajuda = 'Duração por fase de request (fila, conexão, TLS, TTFB, download, parse)'
+    for host, fases in obter_registro_tempos().histogramas().items():
+        for fase, (buckets, n, soma_ms) in fases.items():
+            acumulado = 0
+            for limite, contagem in zip(list(LIMITES_MS) + [float('inf')], buckets):
+                acumulado += contagem
+                le = '+Inf' if limite == float('inf') else _formatar_valor(limite / 1000)
+                yield (f'{nome}_bucket', 'histogram', ajuda, {'host': host, 'fase': fase, 'le': le}, acumulado)
+            yield (f'{nome}_sum', 'histogram', ajuda, {'host': host, 'fase': fase}, round(soma_ms / 1000, 6))
+            yield (f'{nome}_count', 'histogram', ajuda, {'host': host, 'fase': fase}, n)
+
+
+def _registrar_coletores_padrao(registro: RegistroMetricas):
+    from circuit_breaker import obter_circuit_breaker
+    registro.registrar_coletor('produtos_por_segundo', _coletar_produtos_por_segundo)
+    registro.registrar_coletor('tempos', _coletar_tempos)
+    registro.registrar_coletor('circuit_breaker', coletor_setpoints('circuit_breaker', obter_circuit_breaker().resumo))
+    registro.registrar_coletor('processo', lambda: [
+        (f'{PREFIXO}uptime_segundos', 'gauge', 'Segundos desde o início das métricas', {}, round(time.time() - registro.inicio, 1)),
+        (f'{PREFIXO}threads', 'gauge', 'Threads vivas no processo', {}, threading.active_count()),
+    ])
+
+
+# ================================================================================================
+# HOOKS HTTPX
+# ================================================================================================
+class _StreamContado(httpx.SyncByteStream):
+    def __init__(self, stream, host: str):
+        self.stream = stream
+        self.host = host
+
+    def __iter__(self):
+        for chunk in self.stream:
+            obter_metricas().inc(f'{PREFIXO}response_bytes_total', len(chunk), 'Bytes de resposta recebidos', host=self.host)
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+
+
+class _StreamContadoAsync(httpx.AsyncByteStream):
+    def __init__(self, stream, host: str):
+        self.stream = stream
+        self.host = host
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            obter_metricas().inc(f'{PREFIXO}response_bytes_total', len(chunk), 'Bytes de resposta recebidos', host=self.host)
+            yield chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+
+def _contar_resposta(response: httpx.Response) -> str:
+    host = _host(str(response.request.url))
+    obter_metricas().inc(f'{PREFIXO}requests_total', 1, 'Requests HTTP por host e status',
+                         host=host, status=response.status_code)
+    return host
+
+
+def _corpo_ja_lido(response: httpx.Response, host: str) -> bool:
+    """Hook anterior (ex: arquivo_respostas) já leu o corpo: conta os bytes lidos do fio"""
+    if not hasattr(response, '_content'):
+        return False
+    obter_metricas().inc(f'{PREFIXO}response_bytes_total', response.num_bytes_downloaded,
+                         'Bytes de resposta recebidos', host=host)
+    return True
+
+
+def event_hooks_metricas() -> Dict[str, list]:
+    """event_hooks para httpx.Client"""
+    def resposta(response):
+        host = _contar_resposta(response)
+        if not _corpo_ja_lido(response, host):
+            response.stream = _StreamContado(response.stream, host)
+    return {'response': [resposta]}
+
+
+def event_hooks_metricas_async() -> Dict[str, list]:
+    """event_hooks para httpx.AsyncClient"""
+    async def resposta(response):
+        host = _contar_resposta(response)
+        if not _corpo_ja_lido(response, host):
+            response.stream = _StreamContadoAsync(response.stream, host)
+    return {'response': [resposta]}
+
+
+# ================================================================================================
+# SERVIDOR
+# ================================================================================================
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if urlparse(self.path).path not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        corpo = obter_metricas().expor().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+_servidor: Optional[ThreadingHTTPServer] = None
+_servidor_lock = threading.Lock()
+
+
+def iniciar_servidor_metricas(porta: Optional[int] = None, host: str = '127.0.0.1') -> int:
+    """Sobe /metrics numa thread daemon (uma vez por processo). Retorna a porta."""
+    global _servidor
+    with _servidor_lock:
+        if _servidor is None:
+            porta = porta if porta is not None else int(os.environ.get(ENV_PORTA, PORTA_PADRAO))
+            obter_metricas()
+            _servidor = ThreadingHTTPServer((host, porta), _Handler)
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, daemon=True, name='metricas').start()
+            print(f"📈 Métricas em http://{host}:{_servidor.server_address[1]}/metrics")
+        return _servidor.server_address[1]
+
+
+def iniciar_se_configurado() -> Optional[int]:
+    """Sobe o servidor só se METRICAS_PORTA estiver definida"""
+    if os.environ.get(ENV_PORTA):
+        try:
+            return iniciar_servidor_metricas()
+        except OSError as e:
+            print(f"⚠️ Métricas indisponíveis ({ENV_PORTA}={os.environ[ENV_PORTA]}): {e}")
+    return None
+
+
+if __name__ == '__main__':
+    porta = iniciar_servidor_metricas()
+    print("Ctrl+C para sair")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+MOCK E-COMMERCE - Servidor local com as fixtures gravadas + injeção de falhas
+=============================================================================
+
+teste_limites.py e test_baseline_control.py medem vazão contra sites reais:
+lento, não reproduzível e ainda gera 429 de verdade. Este servidor (só stdlib)
+serve as páginas e APIs capturadas no repo para medir vazão e backoff de forma
+determinística.
+
+- Páginas: /produto/<fixture>[-N] (e alias VTEX /<fixture>[-N]/p) servem
+  <fixture>.html; --replicas N multiplica as URLs sobre as mesmas fixtures
+- /sitemap.xml (urlset com todas as URLs de produto) e / (home com links)
+- APIs: /api/<nome> serve <nome>.json (api_matcon_*, api_product_response,
+  mhstudios_api_real, ...)
+- Latência: fixa:S | uniforme:A,B | exponencial:MEDIA | lognormal:MU,SIGMA
+- Falhas por probabilidade: 429 e 503 (com Retry-After), queda de conexão
+  (socket fechado sem resposta)
+- --rps: limite por IP com token bucket → 429 + Retry-After ao estourar
+  (exercita circuit_breaker / autoscaler como um site real)
+- Determinístico: a decisão de falha de cada request vem de
+  hash(seed, path, nº da tentativa nesse path) - independe da ordem das threads
+- /__stats (contadores JSON) e POST /__reset
+
+Uso:
+    python mock_server.py --porta 8765 --latencia lognormal:-3,0.5 --p429 0.05 --p503 0.02 --pqueda 0.01
+    python mock_server.py --replicas 20 --urls-arquivo urls_mock.txt
+    python teste_limites.py urls_mock.txt
+
+Em código:
+    with MockServer(ConfigMock(p429=0.1)) as srv:
+        extrair_detalhes_paralelo([{'url': u} for u in srv.urls_produtos()], print)
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Páginas de debug/busca/home ficam de fora: não são páginas de produto
+FIXTURES_PRODUTO = [
+    'dermo_produto', 'dermo_minoxidil', 'katsukazan_produto', 'magnumauto_rendered',
+    'mhstudios_produto', 'mhstudios_produto_real', 'petrizi_produto', 'sacada_produto_debug',
+    'cebmodas_produto', 'artistasdomundo_produto_kit', 'matcon_debug', 'debug_produto',
+]
+PADROES_API = ['api_matcon_*.json', 'api_product_response.json', 'api_response_example.json',
+               'mhstudios_api_real.json', 'product_basic.json']
+
+
+@dataclass
+class ConfigMock:
+    """Parâmetros do servidor (tudo opcional - padrão é um site rápido e saudável)"""
+    porta: int = 0                   # 0 = porta livre escolhida pelo SO
+    host: str = '127.0.0.1'
+    latencia: str = 'fixa:0'         # fixa:S | uniforme:A,B | exponencial:MEDIA | lognormal:MU,SIGMA
+    p429: float = 0.0
+    p503: float = 0.0
+    pqueda: float = 0.0              # conexão derrubada sem resposta
+    retry_after: float = 1.0         # segundos no header Retry-After (0 = sem header)
+    rps: Optional[float] = None      # limite por IP (token bucket, rajada = rps)
+    replicas: int = 1                # URLs por fixture
+    seed: int = 42
+
+
+def amostrar_latencia(spec: str, rng: random.Random) -> float:
+    tipo, _, args = spec.partition(':')
+    valores = [float(v) for v in args.split(',') if v.strip()] if args else []
+    if tipo == 'fixa':
+        return valores[0] if valores else 0.0
+    if tipo == 'uniforme':
+        return rng.uniform(valores[0], valores[1])
+    if tipo == 'exponencial':
+        return rng.expovariate(1 / valores[0]) if valores[0] > 0 else 0.0
+    if tipo == 'lognormal':
+        return math.exp(rng.gauss(valores[0], valores[1]))
+    raise ValueError(f"Latência desconhecida: {spec}")
+
+
+class _BaldeTokens:
+    """Token bucket por IP (thread-safe)"""
+
+    def __init__(self, rps: float):
+        self.rps = rps
+        self._lock = threading.Lock()
+        self._baldes: Dict[str, List[float]] = {}
+
+    def consumir(self, ip: str) -> bool:
+        agora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._baldes.get(ip, [self.rps, agora])
+            tokens = min(self.rps, tokens + (agora - ultimo) * self.rps)
+            ok = tokens >= 1
+            self._baldes[ip] = [tokens - 1 if ok else tokens, agora]
+            return ok
+
+
+# ================================================================================================
+# SERVIDOR
+# ================================================================================================
+class MockServer:
+    """Servidor HTTP em thread própria; usável como context manager."""
+
+    def __init__(self, config: Optional[ConfigMock] = None, diretorio: str = DIRETORIO):
+        self.config = config or ConfigMock()
+        self.paginas: Dict[str, str] = {}
+        self.apis: Dict[str, str] = {}
+        self._cache_corpo: Dict[str, bytes] = {}
+        self._tentativas: Counter = Counter()
+        self._stats: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._balde = _BaldeTokens(self.config.rps) if self.config.rps else None
+
+        for stem in FIXTURES_PRODUTO:
+            caminho = os.path.join(diretorio, f'{stem}.html')
+            if not os.path.exists(caminho):
+                continue
+            for i in range(self.config.replicas):
+                slug = stem if i == 0 else f'{stem}-{i}'
+                self.paginas[slug] = caminho
+        for padrao in PADROES_API:
+            for caminho in glob.glob(os.path.join(diretorio, padrao)):
+                self.apis[os.path.splitext(os.path.basename(caminho))[0]] = caminho
+
+        self.httpd = ThreadingHTTPServer((self.config.host, self.config.porta), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self.httpd.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    def urls_produtos(self) -> List[str]:
+        return [f'{self.url}/produto/{slug}' for slug in self.paginas]
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'total': {k: sum(c[k] for c in self._stats.values()) for k in ('requests', '200', '404', '429', '503', 'queda', 'limite_rps')},
+                'por_path': {p: dict(c) for p, c in self._stats.items()},
+                'config': asdict(self.config),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._tentativas.clear()
+
+    # --- decisão por request -----------------------------------------------------------------
+    def _rng(self, path: str) -> random.Random:
+        """RNG derivado de (seed, path, tentativa) - mesmo roteiro de falhas a cada execução"""
+        with self._lock:
+            self._tentativas[path] += 1
+            n = self._tentativas[path]
+        semente = hashlib.blake2b(f'{self.config.seed}:{path}:{n}'.encode(), digest_size=8).digest()
+        return random.Random(int.from_bytes(semente, 'big'))
+
+    def _contar(self, path: str, chave: str):
+        with self._lock:
+            self._stats[path][chave] += 1
+
+    def _corpo(self, caminho: str) -> bytes:
+        corpo = self._cache_corpo.get(caminho)
+        if corpo is None:
+            with open(caminho, 'rb') as f:
+                corpo = self._cache_corpo[caminho] = f.read()
+        return corpo
+
+    def _rotear(self, path: str):
+        """path → (status, content-type, corpo)"""
+        if path in ('', '/'):
+            links = '\n'.join(f'<a href="/produto/{s}">{s}</a>' for s in self.paginas)
+            return 200, 'text/html; charset=utf-8', f'<html><body>{links}</body></html>'.encode()
+        if path == '/sitemap.xml':
+            locs = ''.join(f'<url><loc>{u}</loc></url>' for u in self.urls_produtos())
+            xml = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+            return 200, 'application/xml', xml.encode()
+        partes = [p for p in path.split('/') if p]
+        slug = None
+        if len(partes) == 2 and partes[0] == 'produto':
+            slug = partes[1]
+        elif len(partes) == 2 and partes[1] == 'p':
+            slug = partes[0]
+        if slug in self.paginas:
+            return 200, 'text/html; charset=utf-8', self._corpo(self.paginas[slug])
+        if len(partes) == 2 and partes[0] == 'api' and partes[1] in self.apis:
+            return 200, 'application/json', self._corpo(self.apis[partes[1]])
+        return 404, 'text/html; charset=utf-8', b'<html><body><h1>404 - Pagina nao encontrada</h1></body></html>'
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, com_corpo: bool):
+                path = urlparse(self.path).path
+                if path == '/__stats':
+                    return self._enviar(200, 'application/json', json.dumps(servidor.stats()).encode(), com_corpo)
+
+                cfg = servidor.config
+                servidor._contar(path, 'requests')
+                rng = servidor._rng(path)
+                time.sleep(amostrar_latencia(cfg.latencia, rng))
+
+                if servidor._balde and not servidor._balde.consumir(self.client_address[0]):
+                    servidor._contar(path, 'limite_rps')
+                    servidor._contar(path, '429')
+                    return self._enviar(429, 'text/plain', b'Too Many Requests', com_corpo, retry_after=True)
+
+                sorteio = rng.random()
+                if sorteio < cfg.pqueda:
+                    servidor._contar(path, 'queda')
+                    try:
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    self.close_connection = True
+                    return
+                sorteio -= cfg.pqueda
+                if sorteio < cfg.p429:
+                    servidor._contar(path, '429')
+                    return self._enviar(429, 'text/plain', b'Too Many Requests', com_corpo, retry_after=True)
+                sorteio -= cfg.p429
+                if sorteio < cfg.p503:
+                    servidor._contar(path, '503')
+                    return self._enviar(503, 'text/plain', b'Service Unavailable', com_corpo, retry_after=True)
+
+                status, tipo, corpo = servidor._rotear(path)
+                servidor._contar(path, str(status))
+                self._enviar(status, tipo, corpo, com_corpo)
+
+            def _enviar(self, status: int, tipo: str, corpo: bytes, com_corpo: bool, retry_after: bool = False):
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(corpo)))
+                if retry_after and servidor.config.retry_after:
+                    self.send_header('Retry-After', f'{servidor.config.retry_after:g}')
+                self.end_headers()
+                if com_corpo:
+                    self.wfile.write(corpo)
+
+            def do_GET(self):
+                self._responder(True)
+
+            def do_HEAD(self):
+                self._responder(False)
+
+            def do_POST(self):
+                if urlparse(self.path).path == '/__reset':
+                    servidor.reset()
+                    return self._enviar(204, 'text/plain', b'', False)
+                self._enviar(405, 'text/plain', b'Method Not Allowed', True)
+
+        return Handler
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description='Mock e-commerce local com injeção de falhas')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--latencia', default='fixa:0', help='fixa:S | uniforme:A,B | exponencial:MEDIA | lognormal:MU,SIGMA')
+    parser.add_argument('--p429', type=float, default=0.0)
+    parser.add_argument('--p503', type=float, default=0.0)
+    parser.add_argument('--pqueda', type=float, default=0.0, help='Probabilidade de derrubar a conexão')
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--rps', type=float, help='Limite de requests/s por IP (429 ao estourar)')
+    parser.add_argument('--replicas', type=int, default=1, help='URLs por fixture')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--urls-arquivo', help='Grava as URLs de produto (uma por linha)')
+    args = parser.parse_args()
+
+    config = ConfigMock(porta=args.porta, host=args.host, latencia=args.latencia, p429=args.p429,
+                        p503=args.p503, pqueda=args.pqueda, retry_after=args.retry_after,
+                        rps=args.rps, replicas=args.replicas, seed=args.seed)
+    servidor = MockServer(config)
+    urls = servidor.urls_produtos()
+    if args.urls_arquivo:
+        with open(args.urls_arquivo, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(urls) + '\n')
+        print(f"💾 {len(urls)} URLs em {args.urls_arquivo}")
+
+    print(f"🛒 Mock em {servidor.url} - {len(servidor.paginas)} páginas, {len(servidor.apis)} APIs")
+    print(f"   latência={config.latencia} 429={config.p429:.0%} 503={config.p503:.0%} queda={config.pqueda:.0%}"
+          + (f" rps={config.rps:g}" if config.rps else ''))
+    print(f"   {servidor.url}/sitemap.xml · {servidor.url}/__stats")
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.httpd.server_close()
+        print(f"\n📊 {json.dumps(servidor.stats()['total'])}")
+
+
+if __name__ == '__main__':
+    main()
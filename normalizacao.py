@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+NORMALIZAÇÃO - Preço/moeda/disponibilidade/timestamp tipados + export Parquet/Arrow
+====================================================================================
+
+Cada extrator entrega o preço de um jeito: 'R$ 29.90' (sacada, katsukazan,
+dermo), '2.706,38' (matcon fallback HTML), float (petrizi, 0.0 = sem preço),
+str(preco) do JSON-LD (v8). Quem analisa precisava re-parsear tudo.
+
+- Etapa em lote e vetorizada (pyarrow.compute) sobre o lote inteiro:
+    preco, preco_original → float64 (vírgula decimal BR, milhar com ponto, ≤ 0 → null)
+    moeda                 → 'BRL'/'USD'/'EUR' (campo do extrator ou símbolo no preço)
+    disponivel            → bool (schema.org InStock/OutOfStock, "esgotado", ...)
+    extraido_em           → timestamp (sem valor = momento da coleta)
+- Schema estável (SCHEMA_PRODUTO) para todas as plataformas; campos fora do
+  schema vão como JSON em `extras`; preço original em texto fica em `preco_bruto`
+- Export Parquet (particionado por plataforma: `host=<host>/`) ou Arrow IPC (.arrow/.feather)
+- Sem pyarrow: `normalizar_registros` faz a mesma conversão registro a registro
+
+Uso:
+    python normalizacao.py resultados.json dados/ --plataforma www.sacada.com
+    python normalizacao.py produtos.ndjson produtos.arrow
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from sinks import PYARROW_DISPONIVEL, ParquetSink, ler_ndjson
+
+if PYARROW_DISPONIVEL:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+VERSAO_SCHEMA = '1'
+MOEDA_PADRAO = 'BRL'   # Todas as plataformas atuais são brasileiras
+LOTE_PADRAO = 5000
+
+CAMPOS_SCHEMA = ('plataforma', 'url', 'nome', 'marca', 'categoria', 'preco', 'preco_original',
+                 'moeda', 'disponivel', 'imagem', 'extraido_em', 'preco_bruto', 'extras')
+
+# Campos consumidos pela normalização (não vão para `extras`)
+CAMPOS_CONSUMIDOS = set(CAMPOS_SCHEMA) | {'imagens', 'indice'}
+
+# Preço BR: decimal com vírgula ('29,90', '2.706,38') ou só milhar com ponto ('2.706')
+RE_VIRGULA_DECIMAL = r',\d{1,2}$'
+RE_MILHAR_PONTO = r'^-?\d{1,3}(\.\d{3})+$'
+RE_NUMERO = r'^-?\d+(\.\d+)?$'
+
+RE_INDISPONIVEL = r'outofstock|out_of_stock|soldout|sold_out|discontinued|esgotad|indispon|^false$|^0$'
+RE_DISPONIVEL = r'instock|in_stock|limitedavailability|preorder|onlineonly|dispon[ií]vel|^true$|^1$'
+
+if PYARROW_DISPONIVEL:
+    SCHEMA_PRODUTO = pa.schema([
+        ('plataforma', pa.string()),
+        ('url', pa.string()),
+        ('nome', pa.string()),
+        ('marca', pa.string()),
+        ('categoria', pa.string()),
+        ('preco', pa.float64()),
+        ('preco_original', pa.float64()),
+        ('moeda', pa.string()),
+        ('disponivel', pa.bool_()),
+        ('imagem', pa.string()),
+        ('extraido_em', pa.timestamp('us')),
+        ('preco_bruto', pa.string()),
+        ('extras', pa.string()),
+    ], metadata={'versao_schema': VERSAO_SCHEMA})
+
+
+# ================================================================================================
+# CAMPOS AUXILIARES (por registro - baratos)
+# ================================================================================================
+def _texto_preco(valor: Any) -> Optional[str]:
+    """Preço cru → texto (números com ponto decimal; objetos {value/amount})."""
+    if isinstance(valor, dict):
+        for chave in ('value', 'amount', 'price', 'lowPrice'):
+            if chave in valor:
+                return _texto_preco(valor[chave])
+        return None
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return f"{valor:.6f}" if isinstance(valor, float) else str(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+
+def _texto_disponivel(valor: Any) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    return str(valor).strip().lower().rsplit('/', 1)[-1] or None
+
+
+def _imagem(registro: Dict) -> Optional[str]:
+    imagem = registro.get('imagem')
+    if not imagem and isinstance(registro.get('imagens'), list) and registro['imagens']:
+        imagem = registro['imagens'][0]
+    if isinstance(imagem, (list, dict)):
+        imagem = json.dumps(imagem, ensure_ascii=False)
+    return imagem or None
+
+
+def _timestamp(valor: Any, padrao: datetime) -> datetime:
+    if isinstance(valor, datetime):
+        return valor.replace(tzinfo=None)
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return datetime.fromtimestamp(valor)
+    if isinstance(valor, str) and valor:
+        try:
+            return datetime.fromisoformat(valor.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            pass
+    return padrao
+
+
+def _plataforma(registro: Dict, plataforma: Optional[str]) -> Optional[str]:
+    origem = plataforma or registro.get('plataforma')
+    if origem and '://' in origem:
+        origem = urlparse(origem).netloc
+    return origem or urlparse(registro.get('url') or '').netloc or None
+
+
+def _texto(valor: Any) -> Optional[str]:
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return str(valor)
+
+
+def _extras(registro: Dict) -> Optional[str]:
+    extras = {k: v for k, v in registro.items() if k not in CAMPOS_CONSUMIDOS}
+    return json.dumps(extras, ensure_ascii=False, default=str) if extras else None
+
+
+# ================================================================================================
+# NORMALIZAÇÃO VETORIZADA (pyarrow)
+# ================================================================================================
+def _precos_vetorizado(textos: 'pa.Array') -> 'pa.Array':
+    """Texto de preço → float64 em lote ('R$ 1.299,00' → 1299.0, '29.90' → 29.9)."""
+    limpo = pc.replace_substring_regex(textos, r'[^0-9,.\-]', '')
+    formato_br = pc.or_(
+        pc.match_substring_regex(limpo, RE_VIRGULA_DECIMAL),
+        pc.match_substring_regex(limpo, RE_MILHAR_PONTO)
+    )
+    br = pc.replace_substring(pc.replace_substring(limpo, '.', ''), ',', '.')
+    internacional = pc.replace_substring(limpo, ',', '')
+    numero = pc.if_else(formato_br, br, internacional)
+    numero = pc.if_else(pc.match_substring_regex(numero, RE_NUMERO), numero, pa.scalar(None, pa.string()))
+    valores = pc.cast(numero, pa.float64())
+    return pc.if_else(pc.greater(valores, 0), valores, pa.scalar(None, pa.float64()))
+
+
+def _moedas_vetorizado(textos: 'pa.Array', declaradas: 'pa.Array') -> 'pa.Array':
+    detectada = pc.if_else(
+        pc.match_substring(textos, 'US$'), 'USD',
+        pc.if_else(pc.match_substring(textos, '€'), 'EUR', MOEDA_PADRAO)
+    )
+    detectada = pc.fill_null(detectada, MOEDA_PADRAO)
+    return pc.coalesce(pc.utf8_upper(declaradas), detectada)
+
+
+def _disponibilidade_vetorizado(textos: 'pa.Array') -> 'pa.Array':
+    nulo = pa.scalar(None, pa.bool_())
+    return pc.if_else(
+        pc.match_substring_regex(textos, RE_INDISPONIVEL), False,
+        pc.if_else(pc.match_substring_regex(textos, RE_DISPONIVEL), True, nulo)
+    )
+
+
+def normalizar_lote(
+    registros: List[Dict],
+    plataforma: Optional[str] = None,
+    coletado_em: Optional[datetime] = None
+) -> 'pa.Table':
+    """Lote de registros crus → tabela com SCHEMA_PRODUTO. Requer pyarrow."""
+    if not PYARROW_DISPONIVEL:
+        raise ImportError("normalizar_lote requer pyarrow (pip install pyarrow)")
+    coletado_em = coletado_em or datetime.now()
+
+    precos = pa.array([_texto_preco(r.get('preco')) for r in registros], pa.string())
+    originais = pa.array([_texto_preco(r.get('preco_original')) for r in registros], pa.string())
+    moedas = pa.array([_texto(r.get('moeda')) for r in registros], pa.string())
+    disponibilidade = pa.array([_texto_disponivel(r.get('disponivel')) for r in registros], pa.string())
+
+    colunas = {
+        'plataforma': pa.array([_plataforma(r, plataforma) for r in registros], pa.string()),
+        'url': pa.array([_texto(r.get('url')) for r in registros], pa.string()),
+        'nome': pa.array([_texto(r.get('nome')) for r in registros], pa.string()),
+        'marca': pa.array([_texto(r.get('marca')) for r in registros], pa.string()),
+        'categoria': pa.array([_texto(r.get('categoria')) for r in registros], pa.string()),
+        'preco': _precos_vetorizado(precos),
+        'preco_original': _precos_vetorizado(originais),
+        'moeda': _moedas_vetorizado(precos, moedas),
+        'disponivel': _disponibilidade_vetorizado(disponibilidade),
+        'imagem': pa.array([_imagem(r) for r in registros], pa.string()),
+        'extraido_em': pa.array([_timestamp(r.get('extraido_em'), coletado_em) for r in registros], pa.timestamp('us')),
+        'preco_bruto': precos,
+        'extras': pa.array([_extras(r) for r in registros], pa.string()),
+    }
+    return pa.table(colunas, schema=SCHEMA_PRODUTO)
+
+
+# ================================================================================================
+# NORMALIZAÇÃO POR REGISTRO (sem pyarrow)
+# ================================================================================================
+def normalizar_preco(valor: Any) -> Optional[float]:
+    """Mesma regra do lote vetorizado, para um valor."""
+    texto = _texto_preco(valor)
+    if texto is None:
+        return None
+    limpo = re.sub(r'[^0-9,.\-]', '', texto)
+    if re.search(RE_VIRGULA_DECIMAL, limpo) or re.search(RE_MILHAR_PONTO, limpo):
+        limpo = limpo.replace('.', '').replace(',', '.')
+    else:
+        limpo = limpo.replace(',', '')
+    if not re.search(RE_NUMERO, limpo):
+        return None
+    numero = float(limpo)
+    return numero if numero > 0 else None
+
+
+def normalizar_disponivel(valor: Any) -> Optional[bool]:
+    texto = _texto_disponivel(valor)
+    if texto is None:
+        return None
+    if re.search(RE_INDISPONIVEL, texto):
+        return False
+    if re.search(RE_DISPONIVEL, texto):
+        return True
+    return None
+
+
+def normalizar_registro(
+    r: Dict,
+    plataforma: Optional[str] = None,
+    coletado_em: Optional[datetime] = None
+) -> Dict:
+    """Registro cru → dict com os campos de SCHEMA_PRODUTO (tipos Python)."""
+    texto_preco = _texto_preco(r.get('preco'))
+    moeda = _texto(r.get('moeda'))
+    if moeda:
+        moeda = moeda.upper()
+    elif texto_preco and 'US$' in texto_preco:
+        moeda = 'USD'
+    elif texto_preco and '€' in texto_preco:
+        moeda = 'EUR'
+    else:
+        moeda = MOEDA_PADRAO
+    return {
+        'plataforma': _plataforma(r, plataforma),
+        'url': _texto(r.get('url')),
+        'nome': _texto(r.get('nome')),
+        'marca': _texto(r.get('marca')),
+        'categoria': _texto(r.get('categoria')),
+        'preco': normalizar_preco(r.get('preco')),
+        'preco_original': normalizar_preco(r.get('preco_original')),
+        'moeda': moeda,
+        'disponivel': normalizar_disponivel(r.get('disponivel')),
+        'imagem': _imagem(r),
+        'extraido_em': _timestamp(r.get('extraido_em'), coletado_em or datetime.now()),
+        'preco_bruto': texto_preco,
+        'extras': _extras(r),
+    }
+
+
+def normalizar_registros(
+    registros: Iterable[Dict],
+    plataforma: Optional[str] = None,
+    coletado_em: Optional[datetime] = None
+) -> Iterator[Dict]:
+    """Versão sem pyarrow do normalizar_lote (mesmas regras, registro a registro)."""
+    coletado_em = coletado_em or datetime.now()
+    for r in registros:
+        yield normalizar_registro(r, plataforma, coletado_em)
+
+
+# ================================================================================================
+# EXPORT
+# ================================================================================================
+def _lotes(registros: Iterable[Dict], tamanho: int) -> Iterator[List[Dict]]:
+    lote: List[Dict] = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def criar_sink_normalizado(path: str, plataforma: Optional[str] = None, **kwargs) -> ParquetSink:
+    """ParquetSink que normaliza cada lote antes de gravar (schema estável)."""
+    coletado_em = datetime.now()
+    return ParquetSink(
+        path,
+        schema=SCHEMA_PRODUTO,
+        transformar=lambda lote: normalizar_lote(lote, plataforma, coletado_em),
+        **kwargs
+    )
+
+
+def caminho_particao(diretorio: str, plataforma: str, nome: str = 'produtos.parquet') -> str:
+    """dados/host=www.sacada.com/produtos.parquet (partição Hive; `host` para não colidir com a coluna plataforma)."""
+    particao = re.sub(r'[^\w.-]', '_', plataforma or 'desconhecida')
+    return os.path.join(diretorio, f'host={particao}', nome)
+
+
+def exportar(
+    registros: Iterable[Dict],
+    destino: str,
+    plataforma: Optional[str] = None,
+    tamanho_lote: int = LOTE_PADRAO
+) -> int:
+    """
+    Normaliza e grava em lotes. `destino`:
+      *.parquet          → arquivo Parquet
+      *.arrow / *.feather → Arrow IPC
+      diretório          → Parquet particionado (host=<host>/produtos.parquet)
+    Retorna o total de registros.
+    """
+    if not PYARROW_DISPONIVEL:
+        raise ImportError("Export Parquet/Arrow requer pyarrow (pip install pyarrow)")
+
+    if destino.endswith(('.arrow', '.feather')):
+        os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+        total = 0
+        coletado_em = datetime.now()
+        with pa.OSFile(destino, 'wb') as arquivo, pa.ipc.new_file(arquivo, SCHEMA_PRODUTO) as writer:
+            for lote in _lotes(registros, tamanho_lote):
+                writer.write_table(normalizar_lote(lote, plataforma, coletado_em))
+                total += len(lote)
+        return total
+
+    if not destino.endswith('.parquet'):
+        if plataforma is None:
+            # Sem plataforma fixa: uma partição por plataforma detectada
+            return _exportar_particionado(registros, destino, tamanho_lote)
+        destino = caminho_particao(destino, plataforma)
+
+    with criar_sink_normalizado(destino, plataforma, tamanho_lote=tamanho_lote) as sink:
+        sink.write_many(registros)
+    return sink.total
+
+
+def _exportar_particionado(registros: Iterable[Dict], diretorio: str, tamanho_lote: int) -> int:
+    sinks: Dict[str, ParquetSink] = {}
+    total = 0
+    try:
+        for registro in registros:
+            plataforma = _plataforma(registro, None) or 'desconhecida'
+            if plataforma not in sinks:
+                sinks[plataforma] = criar_sink_normalizado(
+                    caminho_particao(diretorio, plataforma), plataforma, tamanho_lote=tamanho_lote
+                )
+            sinks[plataforma].write(registro)
+            total += 1
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    return total
+
+
+def ler_registros(path: str) -> Iterator[Dict]:
+    """Lê saídas existentes: NDJSON (.gz), lista JSON ou {'produtos': [...]}."""
+    if path.endswith(('.ndjson', '.jsonl', '.ndjson.gz', '.jsonl.gz')):
+        yield from ler_ndjson(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    yield from (dados.get('produtos', []) if isinstance(dados, dict) else dados)
+
+
+# ================================================================================================
+# MAIN
+# ================================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza resultados e exporta Parquet/Arrow")
+    parser.add_argument('entrada', help="Resultado existente (.json ou .ndjson[.gz])")
+    parser.add_argument('destino', help="Arquivo .parquet/.arrow ou diretório (particionado por plataforma)")
+    parser.add_argument('--plataforma', help="Plataforma fixa (padrão: campo 'plataforma' ou host da URL)")
+    parser.add_argument('--lote', type=int, default=LOTE_PADRAO)
+    args = parser.parse_args()
+
+    inicio = datetime.now()
+    total = exportar(ler_registros(args.entrada), args.destino, args.plataforma, args.lote)
+    tempo = (datetime.now() - inicio).total_seconds()
+    print(f"✅ {total} registros normalizados → {args.destino} ({tempo:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
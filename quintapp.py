@@ -6,11 +6,12 @@ Usa ThreadPoolExecutor para atualização em tempo real
 FEATURES v2:
 - Homepage SSR Discovery (MatConcasa style) - via httpx/BeautifulSoup
 - Detecta automaticamente melhor método
+- Produtos gravados em CSV (saidas/quintapp_<timestamp>/) conforme cada plataforma
+  termina; a sessão guarda só a prévia
 """
 import streamlit as st
-import csv
+import os
 import time
-from io import StringIO
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any
@@ -21,6 +22,14 @@ import asyncio
 # Importa extratores V8 (mais eficientes)
 from extract_linksv8 import extrair_produtos as extrair_produtos_generico
 from extract_detailsv8 import extrair_detalhes_paralelo
+from descoberta_frontier import descobrir_produtos_frontier
+from singleflight import obter_singleflight
+from sinks import CSVSink, MultiSink, PreviewSink, PYARROW_DISPONIVEL, campos_de
+from normalizacao import caminho_particao, criar_sink_normalizado
+from historico_precos import HistoricoPrecos
+from timing_requests import execucao_tempos, registrar_tempo
+from metricas import iniciar_se_configurado
+from tracer_crawl import faixa, salvar_trace, span
 
 # Importa extratores específicos
 try:
@@ -74,90 +83,39 @@ except Exception as e:
     MATCON_DISPONIVEL = False
     print(f"⚠️ Extrator MatConcasa não disponível: {e}")
 
+try:
+    from extract_listagem import (
+        extrair_produtos as extrair_produtos_listagem,
+        extrair_detalhes_paralelo as extrair_detalhes_listagem,
+    )
+    LISTAGEM_DISPONIVEL = True
+except Exception as e:
+    LISTAGEM_DISPONIVEL = False
+    print(f"⚠️ Extrator por listagem não disponível: {e}")
+
+
+def _parece_produto_discovery(url: str) -> bool:
+    """Links que parecem produto (mesmo critério do discovery original)"""
+    return '/produto/' in url or '/product/' in url or '/p/' in url.lower()
+
 
 async def extrair_urls_homepage(base_url: str, max_produtos: int = 100) -> list:
     """
-    Extrai URLs de produtos navegando pela homepage (MatConcasa style)
+    Extrai URLs de produtos navegando a partir da homepage (MatConcasa style)
     Usado para sites SSR sem sitemap útil
-    VERSÃO SIMPLIFICADA: usa httpx ao invés de Playwright para ser thread-safe
+    Usa o frontier crawler (httpx, thread-safe): categorias descobertas na própria
+    página (não mais lista fixa), buscadas em paralelo e com paginação automática
     """
     print(f"\n🌐 DISCOVERY MODE: {base_url}")
     
-    import httpx
-    from bs4 import BeautifulSoup
-    from urllib.parse import urljoin
-    
-    produtos_urls = set()
-    
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            # 1. Carregar homepage
-            print("📄 Carregando homepage...")
-            response = await client.get(base_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 2. Extrair links da homepage
-            print("🔍 Buscando produtos na homepage...")
-            
-            # Busca links que parecem ser de produtos
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if not href:
-                    continue
-                
-                # Verifica se parece URL de produto
-                if '/produto/' in href or '/product/' in href or '/p/' in href.lower():
-                    url_completa = urljoin(base_url, href)
-                    url_limpa = url_completa.split('?')[0].split('#')[0].rstrip('/')
-                    produtos_urls.add(url_limpa)
-            
-            print(f"  ✓ {len(produtos_urls)} produtos na homepage")
-            
-            # 3. Tentar categorias principais se precisar de mais
-            if len(produtos_urls) < max_produtos:
-                print(f"📁 Buscando em categorias...")
-                
-                categorias_padrao = [
-                    "/ferramentas/", "/casa/", "/cozinha/", "/banheiro/",
-                    "/construcao/", "/eletrica/", "/hidraulica/",
-                ]
-                
-                for cat in categorias_padrao:
-                    if len(produtos_urls) >= max_produtos:
-                        break
-                    
-                    cat_url = base_url.rstrip('/') + cat
-                    
-                    try:
-                        print(f"  Tentando: {cat}")
-                        response = await client.get(cat_url, timeout=15.0)
-                        
-                        if response.status_code == 200:
-                            soup_cat = BeautifulSoup(response.text, 'html.parser')
-                            
-                            novos = 0
-                            for link in soup_cat.find_all('a', href=True):
-                                href = link.get('href')
-                                if not href:
-                                    continue
-                                
-                                if '/produto/' in href or '/product/' in href or '/p/' in href.lower():
-                                    url_completa = urljoin(base_url, href)
-                                    url_limpa = url_completa.split('?')[0].split('#')[0].rstrip('/')
-                                    
-                                    if url_limpa not in produtos_urls:
-                                        produtos_urls.add(url_limpa)
-                                        novos += 1
-                            
-                            if novos > 0:
-                                print(f"    ✓ +{novos} produtos (total: {len(produtos_urls)})")
-                        
-                    except Exception as e:
-                        print(f"    ✗ Erro em {cat}: {str(e)[:50]}")
-                        pass
-        
+        # Busca folga (2x) porque o filtro abaixo remove categorias com /p/ etc
+        produtos_urls = await descobrir_produtos_frontier(
+            base_url,
+            max_produtos=max_produtos * 2,
+            eh_produto=_parece_produto_discovery,
+            normalizar_produto=lambda u: u.split('?')[0].split('#')[0].rstrip('/'),
+        )
     except Exception as e:
         print(f"❌ Erro no discovery: {e}")
         import traceback
@@ -204,9 +162,10 @@ def extrair_urls_homepage_sync(base_url: str, max_produtos: int = 100) -> list:
         traceback.print_exc()
         return []
 
-def detectar_extrator(url: str):
+def detectar_extrator(url: str, modo_listagem: bool = False):
     """
     Detecta qual extrator usar baseado na URL
+    modo_listagem: sites genéricos usam preço/nome das páginas de categoria
     Retorna: (tipo, fn_extrair_produtos, fn_extrair_detalhes, usar_discovery)
     """
     url_lower = url.lower()
@@ -235,22 +194,28 @@ def detectar_extrator(url: str):
     if ('matconcasa' in url_lower or 'matcon' in url_lower) and MATCON_DISPONIVEL:
         return 'matcon', extrair_produtos_matcon, extrair_detalhes_matcon, False
     
+    # Listagem (monitoramento de preço: cards das categorias, sem página de produto)
+    if modo_listagem and LISTAGEM_DISPONIVEL:
+        return 'listagem', extrair_produtos_listagem, extrair_detalhes_listagem, False
+    
     # Genérico (padrão)
     return 'generico', extrair_produtos_generico, extrair_detalhes_paralelo, False
 
 
-def processar_plataforma(url: str, max_produtos: int = None, max_workers: int = 20, progress_callback=None, usar_discovery: bool = False) -> Dict[str, Any]:
+def processar_plataforma(url: str, max_produtos: int = None, max_workers: int = 20, progress_callback=None, usar_discovery: bool = False, modo_listagem: bool = False, hedge: bool = False) -> Dict[str, Any]:
     """
     Processa uma plataforma completa (links + detalhes)
     Executa em thread - callbacks desabilitados para evitar problemas com Streamlit
     
     usar_discovery: Se True, usa Homepage SSR Discovery (MatConcasa style)
+    modo_listagem: Se True, sites genéricos extraem preço/nome das listagens
+    hedge: Se True, o extrator genérico de detalhes duplica requests lentos (> p95 do host)
     """
     try:
         inicio = time.time()
         
         # Detecta extrator apropriado
-        tipo_extrator, extrair_produtos_fn, extrair_detalhes_fn, auto_discovery = detectar_extrator(url)
+        tipo_extrator, extrair_produtos_fn, extrair_detalhes_fn, auto_discovery = detectar_extrator(url, modo_listagem)
         
         # Usa discovery se auto-detectado OU forçado pelo parâmetro
         usar_discovery = usar_discovery or auto_discovery
@@ -265,7 +230,8 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
                 # Modo Discovery: extrai URLs navegando na homepage
                 print(f"\n🌐 [{tipo_extrator.upper()}] Usando DISCOVERY MODE")
                 try:
-                    produtos_links_urls = extrair_urls_homepage_sync(url, max_produtos or 100)
+                    with span('descoberta', url=url, modo='discovery'):
+                        produtos_links_urls = extrair_urls_homepage_sync(url, max_produtos or 100)
                 except Exception as e_discovery:
                     return {
                         'url': url,
@@ -299,7 +265,8 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
                 
             else:
                 # Modo Normal: usa sitemap/extrator específico
-                produtos_links = extrair_produtos_fn(url, callback_dummy, max_produtos)
+                with span('descoberta', url=url, modo=tipo_extrator):
+                    produtos_links = extrair_produtos_fn(url, callback_dummy, max_produtos)
         
         except Exception as e:
             import traceback
@@ -326,6 +293,7 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
             }
         
         tempo_links = time.time() - inicio
+        registrar_tempo(url, 'fase_links', tempo_links)  # Logo ao fim da fase: span certo no trace
         
         # Fase 2: Extração de detalhes
         inicio_detalhes = time.time()
@@ -335,13 +303,14 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
             # Petrizi e Sacada já extraem tudo junto (sem fase de detalhes)
             if extrair_detalhes_fn is None:
                 detalhes = produtos_links
-            elif usar_discovery:
-                # Para discovery, usar extrator genérico de detalhes
+            elif usar_discovery or extrair_detalhes_fn is extrair_detalhes_paralelo:
+                # Extrator genérico de detalhes (discovery ou site genérico) - suporta hedge
                 _, detalhes = extrair_detalhes_paralelo(
                     produtos_links,
                     callback_dummy,
                     produtos_para_detalhar,
-                    max_workers
+                    max_workers,
+                    hedge=hedge
                 )
             else:
                 # Usa o extrator específico
@@ -364,6 +333,7 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
         
         tempo_detalhes = time.time() - inicio_detalhes
         tempo_total = time.time() - inicio
+        registrar_tempo(url, 'fase_detalhes', tempo_detalhes)
         
         return {
             'url': url,
@@ -391,12 +361,20 @@ def processar_plataforma(url: str, max_produtos: int = None, max_workers: int =
             'tempo_total': 0
         }
 
+def processar_plataforma_rastreada(url: str, *args) -> Dict[str, Any]:
+    """processar_plataforma numa faixa própria do trace (tracer_crawl.py) - no-op com o trace desligado"""
+    nome = url.replace('https://', '').replace('http://', '').strip('/')
+    with faixa(f"plataforma {nome}"), span('plataforma', url=url):
+        return processar_plataforma(url, *args)
+
 def main():
     st.set_page_config(
         page_title="QuintApp - Multi-Plataforma",
         layout="wide",
         initial_sidebar_state="expanded"
     )
+    # /metrics do processo se METRICAS_PORTA (idempotente nos reruns do Streamlit)
+    porta_metricas = iniciar_se_configurado()
     
     st.title("QuintApp - Extração Multi-Plataforma Paralela")
     st.markdown("**Processa múltiplas plataformas simultaneamente usando todos os núcleos da CPU**")
@@ -411,6 +389,7 @@ def main():
     {f"- ✅ Petrizi (otimizado - Tray HTML microdata)" if PETRIZI_DISPONIVEL else "- ⚠️ Petrizi (não disponível)"}
     {f"- ✅ Sacada (otimizado - Apollo Cache GraphQL)" if SACADA_DISPONIVEL else "- ⚠️ Sacada (não disponível)"}
     - 🌐 **Homepage SSR Discovery** (MatConcasa, sites SSR sem sitemap útil)
+    {f"- 🏷️ Modo Listagem (preço/nome das categorias, sem página de produto)" if LISTAGEM_DISPONIVEL else "- ⚠️ Modo Listagem (não disponível)"}
     
     O QuintApp detecta automaticamente qual extrator usar!
     """)
@@ -428,6 +407,17 @@ def main():
             value=False,
             help="Força uso do Homepage Discovery em TODOS os sites (útil para testar sites com sitemap ruim)"
         )
+        modo_listagem_global = st.checkbox(
+            "🏷️ Modo Listagem (preços)",
+            value=False,
+            disabled=not LISTAGEM_DISPONIVEL,
+            help="Sites genéricos: pega nome/preço direto das páginas de categoria (JSON-LD, microdata, estado) e só abre a página do produto se faltar campo"
+        )
+        hedge_global = st.checkbox(
+            "🪁 Hedge (cauda lenta)",
+            value=False,
+            help="Extrator genérico: quando uma página demora mais que o p95 do site, dispara uma cópia e usa a primeira resposta (máx. 10% de requests extras)"
+        )
     
     # Input de URLs
     st.header("1. Configurar Plataformas")
@@ -534,6 +524,18 @@ https://www.cebmodaseacessorios.com.br"""
         # Inicia processamento paralelo
         inicio_geral = time.time()
         resultados = []
+        
+        # Produtos vão para CSV em disco conforme cada plataforma termina;
+        # a sessão guarda só a prévia + caminhos dos arquivos
+        timestamp_run = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pasta_saida = os.path.join('saidas', f'quintapp_{timestamp_run}')
+        # Cabeçalho = união das chaves de todas as plataformas (escrito no close)
+        sink_consolidado = CSVSink(os.path.join(pasta_saida, 'produtos.csv'), uniao_chaves=True)
+        
+        # Histórico de preços: grava só o que mudou desde a última coleta de cada produto
+        historico = HistoricoPrecos()
+        execucao_historico = historico.iniciar_execucao('quintapp')
+        mudancas_historico = {'novos': 0, 'alterados': 0}
         status_plataformas = {}
         lock = threading.Lock()
         
@@ -578,14 +580,18 @@ https://www.cebmodaseacessorios.com.br"""
                     }
                     status_plataformas[url] = {'estado': 'aguardando', 'atual': 0, 'total': 0}
         
-        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+        # Contadores de requisições coalescidas (homepage/sitemap/categorias repetidas entre plataformas)
+        singleflight_inicio = dict(obter_singleflight().stats)
+        
+        # Tempos só desta execução (o registro global acumula o processo do Streamlit inteiro)
+        with execucao_tempos() as tempos_execucao, ThreadPoolExecutor(max_workers=max_threads) as executor:
             # Submit todas as tarefas SEM callbacks (Streamlit não suporta atualização em threads)
             futures = {}
             for url in urls:
                 plataforma_progress[url]['inicio'] = time.time()
                 plataforma_progress[url]['status_text'].info("Processando...")
                 plataforma_progress[url]['progress_bar'].progress(0.1)
-                future = executor.submit(processar_plataforma, url, max_produtos, max_workers_detalhes, None, usar_discovery_global)
+                future = executor.submit(processar_plataforma_rastreada, url, max_produtos, max_workers_detalhes, None, usar_discovery_global, modo_listagem_global, hedge_global)
                 futures[future] = url
             
             concluidas = 0
@@ -597,6 +603,28 @@ https://www.cebmodaseacessorios.com.br"""
                 
                 try:
                     resultado = future.result()
+                    if resultado['sucesso'] and resultado.get('produtos'):
+                        nome_plataforma = url.replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_')
+                        preview = PreviewSink()
+                        sink_plataforma = CSVSink(
+                            os.path.join(pasta_saida, f'{nome_plataforma}.csv'),
+                            campos=campos_de(resultado['produtos']), coluna_extras=False
+                        )
+                        # Parquet com preço/moeda/disponibilidade tipados (se pyarrow instalado)
+                        sink_parquet = criar_sink_normalizado(
+                            caminho_particao(os.path.join(pasta_saida, 'parquet'), nome_plataforma), url
+                        ) if PYARROW_DISPONIVEL else None
+                        with MultiSink(sink_plataforma, sink_parquet) as sinks_plataforma:
+                            for produto in resultado['produtos']:
+                                produto_com_origem = {**produto, 'plataforma': url}
+                                sinks_plataforma.write(produto)
+                                sink_consolidado.write(produto_com_origem)
+                                preview.write(produto_com_origem)
+                        resultado['arquivo'] = sink_plataforma.path
+                        resumo_historico = historico.registrar(execucao_historico, resultado['produtos'])
+                        mudancas_historico['novos'] += resumo_historico['novos']
+                        mudancas_historico['alterados'] += resumo_historico['alterados']
+                        resultado['produtos'] = preview.registros  # Libera a lista completa
                     resultados.append(resultado)
                     
                     # Atualiza card da plataforma COM OS RESULTADOS
@@ -659,6 +687,14 @@ https://www.cebmodaseacessorios.com.br"""
                 progress_bar.progress(concluidas / len(urls))
                 status_text.text(f"Processando... {concluidas}/{len(urls)} plataformas")
         
+        sink_consolidado.close()
+        historico.finalizar_execucao(execucao_historico)
+        historico.close()
+        tempos_execucao.salvar(os.path.join(pasta_saida, 'tempos.json'), nome='quintapp')
+        # Linha do tempo da execução (só com TRACE_CRAWL); limpa para a próxima execução
+        caminho_trace = salvar_trace(os.path.join(pasta_saida, 'trace.json'), limpar=True)
+        if caminho_trace:
+            st.caption(f"🧵 Trace: {caminho_trace} (abrir em https://ui.perfetto.dev)")
         tempo_total_geral = time.time() - inicio_geral
         
         progress_bar.progress(1.0)
@@ -667,6 +703,13 @@ https://www.cebmodaseacessorios.com.br"""
         # Armazena resultados na sessão
         st.session_state.resultados = resultados
         st.session_state.tempo_total = tempo_total_geral
+        st.session_state.arquivo_consolidado = sink_consolidado.path if sink_consolidado.total else None
+        st.session_state.timestamp_run = timestamp_run
+        st.session_state.historico = {'execucao': execucao_historico, **mudancas_historico}
+        st.session_state.singleflight = {
+            chave: valor - singleflight_inicio.get(chave, 0)
+            for chave, valor in obter_singleflight().stats.items()
+        }
     
     # Mostra resultados
     if 'resultados' in st.session_state:
@@ -695,6 +738,19 @@ https://www.cebmodaseacessorios.com.br"""
             produtos_por_segundo = total_produtos / tempo_total if tempo_total > 0 else 0
             st.metric("Produtos/segundo", f"{produtos_por_segundo:.2f}")
         
+        singleflight_run = st.session_state.get('singleflight', {})
+        coalescidas = singleflight_run.get('coalescidas', 0)
+        total_compartilhaveis = coalescidas + singleflight_run.get('lideres', 0)
+        if total_compartilhaveis:
+            st.caption(f"🔁 Requisições coalescidas (single-flight): {coalescidas}/{total_compartilhaveis} "
+                       f"({coalescidas / total_compartilhaveis:.0%}) - homepage/sitemap/categorias não baixados em duplicidade")
+        
+        historico_run = st.session_state.get('historico')
+        if historico_run:
+            st.caption(f"📈 Histórico de preços (execução #{historico_run['execucao']}): "
+                       f"{historico_run['novos']} produtos novos, {historico_run['alterados']} com mudanças "
+                       f"- delta: python historico_precos.py delta --desde {historico_run['execucao'] - 1}")
+        
         # Tabela de performance por plataforma
         st.subheader("Performance por Plataforma")
         
@@ -728,72 +784,55 @@ https://www.cebmodaseacessorios.com.br"""
         
         st.dataframe(performance_data, use_container_width=True)
         
-        # Consolidação de todos os produtos
+        # Consolidação de todos os produtos (prévia em memória, completos no CSV em disco)
         st.subheader("Produtos Consolidados")
         
-        todos_produtos = []
+        previa_produtos = []
         for resultado in resultados:
             if resultado['sucesso']:
-                for produto in resultado.get('produtos', []):
-                    # Adiciona origem
-                    produto_com_origem = produto.copy()
-                    produto_com_origem['plataforma'] = resultado['url']
-                    todos_produtos.append(produto_com_origem)
-        
-        if todos_produtos:
-            st.dataframe(todos_produtos, use_container_width=True)
-            
-            # Download CSV consolidado
-            csv_buffer = StringIO()
-            
-            # Pega todos os campos únicos
-            fieldnames = list(set().union(*(produto.keys() for produto in todos_produtos)))
-            
-            # Prioriza ordem dos campos
-            campos_prioritarios = ['plataforma', 'indice', 'nome', 'preco', 'preco_original', 'marca', 'categoria', 'url']
-            fieldnames_ordenados = [c for c in campos_prioritarios if c in fieldnames]
-            fieldnames_ordenados += [c for c in fieldnames if c not in campos_prioritarios]
-            
-            writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames_ordenados, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(todos_produtos)
+                previa_produtos.extend(resultado.get('produtos', []))
+        
+        arquivo_consolidado = st.session_state.get('arquivo_consolidado')
+        if previa_produtos and arquivo_consolidado and os.path.exists(arquivo_consolidado):
+            st.dataframe(previa_produtos, use_container_width=True)
+            st.caption(f"Prévia: {len(previa_produtos)} de {total_produtos} produtos - completos em {os.path.dirname(arquivo_consolidado)}"
+                       + (" (CSV + Parquet normalizado em parquet/)" if PYARROW_DISPONIVEL else ""))
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = st.session_state.get('timestamp_run', datetime.now().strftime("%Y%m%d_%H%M%S"))
             
-            st.download_button(
-                label=f"Baixar Todos os Produtos CSV ({len(todos_produtos)} produtos)",
-                data=csv_buffer.getvalue(),
-                file_name=f"quintapp_produtos_{timestamp}.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
+            # Download CSV consolidado (lido do disco, sem montar em memória a partir dos dicts)
+            with open(arquivo_consolidado, 'rb') as f:
+                st.download_button(
+                    label=f"Baixar Todos os Produtos CSV ({total_produtos} produtos)",
+                    data=f,
+                    file_name=f"quintapp_produtos_{timestamp}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
             
             # Download por plataforma
             with st.expander("Download Individual por Plataforma"):
                 for resultado in resultados:
-                    if resultado['sucesso'] and resultado.get('produtos'):
-                        csv_buffer_individual = StringIO()
+                    arquivo = resultado.get('arquivo')
+                    if resultado['sucesso'] and arquivo and os.path.exists(arquivo):
+                        nome_plataforma = os.path.splitext(os.path.basename(arquivo))[0]
                         
-                        fieldnames_individual = list(set().union(*(p.keys() for p in resultado['produtos'])))
-                        writer_individual = csv.DictWriter(csv_buffer_individual, fieldnames=fieldnames_individual, extrasaction='ignore')
-                        writer_individual.writeheader()
-                        writer_individual.writerows(resultado['produtos'])
-                        
-                        nome_plataforma = resultado['url'].replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_')
-                        
-                        st.download_button(
-                            label=f"{resultado['url']} ({len(resultado['produtos'])} produtos)",
-                            data=csv_buffer_individual.getvalue(),
-                            file_name=f"{nome_plataforma}_{timestamp}.csv",
-                            mime="text/csv",
-                            key=f"download_{nome_plataforma}"
-                        )
+                        with open(arquivo, 'rb') as f:
+                            st.download_button(
+                                label=f"{resultado['url']} ({resultado.get('total_produtos', 0)} produtos)",
+                                data=f,
+                                file_name=f"{nome_plataforma}_{timestamp}.csv",
+                                mime="text/csv",
+                                key=f"download_{nome_plataforma}"
+                            )
         else:
             st.warning("Nenhum produto foi extraído de nenhuma plataforma")
     
     # Sidebar com informações
     with st.sidebar:
         st.markdown("### QuintApp")
+        if porta_metricas:
+            st.caption(f"📈 Métricas: http://127.0.0.1:{porta_metricas}/metrics")
         st.markdown("""
         **Extração Multi-Plataforma**
         
@@ -828,10 +867,10 @@ https://www.cebmodaseacessorios.com.br"""
         **Homepage SSR Discovery (MatConcasa style)**
         
         Para sites com SSR mas sitemap ruim:
-        1. Abre homepage com Playwright
+        1. Abre homepage (httpx)
         2. Extrai links de produtos
-        3. Navega categorias principais
-        4. Scroll para lazy loading
+        3. Navega categorias descobertas (frontier por rendimento, em paralelo)
+        4. Segue paginação (?page=, PS=) enquanto render produtos
         5. Filtra produtos reais
         
         **Quando usar:**
@@ -0,0 +1,288 @@
+"""
+RATE LIMITER POR HOST - Token bucket O(1), sem lock durante a espera
+=====================================================================
+
+Substitui os limiters antigos (AdaptiveRateLimiter do crawlee/linksv7/detailsv7
+e TokenBucket do extract_fast), que dormiam SEGURANDO o lock - todos os workers
+ficavam serializados numa única corrotina e crawls multi-host dividiam um
+único orçamento.
+
+- Um bucket por host (GCRA: 1 timestamp por host, reserva O(1))
+- Reserva calculada sob threading.Lock (sem await) → a espera acontece FORA do lock
+- Funciona com asyncio (`acquire`) e com ThreadPool (`acquire_sync`)
+- Retry-After (segundos ou HTTP-date) pausa o host inteiro, não só o worker
+- Autoscale por host (mesma política do AdaptiveRateLimiter: ajuste a cada 10 requests)
+- Uma instância pode ser compartilhada por todos os extratores (`obter_rate_limiter`)
+
+Uso:
+    limiter = HostRateLimiter(requests_per_minute=120)
+    await limiter.acquire(url)
+    ...
+    limiter.report_429(url, retry_after=parse_retry_after(resp.headers.get('Retry-After')))
+"""
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from timing_requests import registrar_tempo
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+PAUSA_429_PADRAO = 10.0     # Pausa do host em 429 sem Retry-After (segundos)
+MAX_RETRY_AFTER = 300.0     # Teto para Retry-After absurdo
+AJUSTE_A_CADA = 10          # Requests por janela de autoscale
+
+
+# ================================================================================================
+# RETRY-AFTER
+# ================================================================================================
+def parse_retry_after(header_value: Optional[str]) -> Optional[float]:
+    """Parse do header Retry-After (RFC 7231: segundos ou HTTP-date). Retorna segundos."""
+    if not header_value:
+        return None
+    header_value = header_value.strip()
+    try:
+        return max(0.0, float(header_value))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(header_value)
+    except (TypeError, ValueError):
+        return None
+    if data is None:
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+def host_de(url_ou_host: Optional[str]) -> str:
+    """Chave do bucket: netloc da URL (ou o próprio valor se já for host)."""
+    if not url_ou_host:
+        return ''
+    if '://' in url_ou_host:
+        return urlparse(url_ou_host).netloc.lower()
+    return url_ou_host.lower()
+
+
+# ================================================================================================
+# BUCKET
+# ================================================================================================
+class _HostBucket:
+    """Estado de um host (GCRA + métricas de autoscale)."""
+
+    __slots__ = ('rpm', 'tat', 'bloqueado_ate', 'requests', 'erros', 'erros_429')
+
+    def __init__(self, rpm: float):
+        self.rpm = rpm
+        self.tat = 0.0              # Theoretical arrival time do próximo request
+        self.bloqueado_ate = 0.0    # Retry-After / pausa do host
+        self.requests = 0
+        self.erros = 0
+        self.erros_429 = 0
+
+
+# ================================================================================================
+# HOST RATE LIMITER
+# ================================================================================================
+class HostRateLimiter:
+    """
+    Rate limiter por host com reservas não-bloqueantes.
+
+    Args:
+        requests_per_minute: taxa máxima (e inicial) por host
+        burst: requests permitidos em rajada (padrão 1 = espaçamento uniforme)
+        autoscale: ajusta RPM por host conforme erros/429
+        min_rpm: piso do autoscale
+        jitter: jitter máximo (s) somado a cada espera, evita rajadas sincronizadas
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        burst: int = 1,
+        autoscale: bool = True,
+        min_rpm: float = 15,
+        jitter: float = 0.05,
+        verbose: bool = True
+    ):
+        self.max_rpm = requests_per_minute
+        self.burst = max(1, burst)
+        self.autoscale = autoscale
+        self.min_rpm = min(min_rpm, requests_per_minute)
+        self.jitter = jitter
+        self.verbose = verbose
+
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()  # Nunca segurado durante sleep/await
+
+    # ------------------------------------------------------------------
+    # Reserva
+    # ------------------------------------------------------------------
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.max_rpm)
+        return bucket
+
+    def reservar(self, url_ou_host: Optional[str] = None) -> float:
+        """Reserva o próximo slot do host e retorna quantos segundos esperar (O(1))."""
+        host = host_de(url_ou_host)
+        with self._lock:
+            bucket = self._bucket(host)
+            agora = time.monotonic()
+            intervalo = 60.0 / bucket.rpm
+            tolerancia = (self.burst - 1) * intervalo
+
+            tat = max(bucket.tat, agora)
+            chegada = max(tat - tolerancia, agora, bucket.bloqueado_ate)
+            bucket.tat = max(tat, chegada) + intervalo
+            return chegada - agora
+
+    def _espera_com_jitter(self, espera: float) -> float:
+        if self.jitter:
+            espera += random.uniform(0, self.jitter)
+        return espera
+
+    def _pausado(self, url_ou_host: Optional[str]) -> bool:
+        """Host pausado agora? Uma reserva sempre cai depois do bloqueio vigente; se ao acordar
+        o host está pausado, a pausa (429) veio durante a espera e o slot reservado não vale."""
+        with self._lock:
+            bucket = self._buckets.get(host_de(url_ou_host))
+            return bucket is not None and time.monotonic() < bucket.bloqueado_ate
+
+    async def acquire(self, url_ou_host: Optional[str] = None) -> float:
+        """Aguarda o slot do host (async). Retorna o tempo esperado."""
+        total = 0.0
+        while True:
+            espera = self._espera_com_jitter(self.reservar(url_ou_host))
+            if espera > 0:
+                await asyncio.sleep(espera)
+            total += espera
+            if not self._pausado(url_ou_host):
+                break
+        registrar_tempo(url_ou_host, 'fila_rate_limiter', total)  # Depois da espera: span termina agora
+        return total
+
+    def acquire_sync(self, url_ou_host: Optional[str] = None) -> float:
+        """Aguarda o slot do host (threads). Retorna o tempo esperado."""
+        total = 0.0
+        while True:
+            espera = self._espera_com_jitter(self.reservar(url_ou_host))
+            if espera > 0:
+                time.sleep(espera)
+            total += espera
+            if not self._pausado(url_ou_host):
+                break
+        registrar_tempo(url_ou_host, 'fila_rate_limiter', total)  # Depois da espera: span termina agora
+        return total
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+    def pausar_host(self, url_ou_host: Optional[str], segundos: float):
+        """Pausa o host inteiro (todos os workers) e retoma sem rajada."""
+        host = host_de(url_ou_host)
+        segundos = min(max(0.0, segundos), MAX_RETRY_AFTER)
+        with self._lock:
+            bucket = self._bucket(host)
+            ate = time.monotonic() + segundos
+            if ate > bucket.bloqueado_ate:
+                bucket.bloqueado_ate = ate
+                # Após a pausa volta a 1 request por intervalo (sem burst acumulado)
+                tolerancia = (self.burst - 1) * 60.0 / bucket.rpm
+                bucket.tat = max(bucket.tat, ate + tolerancia)
+
+    def report_success(self, url_ou_host: Optional[str] = None):
+        self._registrar(url_ou_host)
+
+    def report_error(self, url_ou_host: Optional[str] = None):
+        self._registrar(url_ou_host, erro=True)
+
+    def report_429(self, url_ou_host: Optional[str] = None, retry_after: Optional[float] = None):
+        """429: pausa o host pelo Retry-After (ou PAUSA_429_PADRAO) e conta para o autoscale."""
+        self.pausar_host(url_ou_host, retry_after if retry_after is not None else PAUSA_429_PADRAO)
+        self._registrar(url_ou_host, erro_429=True)
+
+    def _registrar(self, url_ou_host: Optional[str], erro: bool = False, erro_429: bool = False):
+        host = host_de(url_ou_host)
+        with self._lock:
+            bucket = self._bucket(host)
+            bucket.requests += 1
+            bucket.erros += erro
+            bucket.erros_429 += erro_429
+            if self.autoscale and bucket.requests >= AJUSTE_A_CADA:
+                self._ajustar(host, bucket)
+
+    def _ajustar(self, host: str, bucket: _HostBucket):
+        """Ajusta RPM do host (chamado com o lock)."""
+        error_rate = (bucket.erros + bucket.erros_429) / bucket.requests
+        old_rpm = bucket.rpm
+
+        if bucket.erros_429 > 2:
+            bucket.rpm = max(self.min_rpm, bucket.rpm * 0.3)
+        elif error_rate > 0.2:
+            bucket.rpm = max(self.min_rpm, bucket.rpm * 0.6)
+        elif error_rate < 0.05 and bucket.erros_429 == 0:
+            bucket.rpm = min(self.max_rpm, bucket.rpm * 1.05)
+
+        if self.verbose and int(bucket.rpm) != int(old_rpm):
+            icone = "✅" if bucket.rpm > old_rpm else "⚠️ "
+            print(f"{icone} [{host or '*'}] RPM: {old_rpm:.0f} → {bucket.rpm:.0f}")
+
+        bucket.requests = bucket.erros = bucket.erros_429 = 0
+
+    # ------------------------------------------------------------------
+    # Setpoints
+    # ------------------------------------------------------------------
+    def rpm(self, url_ou_host: Optional[str] = None) -> float:
+        with self._lock:
+            bucket = self._buckets.get(host_de(url_ou_host))
+            return bucket.rpm if bucket else self.max_rpm
+
+    @property
+    def current_rpm(self) -> int:
+        """RPM do host mais restrito (compatível com o AdaptiveRateLimiter)."""
+        with self._lock:
+            if not self._buckets:
+                return int(self.max_rpm)
+            return int(min(b.rpm for b in self._buckets.values()))
+
+    def setpoints(self) -> Dict[str, Dict[str, float]]:
+        """Estado atual por host: rpm e segundos restantes de pausa."""
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                host or '*': {
+                    'rpm': round(b.rpm, 2),
+                    'pausa_restante': round(max(0.0, b.bloqueado_ate - agora), 2)
+                }
+                for host, b in self._buckets.items()
+            }
+
+
+# ================================================================================================
+# INSTÂNCIA COMPARTILHADA
+# ================================================================================================
+_limiter_global: Optional[HostRateLimiter] = None
+_limiter_global_lock = threading.Lock()
+
+
+def obter_rate_limiter(requests_per_minute: float = 120, **kwargs) -> HostRateLimiter:
+    """
+    Limiter único do processo (ex: várias plataformas no quintapp dividem o orçamento
+    por host corretamente). Os parâmetros só valem na primeira chamada.
+    """
+    global _limiter_global
+    with _limiter_global_lock:
+        if _limiter_global is None:
+            _limiter_global = HostRateLimiter(requests_per_minute, **kwargs)
+        return _limiter_global
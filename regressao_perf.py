@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+GATE DE REGRESSÃO DE PERFORMANCE - Baselines por cenário + comparação com tolerância
+=====================================================================================
+
+Os números de performance moravam só em relatórios Markdown e arquivos
+resultados_*.json com timestamp - nada dizia se uma mudança deixou a extração
+mais lenta. Este harness grava baselines e falha (exit 1) em regressões.
+
+- Cenários offline/determinísticos (sem sites reais):
+    parser_v8       extract_detailsv8.extrair_dados_html sobre as fixtures HTML
+    detailsv8_mock  extrair_detalhes_paralelo contra o mock_server.py local
+    linksv8_mock    extract_linksv8.extrair_produtos (sitemap) contra o mock
+    autoscaler_lognormal  AIMDAutoscaler + 16 threads contra um mock saudável com
+                    latência lognormal (p95 ~2.7x o p50): `concorrencia` é o limite
+                    médio na 2ª metade ÷ teto - cai se o controlador confundir a cauda
+                    natural do host com congestionamento
+- Métricas: throughput (itens/s), latência p50/p95 (ms), pico de memória
+  (tracemalloc, passada separada para não distorcer o tempo), taxa de sucesso;
+  métricas com piso em PISOS falham mesmo sem baseline
+- Baseline em storage/baseline_perf.json (por cenário, com máquina/Python/commit);
+  `comparar` avisa quando a baseline veio de outra máquina ou versão do Python
+- `comparar`: tolerância global (--tolerancia 0.15) ou por métrica
+  (--tolerancia-metrica p95_ms=0.3); exit 1 se alguma métrica piorou além dela
+
+Uso:
+    python regressao_perf.py gravar
+    python regressao_perf.py comparar --tolerancia 0.15
+    python regressao_perf.py comparar --cenarios parser_v8 --tolerancia-metrica pico_mb=0.05
+    python regressao_perf.py listar
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+BASELINE_PADRAO = os.path.join('storage', 'baseline_perf.json')
+
+# métrica → 'maior' (maior é melhor) ou 'menor'
+DIRECAO = {
+    'itens_s': 'maior',
+    'p50_ms': 'menor',
+    'p95_ms': 'menor',
+    'pico_mb': 'menor',
+    'taxa_sucesso': 'maior',
+    'concorrencia': 'maior',
+}
+TOLERANCIA_PADRAO = 0.15
+
+# métrica → valor mínimo aceito, independente da baseline
+PISOS = {
+    'concorrencia': 0.25,   # 1/4 do teto = ponto de partida do autoscaler; abaixo disso ele encolheu
+}
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def _pico_mb(funcao: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def _metricas(latencias_s: List[float], itens: int, tempo_total: float, pico_mb: float,
+              taxa_sucesso: float) -> Dict[str, float]:
+    return {
+        'itens_s': round(itens / tempo_total, 2) if tempo_total else 0.0,
+        'p50_ms': round(_percentil(latencias_s, 0.50) * 1000, 3),
+        'p95_ms': round(_percentil(latencias_s, 0.95) * 1000, 3),
+        'pico_mb': round(pico_mb, 2),
+        'taxa_sucesso': round(taxa_sucesso, 4),
+    }
+
+
+# ================================================================================================
+# CENÁRIOS
+# ================================================================================================
+def _cenario_parser(parsear: Callable[[str, str], Dict], repeticoes: int) -> Dict[str, float]:
+    from bench_parsers import carregar_fixtures
+    fixtures = list(carregar_fixtures().items())
+    latencias, acertos = [], 0
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for nome, html in fixtures:
+            t0 = time.perf_counter()
+            dados = parsear(html, nome)
+            latencias.append(time.perf_counter() - t0)
+            acertos += bool(dados.get('nome')) and not dados.get('erro')
+    tempo = time.perf_counter() - inicio
+    pico = _pico_mb(lambda: [parsear(html, nome) for nome, html in fixtures])
+    return _metricas(latencias, len(latencias), tempo, pico, acertos / len(latencias))
+
+
+def cenario_parser_v8(repeticoes: int) -> Dict[str, float]:
+    from extract_detailsv8 import extrair_dados_html
+    return _cenario_parser(extrair_dados_html, repeticoes)
+
+
+@contextlib.contextmanager
+def _cronometrar(modulo, nome_funcao: str, latencias: List[float]):
+    """Troca modulo.nome_funcao por uma versão cronometrada (o executor resolve o nome na hora)"""
+    original = getattr(modulo, nome_funcao)
+
+    def cronometrada(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencias.append(time.perf_counter() - t0)
+
+    setattr(modulo, nome_funcao, cronometrada)
+    try:
+        yield
+    finally:
+        setattr(modulo, nome_funcao, original)
+
+
+def cenario_detailsv8_mock(repeticoes: int) -> Dict[str, float]:
+    import extract_detailsv8 as v8
+    from mock_server import ConfigMock, MockServer
+
+    with MockServer(ConfigMock(latencia='fixa:0.01', replicas=4)) as srv:
+        produtos = [{'url': u} for u in srv.urls_produtos()]
+
+        def rodar():
+            _, lista = v8.extrair_detalhes_paralelo(produtos, lambda m: None, max_produtos=len(produtos),
+                                                    max_workers=8, triar=False, reusar_cache=False)
+            return lista
+
+        latencias, tempos, sucessos = [], [], 0
+        for _ in range(repeticoes):
+            srv.reset()
+            with _cronometrar(v8, 'processar_produto', latencias):
+                t0 = time.perf_counter()
+                sucessos += len(rodar())
+                tempos.append(time.perf_counter() - t0)
+        pico = _pico_mb(rodar)
+    itens = len(produtos) * repeticoes
+    return _metricas(latencias, itens, sum(tempos), pico, sucessos / itens)
+
+
+def cenario_linksv8_mock(repeticoes: int) -> Dict[str, float]:
+    import extract_linksv8
+    from mock_server import ConfigMock, MockServer
+
+    with MockServer(ConfigMock(latencia='fixa:0.01', replicas=20)) as srv:
+        esperado = len(srv.paginas)
+        latencias, encontrados = [], 0
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            urls = extract_linksv8.extrair_produtos(srv.url + '/', lambda m: None, max_produtos=esperado)
+            latencias.append(time.perf_counter() - t0)
+            encontrados += min(len(urls or []), esperado)
+        pico = _pico_mb(lambda: extract_linksv8.extrair_produtos(srv.url + '/', lambda m: None, max_produtos=esperado))
+    # Latência aqui = uma descoberta completa; throughput = URLs descobertas/s
+    return _metricas(latencias, encontrados, sum(latencias), pico, encontrados / (esperado * repeticoes))
+
+
+def cenario_autoscaler_lognormal(repeticoes: int) -> Dict[str, float]:
+    import httpx
+    from concurrent.futures import ThreadPoolExecutor
+    from autoscaler import AIMDAutoscaler
+    from mock_server import ConfigMock, MockServer
+
+    teto, total = 16, 240
+    with MockServer(ConfigMock(latencia='lognormal:-2.5,0.6', replicas=60)) as srv, \
+            httpx.Client(limits=httpx.Limits(max_connections=teto)) as client:
+        urls = (srv.urls_produtos() * (total // len(srv.paginas) + 1))[:total]
+
+        def rodar(autoscaler: AIMDAutoscaler, latencias: List[float], limites: List[int]):
+            def baixar(url):
+                autoscaler.acquire_sync(url)
+                t0, status = time.perf_counter(), None
+                try:
+                    status = client.get(url).status_code
+                finally:
+                    latencia = time.perf_counter() - t0
+                    autoscaler.release(url, latencia, status, erro=status is None)
+                    latencias.append(latencia)
+                    limites.append(autoscaler.limite(url))
+                return status == 200
+
+            with ThreadPoolExecutor(max_workers=teto) as executor:
+                return sum(executor.map(baixar, urls))
+
+        latencias, limites, tempos, sucessos = [], [], [], 0
+        for _ in range(repeticoes):
+            srv.reset()
+            execucao: List[int] = []
+            t0 = time.perf_counter()
+            sucessos += rodar(AIMDAutoscaler(max_concorrencia=teto), latencias, execucao)
+            tempos.append(time.perf_counter() - t0)
+            limites.extend(execucao[len(execucao) // 2:])
+        pico = _pico_mb(lambda: rodar(AIMDAutoscaler(max_concorrencia=teto), [], []))
+    itens = total * repeticoes
+    metricas = _metricas(latencias, itens, sum(tempos), pico, sucessos / itens)
+    metricas['concorrencia'] = round(sum(limites) / len(limites) / teto, 3)
+    return metricas
+
+
+CENARIOS: Dict[str, Callable[[int], Dict[str, float]]] = {
+    'parser_v8': cenario_parser_v8,
+    'detailsv8_mock': cenario_detailsv8_mock,
+    'linksv8_mock': cenario_linksv8_mock,
+    'autoscaler_lognormal': cenario_autoscaler_lognormal,
+}
+
+
+def rodar_cenarios(nomes: List[str], repeticoes: int) -> Dict[str, Dict]:
+    resultados = {}
+    for nome in nomes:
+        print(f"▶️ {nome} ({repeticoes}x) ...", flush=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            metricas = CENARIOS[nome](repeticoes)
+        resultados[nome] = metricas
+        print("   " + ' · '.join(f"{k}={v}" for k, v in metricas.items()))
+    return resultados
+
+
+# ================================================================================================
+# BASELINE E COMPARAÇÃO
+# ================================================================================================
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=10, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def carregar_baseline(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _ambiente() -> Dict[str, str]:
+    return {'maquina': f"{platform.node()} {platform.machine()}", 'python': platform.python_version()}
+
+
+def gravar_baseline(path: str, resultados: Dict[str, Dict]):
+    baseline = carregar_baseline(path)
+    contexto = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        **_ambiente(),
+        'commit': _commit_atual(),
+    }
+    for nome, metricas in resultados.items():
+        baseline[nome] = {'metricas': metricas, **contexto}
+    diretorio = os.path.dirname(path)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def avisos_ambiente(baseline: Dict[str, Dict], cenarios: List[str]) -> List[str]:
+    """Cenários cuja baseline foi gravada em outra máquina ou outra versão do Python."""
+    atual = _ambiente()
+    avisos = []
+    for cenario in cenarios:
+        base = baseline.get(cenario)
+        if not base:
+            continue
+        diferencas = [f"{campo} {base.get(campo) or '?'} → {atual[campo]}"
+                      for campo in ('maquina', 'python') if base.get(campo) != atual[campo]]
+        if diferencas:
+            avisos.append(f"{cenario}: baseline de {', '.join(diferencas)}")
+    return avisos
+
+
+def comparar(baseline: Dict[str, Dict], resultados: Dict[str, Dict], tolerancia: float,
+             por_metrica: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Uma linha por cenário × métrica; 'regressao' = piorou além da tolerância,
+    'abaixo_piso' = ficou abaixo de PISOS (com ou sem baseline)."""
+    por_metrica = por_metrica or {}
+    linhas = []
+    for cenario, metricas in resultados.items():
+        base = (baseline.get(cenario) or {}).get('metricas')
+        for metrica, atual in metricas.items():
+            anterior = base.get(metrica) if base else None
+            tol = por_metrica.get(metrica, tolerancia)
+            linha = {'cenario': cenario, 'metrica': metrica, 'baseline': anterior, 'atual': atual,
+                     'tolerancia': tol, 'variacao': None, 'status': 'sem_baseline'}
+            if anterior is not None:
+                variacao = (atual - anterior) / anterior if anterior else (0.0 if atual == anterior else float('inf'))
+                piora = -variacao if DIRECAO.get(metrica) == 'maior' else variacao
+                linha['variacao'] = round(variacao, 4)
+                linha['status'] = 'regressao' if piora > tol else ('melhora' if piora < -tol else 'ok')
+            if metrica in PISOS and atual < PISOS[metrica]:
+                linha['status'] = 'abaixo_piso'
+            linhas.append(linha)
+    return linhas
+
+
+def imprimir_comparacao(linhas: List[Dict]):
+    icones = {'ok': '✅', 'melhora': '🚀', 'regressao': '❌', 'abaixo_piso': '⛔', 'sem_baseline': '➖'}
+    print(f"\n{'cenário':<16} {'métrica':<13} {'baseline':>11} {'atual':>11} {'variação':>9}  tol")
+    print('-' * 72)
+    for l in linhas:
+        variacao = f"{l['variacao']:+.1%}" if l['variacao'] is not None else '-'
+        base = f"{l['baseline']:,.3f}" if l['baseline'] is not None else '-'
+        print(f"{l['cenario']:<16} {l['metrica']:<13} {base:>11} {l['atual']:>11,.3f} {variacao:>9}  "
+              f"{l['tolerancia']:.0%} {icones[l['status']]}")
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def _parse_tolerancias(itens: List[str]) -> Dict[str, float]:
+    tolerancias = {}
+    for item in itens or []:
+        metrica, _, valor = item.partition('=')
+        if metrica not in DIRECAO or not valor:
+            raise SystemExit(f"❌ --tolerancia-metrica inválida: {item} (métricas: {', '.join(DIRECAO)})")
+        tolerancias[metrica] = float(valor)
+    return tolerancias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Baselines de performance + gate de regressão')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    for nome, ajuda in (('gravar', 'Roda os cenários e grava como baseline'),
+                        ('comparar', 'Roda os cenários e compara com a baseline (exit 1 se regrediu)')):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument('--cenarios', default=','.join(CENARIOS), help=f"Separados por vírgula: {', '.join(CENARIOS)}")
+        p.add_argument('--repeticoes', type=int, default=3)
+        p.add_argument('--baseline', default=BASELINE_PADRAO)
+        if nome == 'comparar':
+            p.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO, help='Piora relativa aceita (0.15 = 15%%)')
+            p.add_argument('--tolerancia-metrica', nargs='*', help='Por métrica, ex: p95_ms=0.3 pico_mb=0.05')
+            p.add_argument('--estrito', action='store_true', help='Cenário sem baseline também falha')
+            p.add_argument('--saida', help='Grava a comparação em JSON')
+
+    p = sub.add_parser('listar', help='Mostra as baselines gravadas')
+    p.add_argument('--baseline', default=BASELINE_PADRAO)
+    args = parser.parse_args()
+
+    if args.comando == 'listar':
+        for nome, b in carregar_baseline(args.baseline).items():
+            print(f"📌 {nome} ({b.get('gerado_em')}, commit {b.get('commit') or '?'}, Python {b.get('python')})")
+            print("   " + ' · '.join(f"{k}={v}" for k, v in b['metricas'].items()))
+        return
+
+    warnings.filterwarnings('ignore')
+    nomes = [c.strip() for c in args.cenarios.split(',') if c.strip()]
+    desconhecidos = [c for c in nomes if c not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"Cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    resultados = rodar_cenarios(nomes, args.repeticoes)
+
+    if args.comando == 'gravar':
+        gravar_baseline(args.baseline, resultados)
+        print(f"\n💾 Baseline gravada em {args.baseline} ({len(resultados)} cenários)")
+        return
+
+    baseline = carregar_baseline(args.baseline)
+    linhas = comparar(baseline, resultados, args.tolerancia, _parse_tolerancias(args.tolerancia_metrica))
+    imprimir_comparacao(linhas)
+    avisos = avisos_ambiente(baseline, nomes)
+    if avisos:
+        print("\n⚠️ Baseline de outro ambiente - tempos e memória podem não ser comparáveis:")
+        for aviso in avisos:
+            print(f"   {aviso}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'gerado_em': datetime.now().isoformat(timespec='seconds'), 'ambiente': _ambiente(),
+                       'avisos_ambiente': avisos, 'linhas': linhas},
+                      f, ensure_ascii=False, indent=2)
+
+    regressoes = [l for l in linhas if l['status'] == 'regressao']
+    abaixo_piso = [l for l in linhas if l['status'] == 'abaixo_piso']
+    sem_baseline = [l for l in linhas if l['status'] == 'sem_baseline']
+    if regressoes or abaixo_piso:
+        if regressoes:
+            print(f"\n❌ {len(regressoes)} regressões além da tolerância")
+        for l in abaixo_piso:
+            print(f"⛔ {l['cenario']}: {l['metrica']}={l['atual']} abaixo do piso {PISOS[l['metrica']]}")
+        sys.exit(1)
+    if sem_baseline:
+        cenarios = sorted({l['cenario'] for l in sem_baseline})
+        print(f"\n⚠️ Sem baseline: {', '.join(cenarios)} (rode: python regressao_perf.py gravar)")
+        if args.estrito:
+            sys.exit(1)
+    print("\n✅ Sem regressões")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+SINGLE-FLIGHT - Coalescência de requisições idênticas em voo
+=============================================================
+
+Quando o quintapp roda várias plataformas (ou a mesma duas vezes), as mesmas
+URLs eram baixadas em paralelo: homepage (descoberta_frontier / linksv8),
+sitemap index, páginas de categoria, homepage da MatCon nos dois extratores...
+
+- Registro de requisições EM VOO por chave: método + URL final + tudo que muda a
+  resposta (headers efetivos com UA/cookies do client, redirects, timeout, auth);
+  clients configurados igual (plataformas diferentes do quintapp) continuam coalescendo
+- A 1ª chamada (líder) faz o download; as concorrentes esperam a mesma resposta
+- Funciona entre threads e entre event loops diferentes (cada plataforma do
+  quintapp roda `asyncio.run` na sua thread) via concurrent.futures.Future
+- Exceções do líder são repassadas para quem esperava
+- Nada fica em cache: terminada a requisição, a próxima chamada baixa de novo
+- Contadores (líderes x coalescidas) para as estatísticas do run
+
+Uso:
+    r = get_compartilhado(client, url)                # httpx.Client
+    r = await get_compartilhado_async(client, url)    # httpx.AsyncClient
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import httpx
+
+
+# ================================================================================================
+# SINGLE-FLIGHT
+# ================================================================================================
+class _LiderCancelado(Exception):
+    """Líder cancelado antes de terminar - quem esperava tenta de novo (vira líder)."""
+
+
+class SingleFlight:
+    """Registro de chamadas em voo; chamadas com a mesma chave compartilham o resultado."""
+
+    def __init__(self):
+        self._em_voo: Dict[Hashable, Tuple[concurrent.futures.Future, int]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'lideres': 0, 'coalescidas': 0}
+
+    def _entrar(self, chave: Hashable) -> Tuple[concurrent.futures.Future, bool]:
+        """Retorna (future, eh_lider). Thread do líder fica registrada para evitar deadlock."""
+        with self._lock:
+            existente = self._em_voo.get(chave)
+            if existente is not None:
+                self.stats['coalescidas'] += 1
+                return existente[0], False
+            futuro: concurrent.futures.Future = concurrent.futures.Future()
+            self._em_voo[chave] = (futuro, threading.get_ident())
+            self.stats['lideres'] += 1
+            return futuro, True
+
+    def _sair(self, chave: Hashable, futuro: concurrent.futures.Future,
+              resultado: Any = None, erro: Optional[BaseException] = None):
+        with self._lock:
+            self._em_voo.pop(chave, None)
+        if erro is not None:
+            futuro.set_exception(erro)
+        else:
+            futuro.set_result(resultado)
+
+    def _lider_na_mesma_thread(self, chave: Hashable) -> bool:
+        with self._lock:
+            existente = self._em_voo.get(chave)
+            return existente is not None and existente[1] == threading.get_ident()
+
+    # ------------------------------------------------------------------
+    def executar(self, chave: Hashable, funcao: Callable[[], Any]) -> Any:
+        """Versão síncrona (threads)."""
+        # Espera bloqueante na thread do próprio líder (async) travaria o loop dele
+        if self._lider_na_mesma_thread(chave):
+            return funcao()
+
+        while True:
+            futuro, eh_lider = self._entrar(chave)
+            if not eh_lider:
+                try:
+                    return futuro.result()
+                except _LiderCancelado:
+                    continue
+
+            try:
+                resultado = funcao()
+            except BaseException as e:
+                self._sair(chave, futuro, erro=e)
+                raise
+            self._sair(chave, futuro, resultado)
+            return resultado
+
+    async def executar_async(self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão async (qualquer event loop)."""
+        while True:
+            futuro, eh_lider = self._entrar(chave)
+            if not eh_lider:
+                try:
+                    # shield: cancelar quem espera não cancela o líder
+                    return await asyncio.shield(asyncio.wrap_future(futuro))
+                except _LiderCancelado:
+                    continue
+
+            try:
+                resultado = await funcao()
+            except asyncio.CancelledError:
+                self._sair(chave, futuro, erro=_LiderCancelado())
+                raise
+            except BaseException as e:
+                self._sair(chave, futuro, erro=e)
+                raise
+            self._sair(chave, futuro, resultado)
+            return resultado
+
+    def resumo(self) -> Dict[str, Any]:
+        total = self.stats['lideres'] + self.stats['coalescidas']
+        return {
+            **self.stats,
+            'taxa_coalescencia': round(self.stats['coalescidas'] / total, 3) if total else 0.0,
+        }
+
+
+# ================================================================================================
+# INSTÂNCIA COMPARTILHADA + ATALHOS HTTP
+# ================================================================================================
+_singleflight_global = SingleFlight()
+
+
+def obter_singleflight() -> SingleFlight:
+    """Registro único do processo (todas as plataformas/threads do quintapp)."""
+    return _singleflight_global
+
+
+def chave_get(client: Union[httpx.Client, httpx.AsyncClient], url: str, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    Chave do GET como o client vai enviá-lo: URL final (base_url + params) e headers
+    efetivos (client + request, incluindo Cookie), mais follow_redirects, timeout e auth.
+    """
+    resto = dict(kwargs)
+    request = client.build_request(
+        'GET', url,
+        params=resto.pop('params', None),
+        headers=resto.pop('headers', None),
+        cookies=resto.pop('cookies', None),
+    )
+    follow_redirects = resto.pop('follow_redirects', client.follow_redirects)
+    timeout = httpx.Timeout(resto.pop('timeout')) if 'timeout' in resto else client.timeout
+    auth = resto.pop('auth', client.auth)
+    return (
+        'GET',
+        str(request.url),
+        tuple(sorted(request.headers.multi_items())),
+        bool(follow_redirects),
+        tuple(sorted(timeout.as_dict().items())),
+        id(auth) if auth is not None else None,
+        tuple(sorted((k, repr(v)) for k, v in resto.items())),
+    )
+
+
+def get_compartilhado(client: httpx.Client, url: str, **kwargs) -> httpx.Response:
+    """client.get coalescido (resposta já lida - segura para compartilhar)."""
+    return _singleflight_global.executar(chave_get(client, url, kwargs), lambda: client.get(url, **kwargs))
+
+
+async def get_compartilhado_async(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """await client.get coalescido, inclusive entre event loops diferentes."""
+    return await _singleflight_global.executar_async(chave_get(client, url, kwargs), lambda: client.get(url, **kwargs))
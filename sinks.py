@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+SINKS - Escrita de resultados em streaming (NDJSON / CSV / Parquet)
+====================================================================
+
+Os resultados ficavam inteiros em memória até o fim do run
+(`st.session_state.resultados` + CSV montado em StringIO no quintapp,
+`stats['produtos']` no extract_production_v2, `self.produtos` no
+CrawleeCrawler) - memória crescendo linear com o crawl.
+
+- Cada registro é gravado no disco assim que é produzido
+- Rotação por nº de registros e/ou bytes (`base.00001.ndjson`, `base.00002.ndjson`, ...)
+- Compressão gzip (`.gz` no nome ou `comprimir=True`)
+- NDJSON e CSV só com a stdlib; Parquet é opcional (pyarrow) e grava em lotes (row groups)
+- `PreviewSink`: primeiros N registros + total, para a UI
+- `MultiSink`: fan-out para vários sinks (ex: arquivo + preview)
+- `criar_sink(path)` escolhe o formato pela extensão
+
+Uso:
+    with MultiSink(criar_sink('saida/produtos.csv.gz'), preview := PreviewSink()) as sink:
+        for produto in produtos:
+            sink.write(produto)
+    print(preview.total, preview.registros[:5])
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+EXTENSOES = ('.ndjson', '.jsonl', '.csv', '.parquet')
+
+# Ordem preferida das colunas (mesma do CSV consolidado do quintapp)
+CAMPOS_PRIORITARIOS = ['plataforma', 'indice', 'nome', 'preco', 'preco_original', 'marca', 'categoria', 'url']
+
+PREVIEW_PADRAO = 50
+LOTE_PARQUET = 1000
+
+
+def _separar_extensao(path: str):
+    """'x/prod.csv.gz' → ('x/prod', '.csv', True)"""
+    comprimido = path.endswith('.gz')
+    sem_gz = path[:-3] if comprimido else path
+    for ext in EXTENSOES:
+        if sem_gz.endswith(ext):
+            return sem_gz[:-len(ext)], ext, comprimido
+    base, ext = os.path.splitext(sem_gz)
+    return base, ext, comprimido
+
+
+def ordenar_campos(chaves: Iterable[str]) -> List[str]:
+    """Colunas na ordem de CAMPOS_PRIORITARIOS, demais na ordem em que apareceram."""
+    chaves = list(dict.fromkeys(chaves))
+    return [c for c in CAMPOS_PRIORITARIOS if c in chaves] + [c for c in chaves if c not in CAMPOS_PRIORITARIOS]
+
+
+def campos_de(registros: Iterable[Dict]) -> List[str]:
+    """União das chaves de uma lista já em memória (cabeçalho completo do CSV)."""
+    chaves: Dict[str, None] = {}
+    for registro in registros:
+        chaves.update(dict.fromkeys(registro))
+    return ordenar_campos(chaves)
+
+
+def _celula(valor: Any) -> Any:
+    """Listas/dicts viram JSON (CSV e colunas texto)."""
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+# ================================================================================================
+# BASE
+# ================================================================================================
+class Sink:
+    """Destino de registros. Subclasses implementam `_escrever` (e opcionalmente `close`)."""
+
+    def __init__(self):
+        self.total = 0
+
+    def write(self, registro: Dict):
+        self._escrever(registro)
+        self.total += 1
+
+    def write_many(self, registros: Iterable[Dict]):
+        for registro in registros:
+            self.write(registro)
+
+    def _escrever(self, registro: Dict):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _ArquivoRotativo(Sink):
+    """Base para formatos de texto: abre, rotaciona e comprime arquivos."""
+
+    def __init__(
+        self,
+        path: str,
+        rotacionar_registros: Optional[int] = None,
+        rotacionar_bytes: Optional[int] = None,
+        comprimir: bool = False
+    ):
+        super().__init__()
+        self.path = path
+        self.base, self.extensao, gz = _separar_extensao(path)
+        self.comprimir = comprimir or gz
+        self.rotacionar_registros = rotacionar_registros
+        self.rotacionar_bytes = rotacionar_bytes
+        self.arquivos: List[str] = []
+
+        self._bruto = None       # Arquivo binário (conta bytes gravados)
+        self._arquivo = None     # Camada de texto (gzip ou não)
+        self._parte = 0
+        self._registros_parte = 0
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _nome_parte(self) -> str:
+        sufixo = '.gz' if self.comprimir else ''
+        if not (self.rotacionar_registros or self.rotacionar_bytes):
+            return f"{self.base}{self.extensao}{sufixo}"
+        return f"{self.base}.{self._parte:05d}{self.extensao}{sufixo}"
+
+    def _abrir(self):
+        self._parte += 1
+        self._registros_parte = 0
+        nome = self._nome_parte()
+        self._bruto = open(nome, 'wb')
+        camada = gzip.GzipFile(fileobj=self._bruto, mode='wb') if self.comprimir else self._bruto
+        self._arquivo = io.TextIOWrapper(camada, encoding='utf-8', newline='')
+        self.arquivos.append(nome)
+        self._ao_abrir()
+
+    def _ao_abrir(self):
+        """Gancho para cabeçalho (CSV)."""
+
+    def _fechar_parte(self):
+        if self._arquivo is None:
+            return
+        self._arquivo.close()  # Fecha gzip (se houver) e o arquivo bruto
+        if not self._bruto.closed:
+            self._bruto.close()
+        self._arquivo = self._bruto = None
+
+    def _precisa_rotacionar(self) -> bool:
+        if self.rotacionar_registros and self._registros_parte >= self.rotacionar_registros:
+            return True
+        if self.rotacionar_bytes:
+            self._arquivo.flush()
+            return self._bruto.tell() >= self.rotacionar_bytes
+        return False
+
+    def write(self, registro: Dict):
+        if self._arquivo is None:
+            self._abrir()
+        elif self._precisa_rotacionar():
+            self._fechar_parte()
+            self._abrir()
+        super().write(registro)
+        self._registros_parte += 1
+
+    def flush(self):
+        if self._arquivo is not None:
+            self._arquivo.flush()
+
+    def close(self):
+        self._fechar_parte()
+
+
+# ================================================================================================
+# FORMATOS
+# ================================================================================================
+class NDJSONSink(_ArquivoRotativo):
+    """Um JSON por linha - formato nativo do journal e da dead-letter."""
+
+    def _escrever(self, registro: Dict):
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+class CSVSink(_ArquivoRotativo):
+    """
+    CSV com cabeçalho estável.
+
+    As colunas vêm de `campos` ou do primeiro registro (prioritárias primeiro);
+    chaves que aparecem depois vão como JSON na coluna `extras`.
+
+    `uniao_chaves=True`: cabeçalho com a união das chaves de todos os registros
+    (sem `extras`). Os registros vão para um NDJSON temporário e o CSV é escrito
+    no `close()`, quando todas as colunas são conhecidas.
+    """
+
+    def __init__(self, path: str, campos: Optional[List[str]] = None, coluna_extras: bool = True,
+                 uniao_chaves: bool = False, **kwargs):
+        super().__init__(path, **kwargs)
+        self.campos: Optional[List[str]] = list(campos) if campos else None
+        self.coluna_extras = coluna_extras and not uniao_chaves
+        self._writer = None
+        self._chaves: Dict[str, None] = {}
+        self._rascunho: Optional[NDJSONSink] = NDJSONSink(f"{self.base}.parcial.ndjson") if uniao_chaves else None
+
+    def _ao_abrir(self):
+        # Cada parte rotacionada tem o próprio cabeçalho
+        self._writer = None
+
+    def write(self, registro: Dict):
+        if self._rascunho is None:
+            super().write(registro)
+            return
+        self._rascunho.write(registro)
+        self._chaves.update(dict.fromkeys(registro))
+        self.total += 1
+
+    def _escrever(self, registro: Dict):
+        if self.campos is None:
+            self.campos = ordenar_campos(registro.keys())
+        if self._writer is None:
+            colunas = self.campos + ['extras'] if self.coluna_extras else self.campos
+            self._writer = csv.DictWriter(self._arquivo, fieldnames=colunas)
+            self._writer.writeheader()
+
+        linha = {c: _celula(registro.get(c)) for c in self.campos}
+        if self.coluna_extras:
+            extras = {k: v for k, v in registro.items() if k not in linha}
+            linha['extras'] = json.dumps(extras, ensure_ascii=False) if extras else ''
+        self._writer.writerow(linha)
+
+    def close(self):
+        if self._rascunho is not None:
+            rascunho, self._rascunho = self._rascunho, None
+            rascunho.close()
+            if rascunho.total:
+                total = self.total
+                self.campos = ordenar_campos(self._chaves)
+                self.write_many(ler_ndjson(rascunho.path))
+                self.total = total
+                os.remove(rascunho.path)
+        super().close()
+
+
+class ParquetSink(Sink):
+    """
+    Parquet em lotes (um row group a cada `tamanho_lote` registros). Requer pyarrow.
+
+    Sem `schema`, o schema é inferido do primeiro lote: colunas bool/int/float
+    consistentes mantêm o tipo, o resto vira string (listas/dicts em JSON).
+    Valores incompatíveis com a coluna nos lotes seguintes viram null.
+    Um lote com chaves novas fecha a parte atual e abre outra com o schema
+    ampliado (colunas antigas + novas, partes numeradas `base.00001.parquet`, ...):
+    nenhuma coluna é descartada, e o schema da última parte lê todas
+    (`pyarrow.dataset.dataset(sink.arquivos, schema=sink.schema)`).
+    `transformar(lote) -> pa.Table` substitui essa conversão (ex: normalizacao.normalizar_lote).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        schema: Optional['pa.Schema'] = None,
+        tamanho_lote: int = LOTE_PARQUET,
+        compressao: str = 'zstd',
+        rotacionar_registros: Optional[int] = None,
+        transformar: Optional[Callable[[List[Dict]], 'pa.Table']] = None
+    ):
+        if not PYARROW_DISPONIVEL:
+            raise ImportError("ParquetSink requer pyarrow (pip install pyarrow)")
+        super().__init__()
+        self.path = path
+        self.base, self.extensao, _ = _separar_extensao(path)
+        self.schema = schema
+        self.schema_evolui = schema is None and transformar is None
+        self.tamanho_lote = tamanho_lote
+        self.compressao = compressao
+        self.rotacionar_registros = rotacionar_registros
+        self.transformar = transformar
+        self.arquivos: List[str] = []
+
+        self._lote: List[Dict] = []
+        self._writer = None
+        self._parte = 0
+        self._registros_parte = 0
+        self._numerar = bool(rotacionar_registros)
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _inferir_schema(self, lote: List[Dict]) -> 'pa.Schema':
+        campos: Dict[str, Any] = {}
+        for registro in lote:
+            for chave, valor in registro.items():
+                if valor is None:
+                    campos.setdefault(chave, None)
+                    continue
+                tipo = (pa.bool_() if isinstance(valor, bool) else
+                        pa.int64() if isinstance(valor, int) else
+                        pa.float64() if isinstance(valor, float) else pa.string())
+                atual = campos.get(chave)
+                if atual is None:
+                    campos[chave] = tipo
+                elif atual != tipo:
+                    numericos = {pa.int64(), pa.float64()}
+                    campos[chave] = pa.float64() if {atual, tipo} <= numericos else pa.string()
+        nomes = ordenar_campos(campos)
+        return pa.schema([(nome, campos[nome] or pa.string()) for nome in nomes])
+
+    def _coagir(self, valor: Any, tipo: 'pa.DataType') -> Any:
+        if valor is None:
+            return None
+        if pa.types.is_string(tipo):
+            return valor if isinstance(valor, str) else str(_celula(valor))
+        if pa.types.is_boolean(tipo):
+            return valor if isinstance(valor, bool) else None
+        if pa.types.is_integer(tipo):
+            return valor if isinstance(valor, int) and not isinstance(valor, bool) else None
+        if pa.types.is_floating(tipo):
+            return float(valor) if isinstance(valor, (int, float)) and not isinstance(valor, bool) else None
+        return valor
+
+    def _nome_parte(self, parte: int) -> str:
+        if not self._numerar:
+            return f"{self.base}{self.extensao}"
+        return f"{self.base}.{parte:05d}{self.extensao}"
+
+    def _ampliar_schema(self, lote: List[Dict]):
+        """Chaves fora do schema → fecha a parte e segue com o schema ampliado."""
+        conhecidas = set(self.schema.names)
+        if all(chave in conhecidas for registro in lote for chave in registro):
+            return
+        novas = [campo for campo in self._inferir_schema(lote) if campo.name not in conhecidas]
+        print(f"⚠️ {self.path}: colunas novas ({', '.join(c.name for c in novas)}) "
+              f"- nova parte com o schema ampliado")
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if not self._numerar:
+            # Até aqui era arquivo único: vira a parte 1
+            self._numerar = True
+            for i, antigo in enumerate(self.arquivos):
+                novo = self._nome_parte(i + 1)
+                os.replace(antigo, novo)
+                self.arquivos[i] = novo
+        self.schema = pa.schema(list(self.schema) + novas)
+
+    def _gravar_lote(self):
+        if not self._lote:
+            return
+        if self.schema is None:
+            self.schema = self._inferir_schema(self._lote)
+        elif self.schema_evolui:
+            self._ampliar_schema(self._lote)
+        if self._writer is None:
+            self._parte += 1
+            self._registros_parte = 0
+            nome = self._nome_parte(self._parte)
+            self._writer = pq.ParquetWriter(nome, self.schema, compression=self.compressao)
+            self.arquivos.append(nome)
+
+        if self.transformar:
+            tabela = self.transformar(self._lote)
+        else:
+            colunas = {
+                campo.name: [self._coagir(r.get(campo.name), campo.type) for r in self._lote]
+                for campo in self.schema
+            }
+            tabela = pa.table(colunas, schema=self.schema)
+        self._writer.write_table(tabela)
+        self._registros_parte += len(self._lote)
+        self._lote = []
+
+        if self.rotacionar_registros and self._registros_parte >= self.rotacionar_registros:
+            self._writer.close()
+            self._writer = None
+
+    def _escrever(self, registro: Dict):
+        self._lote.append(registro)
+        if len(self._lote) >= self.tamanho_lote:
+            self._gravar_lote()
+
+    def flush(self):
+        self._gravar_lote()
+
+    def close(self):
+        self._gravar_lote()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class PreviewSink(Sink):
+    """Guarda só os primeiros `max_registros` (prévia da UI) e conta o total."""
+
+    def __init__(self, max_registros: int = PREVIEW_PADRAO):
+        super().__init__()
+        self.max_registros = max_registros
+        self.registros: List[Dict] = []
+
+    def _escrever(self, registro: Dict):
+        if len(self.registros) < self.max_registros:
+            self.registros.append(registro)
+
+
+class MultiSink(Sink):
+    """Repassa cada registro para vários sinks."""
+
+    def __init__(self, *sinks: Sink):
+        super().__init__()
+        self.sinks = [s for s in sinks if s is not None]
+
+    def _escrever(self, registro: Dict):
+        for sink in self.sinks:
+            sink.write(registro)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# ================================================================================================
+# FÁBRICA + LEITURA
+# ================================================================================================
+def criar_sink(path: str, **kwargs) -> Sink:
+    """Sink pelo formato da extensão (.ndjson/.jsonl/.csv, com ou sem .gz, ou .parquet)."""
+    _, extensao, _ = _separar_extensao(path)
+    if extensao == '.parquet':
+        return ParquetSink(path, **kwargs)
+    if extensao == '.csv':
+        return CSVSink(path, **kwargs)
+    if extensao in ('.ndjson', '.jsonl'):
+        return NDJSONSink(path, **kwargs)
+    raise ValueError(f"Formato de saída não suportado: {path} (use {', '.join(EXTENSOES)})")
+
+
+def ler_ndjson(path: str) -> Iterator[Dict]:
+    """Itera um NDJSON (gzip ou não) sem carregar o arquivo inteiro."""
+    abrir = gzip.open if path.endswith('.gz') else open
+    with abrir(path, 'rt', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def exportar_json(destino: str, registros: Iterable[Dict], envelope: Optional[Dict] = None,
+                  chave: str = 'produtos') -> int:
+    """
+    Grava `{**envelope, chave: [...]}` (ou só a lista) em streaming - compatível com
+    os JSONs de saída existentes sem montar a lista em memória. Retorna o total.
+    """
+    total = 0
+    tmp = f"{destino}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if envelope is not None:
+            cabecalho = json.dumps(envelope, ensure_ascii=False, indent=2)
+            prefixo = cabecalho[:-1].rstrip() + (',\n' if envelope else '\n')
+            f.write(f'{prefixo}  "{chave}": [')
+        else:
+            f.write('[')
+        for registro in registros:
+            f.write(',\n    ' if total else '\n    ')
+            f.write(json.dumps(registro, ensure_ascii=False))
+            total += 1
+        f.write('\n  ]\n}\n' if envelope is not None else '\n]\n')
+    os.replace(tmp, destino)
+    return total
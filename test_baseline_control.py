@@ -198,11 +198,11 @@ async def extrair_produto_via_html(
     return {"erro": "Max retries atingido", "url": url}
 
 
-async def testar_50_urls():
-    """Teste de carga com 50 URLs"""
+async def testar_50_urls(arquivo_urls: str = 'urls_matcon_100.txt'):
+    """Teste de carga com 50 URLs (arquivo_urls: ex. urls_mock.txt do mock_server.py)"""
     
     # Carregar URLs do arquivo
-    with open('urls_matcon_100.txt', 'r', encoding='utf-8') as f:
+    with open(arquivo_urls, 'r', encoding='utf-8') as f:
         urls = [line.strip() for line in f if line.strip()][:50]
     
     print("=" * 100)
@@ -294,4 +294,5 @@ async def testar_50_urls():
 
 
 if __name__ == "__main__":
-    asyncio.run(testar_50_urls())
+    import sys
+    asyncio.run(testar_50_urls(*sys.argv[1:2]))
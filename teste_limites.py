@@ -193,11 +193,11 @@ async def testar_velocidade(pps: float, urls: list, label: str) -> Tuple[float,
     return taxa_sucesso, sucessos, erros_429, tempo_medio
 
 
-async def teste_progressivo():
-    """Teste progressivo para encontrar limites"""
+async def teste_progressivo(arquivo_urls: str = 'urls_matcon_100.txt'):
+    """Teste progressivo para encontrar limites (arquivo_urls: ex. urls_mock.txt do mock_server.py)"""
     
     # Carregar 10 URLs para teste rápido
-    with open('urls_matcon_100.txt', 'r', encoding='utf-8') as f:
+    with open(arquivo_urls, 'r', encoding='utf-8') as f:
         todas_urls = [line.strip() for line in f if line.strip()]
         urls_teste = todas_urls[:10]  # Primeiras 10
     
@@ -305,4 +305,5 @@ async def teste_progressivo():
 
 
 if __name__ == "__main__":
-    asyncio.run(teste_progressivo())
+    import sys
+    asyncio.run(teste_progressivo(*sys.argv[1:2]))
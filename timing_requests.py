@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+TEMPOS POR REQUEST - Quebra DNS+TCP / TLS / TTFB / download / parse / extração + filas
+=======================================================================================
+
+O único tempo que tínhamos era por fase (tempo_links/tempo_detalhes no
+quintapp) ou deltas por item impressos no ExtractorHibrido. Com um site lento
+não dava para saber se o culpado era o servidor, o parser ou o limiter.
+
+- Hooks httpx (`event_hooks_tempos()` / `event_hooks_tempos_async()`) instalam a
+  extensão `trace` do httpcore em cada request e medem:
+    fila_pool  espera por conexão livre no pool do cliente
+    conexao    TCP (inclui DNS: o httpcore resolve dentro do connect_tcp)
+    tls        handshake TLS
+    envio      headers + corpo da requisição
+    ttfb       requisição enviada → headers da resposta
+    download   headers → corpo completo
+    total      hook de request → corpo completo
+- `medir_fase(url, 'parse')` / `registrar_tempo(url, fase, s)` para parse/extração
+- Limiters registram a própria fila: fila_rate_limiter (rate_limiter.py),
+  fila_autoscaler (autoscaler.py), fila_breaker (circuit_breaker.py)
+- Histogramas por host × fase (buckets log em ms + amostras recentes p/ p50/p95)
+- `salvar_tempos(path, hosts)` grava o JSON no fim de cada execução
+- O registro global acumula o processo inteiro (histogramas do /metrics);
+  `with execucao_tempos() as tempos:` recebe só o que foi medido dentro do
+  bloco → `tempos.salvar(...)` por execução (quintapp, chamadas repetidas)
+- Com o trace ligado (tracer_crawl.py), cada fase vira também um span na
+  linha do tempo; o fetch httpx vira um span com as etapas aninhadas
+
+Uso:
+    client = httpx.Client(event_hooks=event_hooks_tempos())
+    with medir_fase(url, 'parse'):
+        soup = BeautifulSoup(html, 'lxml')
+    salvar_tempos('storage/tempos/run.json')
+    with execucao_tempos() as tempos: ...; tempos.salvar('saidas/run/tempos.json')
+    python timing_requests.py storage/tempos/run.json   # resumo legível
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from tracer_crawl import registrar_span, trace_ativo
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO_PADRAO = os.path.join('storage', 'tempos')
+
+LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+MAX_AMOSTRAS = 2048
+
+# Ordem de exibição (fases desconhecidas vão para o fim)
+ORDEM_FASES = ('fila_breaker', 'fila_rate_limiter', 'fila_autoscaler', 'fila_pool', 'conexao', 'tls',
+               'envio', 'ttfb', 'download', 'total', 'parse', 'extracao')
+
+
+def _host(url_ou_host: Optional[str]) -> str:
+    if not url_ou_host:
+        return 'default'
+    if '://' in url_ou_host:
+        return urlparse(url_ou_host).netloc.lower() or 'default'
+    return url_ou_host.lower()
+
+
+# ================================================================================================
+# HISTOGRAMA
+# ================================================================================================
+class Histograma:
+    """Buckets fixos (ms) + janela de amostras recentes para percentis"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LIMITES_MS) + 1)
+        self.n = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.amostras = deque(maxlen=MAX_AMOSTRAS)
+
+    def adicionar(self, segundos: float):
+        ms = segundos * 1000
+        i = 0
+        while i < len(LIMITES_MS) and ms > LIMITES_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.n += 1
+        self.soma += ms
+        self.maximo = max(self.maximo, ms)
+        self.amostras.append(ms)
+
+    def percentil(self, p: float) -> float:
+        if not self.amostras:
+            return 0.0
+        ordenadas = sorted(self.amostras)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+    def resumo(self) -> Dict:
+        return {
+            'n': self.n,
+            'media_ms': round(self.soma / self.n, 2) if self.n else 0.0,
+            'p50_ms': round(self.percentil(0.50), 2),
+            'p95_ms': round(self.percentil(0.95), 2),
+            'max_ms': round(self.maximo, 2),
+            'total_s': round(self.soma / 1000, 3),
+            'buckets_ms': {('+inf' if i == len(LIMITES_MS) else f'<={LIMITES_MS[i]}'): c
+                           for i, c in enumerate(self.buckets) if c},
+        }
+
+
+# ================================================================================================
+# REGISTRO
+# ================================================================================================
+class RegistroTempos:
+    """Histogramas por host × fase (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist: Dict[str, Dict[str, Histograma]] = {}
+        self._execucoes: tuple = ()  # Registros de execução recebendo cópia de cada medida
+        self.inicio = time.time()
+
+    def registrar(self, url_ou_host: Optional[str], fase: str, segundos: float, rastrear: bool = True):
+        """rastrear: a duração terminou agora → span [agora - segundos, agora] no trace"""
+        if segundos is None or segundos < 0:
+            return
+        host = _host(url_ou_host)
+        if rastrear and segundos > 0 and trace_ativo():
+            agora = time.perf_counter()
+            registrar_span(fase, agora - segundos, agora, 'fase', host=host)
+        with self._lock:
+            fases = self._hist.setdefault(host, {})
+            hist = fases.get(fase)
+            if hist is None:
+                hist = fases[fase] = Histograma()
+            hist.adicionar(segundos)
+        for execucao in self._execucoes:
+            execucao.registrar(host, fase, segundos, rastrear=False)
+
+    @contextlib.contextmanager
+    def execucao(self):
+        """Registro novo que recebe as medidas feitas enquanto o bloco roda (o global segue acumulando)"""
+        registro = RegistroTempos()
+        with self._lock:
+            self._execucoes += (registro,)
+        try:
+            yield registro
+        finally:
+            with self._lock:
+                self._execucoes = tuple(r for r in self._execucoes if r is not registro)
+
+    @contextlib.contextmanager
+    def medir(self, url_ou_host: Optional[str], fase: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(url_ou_host, fase, time.perf_counter() - inicio)
+
+    def resumo(self, hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Dict]]:
+        filtro = {_host(h) for h in hosts} if hosts is not None else None
+        ordem = {f: i for i, f in enumerate(ORDEM_FASES)}
+        with self._lock:
+            return {
+                host: {fase: fases[fase].resumo() for fase in sorted(fases, key=lambda f: (ordem.get(f, 99), f))}
+                for host, fases in sorted(self._hist.items())
+                if filtro is None or host in filtro
+            }
+
+    def histogramas(self) -> Dict[str, Dict[str, tuple]]:
+        """Cópia crua por host × fase: (buckets, n, soma_ms) - usado pelo metricas.py"""
+        with self._lock:
+            return {host: {fase: (list(h.buckets), h.n, h.soma) for fase, h in fases.items()}
+                    for host, fases in self._hist.items()}
+
+    def descrever(self, hosts: Optional[Iterable[str]] = None) -> List[str]:
+        """Uma linha por host: média por request de cada fase (onde o tempo vai)"""
+        linhas = []
+        for host, fases in self.resumo(hosts).items():
+            partes = [f"{fase} {r['media_ms']:.0f}ms" for fase, r in fases.items() if fase != 'total']
+            total = fases.get('total')
+            cabecalho = f"⏱️ {host}" + (f" ({total['n']} req, p95 {total['p95_ms']:.0f}ms)" if total else '')
+            linhas.append(f"{cabecalho}: " + ' · '.join(partes))
+        return linhas
+
+    def salvar(self, path: Optional[str] = None, hosts: Optional[Iterable[str]] = None,
+               nome: str = 'execucao', meta: Optional[Dict] = None) -> str:
+        if path is None:
+            path = os.path.join(DIRETORIO_PADRAO, f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        dados = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'nome': nome,
+            'limites_ms': list(LIMITES_MS),
+            **(meta or {}),
+            'hosts': self.resumo(hosts),
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self.inicio = time.time()
+
+
+_registro: Optional[RegistroTempos] = None
+_registro_lock = threading.Lock()
+
+
+def obter_registro_tempos() -> RegistroTempos:
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroTempos()
+        return _registro
+
+
+def registrar_tempo(url_ou_host: Optional[str], fase: str, segundos: float):
+    obter_registro_tempos().registrar(url_ou_host, fase, segundos)
+
+
+def medir_fase(url_ou_host: Optional[str], fase: str):
+    return obter_registro_tempos().medir(url_ou_host, fase)
+
+
+def salvar_tempos(path: Optional[str] = None, hosts: Optional[Iterable[str]] = None,
+                  nome: str = 'execucao', meta: Optional[Dict] = None) -> str:
+    return obter_registro_tempos().salvar(path, hosts, nome, meta)
+
+
+def descrever_tempos(hosts: Optional[Iterable[str]] = None) -> List[str]:
+    return obter_registro_tempos().descrever(hosts)
+
+
+def execucao_tempos():
+    return obter_registro_tempos().execucao()
+
+
+# ================================================================================================
+# HOOKS HTTPX
+# ================================================================================================
+class _Rastreio:
+    """Callback da extensão `trace` do httpcore: guarda o instante de cada evento"""
+
+    def __init__(self, url: str, registro: RegistroTempos):
+        self.url = url
+        self.registro = registro
+        self.inicio = time.perf_counter()
+        self.t: Dict[str, float] = {}
+        self.fechado = False
+
+    def evento(self, nome: str):
+        # 'connection.connect_tcp.started' / 'http11.receive_response_body.complete' → sem prefixo
+        _, _, etapa = nome.partition('.')
+        self.t[etapa] = time.perf_counter()
+        if etapa.endswith('.failed') or etapa == 'receive_response_body.complete':
+            self.finalizar()
+
+    def _dur(self, inicio: str, fim: str) -> Optional[float]:
+        if inicio in self.t and fim in self.t:
+            return self.t[fim] - self.t[inicio]
+        return None
+
+    def finalizar(self):
+        if self.fechado:
+            return
+        self.fechado = True
+        t = self.t
+        conexao = self._dur('connect_tcp.started', 'connect_tcp.complete')
+        tls = self._dur('start_tls.started', 'start_tls.complete')
+        fases = {'conexao': conexao, 'tls': tls}
+        if 'send_request_headers.started' in t:
+            fases['fila_pool'] = max(0.0, t['send_request_headers.started'] - self.inicio - (conexao or 0) - (tls or 0))
+        fim_envio = 'send_request_body.complete' if 'send_request_body.complete' in t else 'send_request_headers.complete'
+        fases['envio'] = self._dur('send_request_headers.started', fim_envio)
+        if fim_envio in t and 'receive_response_headers.complete' in t:
+            fases['ttfb'] = t['receive_response_headers.complete'] - t[fim_envio]
+        fases['download'] = self._dur('receive_response_headers.complete', 'receive_response_body.complete')
+        if 'receive_response_body.complete' in t:
+            fases['total'] = t['receive_response_body.complete'] - self.inicio
+        for fase, segundos in fases.items():
+            if segundos is not None:
+                self.registro.registrar(self.url, fase, segundos, rastrear=False)
+        if trace_ativo():
+            self._rastrear()
+
+    def _rastrear(self):
+        """Span do fetch com as etapas nos instantes reais (fila_pool → conexão → TLS → envio → TTFB → download)"""
+        t = self.t
+        fim = t.get('receive_response_body.complete', max(t.values(), default=self.inicio))
+        falhou = any(etapa.endswith('.failed') for etapa in t)
+        registrar_span('fetch', self.inicio, fim, 'fetch', url=self.url, falhou=falhou)
+        primeira = t.get('connect_tcp.started', t.get('send_request_headers.started'))
+        if primeira is not None and primeira > self.inicio:
+            registrar_span('fila_pool', self.inicio, primeira, 'fetch')
+        fim_envio = 'send_request_body.complete' if 'send_request_body.complete' in t else 'send_request_headers.complete'
+        for nome, inicio, fim_etapa in (
+            ('conexao', 'connect_tcp.started', 'connect_tcp.complete'),
+            ('tls', 'start_tls.started', 'start_tls.complete'),
+            ('envio', 'send_request_headers.started', fim_envio),
+            ('ttfb', fim_envio, 'receive_response_headers.complete'),
+            ('download', 'receive_response_headers.complete', 'receive_response_body.complete'),
+        ):
+            if inicio in t and fim_etapa in t:
+                registrar_span(nome, t[inicio], t[fim_etapa], 'fetch')
+
+
+def _trace_sync(rastreio: _Rastreio):
+    def trace(nome, info):
+        rastreio.evento(nome)
+    return trace
+
+
+def _trace_async(rastreio: _Rastreio):
+    async def trace(nome, info):
+        rastreio.evento(nome)
+    return trace
+
+
+def event_hooks_tempos(registro: Optional[RegistroTempos] = None) -> Dict[str, list]:
+    """event_hooks para httpx.Client"""
+    def instalar(request):
+        rastreio = _Rastreio(str(request.url), registro or obter_registro_tempos())
+        request.extensions['trace'] = _trace_sync(rastreio)
+    return {'request': [instalar]}
+
+
+def event_hooks_tempos_async(registro: Optional[RegistroTempos] = None) -> Dict[str, list]:
+    """event_hooks para httpx.AsyncClient"""
+    async def instalar(request):
+        rastreio = _Rastreio(str(request.url), registro or obter_registro_tempos())
+        request.extensions['trace'] = _trace_async(rastreio)
+    return {'request': [instalar]}
+
+
+def combinar_hooks(*hooks: Optional[Dict[str, list]]) -> Dict[str, list]:
+    """Junta vários dicts de event_hooks (ex: arquivo_respostas + tempos)"""
+    combinado: Dict[str, list] = {}
+    for h in hooks:
+        for evento, funcoes in (h or {}).items():
+            combinado.setdefault(evento, []).extend(funcoes)
+    return combinado
+
+
+# ================================================================================================
+# CLI
+# ================================================================================================
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python timing_requests.py <tempos.json>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding='utf-8') as f:
+        dados = json.load(f)
+    print(f"⏱️ {dados.get('nome')} - {dados.get('gerado_em')}\n")
+    for host, fases in dados['hosts'].items():
+        print(f"🌐 {host}")
+        print(f"   {'fase':<18} {'n':>6} {'média':>9} {'p50':>9} {'p95':>9} {'max':>9} {'total':>9}")
+        for fase, r in fases.items():
+            print(f"   {fase:<18} {r['n']:>6} {r['media_ms']:>7.1f}ms {r['p50_ms']:>7.1f}ms "
+                  f"{r['p95_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms {r['total_s']:>8.2f}s")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+TRACE DO CRAWL - Linha do tempo em Chrome trace-event JSON (Perfetto / chrome://tracing)
+========================================================================================
+
+Histogramas (timing_requests.py) dizem quanto cada fase custa, mas não mostram
+por que os lotes do extract_matcon_final ou as threads de plataforma do
+quintapp deixam capacidade ociosa. O trace mostra cada worker numa faixa:
+buracos = concorrência parada, barras longas no fim do lote = stragglers.
+
+- Opt-in: TRACE_CRAWL=1 (salva em storage/traces/) ou TRACE_CRAWL=<arquivo.json>,
+  ou `ativar_trace()` no código. Desligado, `span()` é um nullcontext
+- Spans automáticos: tudo que passa por timing_requests (fetch httpx com
+  conexão/TLS/envio/TTFB/download, parse, filas de breaker/autoscaler/rate
+  limiter, fases do quintapp)
+- Spans explícitos: `span('descoberta')`, navegação do browser, lotes
+- Faixas: thread ou task asyncio atual; `faixa('worker 3')` dá nome fixo
+  (ex: slot do lote, worker do Crawlee, plataforma do quintapp)
+- `salvar_trace(path)` grava {"traceEvents": [...]} (também no atexit com TRACE_CRAWL)
+
+Uso:
+    TRACE_CRAWL=storage/traces/matcon.json python extract_matcon_final.py
+    with span('descoberta', url=url): ...
+    abrir em https://ui.perfetto.dev (Open trace file) ou chrome://tracing
+"""
+
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+DIRETORIO_PADRAO = os.path.join('storage', 'traces')
+ENV_TRACE = 'TRACE_CRAWL'
+MAX_EVENTOS = 500_000  # ~100 MB de JSON; eventos mais antigos são descartados
+
+_faixa_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('faixa_trace', default=None)
+_NULO = contextlib.nullcontext()
+
+
+# ================================================================================================
+# TRACER
+# ================================================================================================
+class TracerCrawl:
+    """Eventos completos ('X') com ts/dur em µs, uma faixa (tid) por worker"""
+
+    def __init__(self, nome: str = 'crawl', max_eventos: int = MAX_EVENTOS):
+        self.nome = nome
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter()
+        self.inicio = datetime.now()
+        self._lock = threading.Lock()
+        self._eventos = deque(maxlen=max_eventos)
+        self._meta: list = []  # Nomes de processo/faixas (fora do deque: nunca descartados)
+        self._faixas: Dict[object, int] = {}
+        self._faixas_tarefas: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._proximo_tid = 1
+        self._meta.append({'ph': 'M', 'name': 'process_name', 'pid': self.pid, 'tid': 0,
+                           'args': {'name': f'{nome} (pid {self.pid})'}})
+
+    def _us(self, t: float) -> float:
+        return round((t - self.t0) * 1e6, 1)
+
+    def _nova_faixa(self, nome: str) -> int:
+        tid = self._proximo_tid
+        self._proximo_tid += 1
+        self._meta.append({'ph': 'M', 'name': 'thread_name', 'pid': self.pid, 'tid': tid, 'args': {'name': nome}})
+        self._meta.append({'ph': 'M', 'name': 'thread_sort_index', 'pid': self.pid, 'tid': tid,
+                           'args': {'sort_index': tid}})
+        return tid
+
+    def _tid(self) -> int:
+        """Faixa nomeada (faixa()) > task asyncio > thread"""
+        nome = _faixa_atual.get()
+        with self._lock:
+            if nome is not None:
+                chave = ('faixa', nome)
+                if chave not in self._faixas:
+                    self._faixas[chave] = self._nova_faixa(nome)
+                return self._faixas[chave]
+            thread = threading.current_thread()
+            try:
+                tarefa = asyncio.current_task()
+            except RuntimeError:
+                tarefa = None
+            if tarefa is not None:
+                tid = self._faixas_tarefas.get(tarefa)
+                if tid is None:
+                    tid = self._faixas_tarefas[tarefa] = self._nova_faixa(f'{thread.name} / {tarefa.get_name()}')
+                return tid
+            chave = ('thread', thread.ident)
+            if chave not in self._faixas:
+                self._faixas[chave] = self._nova_faixa(thread.name)
+            return self._faixas[chave]
+
+    def registrar_span(self, nome: str, inicio: float, fim: float, cat: str = 'crawl', **args):
+        """Span com instantes de time.perf_counter() (para durações medidas fora do span())"""
+        evento = {'ph': 'X', 'name': nome, 'cat': cat, 'pid': self.pid, 'tid': self._tid(),
+                  'ts': self._us(inicio), 'dur': round(max(fim - inicio, 0.0) * 1e6, 1)}
+        if args:
+            evento['args'] = args
+        self._eventos.append(evento)
+
+    @contextlib.contextmanager
+    def span(self, nome: str, cat: str = 'crawl', **args):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_span(nome, inicio, time.perf_counter(), cat, **args)
+
+    def instante(self, nome: str, cat: str = 'crawl', **args):
+        evento = {'ph': 'i', 's': 't', 'name': nome, 'cat': cat, 'pid': self.pid, 'tid': self._tid(),
+                  'ts': self._us(time.perf_counter())}
+        if args:
+            evento['args'] = args
+        self._eventos.append(evento)
+
+    def salvar(self, path: Optional[str] = None, limpar: bool = False) -> str:
+        if path is None:
+            path = os.path.join(DIRETORIO_PADRAO, f"{self.nome}_{self.inicio.strftime('%Y%m%d_%H%M%S')}.json")
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with self._lock:
+            eventos = list(self._meta) + list(self._eventos)
+            if limpar:
+                self._eventos.clear()
+        dados = {
+            'traceEvents': eventos,
+            'displayTimeUnit': 'ms',
+            'otherData': {'nome': self.nome, 'inicio': self.inicio.isoformat(timespec='seconds')},
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+        return path
+
+    def __len__(self) -> int:
+        return len(self._eventos)
+
+
+_tracer: Optional[TracerCrawl] = None
+_tracer_lock = threading.Lock()
+
+
+def ativar_trace(nome: str = 'crawl') -> TracerCrawl:
+    """Liga o trace no processo (idempotente)"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = TracerCrawl(nome)
+        return _tracer
+
+
+def obter_tracer() -> Optional[TracerCrawl]:
+    return _tracer
+
+
+def trace_ativo() -> bool:
+    return _tracer is not None
+
+
+# ================================================================================================
+# API DE CONVENIÊNCIA (no-op com o trace desligado)
+# ================================================================================================
+def span(nome: str, cat: str = 'crawl', **args):
+    if _tracer is None:
+        return _NULO
+    return _tracer.span(nome, cat, **args)
+
+
+def registrar_span(nome: str, inicio: float, fim: float, cat: str = 'crawl', **args):
+    if _tracer is not None:
+        _tracer.registrar_span(nome, inicio, fim, cat, **args)
+
+
+def instante(nome: str, cat: str = 'crawl', **args):
+    if _tracer is not None:
+        _tracer.instante(nome, cat, **args)
+
+
+@contextlib.contextmanager
+def faixa(nome: str):
+    """Spans dentro do bloco vão para a faixa `nome` (vale para a thread/task atual)"""
+    token = _faixa_atual.set(nome)
+    try:
+        yield
+    finally:
+        _faixa_atual.reset(token)
+
+
+def salvar_trace(path: Optional[str] = None, limpar: bool = False) -> Optional[str]:
+    """Grava o trace (None se desligado). limpar=True zera os eventos (ex: entre execuções do quintapp)"""
+    if _tracer is None:
+        return None
+    return _tracer.salvar(path, limpar=limpar)
+
+
+def _salvar_no_fim():
+    if _tracer is not None and len(_tracer):
+        destino = os.environ.get(ENV_TRACE)
+        path = destino if destino and destino.endswith('.json') else None
+        print(f"🧵 Trace: {_tracer.salvar(path)}")
+
+
+# TRACE_CRAWL=1 ou TRACE_CRAWL=<arquivo.json>: liga no import e salva na saída do processo
+if os.environ.get(ENV_TRACE, '').strip() not in ('', '0'):
+    ativar_trace(os.path.splitext(os.path.basename(sys.argv[0] or 'crawl'))[0] or 'crawl')
+    atexit.register(_salvar_no_fim)
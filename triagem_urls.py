@@ -0,0 +1,278 @@
+"""
+TRIAGEM DE URLs - Liveness check barato antes da fase de detalhes
+==================================================================
+
+Antes de baixar a página completa de cada produto, verifica em massa se a URL
+ainda está viva usando HEAD (ou GET com `Range: bytes=0-N` quando o servidor
+não aceita HEAD), seguindo redirects.
+
+Classificação:
+- viva            → 2xx na URL (ou em redirect para outro produto)
+- nao_encontrada  → 404
+- removida        → 410
+- soft_404        → 200 mas redireciona para home/404/busca ou <title>/<h1> de "não encontrada"
+- bloqueada       → 401/403/429 (inconclusivo - segue para detalhes)
+- inconclusiva    → outros 4xx (400/405/408/416... respostas comuns a HEAD/Range) - segue para detalhes
+- erro            → timeout/conexão/5xx (inconclusivo - segue para detalhes)
+
+Só as URLs com classificação MORTA (404/410/soft-404) são descartadas. Em
+catálogos com muitos produtos mortos no sitemap (ex: Sacada product-0) isso
+elimina a maior parte dos downloads completos desperdiçados.
+
+Uso:
+    vivas, descartadas = await triar_urls(urls)
+    produtos = filtrar_produtos_vivos(produtos, callback, max_produtos=100)
+"""
+
+import asyncio
+import html
+import re
+import concurrent.futures
+from typing import List, Dict, Tuple, Optional, Callable
+from urllib.parse import urlparse
+
+import httpx
+
+
+# ================================================================================================
+# CONFIGURAÇÃO
+# ================================================================================================
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+RANGE_BYTES = 16384     # Bytes lidos no GET parcial (suficiente para <title>)
+TIMEOUT_TRIAGEM = 8.0
+MAX_CONCORRENCIA = 20
+
+# Classificações que tiram a URL da fase de detalhes
+MORTAS = {'nao_encontrada', 'removida', 'soft_404'}
+
+# Marcadores de soft-404 na URL final (após redirects)
+URL_SOFT_404_RE = re.compile(
+    r'/404\b|productlinknotfound|not-?found|nao-?encontrad|pagina-?nao-?existe',
+    re.IGNORECASE
+)
+
+# Marcadores de soft-404 no <title>/<h1> (não no corpo todo: strings de i18n em JS inline dão falso positivo)
+CORPO_SOFT_404 = [
+    'página não encontrada',
+    'pagina nao encontrada',
+    'página não existe',
+    'produto não encontrado',
+    'produto nao encontrado',
+    'page not found',
+    'productlinknotfound',
+]
+TITLE_404_RE = re.compile(r'<title[^>]*>[^<]*\b404\b[^<]*</title>', re.IGNORECASE)
+TITULOS_RE = re.compile(r'<(title|h1)\b[^>]*>(.*?)</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAGS_RE = re.compile(r'<[^>]+>')
+
+
+def _titulos(corpo: str) -> str:
+    """Texto do <title> e dos <h1> (minúsculo, sem tags) - onde a página diz que não existe."""
+    textos = (' '.join(html.unescape(TAGS_RE.sub(' ', m.group(2))).split()) for m in TITULOS_RE.finditer(corpo))
+    return ' | '.join(textos).lower()
+
+
+# ================================================================================================
+# CLASSIFICAÇÃO
+# ================================================================================================
+def classificar_resposta(url: str, status: int, url_final: Optional[str] = None, corpo: str = '') -> str:
+    """
+    Classifica uma resposta de triagem (HEAD ou GET parcial).
+    Função pura - também usada pela validação síncrona do extract_linksv5.
+    """
+    if status == 404:
+        return 'nao_encontrada'
+    if status == 410:
+        return 'removida'
+    if status in (401, 403, 429):
+        return 'bloqueada'
+    if status >= 500:
+        return 'erro'
+    if status >= 400:
+        # 400/405/408/416...: o servidor recusou a sonda, não disse que o produto sumiu
+        return 'inconclusiva'
+
+    # 2xx/3xx final: checa se o redirect levou para home/404/busca
+    if url_final and url_final.rstrip('/') != url.rstrip('/'):
+        final = urlparse(url_final)
+        original = urlparse(url)
+
+        if URL_SOFT_404_RE.search(url_final):
+            return 'soft_404'
+
+        # Produto que redireciona para a home (ou para página de busca)
+        if final.path.strip('/') == '' and original.path.strip('/') != '':
+            return 'soft_404'
+        if final.path.rstrip('/') in ('/busca', '/search', '/s') or 'busca?' in url_final:
+            return 'soft_404'
+
+    if corpo:
+        titulos = _titulos(corpo)
+        if any(m in titulos for m in CORPO_SOFT_404) or TITLE_404_RE.search(corpo):
+            return 'soft_404'
+
+    return 'viva'
+
+
+# ================================================================================================
+# TRIAGEM ASSÍNCRONA
+# ================================================================================================
+async def _get_parcial(client: httpx.AsyncClient, url: str, range_bytes: int) -> Tuple[int, str, str]:
+    """GET com Range: lê no máximo `range_bytes` e fecha a conexão (mesmo se o servidor ignorar Range)."""
+    headers = {'Range': f'bytes=0-{range_bytes - 1}'}
+
+    async with client.stream('GET', url, headers=headers) as response:
+        corpo = b''
+        if response.status_code < 400:
+            async for chunk in response.aiter_bytes():
+                corpo += chunk
+                if len(corpo) >= range_bytes:
+                    break
+
+        status = response.status_code
+        if status == 206:  # Partial Content = viva
+            status = 200
+
+        encoding = response.encoding or 'utf-8'
+        return status, str(response.url), corpo[:range_bytes].decode(encoding, errors='ignore')
+
+
+async def triar_url(
+    client: httpx.AsyncClient,
+    url: str,
+    modo: str = 'head',
+    range_bytes: int = RANGE_BYTES
+) -> str:
+    """
+    Triagem de uma URL.
+
+    modo='head'  → HEAD primeiro; cai para GET parcial se servidor não suportar HEAD
+    modo='range' → sempre GET parcial (detecta soft-404 pelo corpo também)
+    """
+    try:
+        if modo == 'head':
+            response = await client.head(url)
+
+            # Servidores que não implementam HEAD (ou o tratam como erro)
+            if response.status_code not in (405, 501, 400, 403):
+                return classificar_resposta(url, response.status_code, str(response.url))
+
+        status, url_final, corpo = await _get_parcial(client, url, range_bytes)
+        return classificar_resposta(url, status, url_final, corpo)
+
+    except httpx.TimeoutException:
+        return 'erro'
+    except Exception:
+        return 'erro'
+
+
+async def triar_urls(
+    urls: List[str],
+    max_concorrencia: int = MAX_CONCORRENCIA,
+    modo: str = 'head',
+    timeout: float = TIMEOUT_TRIAGEM,
+    progress_callback: Optional[Callable] = None
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Triagem em massa.
+
+    Returns:
+        (urls_vivas na ordem original, {url_descartada: classificacao})
+    """
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    classificacoes: Dict[str, str] = {}
+
+    async with httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_concorrencia)
+    ) as client:
+
+        async def _triar(url: str):
+            async with semaforo:
+                classificacoes[url] = await triar_url(client, url, modo)
+            if progress_callback:
+                progress_callback(len(classificacoes), len(urls), url, "triagem")
+
+        await asyncio.gather(*(_triar(url) for url in dict.fromkeys(urls)))
+
+    vivas = [url for url in urls if classificacoes.get(url) not in MORTAS]
+    descartadas = {url: c for url, c in classificacoes.items() if c in MORTAS}
+    return vivas, descartadas
+
+
+def triar_urls_sync(urls: List[str], **kwargs) -> Tuple[List[str], Dict[str, str]]:
+    """Wrapper síncrono (thread-safe) para extratores baseados em ThreadPool."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(triar_urls(urls, **kwargs))
+
+    # Já existe loop rodando nesta thread (ex: Streamlit) - executa em thread isolada
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, triar_urls(urls, **kwargs)).result()
+
+
+# ================================================================================================
+# INTEGRAÇÃO COM EXTRATORES (lista de dicts {'url': ...})
+# ================================================================================================
+def resumir_descartadas(descartadas: Dict[str, str]) -> Dict[str, int]:
+    """Conta descartes por classificação."""
+    resumo: Dict[str, int] = {}
+    for classificacao in descartadas.values():
+        resumo[classificacao] = resumo.get(classificacao, 0) + 1
+    return resumo
+
+
+def filtrar_produtos_vivos(
+    produtos: List[Dict],
+    callback: Optional[Callable] = None,
+    max_produtos: Optional[int] = None,
+    **kwargs
+) -> List[Dict]:
+    """
+    Remove produtos mortos antes da fase de detalhes.
+
+    Com max_produtos, triagem é feita em lotes e para assim que houver
+    produtos vivos suficientes (não faz HEAD no catálogo inteiro).
+    """
+    if not produtos:
+        return produtos
+
+    vivos: List[Dict] = []
+    descartadas_total: Dict[str, str] = {}
+    posicao = 0
+
+    while posicao < len(produtos):
+        if max_produtos:
+            faltam = max_produtos - len(vivos)
+            if faltam <= 0:
+                break
+            # Lote com folga para compensar os mortos
+            tamanho_lote = max(MAX_CONCORRENCIA, faltam + faltam // 2)
+        else:
+            tamanho_lote = len(produtos)
+
+        lote = produtos[posicao:posicao + tamanho_lote]
+        posicao += len(lote)
+
+        urls_vivas, descartadas = triar_urls_sync([p['url'] for p in lote], **kwargs)
+        descartadas_total.update(descartadas)
+        vivas_set = set(urls_vivas)
+        vivos.extend(p for p in lote if p['url'] in vivas_set)
+
+    if max_produtos:
+        vivos = vivos[:max_produtos]
+
+    if descartadas_total:
+        resumo = ', '.join(f"{k}: {v}" for k, v in resumir_descartadas(descartadas_total).items())
+        if callback:
+            callback(f"🩺 Triagem: {len(descartadas_total)} URLs mortas descartadas ({resumo})")
+
+    return vivos